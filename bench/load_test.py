@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Concurrent upload load test for Hardware Inventory
+Starts the web interface on localhost (or targets --url) and replays what a
+fleet running `curl | bash` does: each simulated host uploads its synthetic
+scan, then rescans a few times with the If-None-Match handshake, uploading
+again only when its hardware changed. Hosts told the server is busy (429 or
+503) back off and retry the way the scanner script does. Dashboard readers
+run alongside.
+Reports p50/p95/p99 latency, error rates by cause and throughput per
+operation, to find how many simultaneous hosts one server survives.
+
+Usage:
+    python3 load_test.py --hosts 200 --arrival burst
+    python3 load_test.py --hosts 1000 --arrival poisson --rate 50 --workers 4 --threads 8
+    python3 load_test.py --url http://inventory:5101 --hosts 100 --readers 0
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+sys.path.insert(0, SRC_DIR)
+
+from run_benchmarks import _git_commit, _summarize  # noqa: E402
+from synthetic_fleet import generate_fleet  # noqa: E402
+from inventory_manager import scan_fingerprint  # noqa: E402
+
+READ_PAGES = ['/', '/systems', '/components', '/reports']
+
+# Answers that mean "busy, come back later", and the longest wait between tries
+BUSY_STATUSES = (429, 503)
+MAX_BACKOFF = 300
+
+
+class Recorder:
+    """Latency samples and error counts per operation, shared by all threads"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.throttled: Dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finish(self, operation: str, seconds: float, error: Optional[str] = None, throttled: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled[operation] = self.throttled.get(operation, 0) + 1
+            elif error:
+                kinds = self.errors.setdefault(operation, {})
+                kinds[error] = kinds.get(error, 0) + 1
+            else:
+                self.samples.setdefault(operation, []).append(seconds)
+
+    def give_up(self, operation: str):
+        """A host still turned away after its last retry"""
+        with self._lock:
+            kinds = self.errors.setdefault(operation, {})
+            kinds['gave_up'] = kinds.get('gave_up', 0) + 1
+
+
+def _classify(status: Optional[int], body: str) -> str:
+    if 'database is locked' in body:
+        return 'database_locked'
+    if status is not None:
+        return f'http_{status}'
+    return body or 'error'
+
+
+def request(recorder: Recorder, operation: str, url: str, data: bytes = None,
+            headers: Dict = None, timeout: float = 30.0, ok=(200,), busy: Dict = None) -> Optional[int]:
+    """Time one request; returns the status code, or None if it failed
+
+    With busy given, 429/503 answers aren't errors: they are counted as
+    throttled and their Retry-After and jitter window are stored in busy.
+    """
+    req = urllib.request.Request(url, data=data, headers=headers or {},
+                                 method='GET' if data is None else 'POST')
+    recorder.start()
+    start = time.perf_counter()
+    status, error, throttled = None, None, False
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+        body = e.read().decode('utf-8', 'replace')
+        if busy is not None and status in BUSY_STATUSES:
+            throttled = True
+            busy['retry_after'] = float(e.headers.get('Retry-After') or 5)
+            busy['jitter'] = float(e.headers.get('X-Inventory-Retry-Jitter') or 0)
+        elif status not in ok:
+            error = _classify(status, body)
+    except socket.timeout:
+        error = 'timeout'
+    except (urllib.error.URLError, ConnectionError) as e:
+        reason = getattr(e, 'reason', e)
+        error = 'timeout' if isinstance(reason, socket.timeout) else f'connection: {reason}'
+    recorder.finish(operation, time.perf_counter() - start, error, throttled)
+    return None if error else status
+
+
+def request_with_backoff(recorder: Recorder, operation: str, url: str, rng: random.Random,
+                         max_retries: int, **kwargs) -> Optional[int]:
+    """request(), retrying busy answers like the /scan_system script
+
+    Waits Retry-After doubled on each attempt (at most MAX_BACKOFF) plus a
+    random share of the server's jitter window.
+    """
+    for attempt in range(max_retries + 1):
+        busy = {}
+        status = request(recorder, operation, url, busy=busy, **kwargs)
+        if not busy:
+            return status
+        if attempt < max_retries:
+            delay = min(busy['retry_after'] * 2 ** attempt, MAX_BACKOFF)
+            time.sleep(delay + rng.uniform(0, busy['jitter']))
+    recorder.give_up(operation)
+    return None
+
+
+def simulate_host(recorder: Recorder, base_url: str, scan: Dict, rescans: int, interval: float,
+                  change_rate: float, timeout: float, rng: random.Random, max_retries: int = 6):
+    """One host: a full upload, then handshake rescans like /scan_system"""
+    url = f'{base_url}/api/upload_scan'
+    for attempt in range(rescans + 1):
+        if attempt:
+            time.sleep(interval * rng.uniform(0.5, 1.5))
+            detected = datetime.fromisoformat(scan['detection_date']) + timedelta(hours=1)
+            scan = dict(scan, detection_date=detected.isoformat(timespec='seconds'))
+            if rng.random() < change_rate and scan.get('storage'):
+                # A disk was swapped since the last scan
+                disk = dict(scan['storage'][0], serial=f'S{rng.getrandbits(48):012X}')
+                scan['storage'] = [disk] + scan['storage'][1:]
+            status = request_with_backoff(recorder, 'handshake', url, rng, max_retries, data=b'',
+                                          timeout=timeout, ok=(200, 304), headers={
+                'X-Inventory-Hostname': scan['hostname'],
+                'X-Inventory-Detection-Date': scan['detection_date'],
+                'If-None-Match': f'"{scan_fingerprint(scan)}"',
+            })
+            if status != 200:
+                continue  # unchanged (304) or failed
+        request_with_backoff(recorder, 'upload', url, rng, max_retries,
+                             data=json.dumps(scan).encode('utf-8'), timeout=timeout,
+                             headers={'Content-Type': 'application/json'})
+
+
+def read_dashboard(recorder: Recorder, base_url: str, stop: threading.Event, think: float,
+                   timeout: float, rng: random.Random):
+    while not stop.is_set():
+        request(recorder, 'read', base_url + rng.choice(READ_PAGES), timeout=timeout)
+        stop.wait(think * rng.uniform(0.5, 1.5))
+
+
+def arrival_offsets(count: int, pattern: str, rate: float, duration: float,
+                    rng: random.Random) -> List[float]:
+    """Seconds after the start at which each host begins"""
+    if pattern == 'burst':
+        # Everyone's cron fires at the same minute
+        return [0.0] * count
+    if pattern == 'uniform':
+        # Cron with a random splay of up to duration seconds
+        return sorted(rng.uniform(0, duration) for _ in range(count))
+    offsets, now = [], 0.0
+    for _ in range(count):
+        now += rng.expovariate(rate)
+        offsets.append(now)
+    return offsets
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, workers: int, threads: int, log) -> Tuple[subprocess.Popen, str]:
+    """Run web_interface.py on a free localhost port and wait until it is ready"""
+    port = _free_port()
+    env = dict(os.environ, INVENTORY_DB=db_path)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SRC_DIR, 'web_interface.py'), '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers), '--threads', str(threads)],
+        cwd=SRC_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + '/health/ready', timeout=1) as response:
+                if response.status == 200:
+                    return process, base_url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become ready within 60s")
+
+
+def run(args, base_url: str) -> Dict:
+    rng = random.Random(args.seed)
+    fleet = list(generate_fleet(args.hosts, args.seed, prefix='load'))
+    offsets = arrival_offsets(len(fleet), args.arrival, args.rate, args.duration, rng)
+    recorder = Recorder()
+    stop = threading.Event()
+
+    readers = [threading.Thread(target=read_dashboard,
+                                args=(recorder, base_url, stop, args.think, args.timeout,
+                                      random.Random(args.seed + i)), daemon=True)
+               for i in range(args.readers)]
+    start = time.perf_counter()
+    for reader in readers:
+        reader.start()
+
+    def host_task(index: int):
+        delay = offsets[index] - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        simulate_host(recorder, base_url, fleet[index], args.rescans, args.rescan_interval,
+                      args.change_rate, args.timeout, random.Random(args.seed * 7919 + index),
+                      args.max_retries)
+
+    concurrency = args.concurrency or len(fleet)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='host') as pool:
+        list(pool.map(host_task, range(len(fleet))))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    results = {}
+    for operation in sorted(recorder.samples.keys() | recorder.errors.keys() | recorder.throttled.keys()):
+        samples = recorder.samples.get(operation, [])
+        errors = recorder.errors.get(operation, {})
+        throttled = recorder.throttled.get(operation, 0)
+        total = len(samples) + sum(count for kind, count in errors.items() if kind != 'gave_up') + throttled
+        entry = _summarize(samples) if samples else {'runs': 0}
+        entry.update({
+            'requests': total,
+            'throttled': throttled,
+            'errors': errors,
+            'error_rate': sum(errors.values()) / total if total else 0.0,
+            'throughput_per_second': len(samples) / elapsed if elapsed else 0.0,
+        })
+        results[operation] = entry
+    return {'seconds': elapsed, 'peak_in_flight': recorder.peak_in_flight, 'operations': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent upload load test')
+    parser.add_argument('--hosts', type=int, default=200, help='Simulated hosts (default: 200)')
+    parser.add_argument('--arrival', choices=['burst', 'uniform', 'poisson'], default='burst',
+                        help='When hosts start: all at once, spread over --duration, '
+                             'or Poisson at --rate (default: burst)')
+    parser.add_argument('--rate', type=float, default=20.0, help='Hosts per second for poisson (default: 20)')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Spread in seconds for uniform (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='Maximum hosts in flight (default: all)')
+    parser.add_argument('--rescans', type=int, default=2, help='Handshake rescans per host (default: 2)')
+    parser.add_argument('--rescan-interval', type=float, default=1.0,
+                        help='Mean seconds between a host\'s scans (default: 1)')
+    parser.add_argument('--change-rate', type=float, default=0.1,
+                        help='Share of rescans whose hardware changed (default: 0.1)')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent dashboard readers (default: 4)')
+    parser.add_argument('--think', type=float, default=0.2,
+                        help='Mean pause between a reader\'s page loads (default: 0.2)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Request timeout (default: 30)')
+    parser.add_argument('--max-retries', type=int, default=6,
+                        help='Retries of a request the server turned away as busy (default: 6)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes (default: 2)')
+    parser.add_argument('--threads', type=int, default=4, help='Server threads per worker (default: 4)')
+    parser.add_argument('--output', help='Also write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        log_path = os.path.join(tmp, 'server.log')
+        with open(log_path, 'w') as log:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                print(f"Starting server ({args.workers} workers x {args.threads} threads)...")
+                process, base_url = start_server(os.path.join(tmp, 'load.db'), args.workers,
+                                                 args.threads, log)
+            try:
+                print(f"Running {args.hosts} hosts ({args.arrival} arrival, {args.rescans} rescans each) "
+                      f"and {args.readers} readers against {base_url}...")
+                report = run(args, base_url)
+            finally:
+                if process:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+    report.update({
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+    })
+
+    print(f"\n{'operation':10} {'requests':>9} {'busy':>6} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'ok/s':>8}")
+    print("-" * 85)
+    for operation, entry in report['operations'].items():
+        latency = (f"{entry['p50_ms']:9.1f} {entry['p95_ms']:9.1f} {entry['p99_ms']:9.1f} {entry['max_ms']:9.1f}"
+                   if entry['runs'] else f"{'-':>9} {'-':>9} {'-':>9} {'-':>9}")
+        print(f"{operation:10} {entry['requests']:9} {entry['throttled']:6} {entry['error_rate']:7.1%} {latency} "
+              f"{entry['throughput_per_second']:8.1f}")
+        for kind, count in sorted(entry['errors'].items()):
+            print(f"    {kind}: {count}")
+    print(f"\n{report['seconds']:.1f}s wall time, peak {report['peak_in_flight']} requests in flight")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    failed = any(entry['errors'] for entry in report['operations'].values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Hardware Inventory
+Measures ingest throughput, CLI start-up and output, page latency through
+the Flask test client (including /reports), PCI database load time and
+manufacturer backfill
+against a synthetic fleet. Results are written as JSON so runs can be
+compared across commits.
+
+Usage:
+    python3 run_benchmarks.py --systems 500
+    python3 run_benchmarks.py --compare results/old.json results/new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+sys.path.insert(0, SRC_DIR)
+
+from synthetic_fleet import ComponentMix, generate_fleet  # noqa: E402
+
+
+def _summarize(samples: List[float]) -> Dict:
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000
+
+    return {
+        'runs': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def _time_calls(func: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Swallow the progress messages the inventory prints"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_ingest(db_path: str, fleet: List[Dict]) -> Dict:
+    """update_system throughput for first scans and unchanged rescans"""
+    from inventory_manager import HardwareInventory
+
+    with _quiet():
+        inventory = HardwareInventory(db_path)
+    results = {}
+    try:
+        for phase in ('initial', 'rescan'):
+            start = time.perf_counter()
+            with _quiet():
+                for payload in fleet:
+                    inventory.update_system(payload)
+            elapsed = time.perf_counter() - start
+            results[phase] = {
+                'scans': len(fleet),
+                'seconds': elapsed,
+                'scans_per_second': len(fleet) / elapsed if elapsed else 0.0,
+            }
+    finally:
+        inventory.close()
+    return results
+
+
+def bench_cli(db_path: str, hostname: str, repeat: int) -> Dict:
+    """Wall time of CLI invocations, including interpreter start-up"""
+    script = os.path.join(SRC_DIR, 'inventory_manager.py')
+    commands = {
+        'list': [sys.executable, script, 'list', '--db', db_path],
+        'show': [sys.executable, script, 'show', '--db', db_path],
+        'show_host': [sys.executable, script, 'show', '--hostname', hostname, '--db', db_path],
+        'list_json': [sys.executable, script, 'list', '--format', 'json', '--db', db_path],
+    }
+    results = {}
+    for name, command in commands.items():
+        samples = _time_calls(
+            lambda: subprocess.run(command, cwd=SRC_DIR, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, check=True),
+            repeat)
+        results[name] = _summarize(samples)
+    return results
+
+
+def bench_pages(db_path: str, hostname: str, repeat: int) -> Dict:
+    """Page latency through the Flask test client"""
+    import web_interface
+
+    web_interface.app.config['DATABASE'] = db_path
+    with _quiet():
+        web_interface.warm_up()
+    client = web_interface.app.test_client()
+
+    pages = {
+        'dashboard': '/',
+        'systems': '/systems',
+        'components': '/components',
+        'components_filtered': '/components?type=storage&status=installed',
+        'system_detail': f'/system/{hostname}',
+        'reports': '/reports',
+    }
+    results = {}
+    for name, url in pages.items():
+        def fetch():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url} returned {response.status_code}"
+        fetch()  # untimed warm-up request
+        results[name] = _summarize(_time_calls(fetch, repeat))
+    return results
+
+
+def bench_pci(repeat: int) -> Dict:
+    """Time to parse pci.ids"""
+    from pci_lookup import PCIIDLookup
+
+    with _quiet():
+        lookup = PCIIDLookup()
+        samples = _time_calls(PCIIDLookup, repeat)
+    result = _summarize(samples)
+    result.update({'vendors': len(lookup.vendors), 'devices': len(lookup.devices)})
+    return result
+
+
+def bench_backfill(db_path: str) -> Dict:
+    """backfill_manufacturers over every component with its manufacturer cleared"""
+    from inventory_manager import HardwareInventory
+
+    with _quiet():
+        inventory = HardwareInventory(db_path)
+    try:
+        inventory.conn.execute("UPDATE components SET manufacturer = ''")
+        inventory.conn.commit()
+        candidates = inventory.conn.execute("SELECT COUNT(*) FROM components").fetchone()[0]
+        start = time.perf_counter()
+        with _quiet():
+            updated = inventory.backfill_manufacturers()
+        elapsed = time.perf_counter() - start
+    finally:
+        inventory.close()
+    return {'components': candidates, 'updated': updated, 'seconds': elapsed}
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True)
+        return result.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run(args) -> Dict:
+    mix = ComponentMix(ComponentMix.parse_range(args.disks), ComponentMix.parse_range(args.gpus),
+                       ComponentMix.parse_range(args.dimms))
+    fleet = list(generate_fleet(args.systems, args.seed, mix))
+    hostname = fleet[len(fleet) // 2]['hostname']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        results = {}
+        print(f"Ingesting {len(fleet)} systems...")
+        results['ingest'] = bench_ingest(db_path, fleet)
+        print("Timing CLI actions...")
+        results['cli'] = bench_cli(db_path, hostname, args.cli_repeat)
+        print("Timing pages...")
+        results['pages'] = bench_pages(db_path, hostname, args.repeat)
+        print("Timing PCI database load...")
+        results['pci_load'] = bench_pci(args.cli_repeat)
+        print("Timing manufacturer backfill...")
+        results['backfill'] = bench_backfill(db_path)
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'systems': args.systems, 'seed': args.seed, 'disks': args.disks,
+            'gpus': args.gpus, 'dimms': args.dimms, 'repeat': args.repeat,
+            'cli_repeat': args.cli_repeat,
+        },
+        'results': results,
+    }
+
+
+def _flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    """Print the change in every timing between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old['results']), _flatten(new['results'])
+
+    print(f"{'metric':55} {old['commit']:>12} {new['commit']:>12} {'change':>8}")
+    print("-" * 90)
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        if not (name.endswith('_ms') or name.endswith('seconds') or name.endswith('per_second')):
+            continue
+        before, after = old_flat[name], new_flat[name]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else 'n/a'
+        print(f"{name:55} {before:12.2f} {after:12.2f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hardware Inventory benchmarks')
+    parser.add_argument('--systems', type=int, default=200, help='Synthetic systems (default: 200)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--disks', default='1-4', help='Disks per system (default: 1-4)')
+    parser.add_argument('--gpus', default='0-2', help='GPUs per system (default: 0-2)')
+    parser.add_argument('--dimms', default='2-8', help='DIMMs per system (default: 2-8)')
+    parser.add_argument('--repeat', type=int, default=50, help='Page requests per URL (default: 50)')
+    parser.add_argument('--cli-repeat', type=int, default=5, help='Runs per CLI action (default: 5)')
+    parser.add_argument('--output', help='Result file (default: results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='Compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results',
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    ingest = report['results']['ingest']
+    print(f"\nIngest: {ingest['initial']['scans_per_second']:.1f} scans/s initial, "
+          f"{ingest['rescan']['scans_per_second']:.1f} scans/s rescan")
+    for name, summary in report['results']['pages'].items():
+        print(f"  {name:22} p50 {summary['p50_ms']:7.2f} ms   p95 {summary['p95_ms']:7.2f} ms")
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Synthetic fleet generator for Hardware Inventory
+Produces realistic detect_hardware.sh payloads for N systems with a
+configurable component mix, for benchmarks and load tests.
+
+Usage:
+    python3 synthetic_fleet.py --systems 500 --out fleet.ndjson
+"""
+
+import argparse
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+CPU_MODELS = [
+    ('AMD Ryzen 5 3600 6-Core Processor', 12, 2),
+    ('AMD Ryzen 9 5950X 16-Core Processor', 32, 2),
+    ('AMD EPYC 7302P 16-Core Processor', 32, 2),
+    ('Intel(R) Core(TM) i7-9700K CPU @ 3.60GHz', 8, 1),
+    ('Intel(R) Xeon(R) Silver 4214 CPU @ 2.20GHz', 24, 2),
+    ('Intel(R) Xeon(R) Gold 6230R CPU @ 2.10GHz', 52, 2),
+]
+
+# (model, size, type, vendor_id, device_id) - vendor/device only for NVMe
+DISK_MODELS = [
+    ('Samsung SSD 970 EVO Plus 500GB', '465.8GiB', 'SSD', '144d', 'a808'),
+    ('Samsung SSD 980 PRO 1TB', '931.5GiB', 'SSD', '144d', 'a80a'),
+    ('Samsung SSD 870 EVO 2TB', '1.8TiB', 'SSD', '', ''),
+    ('WDC WD40EZRZ-00GXCB0', '3.6TiB', 'HDD', '', ''),
+    ('WDC WD101EFBX-68B0AN0', '9.1TiB', 'HDD', '', ''),
+    ('ST8000VN004-2M2101', '7.3TiB', 'HDD', '', ''),
+    ('CT1000MX500SSD1', '931.5GiB', 'SSD', '', ''),
+    ('KINGSTON SA400S37480G', '447.1GiB', 'SSD', '', ''),
+    ('INTEL SSDPE2KX040T8', '3.6TiB', 'SSD', '8086', '0a54'),
+]
+
+GPU_MODELS = [
+    ('NVIDIA Corporation GA106 [GeForce RTX 3060 Lite Hash Rate] [10de:2504] (rev a1)', '10de', '2504'),
+    ('NVIDIA Corporation GA102 [GeForce RTX 3080 Lite Hash Rate] [10de:2216] (rev a1)', '10de', '2216'),
+    ('NVIDIA Corporation TU104GL [Quadro RTX 4000] [10de:1eb1] (rev a1)', '10de', '1eb1'),
+    ('Advanced Micro Devices, Inc. [AMD/ATI] Navi 21 [Radeon RX 6800/6800 XT / 6900 XT] [1002:73bf] (rev c1)',
+     '1002', '73bf'),
+    ('Matrox Electronics Systems Ltd. Integrated Matrox G200eW3 Graphics Controller [102b:0536] (rev 04)',
+     '102b', '0536'),
+    ('Intel Corporation CometLake-S GT2 [UHD Graphics 630] [8086:3e92]', '8086', '3e92'),
+]
+
+DIMM_MODELS = [
+    ('Samsung', 'M393A2K40CB2-CTD', '16 GB', '2666 MT/s', 'DDR4'),
+    ('Samsung', 'M393A4K40DB3-CWE', '32 GB', '3200 MT/s', 'DDR4'),
+    ('Micron', '36ASF4G72PZ-2G9E2', '32 GB', '2933 MT/s', 'DDR4'),
+    ('Kingston', 'KHX3200C16D4/16GX', '16 GB', '3200 MT/s', 'DDR4'),
+    ('SK Hynix', 'HMA82GR7CJR8N-XN', '16 GB', '3200 MT/s', 'DDR4'),
+]
+
+BOARDS = [
+    ('Dell Inc.', '0JP31P', 'Dell Inc.', 'PowerEdge R740'),
+    ('Supermicro', 'H11SSL-i', 'Supermicro', 'Super Server'),
+    ('ASUSTeK COMPUTER INC.', 'PRIME X570-PRO', 'System manufacturer', 'System Product Name'),
+    ('Gigabyte Technology Co., Ltd.', 'B550 AORUS ELITE', 'Gigabyte Technology Co., Ltd.', 'B550 AORUS ELITE'),
+    ('HPE', 'ProLiant DL380 Gen10', 'HPE', 'ProLiant DL380 Gen10'),
+]
+
+
+class ComponentMix:
+    """Inclusive (min, max) ranges for the per-system component counts"""
+
+    def __init__(self, disks: Tuple[int, int] = (1, 4), gpus: Tuple[int, int] = (0, 2),
+                 dimms: Tuple[int, int] = (2, 8)):
+        self.disks = disks
+        self.gpus = gpus
+        self.dimms = dimms
+
+    @staticmethod
+    def parse_range(value: str) -> Tuple[int, int]:
+        """Parse '3' or '1-4' into an inclusive range"""
+        low, _, high = value.partition('-')
+        return int(low), int(high or low)
+
+
+def _serial(rng: random.Random, prefix: str, length: int = 12) -> str:
+    alphabet = 'ABCDEFGHJKLMNPQRSTUVWXYZ0123456789'
+    return prefix + ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def generate_scan(hostname: str, rng: random.Random, mix: Optional[ComponentMix] = None,
+                  detection_date: Optional[datetime] = None) -> Dict:
+    """Build one payload in the detect_hardware.sh JSON schema"""
+    mix = mix or ComponentMix()
+    detection_date = detection_date or datetime.now(timezone.utc)
+
+    cpu_model, cpus, threads_per_core = rng.choice(CPU_MODELS)
+    board_mfr, board_product, system_mfr, system_product = rng.choice(BOARDS)
+
+    slots = []
+    dimm_mfr, part_number, size, speed, mem_type = rng.choice(DIMM_MODELS)
+    for i in range(rng.randint(*mix.dimms)):
+        slots.append({
+            'slot': f'DIMM_{chr(ord("A") + i // 2)}{i % 2 + 1}',
+            'size': size,
+            'speed': speed,
+            'type': mem_type,
+            'manufacturer': dimm_mfr,
+            'part_number': part_number,
+            'serial': _serial(rng, '', 8),
+        })
+    total_gb = sum(int(slot['size'].split()[0]) for slot in slots)
+
+    storage = []
+    for i in range(rng.randint(*mix.disks)):
+        model, disk_size, disk_type, vendor_id, device_id = rng.choice(DISK_MODELS)
+        device = f'/dev/nvme{i}n1' if vendor_id else f'/dev/sd{chr(ord("a") + i)}'
+        storage.append({
+            'device': device,
+            'size': disk_size,
+            'model': model,
+            'serial': _serial(rng, 'S'),
+            'type': disk_type,
+            'vendor_id': vendor_id,
+            'device_id': device_id,
+        })
+
+    gpus = []
+    for _ in range(rng.randint(*mix.gpus)):
+        device, vendor_id, device_id = rng.choice(GPU_MODELS)
+        gpus.append({'device': device, 'vendor_id': vendor_id, 'device_id': device_id})
+
+    return {
+        'hostname': hostname,
+        'detection_date': detection_date.isoformat(timespec='seconds'),
+        'cpu': {
+            'model': cpu_model,
+            'cores': str(cpus),
+            'threads_per_core': str(threads_per_core),
+            'sockets': '2' if 'Xeon' in cpu_model or 'EPYC' in cpu_model else '1',
+        },
+        'memory': {'total_gb': str(total_gb), 'slots': slots},
+        'storage': storage,
+        'gpu': gpus,
+        'motherboard': {
+            'manufacturer': board_mfr,
+            'product': board_product,
+            'version': f'A0{rng.randint(0, 9)}',
+            'serial': _serial(rng, 'MB'),
+        },
+        'system': {
+            'manufacturer': system_mfr,
+            'product': system_product,
+            'version': '',
+            'serial': _serial(rng, 'SN', 8),
+            'uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+        },
+    }
+
+
+def generate_fleet(count: int, seed: int = 42, mix: Optional[ComponentMix] = None,
+                   prefix: str = 'host') -> Iterator[Dict]:
+    """Yield payloads for count systems; the same seed gives the same fleet"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        yield generate_scan(f'{prefix}{i:05d}', rng, mix,
+                            detection_date=start + timedelta(minutes=i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic hardware scan payloads')
+    parser.add_argument('--systems', type=int, default=100, help='Number of systems (default: 100)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--disks', default='1-4', help='Disks per system, N or MIN-MAX (default: 1-4)')
+    parser.add_argument('--gpus', default='0-2', help='GPUs per system, N or MIN-MAX (default: 0-2)')
+    parser.add_argument('--dimms', default='2-8', help='DIMMs per system, N or MIN-MAX (default: 2-8)')
+    parser.add_argument('--prefix', default='host', help='Hostname prefix (default: host)')
+    parser.add_argument('--out', default='-', help='Output NDJSON file (default: stdout)')
+    args = parser.parse_args()
+
+    mix = ComponentMix(ComponentMix.parse_range(args.disks), ComponentMix.parse_range(args.gpus),
+                       ComponentMix.parse_range(args.dimms))
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    try:
+        for payload in generate_fleet(args.systems, args.seed, mix, args.prefix):
+            out.write(json.dumps(payload) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
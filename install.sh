@@ -12,6 +12,7 @@ INSTALL_PATH="/opt/hardware-inventory"
 PYTHON_BIN="/usr/bin/python3"
 SERVICE_USER="$USER"
 SERVICE_GROUP="$USER"
+AGENT_SERVER=""
 
 # Parse command line arguments
 while [[ $# -gt 0 ]]; do
@@ -32,6 +33,10 @@ while [[ $# -gt 0 ]]; do
             PYTHON_BIN="$2"
             shift 2
             ;;
+        --agent)
+            AGENT_SERVER="$2"
+            shift 2
+            ;;
         --help)
             echo "Usage: $0 [options]"
             echo ""
@@ -40,6 +45,9 @@ while [[ $# -gt 0 ]]; do
             echo "  --user USER     Service user (default: current user)"
             echo "  --group GROUP   Service group (default: current user)"
             echo "  --python PATH   Python binary path (default: /usr/bin/python3)"
+            echo "  --agent URL     Install only the hardware agent, reporting to the"
+            echo "                  inventory server at URL (e.g. http://inventory:5101)"
+            echo "                  (files are owned by root; --user and --group are ignored)"
             echo "  --help          Show this help message"
             exit 0
             ;;
@@ -55,6 +63,9 @@ echo "  Path: $INSTALL_PATH"
 echo "  User: $SERVICE_USER"
 echo "  Group: $SERVICE_GROUP"
 echo "  Python: $PYTHON_BIN"
+if [ -n "$AGENT_SERVER" ]; then
+    echo "  Agent server: $AGENT_SERVER"
+fi
 echo ""
 
 # Check prerequisites
@@ -65,14 +76,39 @@ if ! command -v "$PYTHON_BIN" &> /dev/null; then
     exit 1
 fi
 
-if ! "$PYTHON_BIN" -c "import flask" &> /dev/null; then
+if [ -z "$AGENT_SERVER" ] && ! "$PYTHON_BIN" -c "import flask" &> /dev/null; then
     echo "Error: Flask is not installed. Please install it with:"
     echo "  pip3 install flask"
     exit 1
 fi
 
+# The agent runs as root, so its code must only be writable by root:
+# anyone who could edit it, or swap the directory it lives in, could run
+# code as root
+if [ -n "$AGENT_SERVER" ]; then
+    if [ "$INSTALL_PATH" = "$(pwd)" ]; then
+        echo "Error: --agent needs an installation path outside the source directory"
+        exit 1
+    fi
+    echo "Creating installation directory (owned by root)..."
+    sudo mkdir -p "$INSTALL_PATH"
+    INSTALL_PATH="$(cd "$INSTALL_PATH" && pwd -P)"
+    dir="$(dirname "$INSTALL_PATH")"
+    while true; do
+        if [ "$(stat -c %u "$dir")" != 0 ] || [ -n "$(find "$dir" -maxdepth 0 -perm /022)" ]; then
+            echo "Error: $dir is writable by users other than root; choose another --path"
+            exit 1
+        fi
+        [ "$dir" = "/" ] && break
+        dir="$(dirname "$dir")"
+    done
+
+    echo "Copying files..."
+    sudo cp -r . "$INSTALL_PATH/"
+    sudo chown -R root:root "$INSTALL_PATH"
+    sudo chmod -R go-w "$INSTALL_PATH"
 # Create installation directory
-if [ "$INSTALL_PATH" != "$(pwd)" ]; then
+elif [ "$INSTALL_PATH" != "$(pwd)" ]; then
     echo "Creating installation directory..."
     sudo mkdir -p "$INSTALL_PATH"
     sudo chown "$SERVICE_USER:$SERVICE_GROUP" "$INSTALL_PATH"
@@ -82,6 +118,28 @@ if [ "$INSTALL_PATH" != "$(pwd)" ]; then
     sudo chown -R "$SERVICE_USER:$SERVICE_GROUP" "$INSTALL_PATH"
 fi
 
+# The agent only needs the collector and itself; no web service or database
+if [ -n "$AGENT_SERVER" ]; then
+    echo "Creating agent service file..."
+    sed -e "s|%SERVER_URL%|$AGENT_SERVER|g" \
+        -e "s|%INSTALL_PATH%|$INSTALL_PATH|g" \
+        -e "s|%PYTHON_BIN%|$PYTHON_BIN|g" \
+        "$INSTALL_PATH/systemd/hardware-inventory-agent.service.template" | \
+        sudo tee /etc/systemd/system/hardware-inventory-agent.service > /dev/null
+
+    echo "Reloading systemd..."
+    sudo systemctl daemon-reload
+
+    echo ""
+    echo "Agent installation complete!"
+    echo ""
+    echo "To start the agent:"
+    echo "  sudo systemctl enable --now hardware-inventory-agent"
+    echo ""
+    echo "It uploads a scan to $AGENT_SERVER now and whenever the hardware changes."
+    exit 0
+fi
+
 # Create data directory
 echo "Creating data directory..."
 mkdir -p "$INSTALL_PATH/data"
@@ -109,6 +167,9 @@ echo ""
 echo "To check status:"
 echo "  sudo systemctl status hardware-inventory"
 echo ""
+echo "To reload workers after an update (graceful, no dropped requests):"
+echo "  sudo systemctl reload hardware-inventory"
+echo ""
 echo "Web interface will be available at:"
 echo "  http://localhost:5000"
 echo ""
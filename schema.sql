@@ -5,17 +5,52 @@
 CREATE TABLE IF NOT EXISTS components (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     component_type VARCHAR(50) NOT NULL, -- cpu, gpu, memory, storage, motherboard
-    manufacturer VARCHAR(100),
+    manufacturer VARCHAR(100), -- canonical name of manufacturer_id, for display
+    manufacturer_id INTEGER, -- see manufacturers.py
     model VARCHAR(200),
     serial_number VARCHAR(100),
     specifications TEXT, -- JSON field for detailed specs
     status VARCHAR(20) DEFAULT 'spare', -- installed, spare, retired
     location VARCHAR(100), -- hostname if installed, physical location if spare
+    capacity_bytes INTEGER, -- parsed from specifications size (memory, storage)
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Cold components moved out of components by component_archive.py; same
+-- columns and ids, so they can be moved back
+CREATE TABLE IF NOT EXISTS archived_components (
+    id INTEGER PRIMARY KEY,
+    component_type VARCHAR(50) NOT NULL,
+    manufacturer VARCHAR(100),
+    manufacturer_id INTEGER,
+    model VARCHAR(200),
+    serial_number VARCHAR(100),
+    specifications TEXT,
+    status VARCHAR(20),
+    location VARCHAR(100),
+    capacity_bytes INTEGER,
+    notes TEXT,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archive_reason VARCHAR(20) -- retired, unseen
+);
+
+-- One row per vendor, however scans and spreadsheets spell it
+CREATE TABLE IF NOT EXISTS manufacturers (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(100) UNIQUE NOT NULL -- canonical name
+);
+
+-- Normalized spellings (manufacturer_key()) -> manufacturer
+CREATE TABLE IF NOT EXISTS manufacturer_aliases (
+    alias VARCHAR(100) PRIMARY KEY,
+    manufacturer_id INTEGER NOT NULL,
+    FOREIGN KEY (manufacturer_id) REFERENCES manufacturers(id)
+) WITHOUT ROWID;
+
 -- Systems table for complete computer records
 CREATE TABLE IF NOT EXISTS systems (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,6 +60,9 @@ CREATE TABLE IF NOT EXISTS systems (
     serial_number VARCHAR(100),
     uuid VARCHAR(100),
     last_scan TIMESTAMP,
+    scan_fingerprint VARCHAR(64), -- hash of the last uploaded scan payload
+    site VARCHAR(100), -- from the scan payload or INVENTORY_SITE
+    memory_bytes INTEGER, -- installed RAM from the last scan
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -40,11 +78,110 @@ CREATE TABLE IF NOT EXISTS system_components (
     FOREIGN KEY (component_id) REFERENCES components(id)
 );
 
+-- Raw scan archive: each distinct scan body stored once, zlib-compressed
+CREATE TABLE IF NOT EXISTS scan_blobs (
+    hash VARCHAR(64) PRIMARY KEY, -- scan fingerprint (body without detection_date)
+    body BLOB NOT NULL,
+    raw_size INTEGER,
+    compressed_size INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- When each host reported which scan body
+CREATE TABLE IF NOT EXISTS scan_timeline (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hostname VARCHAR(100) NOT NULL,
+    scanned_at TIMESTAMP NOT NULL, -- detection_date normalized to UTC
+    scan_hash VARCHAR(64) NOT NULL,
+    FOREIGN KEY (scan_hash) REFERENCES scan_blobs(hash)
+);
+
+-- Component set changes per system, recorded on each scan
+CREATE TABLE IF NOT EXISTS component_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hostname VARCHAR(100) NOT NULL,
+    component_id INTEGER NOT NULL,
+    change VARCHAR(10) NOT NULL, -- added, removed, changed
+    fields TEXT NOT NULL, -- JSON of the component's tracked columns
+    changed_at TIMESTAMP NOT NULL -- detection_date normalized to UTC
+);
+
+-- Full component sets every few changes, to bound reconstruction cost
+CREATE TABLE IF NOT EXISTS system_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hostname VARCHAR(100) NOT NULL,
+    taken_at TIMESTAMP NOT NULL,
+    history_id INTEGER NOT NULL, -- last component_history row included
+    components TEXT NOT NULL -- JSON object of component id -> tracked columns
+);
+
+-- Recent changes, broadcast to live dashboard viewers (see change_events.py)
+CREATE TABLE IF NOT EXISTS change_events (
+    id INTEGER PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL, -- scan, component, system-deleted, bulk, import
+    data TEXT NOT NULL, -- JSON
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Findings of the last consistency check of each row (see consistency.py)
+CREATE TABLE IF NOT EXISTS consistency_issues (
+    id INTEGER PRIMARY KEY,
+    check_name VARCHAR(30) NOT NULL, -- duplicate-serial, installed-unlinked, dangling-link, location-mismatch
+    component_id INTEGER,
+    system_id INTEGER,
+    link_id INTEGER, -- system_components.id
+    detail TEXT,
+    found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Last run of each database maintenance task (see maintenance.py)
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    task VARCHAR(30) PRIMARY KEY, -- optimize, analyze, vacuum, checkpoint
+    started_at REAL NOT NULL, -- Unix time
+    seconds REAL NOT NULL,
+    result VARCHAR(20) NOT NULL, -- ok, partial, skipped, failed
+    detail TEXT, -- JSON
+    runs INTEGER NOT NULL DEFAULT 0
+);
+
+-- Key/value store for database-wide state
+CREATE TABLE IF NOT EXISTS meta (
+    key VARCHAR(50) PRIMARY KEY,
+    value INTEGER
+);
+
+-- Bumped by the triggers below whenever report inputs change, so cached
+-- reports know when to recompute
+INSERT OR IGNORE INTO meta (key, value) VALUES ('write_generation', 0);
+
+-- Unix time until which one process holds the maintenance lease
+INSERT OR IGNORE INTO meta (key, value) VALUES ('maintenance_lease', 0);
+
+-- Set once memory rows keyed by part number have been re-keyed (see
+-- HardwareInventory._rekey_memory)
+INSERT OR IGNORE INTO meta (key, value) VALUES ('memory_keyed_by_serial', 1);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_components_type ON components(component_type);
 CREATE INDEX IF NOT EXISTS idx_components_status ON components(status);
+CREATE INDEX IF NOT EXISTS idx_components_serial ON components(serial_number);
 CREATE INDEX IF NOT EXISTS idx_system_components_system ON system_components(system_id);
 CREATE INDEX IF NOT EXISTS idx_system_components_component ON system_components(component_id);
+CREATE INDEX IF NOT EXISTS idx_scan_timeline_host ON scan_timeline(hostname, scanned_at);
+CREATE INDEX IF NOT EXISTS idx_scan_timeline_hash ON scan_timeline(scan_hash);
+CREATE INDEX IF NOT EXISTS idx_components_type_model ON components(component_type, model, status);
+CREATE INDEX IF NOT EXISTS idx_components_type_capacity ON components(component_type, status, capacity_bytes);
+CREATE INDEX IF NOT EXISTS idx_component_history_host ON component_history(hostname, id);
+CREATE INDEX IF NOT EXISTS idx_system_snapshots_host ON system_snapshots(hostname, taken_at);
+CREATE INDEX IF NOT EXISTS idx_components_manufacturer ON components(manufacturer_id, component_type, status);
+CREATE INDEX IF NOT EXISTS idx_manufacturer_aliases_manufacturer ON manufacturer_aliases(manufacturer_id);
+CREATE INDEX IF NOT EXISTS idx_components_updated ON components(updated_at);
+CREATE INDEX IF NOT EXISTS idx_components_location ON components(location);
+CREATE INDEX IF NOT EXISTS idx_systems_updated ON systems(updated_at);
+CREATE INDEX IF NOT EXISTS idx_consistency_issues_component ON consistency_issues(component_id);
+CREATE INDEX IF NOT EXISTS idx_consistency_issues_link ON consistency_issues(link_id);
+CREATE INDEX IF NOT EXISTS idx_archived_components_serial ON archived_components(serial_number, component_type);
+CREATE INDEX IF NOT EXISTS idx_archived_components_type ON archived_components(component_type, status);
 
 -- Trigger to update the updated_at timestamp
 CREATE TRIGGER IF NOT EXISTS update_components_timestamp 
@@ -58,3 +195,52 @@ AFTER UPDATE ON systems
 BEGIN
     UPDATE systems SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
 END;
+
+-- Write generation triggers. Rescans that change nothing don't fire these;
+-- changes to which components a system has are seen via component_history.
+CREATE TRIGGER IF NOT EXISTS components_insert_generation
+AFTER INSERT ON components
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS components_update_generation
+AFTER UPDATE ON components
+WHEN OLD.component_type IS NOT NEW.component_type OR OLD.manufacturer IS NOT NEW.manufacturer
+  OR OLD.model IS NOT NEW.model OR OLD.status IS NOT NEW.status
+  OR OLD.location IS NOT NEW.location OR OLD.capacity_bytes IS NOT NEW.capacity_bytes
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS components_delete_generation
+AFTER DELETE ON components
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS systems_insert_generation
+AFTER INSERT ON systems
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS systems_update_generation
+AFTER UPDATE ON systems
+WHEN OLD.hostname IS NOT NEW.hostname OR OLD.site IS NOT NEW.site
+  OR OLD.memory_bytes IS NOT NEW.memory_bytes
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS systems_delete_generation
+AFTER DELETE ON systems
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
+
+CREATE TRIGGER IF NOT EXISTS component_history_generation
+AFTER INSERT ON component_history
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'write_generation';
+END;
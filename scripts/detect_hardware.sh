@@ -42,8 +42,35 @@ echo "  },"
 # Memory Information
 echo "  \"memory\": {"
 echo "    \"total_gb\": \"$(free -g | grep Mem: | awk '{print $2}')\","
-# TODO: Fix memory slot detection
-echo "    \"slots\": []"
+if [ "$EUID" -eq 0 ] && command -v dmidecode >/dev/null 2>&1; then
+    echo "    \"slots\": ["
+    # One JSON object per "Memory Device" section of dmidecode -t 17
+    dmidecode -t 17 2>/dev/null | awk '
+        function esc(v) { gsub(/\\/, "\\\\", v); gsub(/"/, "\\\"", v); return v }
+        function clean(v) {
+            gsub(/^[ \t]+|[ \t]+$/, "", v)
+            if (tolower(v) ~ /^(not specified|unknown|none|to be filled by o\.e\.m\.)$/) return ""
+            return v
+        }
+        function emit() {
+            if (!in_device) return
+            serial = clean(f["Serial Number"])
+            if (serial ~ /^(0+|[Ff]+)$/) serial = ""
+            printf "%s      {\"slot\": \"%s\", \"size\": \"%s\", \"speed\": \"%s\", \"type\": \"%s\", \"manufacturer\": \"%s\", \"part_number\": \"%s\", \"serial\": \"%s\"}", sep, esc(clean(f["Locator"])), esc(clean(f["Size"])), esc(clean(f["Speed"])), esc(clean(f["Type"])), esc(clean(f["Manufacturer"])), esc(clean(f["Part Number"])), esc(serial)
+            sep = ",\n"
+            in_device = 0
+        }
+        /^[^\t]/ { emit(); if ($0 == "Memory Device") { in_device = 1; delete f } next }
+        in_device && /^\t[^\t]/ {
+            line = substr($0, 2); key = substr(line, 1, index(line, ":") - 1)
+            f[key] = substr(line, index(line, ":") + 1)
+        }
+        END { emit(); if (sep != "") printf "\n" }
+    '
+    echo "    ]"
+else
+    echo "    \"slots\": []"
+fi
 echo "  },"
 
 # Storage Information
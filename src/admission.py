@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Admission control for scan uploads
+When cron starts /scan_system across a fleet in the same minute, every host
+uploads at once and most requests end up waiting on the SQLite write lock
+until they time out. Uploads, including the fingerprint handshakes of
+unchanged hosts (which record the scan), are instead admitted through a token
+bucket (a steady rate with some burst) and a limit on how many are ingested
+at once. A request that can't be admitted is turned away straight away
+with 429 (over the rate) or 503 (no free slot in time), a Retry-After and a
+jitter window that scanners spread their retries over.
+
+The jitter window comes from a virtual queue: every rejected host is
+expected back, and the queue drains at the rate uploads are admitted, so
+the window is roughly how long it takes to admit everyone already told to
+wait. Limits apply per worker process.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from metrics import REGISTRY
+
+# Uploads ingested at once per worker (0 = no limit)
+INGEST_CONCURRENCY = int(os.environ.get('INVENTORY_INGEST_CONCURRENCY', 4))
+# Seconds an upload may wait for a free slot before 503
+INGEST_QUEUE_TIMEOUT = float(os.environ.get('INVENTORY_INGEST_QUEUE_MS', 5000)) / 1000
+# Full uploads per second per worker, and how many may arrive at once (0 = no limit)
+INGEST_RATE = float(os.environ.get('INVENTORY_INGEST_RATE', 0))
+INGEST_BURST = int(os.environ.get('INVENTORY_INGEST_BURST', 20))
+# Longest jitter window suggested to scanners, in seconds
+MAX_JITTER = int(os.environ.get('INVENTORY_INGEST_MAX_JITTER', 300))
+
+INGEST_REJECTED = REGISTRY.counter(
+    'inventory_ingest_rejected_total', 'Scan uploads turned away by admission control, by reason', ['reason'])
+
+
+class Overloaded(Exception):
+    """An upload that wasn't admitted, and when to come back"""
+
+    def __init__(self, status: int, reason: str, retry_after: int, jitter: int):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        self.jitter = jitter
+        super().__init__(f"Server busy ({reason}); retry after {retry_after}s "
+                         f"with up to {jitter}s of jitter")
+
+
+class AdmissionController:
+    """Token bucket plus a concurrency limit for one worker's uploads"""
+
+    def __init__(self, concurrency: int = None, rate: float = None, burst: int = None,
+                 queue_timeout: float = None, max_jitter: int = None, clock=time.monotonic):
+        self.concurrency = INGEST_CONCURRENCY if concurrency is None else concurrency
+        self.rate = INGEST_RATE if rate is None else rate
+        self.burst = max(1, INGEST_BURST if burst is None else burst)
+        self.queue_timeout = INGEST_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.max_jitter = MAX_JITTER if max_jitter is None else max_jitter
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency) if self.concurrency > 0 else None
+        self._tokens = float(self.burst)
+        self._pending = 0.0
+        self._updated = clock()
+        # Moving average of how long an admitted upload takes
+        self._duration = 0.1
+
+    def _refill(self):
+        """Top up tokens and drain the virtual queue for the time elapsed"""
+        now = self._clock()
+        elapsed, self._updated = now - self._updated, now
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._pending = max(0.0, self._pending - elapsed * self._admit_rate())
+
+    def _admit_rate(self) -> float:
+        """Uploads per second this worker is expected to admit"""
+        rates = []
+        if self.rate > 0:
+            rates.append(self.rate)
+        if self.concurrency > 0:
+            rates.append(self.concurrency / self._duration)
+        return min(rates) if rates else float('inf')
+
+    def _reject(self, status: int, reason: str, retry_after: float) -> Overloaded:
+        """Count a rejection (lock held) and describe when to retry"""
+        self._pending += 1
+        INGEST_REJECTED.inc(reason=reason)
+        jitter = min(self.max_jitter, math.ceil(self._pending / self._admit_rate()))
+        return Overloaded(status, reason, max(1, math.ceil(retry_after)), max(1, jitter))
+
+    def check(self):
+        """Raise Overloaded if an upload arriving now would be rate limited
+
+        Takes nothing from the bucket; used to turn a host away before it
+        sends its full scan.
+        """
+        with self._lock:
+            self._refill()
+            if self.rate > 0 and self._tokens < 1:
+                raise self._reject(429, 'rate', (1 - self._tokens) / self.rate)
+
+    def _give_back(self):
+        """Return a token taken by an upload that wasn't ingested (lock held)"""
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + 1)
+
+    def refund(self):
+        """Give back the token of an admitted request that ingested nothing
+
+        A fingerprint handshake for changed hardware is followed by the full
+        upload, which should be the only one of the two to count.
+        """
+        with self._lock:
+            self._refill()
+            self._give_back()
+
+    @contextmanager
+    def admit(self):
+        """Hold a token and a slot while an upload is ingested, or raise Overloaded
+
+        The token is given back if no slot frees up in time.
+        """
+        with self._lock:
+            self._refill()
+            if self.rate > 0:
+                if self._tokens < 1:
+                    raise self._reject(429, 'rate', (1 - self._tokens) / self.rate)
+                self._tokens -= 1
+        if self._slots is not None and not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._refill()
+                self._give_back()
+                raise self._reject(503, 'concurrency', self._duration)
+        start = self._clock()
+        try:
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+            with self._lock:
+                self._duration = 0.8 * self._duration + 0.2 * max(self._clock() - start, 0.001)
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """This process's upload admission controller, created on first use"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
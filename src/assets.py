@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for Hardware Inventory
+Builds a manifest of the files in static/ once at startup: each file gets a
+content-hashed name (css/inventory.css -> css/inventory.3f2a9c1b07d4.css)
+that can be cached forever, since any change produces a new name. /static/
+URLs inside stylesheets are rewritten to the hashed names too, so a changed
+image also changes the stylesheet's hash. Text assets are precompressed
+with gzip (and brotli, if the brotli module is installed) so requests
+don't compress them again.
+
+Files are still served under their plain names, revalidated on every use,
+for clients that fetch a fixed URL, such as the scanner fetching
+detect_hardware.sh with curl.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Hashed URLs never change content, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Only text formats benefit; images are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.sh', '.txt', '.json', '.map'}
+MIN_COMPRESS_BYTES = 256
+
+_HASH_LENGTH = 12
+_CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)/static/([^'")?#\s]+)\1\s*\)""")
+_HASHED_NAME_PATTERN = re.compile(r'^(.*)\.[0-9a-f]{%d}(\.[^./]+)$' % _HASH_LENGTH)
+
+
+class Asset:
+    """One static file: where it lives, its hash and any encoded bodies
+
+    body is set when the served content differs from the file on disk
+    (stylesheets with rewritten URLs); otherwise the file is sent as is.
+    """
+
+    def __init__(self, name: str, path: str, digest: str, mimetype: str,
+                 body: Optional[bytes] = None, encodings: Dict[str, bytes] = None):
+        self.name = name
+        self.path = path
+        self.digest = digest
+        self.mimetype = mimetype
+        self.body = body
+        self.encodings = encodings or {}
+
+    @property
+    def hashed_name(self) -> str:
+        stem, extension = os.path.splitext(self.name)
+        return f"{stem}.{self.digest[:_HASH_LENGTH]}{extension}"
+
+
+class AssetManifest:
+    """Every file under a static directory, by plain and by hashed name"""
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self.assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+        self._signature = None
+
+    def _scan(self) -> Dict[str, Tuple[str, float, int]]:
+        files = {}
+        for root, _dirs, names in os.walk(self.static_dir):
+            for filename in names:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.static_dir).replace(os.sep, '/')
+                stat = os.stat(path)
+                files[name] = (path, stat.st_mtime, stat.st_size)
+        return files
+
+    def build(self) -> 'AssetManifest':
+        """Hash and precompress every file; stylesheets after what they refer to"""
+        files = self._scan()
+        self.assets, self._hashed = {}, {}
+        ordered = sorted(files, key=lambda name: (name.endswith('.css'), name))
+        for name in ordered:
+            path = files[name][0]
+            with open(path, 'rb') as f:
+                content = f.read()
+            body = None
+            if name.endswith('.css'):
+                rewritten = _CSS_URL_PATTERN.sub(self._rewrite_url, content.decode('utf-8')).encode('utf-8')
+                if rewritten != content:
+                    body = content = rewritten
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if mimetype.startswith('text/') or mimetype == 'application/javascript':
+                mimetype += '; charset=utf-8'
+            asset = Asset(name, path, hashlib.sha256(content).hexdigest(), mimetype, body,
+                          _precompress(name, content))
+            self.assets[name] = asset
+            self._hashed[asset.hashed_name] = asset
+        self._signature = {name: info[1:] for name, info in files.items()}
+        return self
+
+    def _rewrite_url(self, match) -> str:
+        quote, name = match.group(1), match.group(2)
+        return f"url({quote}/static/{self.url_path(name)}{quote})"
+
+    def stale(self) -> bool:
+        """Whether files were added, removed or changed since build()"""
+        return {name: info[1:] for name, info in self._scan().items()} != self._signature
+
+    def url_path(self, name: str) -> str:
+        """Hashed name for a static file, or the name itself if unknown"""
+        asset = self.assets.get(name)
+        return asset.hashed_name if asset else name
+
+    def resolve(self, filename: str) -> Tuple[Optional[Asset], bool]:
+        """(asset, whether filename is its current hashed name)
+
+        A hashed name from an earlier build still finds the file, but isn't
+        treated as immutable since its content has changed.
+        """
+        if filename in self._hashed:
+            return self._hashed[filename], True
+        if filename in self.assets:
+            return self.assets[filename], False
+        match = _HASHED_NAME_PATTERN.match(filename)
+        if match:
+            return self.assets.get(match.group(1) + match.group(2)), False
+        return None, False
+
+
+def _precompress(name: str, content: bytes) -> Dict[str, bytes]:
+    """Encoded variants worth serving, smallest first"""
+    if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS or len(content) < MIN_COMPRESS_BYTES:
+        return {}
+    encodings = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(content)
+    return {encoding: body for encoding, body in sorted(encodings.items(), key=lambda item: len(item[1]))
+            if len(body) < len(content)}
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Online backups for Hardware Inventory
+Copies the live database with SQLite's backup API, a batch of pages at a
+time with a pause in between, so scans keep being ingested while the copy
+runs. Each snapshot is checked with PRAGMA integrity_check before it is
+kept, optionally gzip-compressed, and old snapshots are rotated out.
+Snapshots can also be opened read-only, so heavy reports don't have to run
+against the live database.
+"""
+
+import fcntl
+import gzip
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from metrics import REGISTRY
+
+BACKUPS = REGISTRY.counter(
+    'inventory_backups_total', 'Database backups attempted, by result (ok, failed)', ['result'])
+BACKUP_SECONDS = REGISTRY.histogram(
+    'inventory_backup_duration_seconds', 'Time taken to copy, verify and store a backup',
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0))
+BACKUP_LAST_SUCCESS = REGISTRY.gauge(
+    'inventory_backup_last_success_timestamp_seconds', 'Unix time of the last successful backup',
+    multiprocess_mode='max')
+
+# How many times a stepped copy may be restarted by concurrent writes before
+# the rest is copied in one step
+MAX_RESTARTS = 3
+
+# Directory in the backup directory that holds the expanded copy of a
+# compressed snapshot opened for reading
+EXPANDED_DIR = '.expanded'
+
+
+class BackupError(Exception):
+    """A backup could not be taken or failed verification"""
+
+
+class _Restarted(Exception):
+    """Raised from the progress callback to abandon a stepped copy"""
+
+
+class BackupPolicy:
+    """Where snapshots go, how many are kept and how hard the copy pushes
+
+    pages is the number of pages copied per step and sleep the pause (in
+    seconds) between steps; writers get the database to themselves during
+    the pause.
+    """
+
+    def __init__(self, directory: str, keep: int = 7, compress: bool = True,
+                 pages: int = 256, sleep: float = 0.05):
+        self.directory = directory
+        self.keep = max(keep, 1)
+        self.compress = compress
+        self.pages = max(pages, 1)
+        self.sleep = max(sleep, 0.0)
+
+    @classmethod
+    def from_env(cls, db_path: str) -> 'BackupPolicy':
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'backups')
+        return cls(
+            directory=os.environ.get('INVENTORY_BACKUP_DIR', default_dir),
+            keep=int(os.environ.get('INVENTORY_BACKUP_KEEP', 7)),
+            compress=os.environ.get('INVENTORY_BACKUP_COMPRESS', 'true').lower() not in ('0', 'false', 'no'),
+            pages=int(os.environ.get('INVENTORY_BACKUP_PAGES', 256)),
+            sleep=int(os.environ.get('INVENTORY_BACKUP_SLEEP_MS', 50)) / 1000,
+        )
+
+
+def _copy(source, target, pages: int, sleep: float,
+          progress: Optional[Callable[[int, int], None]]) -> int:
+    """Stepped copy; returns how often concurrent writes forced a restart
+
+    After MAX_RESTARTS the remainder is copied in a single step, which only
+    holds a read transaction (in WAL mode writers carry on regardless).
+    """
+    restarts = 0
+    last_remaining = None
+
+    def on_step(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        if progress:
+            progress(total - remaining, total)
+
+    try:
+        source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+    except _Restarted:
+        source.backup(target, pages=-1)
+    return restarts
+
+
+def list_backups(directory: str) -> List[str]:
+    """Snapshot files in a directory, newest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    snapshots = [name for name in names
+                 if not name.startswith('.') and (name.endswith('.db') or name.endswith('.db.gz'))]
+    # Names embed a UTC timestamp, so they sort chronologically
+    return [os.path.join(directory, name)
+            for name in sorted(snapshots, key=lambda name: name.split('-')[-1], reverse=True)]
+
+
+def latest_backup(directory: str) -> Optional[str]:
+    backups = list_backups(directory)
+    return backups[0] if backups else None
+
+
+def rotate(directory: str, keep: int) -> List[str]:
+    """Delete all but the newest keep snapshots; returns the removed paths"""
+    removed = list_backups(directory)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def backup_database(db_path: str, policy: BackupPolicy = None, now: datetime = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """Take a verified snapshot of a live database
+
+    Returns the snapshot path and copy statistics; raises BackupError if the
+    copy fails its integrity check.
+    """
+    if not os.path.exists(db_path):
+        raise BackupError(f"Database {db_path} does not exist")
+    policy = policy or BackupPolicy.from_env(db_path)
+    now = now or datetime.now(timezone.utc)
+    os.makedirs(policy.directory, exist_ok=True)
+    stem = Path(db_path).stem
+    name = f"{stem}-{now.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.db"
+    final_path = os.path.join(policy.directory, name + ('.gz' if policy.compress else ''))
+    # Work on hidden files so a half-written snapshot is never picked up
+    temp_path = os.path.join(policy.directory, f'.{name}.tmp')
+
+    start = time.perf_counter()
+    try:
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(temp_path)
+        try:
+            restarts = _copy(source, target, policy.pages, policy.sleep, progress)
+            page_count = target.execute("PRAGMA page_count").fetchone()[0]
+            # The copy inherits WAL mode; make it a self-contained file
+            target.execute("PRAGMA journal_mode=DELETE")
+            problems = [row[0] for row in target.execute("PRAGMA integrity_check").fetchall()]
+        finally:
+            target.close()
+            source.close()
+        if problems != ['ok']:
+            raise BackupError(f"Integrity check failed: {'; '.join(problems[:5])}")
+
+        if policy.compress:
+            with open(temp_path, 'rb') as raw, gzip.open(temp_path + '.gz', 'wb') as compressed:
+                shutil.copyfileobj(raw, compressed)
+            os.remove(temp_path)
+            os.replace(temp_path + '.gz', final_path)
+        else:
+            os.replace(temp_path, final_path)
+    except (sqlite3.Error, OSError, BackupError) as e:
+        BACKUPS.inc(result='failed')
+        for leftover in (temp_path, temp_path + '.gz'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        if isinstance(e, BackupError):
+            raise
+        raise BackupError(f"Backup of {db_path} failed: {e}") from e
+
+    seconds = time.perf_counter() - start
+    removed = rotate(policy.directory, policy.keep)
+    BACKUPS.inc(result='ok')
+    BACKUP_SECONDS.observe(seconds)
+    BACKUP_LAST_SUCCESS.set(time.time())
+    return {
+        'path': final_path,
+        'size': os.path.getsize(final_path),
+        'pages': page_count,
+        'restarts': restarts,
+        'seconds': round(seconds, 3),
+        'rotated': removed,
+    }
+
+
+def _expansion_dir(snapshot: str) -> str:
+    """Private directory next to a compressed snapshot for its expanded copy
+
+    It sits in the backup directory (so only users who can read the
+    snapshots see it) and must be ours and closed to everyone else.
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(snapshot)), EXPANDED_DIR)
+    try:
+        os.mkdir(cache_dir, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(cache_dir)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise BackupError(f"{cache_dir} is not a private directory owned by this user")
+    return cache_dir
+
+
+def open_backup(path: str) -> sqlite3.Connection:
+    """Read-only connection to a snapshot
+
+    Compressed snapshots are expanded once into a private directory in the
+    backup directory; only the most recently opened one is kept there.
+    Expanding, cleaning up and opening happen under a lock, so another
+    process can only remove an expanded copy once it is open here (an open
+    file stays readable after it is unlinked).
+    """
+    if not path.endswith('.gz'):
+        return _connect_immutable(path)
+    cache_dir = _expansion_dir(path)
+    expanded = os.path.join(cache_dir, os.path.basename(path)[:-3])
+    with open(os.path.join(cache_dir, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(expanded):
+            fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix='.', suffix='.tmp')
+            try:
+                with gzip.open(path, 'rb') as compressed, os.fdopen(fd, 'wb') as raw:
+                    shutil.copyfileobj(compressed, raw)
+                os.replace(temp_path, expanded)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        # Temporary files left here were abandoned by a process that died
+        # holding the lock
+        for stale in os.listdir(cache_dir):
+            if stale not in ('.lock', os.path.basename(expanded)):
+                os.remove(os.path.join(cache_dir, stale))
+        conn = _connect_immutable(expanded)
+        # Make SQLite open the file before the lock is released
+        conn.execute("PRAGMA schema_version").fetchone()
+    return conn
+
+
+def _connect_immutable(path: str) -> sqlite3.Connection:
+    # Snapshots never change, so SQLite can skip locking entirely
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + '?immutable=1', uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
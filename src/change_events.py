@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Live change notifications for Hardware Inventory
+Writers append a small event to the change_events table in the same
+transaction as the change itself (host scanned, component edited, moved or
+deleted, ...). Each web worker process runs one poller thread, only while
+someone is watching, that reads new events by primary key and broadcasts
+them to every connected Server-Sent Events stream. Dashboard counts are
+recomputed once per batch of events rather than once per viewer.
+
+Events are kept in the database so changes made by any worker, or by the
+CLI, reach viewers connected to any worker.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+# Events kept in change_events; older ones are pruned as new ones arrive
+EVENT_RETENTION = int(os.environ.get('INVENTORY_EVENTS_KEEP', 1000))
+POLL_INTERVAL = float(os.environ.get('INVENTORY_EVENTS_POLL_MS', 500)) / 1000
+# Streams per worker process; further viewers get 503 and retry
+MAX_CLIENTS = int(os.environ.get('INVENTORY_EVENTS_MAX_CLIENTS', 100))
+# Messages kept in memory for viewers that are briefly behind
+BUFFER_SIZE = 256
+HEARTBEAT_SECONDS = 15.0
+
+# Unchanged rescans only move last_scan; they don't change any counts
+_COUNTLESS = {('scan', True)}
+
+EVENTS_BROADCAST = REGISTRY.counter(
+    'inventory_events_broadcast_total', 'Change events broadcast to live viewers, by kind', ['kind'])
+EVENT_STREAMS = REGISTRY.gauge(
+    'inventory_event_streams', 'Server-Sent Events streams currently open')
+
+
+def record_event(conn, kind: str, data: Dict):
+    """Append a change event on the caller's connection and transaction"""
+    cursor = conn.execute("INSERT INTO change_events (kind, data) VALUES (?, ?)",
+                          (kind, json.dumps(data, default=str)))
+    conn.execute("DELETE FROM change_events WHERE id <= ?", (cursor.lastrowid - EVENT_RETENTION,))
+
+
+def latest_event_id(conn) -> int:
+    """Id of the newest event, which pages pass to /events as ?since="""
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_events").fetchone()[0]
+
+
+def read_counts(conn) -> Dict:
+    """What the dashboard shows: systems, and components by type and status"""
+    components = {}
+    for comp_type, status, count in conn.execute(
+            "SELECT component_type, status, COUNT(*) FROM components GROUP BY component_type, status"):
+        components.setdefault(comp_type, {'installed': 0, 'spare': 0, 'retired': 0})[status] = count
+    systems = conn.execute("SELECT COUNT(*) FROM systems").fetchone()[0]
+    return {'systems': systems, 'components': components}
+
+
+def format_message(event_id: Optional[int], kind: str, data: str) -> str:
+    """One Server-Sent Events message"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {kind}\ndata: {data}\n\n"
+
+
+class TooManyStreams(Exception):
+    """This worker already serves MAX_CLIENTS streams"""
+
+
+class EventBroker:
+    """Fans change events out from one poller thread to many streams
+
+    Messages are (sequence, event id, kind, JSON data). The sequence
+    numbers every broadcast, including derived 'counts' messages that have
+    no event id, so each stream only needs to remember where it is.
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = None, max_clients: int = None):
+        self.db_path = db_path
+        self.poll_interval = POLL_INTERVAL if poll_interval is None else poll_interval
+        self.max_clients = MAX_CLIENTS if max_clients is None else max_clients
+        self._cond = threading.Condition()
+        self._messages = deque(maxlen=BUFFER_SIZE)
+        self._seq = 0
+        self._last_id = 0
+        self._counts = None
+        self._streams = 0
+        self._thread = None
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def subscribe(self, since: Optional[int] = None) -> 'EventStream':
+        """Open a stream; since is the event id the viewer's page was rendered at"""
+        with self._cond:
+            if self._streams >= self.max_clients:
+                raise TooManyStreams(f"{self._streams} live streams already open")
+            if self._thread is None:
+                conn = self._connect()
+                try:
+                    self._last_id = latest_event_id(conn)
+                finally:
+                    conn.close()
+                self._messages.clear()
+                self._counts = None
+                self._closed = False
+                self._thread = threading.Thread(target=self._poll, name='change-events', daemon=True)
+                self._thread.start()
+            self._streams += 1
+            EVENT_STREAMS.inc()
+            return EventStream(self, *self._start_position(since))
+
+    def _start_position(self, since: Optional[int]) -> Tuple[int, int, bool]:
+        """(sequence, event id to skip up to, needs reload) for a new stream"""
+        if since is None or since == self._last_id:
+            return self._seq, 0, False
+        if since > self._last_id:
+            # The page saw events the poller hasn't picked up yet
+            return self._seq, since, False
+        for seq, event_id, _kind, _data in self._messages:
+            if event_id is not None and event_id > since:
+                # Replay from the buffer if nothing in between was missed
+                return seq - 1, 0, event_id != since + 1
+        return self._seq, 0, True
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._streams -= 1
+            EVENT_STREAMS.dec()
+
+    def close(self):
+        """End every stream and stop polling"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _poll(self):
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    if self._streams == 0 or self._closed:
+                        self._thread = None
+                        return
+                    last_id = self._last_id
+                rows = conn.execute(
+                    "SELECT id, kind, data FROM change_events WHERE id > ? ORDER BY id LIMIT 500", (last_id,)
+                ).fetchall()
+                if not rows:
+                    with self._cond:
+                        self._cond.wait(self.poll_interval)
+                    continue
+                counts = None
+                if any((kind, json.loads(data).get('unchanged', False)) not in _COUNTLESS
+                       for _id, kind, data in rows):
+                    counts = read_counts(conn)
+                self._broadcast(rows, counts)
+        except sqlite3.Error:
+            # Streams see the broker close and the browser reconnects
+            with self._cond:
+                self._thread = None
+                self._closed = True
+                self._cond.notify_all()
+        finally:
+            conn.close()
+
+    def _broadcast(self, rows: List[Tuple[int, str, str]], counts: Optional[Dict]):
+        with self._cond:
+            for event_id, kind, data in rows:
+                self._seq += 1
+                self._messages.append((self._seq, event_id, kind, data))
+                EVENTS_BROADCAST.inc(kind=kind)
+            self._last_id = rows[-1][0]
+            if counts is not None and counts != self._counts:
+                self._counts = counts
+                self._seq += 1
+                self._messages.append((self._seq, None, 'counts', json.dumps(counts)))
+            self._cond.notify_all()
+
+    def _read(self, position: int, timeout: float) -> Tuple[int, Optional[List[Tuple]]]:
+        """Messages after position, waiting up to timeout for some
+
+        Returns None instead of a list when the stream fell further behind
+        than the buffer reaches, or the broker closed.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > position or self._closed, timeout)
+            if self._closed:
+                return position, None
+            if self._seq == position:
+                return position, []
+            first = self._messages[0][0] if self._messages else self._seq + 1
+            if first > position + 1:
+                return self._seq, None
+            messages = list(islice(self._messages, position + 1 - first, None))
+            return self._seq, messages
+
+
+class EventStream:
+    """One viewer's position in the broadcast"""
+
+    def __init__(self, broker: EventBroker, position: int, skip_until: int = 0, reload: bool = False):
+        self.broker = broker
+        self.position = position
+        self.skip_until = skip_until
+        self.reload = reload
+        self._open = True
+
+    def read(self, timeout: float) -> Optional[List[Tuple[Optional[int], str, str]]]:
+        """(event id, kind, data) messages, [] on timeout, None to reload"""
+        if self.reload:
+            return None
+        self.position, messages = self.broker._read(self.position, timeout)
+        if messages is None:
+            return None
+        return [(event_id, kind, data) for _seq, event_id, kind, data in messages
+                if event_id is None or event_id > self.skip_until]
+
+    def messages(self, stopping: Optional[threading.Event] = None) -> Iterator[str]:
+        """Server-Sent Events text until the viewer leaves or must reload
+
+        stopping ends the stream early, e.g. when the server shuts down.
+        """
+        try:
+            yield "retry: 5000\n\n"
+            idle = 0.0
+            while not (stopping is not None and stopping.is_set()):
+                batch = self.read(timeout=1.0)
+                if batch is None:
+                    yield format_message(None, 'reload', '{}')
+                    return
+                if batch:
+                    idle = 0.0
+                    yield ''.join(format_message(*message) for message in batch)
+                else:
+                    idle += 1.0
+                    if idle >= HEARTBEAT_SECONDS:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+        finally:
+            self.close()
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self.broker._unsubscribe()
+
+
+_brokers: Dict[str, EventBroker] = {}
+_brokers_pid = None
+_brokers_lock = threading.Lock()
+
+
+def get_broker(db_path: str) -> EventBroker:
+    """Broker for a database, shared by the requests of this process
+
+    Created on first use, and again after a fork, since prefork workers
+    don't inherit the master's threads.
+    """
+    global _brokers_pid
+    with _brokers_lock:
+        if _brokers_pid != os.getpid():
+            _brokers.clear()
+            _brokers_pid = os.getpid()
+        if db_path not in _brokers:
+            _brokers[db_path] = EventBroker(db_path)
+        return _brokers[db_path]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cold storage for components that no longer change
+Retired components, and installed components whose system hasn't been
+scanned for a long time, are moved from components to archived_components.
+Every page, report and scan ingest reads components, so it then only holds
+live hardware and stays small enough to be cached.
+
+Archived rows keep their ids, so component_history still refers to them,
+and can be restored. A scan that reports an archived serial number restores
+that row instead of inserting a new one. Writes happen on the caller's
+connection and inside its transaction.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from component_history import ComponentHistory
+
+# Columns shared by components and archived_components, in one fixed order
+# (ALTER TABLE appends migrated columns, so SELECT * order varies)
+COLUMNS = ('id', 'component_type', 'manufacturer', 'manufacturer_id', 'model', 'serial_number',
+           'specifications', 'status', 'location', 'capacity_bytes', 'notes', 'created_at', 'updated_at')
+COLUMN_LIST = ', '.join(COLUMNS)
+
+
+class ComponentArchivePolicy:
+    """Which components are cold
+
+    Retired components are archived retired_days after their last change
+    (0 = straight away). Installed components are archived once neither
+    they nor any system they're linked to has been seen for unseen_days
+    (0 = never). Spares are never archived.
+    """
+
+    def __init__(self, retired_days: int = 30, unseen_days: int = 365):
+        self.retired_days = max(retired_days, 0)
+        self.unseen_days = max(unseen_days, 0)
+
+    @classmethod
+    def from_env(cls) -> 'ComponentArchivePolicy':
+        return cls(
+            retired_days=int(os.environ.get('INVENTORY_RETIRED_ARCHIVE_DAYS', 30)),
+            unseen_days=int(os.environ.get('INVENTORY_UNSEEN_ARCHIVE_DAYS', 365)),
+        )
+
+
+class ComponentArchive:
+    """Moves components between components and archived_components"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _select(self, policy: ComponentArchivePolicy):
+        """Fill temp.archive_selection with the cold components and why"""
+        execute = self.conn.execute
+        execute("CREATE TEMP TABLE IF NOT EXISTS archive_selection (id INTEGER PRIMARY KEY, reason TEXT)")
+        execute("DELETE FROM temp.archive_selection")
+        execute("""
+            INSERT INTO temp.archive_selection
+            SELECT id, 'retired' FROM components
+            WHERE status = 'retired' AND updated_at <= datetime('now', ?)
+        """, (f'-{policy.retired_days} days',))
+        if policy.unseen_days:
+            cutoff = f'-{policy.unseen_days} days'
+            # Rescans that change nothing don't touch updated_at, so a link
+            # to a recently scanned system is what says it's still there
+            execute("""
+                INSERT OR IGNORE INTO temp.archive_selection
+                SELECT c.id, 'unseen' FROM components c
+                WHERE c.status = 'installed' AND c.updated_at < datetime('now', ?)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM system_components sc JOIN systems s ON s.id = sc.system_id
+                      WHERE sc.component_id = c.id
+                        AND COALESCE(datetime(s.last_scan), s.updated_at) >= datetime('now', ?))
+            """, (cutoff, cutoff))
+
+    def archive(self, policy: ComponentArchivePolicy = None, dry_run: bool = False) -> Dict:
+        """Move cold components out of components
+
+        Their system links are removed. Returns how many were archived for
+        each reason and how many links went with them.
+        """
+        self._select(policy or ComponentArchivePolicy.from_env())
+        summary = dict.fromkeys(('retired', 'unseen'), 0)
+        summary.update(self.conn.execute(
+            "SELECT reason, COUNT(*) FROM temp.archive_selection GROUP BY reason").fetchall())
+        summary['unlinked'] = 0
+        if not dry_run:
+            selection = "SELECT id FROM temp.archive_selection"
+            self.conn.execute(f"""
+                INSERT OR REPLACE INTO archived_components ({COLUMN_LIST}, archive_reason)
+                SELECT {', '.join('c.' + column for column in COLUMNS)}, s.reason
+                FROM components c JOIN temp.archive_selection s ON s.id = c.id
+            """)
+            ComponentHistory(self.conn).record_unlinked(self.conn.cursor(), f"sc.component_id IN ({selection})")
+            summary['unlinked'] = self.conn.execute(
+                f"DELETE FROM system_components WHERE component_id IN ({selection})").rowcount
+            self.conn.execute(f"DELETE FROM components WHERE id IN ({selection})")
+        self.conn.execute("DELETE FROM temp.archive_selection")
+        return summary
+
+    def restore(self, ids: Iterable[int]) -> Dict:
+        """Move archived components back; returns restored and skipped counts
+
+        Components whose serial number is in use by another component of the
+        same type (the part was scanned again after being archived) are
+        skipped and stay archived. Installed components come back as spares.
+        """
+        ids = json.dumps(sorted({int(component_id) for component_id in ids}))
+        restorable = [row[0] for row in self.conn.execute("""
+            SELECT a.id FROM archived_components a
+            WHERE a.id IN (SELECT value FROM json_each(?))
+              AND NOT EXISTS (SELECT 1 FROM components c
+                              WHERE a.serial_number <> '' AND c.serial_number = a.serial_number
+                                AND c.component_type = a.component_type)
+        """, (ids,))]
+        self._move_back(restorable)
+        skipped = self.conn.execute("SELECT COUNT(*) FROM archived_components WHERE id IN "
+                                    "(SELECT value FROM json_each(?))", (ids,)).fetchone()[0]
+        return {'restored': len(restorable), 'skipped': skipped}
+
+    def restore_serial(self, serial: str, component_type: str) -> Optional[int]:
+        """Restore the archived component with a serial number, if there is one
+
+        Used by scan ingest when a serial isn't among the live components.
+        """
+        row = self.conn.execute("""
+            SELECT id FROM archived_components WHERE serial_number = ? AND component_type = ?
+            ORDER BY archived_at DESC LIMIT 1
+        """, (serial, component_type)).fetchone()
+        if row is None:
+            return None
+        self._move_back([row[0]])
+        return row[0]
+
+    def _move_back(self, ids: List[int]):
+        """Restored components count as changed now, so they aren't archived again at once
+
+        Their system links went when they were archived, so installed ones
+        come back as spares with no location, as when their system is
+        deleted; a scan that reports one installs it again.
+        """
+        selection = "SELECT value FROM json_each(?)"
+        restored = {'updated_at': 'CURRENT_TIMESTAMP',
+                    'status': "CASE status WHEN 'installed' THEN 'spare' ELSE status END",
+                    'location': "CASE status WHEN 'installed' THEN NULL ELSE location END"}
+        columns = [restored.get(column, column) for column in COLUMNS]
+        self.conn.execute(f"""
+            INSERT INTO components ({COLUMN_LIST})
+            SELECT {', '.join(columns)} FROM archived_components WHERE id IN ({selection})
+        """, (json.dumps(ids),))
+        self.conn.execute(f"DELETE FROM archived_components WHERE id IN ({selection})", (json.dumps(ids),))
+
+    def stats(self) -> Dict:
+        """Live and archived component counts"""
+        return {
+            'live': self.conn.execute("SELECT COUNT(*) FROM components").fetchone()[0],
+            'archived': self.conn.execute("SELECT COUNT(*) FROM archived_components").fetchone()[0],
+        }
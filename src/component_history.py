@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Component history for Hardware Inventory
+Records what changed in a system's component set on every scan, so the
+hardware a host had at any point in time can be rebuilt. Each scan writes
+deltas (added, removed, changed) to component_history, as does anything
+else that unlinks components (deletes, bulk actions, archiving, repairs);
+every
+SNAPSHOT_INTERVAL deltas a full copy of the component set is written to
+system_snapshots. Rebuilding a date starts from the nearest snapshot, so it
+never replays more than one interval of deltas.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from scan_archive import normalize_timestamp
+
+# Deltas per host between full snapshots
+SNAPSHOT_INTERVAL = int(os.environ.get('INVENTORY_SNAPSHOT_INTERVAL', 50))
+
+# Component columns tracked over time (status and location follow from
+# being linked to the system)
+TRACKED_FIELDS = ('component_type', 'manufacturer', 'model', 'serial_number', 'specifications')
+
+
+class ComponentHistory:
+    """Deltas and periodic snapshots of each system's component set
+
+    Writes use the caller's cursor and transaction.
+    """
+
+    def __init__(self, conn, snapshot_interval: int = None):
+        self.conn = conn
+        self.snapshot_interval = snapshot_interval or SNAPSHOT_INTERVAL
+
+    @staticmethod
+    def current_components(cursor, system_id: int) -> Dict[int, Dict]:
+        """Tracked fields of the components linked to a system, by id"""
+        cursor.execute(f"""
+            SELECT c.id, {', '.join('c.' + field for field in TRACKED_FIELDS)}
+            FROM components c
+            JOIN system_components sc ON c.id = sc.component_id
+            WHERE sc.system_id = ?
+        """, (system_id,))
+        return {row[0]: dict(zip(TRACKED_FIELDS, row[1:])) for row in cursor.fetchall()}
+
+    def record(self, cursor, hostname: str, before: Dict[int, Dict], after: Dict[int, Dict],
+               scanned_at: str, previous_scan: Optional[str] = None) -> int:
+        """Write the deltas between two component sets; returns how many"""
+        changed_at = normalize_timestamp(scanned_at)
+        self._first_snapshot(cursor, hostname, before, previous_scan, changed_at)
+
+        deltas = []
+        for component_id, fields in after.items():
+            if component_id not in before:
+                deltas.append((component_id, 'added', fields))
+            elif before[component_id] != fields:
+                deltas.append((component_id, 'changed', fields))
+        for component_id, fields in before.items():
+            if component_id not in after:
+                deltas.append((component_id, 'removed', fields))
+        if not deltas:
+            return 0
+
+        cursor.executemany("""
+            INSERT INTO component_history (hostname, component_id, change, fields, changed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(hostname, component_id, change, json.dumps(fields), changed_at)
+              for component_id, change, fields in sorted(deltas)])
+
+        cursor.execute("""
+            SELECT COUNT(*) FROM component_history
+            WHERE hostname = ? AND id > (SELECT COALESCE(MAX(history_id), 0)
+                                         FROM system_snapshots WHERE hostname = ?)
+        """, (hostname, hostname))
+        if cursor.fetchone()[0] >= self.snapshot_interval:
+            self._snapshot(cursor, hostname, changed_at, after)
+        return len(deltas)
+
+    def record_unlinked(self, cursor, condition: str, params=()) -> int:
+        """Write removed deltas for the links about to be deleted; returns how many
+
+        condition selects the links from system_components sc. Call it
+        before the delete, while the components are still linked.
+        """
+        removed_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        cursor.execute(f"""
+            SELECT sc.system_id, s.hostname, s.last_scan, sc.component_id
+            FROM system_components sc JOIN systems s ON s.id = sc.system_id
+            WHERE {condition}
+        """, params)
+        systems: Dict[tuple, set] = {}
+        for system_id, hostname, last_scan, component_id in cursor.fetchall():
+            systems.setdefault((system_id, hostname, last_scan), set()).add(component_id)
+
+        deltas = []
+        for (system_id, hostname, last_scan), removed in systems.items():
+            components = self.current_components(cursor, system_id)
+            self._first_snapshot(cursor, hostname, components, last_scan, removed_at)
+            deltas.extend((hostname, component_id, 'removed', json.dumps(components[component_id]), removed_at)
+                          for component_id in sorted(removed) if component_id in components)
+        cursor.executemany("""
+            INSERT INTO component_history (hostname, component_id, change, fields, changed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, deltas)
+        return len(deltas)
+
+    def _first_snapshot(self, cursor, hostname: str, components: Dict[int, Dict],
+                        last_scan: Optional[str], until: str):
+        """Snapshot a host's current components if it has no snapshot yet
+
+        Systems scanned before history was kept start from what they have
+        now. The set is stamped with the last time it is known to have held:
+        the last scan or the host's latest delta, whichever is later, but
+        never after the change about to be recorded at until.
+        """
+        cursor.execute("SELECT 1 FROM system_snapshots WHERE hostname = ? LIMIT 1", (hostname,))
+        if cursor.fetchone() or not components:
+            return
+        cursor.execute("SELECT MAX(changed_at) FROM component_history WHERE hostname = ?", (hostname,))
+        known = [cursor.fetchone()[0]]
+        if last_scan:
+            known.append(normalize_timestamp(last_scan))
+        taken_at = max(filter(None, known), default=until)
+        self._snapshot(cursor, hostname, min(taken_at, until), components)
+
+    def _snapshot(self, cursor, hostname: str, taken_at: str, components: Dict[int, Dict]):
+        cursor.execute("""
+            INSERT INTO system_snapshots (hostname, taken_at, history_id, components)
+            VALUES (?, ?, (SELECT COALESCE(MAX(id), 0) FROM component_history WHERE hostname = ?), ?)
+        """, (hostname, taken_at, hostname, json.dumps(components)))
+
+    def state_at(self, hostname: str, at: str) -> Optional[Dict]:
+        """Rebuild a system's components at a time
+
+        Returns None if nothing is recorded for the host at or before then.
+        """
+        at = normalize_timestamp(at)
+        snapshot = self.conn.execute("""
+            SELECT history_id, components, taken_at FROM system_snapshots
+            WHERE hostname = ? AND taken_at <= ?
+            ORDER BY taken_at DESC, id DESC LIMIT 1
+        """, (hostname, at)).fetchone()
+        if snapshot:
+            components = {int(component_id): fields
+                          for component_id, fields in json.loads(snapshot[1]).items()}
+            start_id = snapshot[0]
+        else:
+            components, start_id = {}, 0
+
+        deltas = self.conn.execute("""
+            SELECT component_id, change, fields FROM component_history
+            WHERE hostname = ? AND id > ? AND changed_at <= ?
+            ORDER BY id
+        """, (hostname, start_id, at)).fetchall()
+        if not snapshot and not deltas:
+            return None
+        for component_id, change, fields in deltas:
+            if change == 'removed':
+                components.pop(component_id, None)
+            else:
+                components[component_id] = json.loads(fields)
+
+        return {
+            'as_of': at,
+            'snapshot_taken_at': snapshot[2] if snapshot else None,
+            'deltas_applied': len(deltas),
+            'components': sorted(
+                (dict(fields, id=component_id) for component_id, fields in components.items()),
+                key=lambda component: (component['component_type'], component['id'])),
+        }
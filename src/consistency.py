@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Inventory consistency checks for Hardware Inventory
+Finds data problems that accumulate silently, since foreign keys aren't
+enforced and scans only ever rewrite their own host's links:
+
+- duplicate-serial: one serial number linked to more than one system
+- installed-unlinked: an installed component no system links to
+- dangling-link: a system_components row whose system or component is gone
+- location-mismatch: a linked component whose location isn't the host's name
+
+Each check is one set-based query over a scope of component and link ids.
+A full run scopes everything; later runs scope only rows changed since the
+stored watermark (components and systems by updated_at, links and
+component_history by id) plus the rows sharing a serial or host with them. Links left behind by rows
+deleted outside the application are only found by a full run.
+
+Findings are kept in consistency_issues, so each run replaces only the
+issues in its scope. Writes use the caller's transaction.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from component_history import ComponentHistory
+
+CHECKS = {
+    'duplicate-serial': 'Serial number linked to more than one system',
+    'installed-unlinked': 'Installed component not linked to any system',
+    'dangling-link': 'Link to a deleted system or component',
+    'location-mismatch': "Component location differs from its system's hostname",
+}
+
+_IN_COMPONENTS = "(SELECT id FROM temp.check_components)"
+_IN_LINKS = "(SELECT id FROM temp.check_links)"
+
+_CHECK_QUERIES = {
+    'duplicate-serial': f"""
+        WITH duplicated AS (
+            SELECT c.serial_number AS serial, COUNT(DISTINCT sc.system_id) AS systems
+            FROM components c
+            JOIN system_components sc ON sc.component_id = c.id
+            JOIN systems s ON s.id = sc.system_id
+            WHERE c.serial_number IN (SELECT serial_number FROM components
+                                      WHERE id IN {_IN_COMPONENTS} AND serial_number <> '')
+            GROUP BY c.serial_number
+            HAVING COUNT(DISTINCT sc.system_id) > 1
+        )
+        SELECT c.id, sc.system_id, sc.id,
+               'serial ' || d.serial || ' is linked to ' || d.systems || ' systems'
+        FROM duplicated d
+        JOIN components c ON c.serial_number = d.serial
+        JOIN system_components sc ON sc.component_id = c.id
+        JOIN systems s ON s.id = sc.system_id
+    """,
+    'installed-unlinked': f"""
+        SELECT c.id, NULL, NULL,
+               'installed at ' || COALESCE(NULLIF(c.location, ''), '(no location)') || ' but not linked'
+        FROM components c
+        WHERE c.id IN {_IN_COMPONENTS} AND c.status = 'installed'
+          AND NOT EXISTS (SELECT 1 FROM system_components sc WHERE sc.component_id = c.id)
+    """,
+    'dangling-link': f"""
+        SELECT sc.component_id, sc.system_id, sc.id,
+               CASE WHEN s.id IS NULL THEN 'system ' || sc.system_id || ' no longer exists'
+                    ELSE 'component ' || sc.component_id || ' no longer exists' END
+        FROM system_components sc
+        LEFT JOIN systems s ON s.id = sc.system_id
+        LEFT JOIN components c ON c.id = sc.component_id
+        WHERE sc.id IN {_IN_LINKS} AND (s.id IS NULL OR c.id IS NULL)
+    """,
+    'location-mismatch': f"""
+        SELECT c.id, s.id, sc.id,
+               'location ' || COALESCE(NULLIF(c.location, ''), '(none)') || ' but linked to ' || s.hostname
+        FROM system_components sc
+        JOIN components c ON c.id = sc.component_id
+        JOIN systems s ON s.id = sc.system_id
+        WHERE sc.id IN {_IN_LINKS} AND c.location IS NOT s.hostname
+    """,
+}
+
+
+class ConsistencyChecker:
+    """Finds, records and optionally repairs inventory inconsistencies"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _meta(self, key: str) -> Optional[int]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def last_checked(self) -> Optional[str]:
+        """UTC time of the last run, or None if there hasn't been one"""
+        checked = self._meta('consistency_checked_at')
+        if checked is None:
+            return None
+        return self.conn.execute("SELECT datetime(?, 'unixepoch')", (checked,)).fetchone()[0]
+
+    def _build_scope(self, since: Optional[int], link_mark: int, history_mark: int):
+        """Fill temp.check_components and temp.check_links"""
+        execute = self.conn.execute
+        execute("CREATE TEMP TABLE IF NOT EXISTS check_components (id INTEGER PRIMARY KEY)")
+        execute("CREATE TEMP TABLE IF NOT EXISTS check_links (id INTEGER PRIMARY KEY)")
+        execute("DELETE FROM temp.check_components")
+        execute("DELETE FROM temp.check_links")
+        if since is None:
+            execute("INSERT INTO temp.check_components SELECT id FROM components")
+            execute("INSERT OR IGNORE INTO temp.check_components SELECT component_id FROM system_components")
+            execute("INSERT INTO temp.check_links SELECT id FROM system_components")
+            return
+
+        changed = "datetime(?, 'unixepoch')"
+        execute(f"INSERT OR IGNORE INTO temp.check_components SELECT id FROM components WHERE updated_at >= {changed}",
+                (since,))
+        # A rescan drops links to hardware that's gone without touching the
+        # component; the scan's history says which ones
+        execute("INSERT OR IGNORE INTO temp.check_components SELECT component_id FROM component_history WHERE id > ?",
+                (history_mark,))
+        execute(f"""
+            INSERT OR IGNORE INTO temp.check_components
+            SELECT c.id FROM systems s JOIN components c ON c.location = s.hostname
+            WHERE s.updated_at >= {changed}
+        """, (since,))
+        execute("INSERT OR IGNORE INTO temp.check_links SELECT id FROM system_components WHERE id > ?", (link_mark,))
+        execute(f"""
+            INSERT OR IGNORE INTO temp.check_links
+            SELECT sc.id FROM systems s JOIN system_components sc ON sc.system_id = s.id
+            WHERE s.updated_at >= {changed}
+        """, (since,))
+        execute(f"""
+            INSERT OR IGNORE INTO temp.check_components
+            SELECT component_id FROM system_components WHERE id IN {_IN_LINKS}
+        """)
+        # Other holders of the same serials, then every link of the scope
+        execute(f"""
+            INSERT OR IGNORE INTO temp.check_components
+            SELECT id FROM components
+            WHERE serial_number IN (SELECT serial_number FROM components
+                                    WHERE id IN {_IN_COMPONENTS} AND serial_number <> '')
+        """)
+        execute(f"""
+            INSERT OR IGNORE INTO temp.check_links
+            SELECT id FROM system_components WHERE component_id IN {_IN_COMPONENTS}
+        """)
+
+    def _find(self) -> List[Dict]:
+        """Run every check over the current scope"""
+        found = []
+        for check, query in _CHECK_QUERIES.items():
+            for component_id, system_id, link_id, detail in self.conn.execute(query):
+                found.append({'check_name': check, 'component_id': component_id,
+                              'system_id': system_id, 'link_id': link_id, 'detail': detail})
+        return found
+
+    def _repair(self, found: List[Dict]) -> Dict:
+        """Fix what was found; links are trusted over component columns
+
+        Dangling links are deleted. Of the links sharing a serial number
+        only the newest (the latest scan) is kept. Locations are set to the
+        linked host, and installed components left without a link become
+        spares with no location, as when their system is deleted.
+        """
+        by_check: Dict[str, List[Dict]] = {}
+        for issue in found:
+            by_check.setdefault(issue['check_name'], []).append(issue)
+
+        stale_links = {issue['link_id'] for issue in by_check.get('dangling-link', [])}
+        duplicates = by_check.get('duplicate-serial', [])
+        serials = dict(self.conn.execute(f"""
+            SELECT id, serial_number FROM components WHERE id IN {_IN_COMPONENTS} AND serial_number <> ''
+        """)) if duplicates else {}
+        newest: Dict[str, int] = {}
+        for issue in duplicates:
+            serial = serials[issue['component_id']]
+            newest[serial] = max(newest.get(serial, 0), issue['link_id'])
+        stale_links.update(issue['link_id'] for issue in duplicates
+                           if issue['link_id'] != newest[serials[issue['component_id']]])
+        # Removals go into the hosts' history, which also invalidates cached
+        # reports; dangling links have no host, but still count as a write
+        recorded = ComponentHistory(self.conn).record_unlinked(
+            self.conn.cursor(), "sc.id IN (SELECT value FROM json_each(?))", (json.dumps(sorted(stale_links)),))
+        self.conn.executemany("DELETE FROM system_components WHERE id = ?", [(link,) for link in stale_links])
+        if stale_links and not recorded:
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'write_generation'")
+
+        relocated = self.conn.execute(f"""
+            UPDATE components
+            SET location = (SELECT s.hostname FROM system_components sc JOIN systems s ON s.id = sc.system_id
+                            WHERE sc.component_id = components.id ORDER BY sc.id DESC LIMIT 1),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id IN {_IN_COMPONENTS}
+              AND EXISTS (SELECT 1 FROM system_components sc JOIN systems s ON s.id = sc.system_id
+                          WHERE sc.component_id = components.id AND s.hostname IS NOT components.location)
+        """).rowcount
+        unlinked = self.conn.execute(f"""
+            UPDATE components SET status = 'spare', location = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id IN {_IN_COMPONENTS} AND status = 'installed'
+              AND NOT EXISTS (SELECT 1 FROM system_components sc WHERE sc.component_id = components.id)
+        """).rowcount
+        return {'links_removed': len(stale_links), 'relocated': relocated, 'made_spare': unlinked}
+
+    def run(self, full: bool = False, repair: bool = False) -> Dict:
+        """Check the rows changed since the last run (or everything)
+
+        The first run, or full=True, checks everything. Returns the scope
+        sizes, issue counts by check and, with repair, what was fixed.
+        """
+        since = None if full else self._meta('consistency_checked_at')
+        started = self.conn.execute("SELECT CAST(strftime('%s', 'now') AS INTEGER)").fetchone()[0]
+        link_mark = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM system_components").fetchone()[0]
+        history_mark = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM component_history").fetchone()[0]
+        self._build_scope(since, self._meta('consistency_link_id') or 0, self._meta('consistency_history_id') or 0)
+
+        summary = {
+            'full': since is None,
+            'components_checked': self.conn.execute("SELECT COUNT(*) FROM temp.check_components").fetchone()[0],
+            'links_checked': self.conn.execute("SELECT COUNT(*) FROM temp.check_links").fetchone()[0],
+        }
+        found = self._find()
+        if repair:
+            summary['repaired'] = self._repair(found)
+            summary['repaired']['issues'] = len(found)
+            found = self._find()
+
+        if since is None:
+            self.conn.execute("DELETE FROM consistency_issues")
+        else:
+            # Issues in scope are re-found below; those about deleted links
+            # or components are resolved
+            self.conn.execute(f"""
+                DELETE FROM consistency_issues
+                WHERE component_id IN {_IN_COMPONENTS} OR link_id IN {_IN_LINKS}
+                   OR (link_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM system_components sc
+                                                           WHERE sc.id = consistency_issues.link_id))
+                   OR (link_id IS NULL AND NOT EXISTS (SELECT 1 FROM components c
+                                                       WHERE c.id = consistency_issues.component_id))
+            """)
+        self.conn.executemany("""
+            INSERT INTO consistency_issues (check_name, component_id, system_id, link_id, detail)
+            VALUES (:check_name, :component_id, :system_id, :link_id, :detail)
+        """, found)
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              [('consistency_checked_at', started), ('consistency_link_id', link_mark),
+                               ('consistency_history_id', history_mark)])
+        self.conn.execute("DELETE FROM temp.check_components")
+        self.conn.execute("DELETE FROM temp.check_links")
+
+        summary['found'] = {check: 0 for check in CHECKS}
+        for issue in found:
+            summary['found'][issue['check_name']] += 1
+        summary['open'] = self.conn.execute("SELECT COUNT(*) FROM consistency_issues").fetchone()[0]
+        return summary
+
+    def issues(self, check: str = None) -> List[Dict]:
+        """Recorded issues with the component and host they concern"""
+        where, params = ('WHERE i.check_name = ?', (check,)) if check else ('', ())
+        cursor = self.conn.execute(f"""
+            SELECT i.id, i.check_name, i.component_id, i.system_id, i.link_id, i.detail, i.found_at,
+                   c.component_type, c.model, c.serial_number, c.status, c.location, s.hostname
+            FROM consistency_issues i
+            LEFT JOIN components c ON c.id = i.component_id
+            LEFT JOIN systems s ON s.id = i.system_id
+            {where}
+            ORDER BY i.check_name, i.component_id, i.link_id
+        """, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
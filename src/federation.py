@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Federated queries for Hardware Inventory
+Lets one web instance read several site databases (one SQLite file per
+datacenter) without copying them into one file. A query is run against
+every site in parallel on a shared thread pool and the rows are merged with
+a site column. A site that is missing, locked or too slow is reported as an
+error for that site only; the others still answer.
+
+Sites are configured with INVENTORY_SITES, e.g.
+    INVENTORY_SITES="dc1=/srv/inventory/dc1.db,dc2=/srv/inventory/dc2.db"
+The instance's own database (INVENTORY_DB) is always the first site, named
+after INVENTORY_SITE or "local".
+"""
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY
+
+# Seconds a site may take to answer before it is reported as unavailable
+SITE_TIMEOUT = float(os.environ.get('INVENTORY_SITE_TIMEOUT', 5))
+MAX_WORKERS = int(os.environ.get('INVENTORY_FEDERATION_WORKERS', 8))
+
+SITE_ERRORS = REGISTRY.counter(
+    'inventory_federation_site_errors_total', 'Federated queries a site failed to answer', ['site'])
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all requests of this process
+
+    Created on first use, and again after a fork, since prefork workers
+    don't inherit the master's threads.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='federation')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def parse_sites(spec: str) -> Dict[str, str]:
+    """Parse "name=path,name=path" into an ordered {name: path}"""
+    sites = {}
+    for entry in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, sep, path = entry.partition('=')
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"Invalid site {entry!r}; expected name=/path/to/database.db")
+        sites[name.strip()] = path.strip()
+    return sites
+
+
+class FederatedResult:
+    """Rows merged from every site that answered, plus per-site errors"""
+
+    def __init__(self, rows: List[Dict], errors: Dict[str, str]):
+        self.rows = rows
+        self.errors = errors
+
+
+class Federation:
+    """Read-only fan-out of one query across several site databases"""
+
+    def __init__(self, primary_path: str, primary_name: str = None, sites: Dict[str, str] = None,
+                 timeout: float = None):
+        self.sites = {primary_name or 'local': primary_path}
+        primary = os.path.abspath(primary_path)
+        for name, path in (sites or {}).items():
+            if os.path.abspath(path) != primary:
+                self.sites.setdefault(name, path)
+        self.timeout = SITE_TIMEOUT if timeout is None else timeout
+
+    @classmethod
+    def from_env(cls, primary_path: str) -> 'Federation':
+        return cls(primary_path, os.environ.get('INVENTORY_SITE') or None,
+                   parse_sites(os.environ.get('INVENTORY_SITES', '')))
+
+    @property
+    def primary(self) -> str:
+        return next(iter(self.sites))
+
+    @property
+    def federated(self) -> bool:
+        return len(self.sites) > 1
+
+    def _query_site(self, name: str, sql: str, params: tuple, connections: Dict) -> List[Dict]:
+        path = self.sites[name]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"database {path} not found")
+        conn = sqlite3.connect(path, timeout=self.timeout, check_same_thread=False)
+        connections[name] = conn
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = ON")
+            rows = []
+            for row in conn.execute(sql, params):
+                merged = dict(row)
+                merged['site'] = name
+                rows.append(merged)
+            return rows
+        finally:
+            conn.close()
+
+    def query(self, sql: str, params: tuple = (), site: str = None) -> FederatedResult:
+        """Run a read-only query on every site (or just one) and merge the rows
+
+        Rows keep their site order; callers sort merged results themselves.
+        """
+        names = [site] if site else list(self.sites)
+        unknown = [name for name in names if name not in self.sites]
+        if unknown:
+            return FederatedResult([], {name: 'unknown site' for name in unknown})
+
+        connections = {}
+        executor = _get_executor()
+        futures = {name: executor.submit(self._query_site, name, sql, params, connections)
+                   for name in names}
+        wait(futures.values(), timeout=self.timeout)
+
+        rows, errors = [], {}
+        for name, future in futures.items():
+            if not future.done():
+                # Stop the statement so the worker thread is freed
+                conn = connections.get(name)
+                if conn is not None:
+                    try:
+                        conn.interrupt()
+                    except sqlite3.ProgrammingError:
+                        pass  # finished and closed in the meantime
+                errors[name] = f"timed out after {self.timeout:g}s"
+            elif future.exception() is not None:
+                errors[name] = str(future.exception())
+            else:
+                rows.extend(future.result())
+        for name in errors:
+            SITE_ERRORS.inc(site=name)
+        return FederatedResult(rows, errors)
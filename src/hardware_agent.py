@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Hardware change agent for Hardware Inventory
+A small daemon for hosts that should stay current without periodic
+`curl | bash` rescans. It keeps a cheap signature of the host's hardware
+(PCI and block devices from sysfs, DMI identity, present CPUs, total
+memory) that is rechecked with a few stat() calls every --interval
+seconds, or at once when the kernel reports a device being added or
+removed over udev netlink. Only when the signature moves is a full scan
+collected, and it is uploaded to /api/upload_scan only if its fingerprint
+differs from the last upload.
+
+Every --heartbeat seconds (and at startup) the agent rescans and sends the
+fingerprint alone. The server answers 304 and just records the scan time,
+so the host is still shown as alive without uploading anything.
+
+Failed syncs are retried like the scanner script does: the wait doubles
+with each attempt, starting from the server's Retry-After when it is busy
+(429/503), plus a random share of its X-Inventory-Retry-Jitter window, so
+a fleet coming back from an outage doesn't retry in lockstep.
+
+Needs only the standard library and hardware_collector.py next to it:
+    sudo python3 hardware_agent.py --server http://inventory:5101
+"""
+
+import hashlib
+import json
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Optional, Tuple
+
+import hardware_collector
+from hardware_collector import SYS_BLOCK, SYS_DMI, SYS_PCI, UDEV_DATA, _read
+
+# Seconds between signature checks; changes seen over netlink are acted on at once
+CHECK_INTERVAL = float(os.environ.get('INVENTORY_AGENT_INTERVAL', 60))
+# Seconds between heartbeats, which also catch anything the signature misses
+HEARTBEAT_INTERVAL = float(os.environ.get('INVENTORY_AGENT_HEARTBEAT', 6 * 3600))
+# Seconds to let a burst of device events finish before scanning
+SETTLE_SECONDS = 2.0
+# Seconds before retrying a failed upload, and the most a doubled wait grows to
+RETRY_SECONDS = 60.0
+MAX_RETRY_SECONDS = 300.0
+HTTP_TIMEOUT = 30
+
+# Kernel uevents are multicast to group 1 of NETLINK_KOBJECT_UEVENT
+NETLINK_KOBJECT_UEVENT = 15
+_UEVENT_SUBSYSTEMS = {'pci', 'block', 'cpu', 'memory'}
+_UEVENT_ACTIONS = {'add', 'remove', 'change', 'online', 'offline'}
+
+
+def scan_fingerprint(data: Dict) -> str:
+    """Hash of a scan without its detection_date
+
+    Must match inventory_manager.scan_fingerprint(), which the server
+    compares against.
+    """
+    payload = {key: value for key, value in data.items() if key != 'detection_date'}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _entries(path: str) -> Tuple[Tuple[str, int], ...]:
+    """(name, inode) of a sysfs directory's entries
+
+    sysfs gives a device a new inode when it is removed and added again,
+    so a swapped disk that reuses its name (sda) still changes this.
+    """
+    try:
+        return tuple(sorted((entry.name, entry.inode()) for entry in os.scandir(path)))
+    except OSError:
+        return ()
+
+
+def hardware_signature() -> Tuple:
+    """Cheap summary of the hardware that changes whenever a scan would
+
+    Reads directory listings and a handful of small sysfs attributes; it
+    never opens a disk or runs a probe.
+    """
+    disks = []
+    for name, inode in _entries(SYS_BLOCK):
+        block_dir = os.path.join(SYS_BLOCK, name)
+        dev = _read(os.path.join(block_dir, 'dev'))
+        try:
+            # udev rewrites a device's database entry when it (re)appears
+            udev_mtime = os.stat(os.path.join(UDEV_DATA, f'b{dev}')).st_mtime_ns
+        except OSError:
+            udev_mtime = 0
+        disks.append((name, inode, dev, _read(os.path.join(block_dir, 'size')), udev_mtime))
+    return (
+        _entries(SYS_PCI),
+        tuple(disks),
+        tuple(_read(os.path.join(SYS_DMI, attribute))
+              for attribute in ('board_name', 'board_serial', 'product_name', 'product_uuid', 'bios_version')),
+        _read('/sys/devices/system/cpu/present'),
+        hardware_collector.collect_memory_total_gb(),
+    )
+
+
+def open_uevent_socket() -> Optional[socket.socket]:
+    """Netlink socket receiving kernel device events, or None where unavailable"""
+    if not hasattr(socket, 'AF_NETLINK'):
+        return None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        sock.bind((0, 1))
+    except OSError:
+        return None
+    sock.setblocking(False)
+    return sock
+
+
+def parse_uevent(message: bytes) -> Dict[str, str]:
+    """ACTION@devpath\\0KEY=value\\0... as a dict"""
+    fields = {}
+    for part in message.split(b'\0')[1:]:
+        key, sep, value = part.decode('utf-8', 'replace').partition('=')
+        if sep:
+            fields[key] = value
+    return fields
+
+
+def is_hardware_event(fields: Dict[str, str]) -> bool:
+    return fields.get('SUBSYSTEM') in _UEVENT_SUBSYSTEMS and fields.get('ACTION') in _UEVENT_ACTIONS
+
+
+class HardwareWatcher:
+    """Waits until the hardware signature may have changed
+
+    With a netlink socket, device events wake the watcher early; the
+    signature is still rechecked every interval in case events are missed
+    (or netlink isn't available, e.g. in some containers).
+    """
+
+    def __init__(self, interval: float = None, use_netlink: bool = True):
+        self.interval = CHECK_INTERVAL if interval is None else interval
+        self.sock = open_uevent_socket() if use_netlink else None
+        self.signature = hardware_signature()
+
+    def _drain(self) -> bool:
+        """Read queued device events; whether any concern the hardware"""
+        relevant = False
+        while True:
+            try:
+                message = self.sock.recv(65536)
+            except BlockingIOError:
+                return relevant
+            except OSError:
+                # ENOBUFS after an event storm: some were dropped, so check
+                return True
+            relevant = relevant or is_hardware_event(parse_uevent(message))
+
+    def _sleep(self, seconds: float, stop: threading.Event) -> bool:
+        """Sleep until seconds pass, stop is set or a device event arrives"""
+        deadline = time.monotonic() + seconds
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.sock is None:
+                stop.wait(min(remaining, 1.0))
+                continue
+            # Short selects so a stop request is noticed promptly
+            readable, _, _ = select.select([self.sock], [], [], min(remaining, 1.0))
+            if readable and self._drain():
+                return True
+        return False
+
+    def wait(self, timeout: float, stop: threading.Event) -> bool:
+        """Wait up to timeout; True as soon as the signature has changed"""
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._sleep(min(remaining, self.interval), stop):
+                # Let the rest of a hotplug burst arrive before looking
+                self._sleep(SETTLE_SECONDS, stop)
+                if self.sock is not None:
+                    self._drain()
+            signature = hardware_signature()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+        return False
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class ServerBusy(OSError):
+    """The server turned an upload away (429/503) and said when to come back"""
+
+    def __init__(self, status: int, retry_after: float, jitter: float):
+        self.status = status
+        self.retry_after = retry_after
+        self.jitter = jitter
+        super().__init__(f"server busy (HTTP {status}); retry after {retry_after:g}s")
+
+
+def _header_seconds(headers, name: str, default: float) -> float:
+    try:
+        return max(float(headers.get(name)), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class InventoryClient:
+    """Talks to /api/upload_scan"""
+
+    def __init__(self, server: str, timeout: float = HTTP_TIMEOUT):
+        self.url = server.rstrip('/') + '/api/upload_scan'
+        self.timeout = timeout
+
+    def _post(self, body: Optional[bytes], headers: Dict[str, str]) -> Tuple[int, Dict]:
+        request = urllib.request.Request(self.url, data=body if body is not None else b'',
+                                         headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                return response.status, json.loads(payload) if payload else {}
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, {}
+            if e.code in (429, 503):
+                raise ServerBusy(e.code, _header_seconds(e.headers, 'Retry-After', RETRY_SECONDS),
+                                 _header_seconds(e.headers, 'X-Inventory-Retry-Jitter', 0.0)) from None
+            raise
+
+    def check_unchanged(self, data: Dict, fingerprint: str) -> bool:
+        """Send only the fingerprint; True if the server already has this scan"""
+        status, _result = self._post(None, {
+            'X-Inventory-Hostname': data.get('hostname', ''),
+            'X-Inventory-Detection-Date': data.get('detection_date', ''),
+            'If-None-Match': f'"{fingerprint}"',
+        })
+        return status == 304
+
+    def upload(self, data: Dict) -> Dict:
+        _status, result = self._post(json.dumps(data).encode('utf-8'),
+                                     {'Content-Type': 'application/json'})
+        # stale: the server already has a newer scan and archived this one
+        if result.get('status') not in ('success', 'stale'):
+            raise OSError(f"upload rejected: {result.get('message', result)}")
+        return result
+
+
+class HardwareAgent:
+    """Uploads a scan when the hardware changes, and a heartbeat otherwise"""
+
+    def __init__(self, client: InventoryClient, watcher: HardwareWatcher,
+                 heartbeat: float = None, collect=None, log=None):
+        self.client = client
+        self.watcher = watcher
+        self.heartbeat = HEARTBEAT_INTERVAL if heartbeat is None else heartbeat
+        self.collect = collect or hardware_collector.collect
+        self.log = log or (lambda message: print(message, file=sys.stderr, flush=True))
+        self.uploaded = None
+        self.stats = {'scans': 0, 'uploads': 0, 'heartbeats': 0, 'errors': 0}
+        # Failed syncs in a row, and how long to wait before the next attempt
+        self.failures = 0
+        self.retry_delay = RETRY_SECONDS
+
+    def sync(self, heartbeat: bool = False) -> bool:
+        """Scan and bring the server up to date; False if the server was unreachable
+
+        A heartbeat (or the first sync) asks the server before uploading,
+        since it may already have this scan from an earlier run.
+        """
+        data = self.collect()
+        self.stats['scans'] += 1
+        fingerprint = scan_fingerprint(data)
+        try:
+            if heartbeat or self.uploaded is None:
+                if self.client.check_unchanged(data, fingerprint):
+                    self.stats['heartbeats'] += 1
+                    self.uploaded = fingerprint
+                    self.failures = 0
+                    return True
+            elif fingerprint == self.uploaded:
+                return True
+            self.client.upload(data)
+        except ServerBusy as e:
+            self._backoff(e.retry_after, e.jitter)
+            self.log(f"Server {self.client.url} busy (HTTP {e.status}); "
+                     f"retrying in {self.retry_delay:.0f}s")
+            return False
+        except (OSError, ValueError) as e:
+            self.stats['errors'] += 1
+            self._backoff(RETRY_SECONDS, RETRY_SECONDS)
+            self.log(f"Upload to {self.client.url} failed: {e}; retrying in {self.retry_delay:.0f}s")
+            return False
+        self.failures = 0
+        self.stats['uploads'] += 1
+        self.uploaded = fingerprint
+        self.log(f"Uploaded scan for {data.get('hostname')} ({fingerprint[:12]})")
+        return True
+
+    def _backoff(self, base: float, jitter: float):
+        """Set retry_delay: base doubled per failure in a row, capped, plus jitter"""
+        delay = min(base * 2 ** self.failures, MAX_RETRY_SECONDS)
+        self.retry_delay = delay + random.uniform(0, jitter)
+        self.failures += 1
+
+    def run(self, stop: threading.Event):
+        """Sync now, then on every hardware change and heartbeat until stop is set"""
+        synced = self.sync(heartbeat=True)
+        next_heartbeat = time.monotonic() + self.heartbeat
+        while not stop.is_set():
+            timeout = next_heartbeat - time.monotonic()
+            if not synced:
+                timeout = min(timeout, self.retry_delay)
+            changed = self.watcher.wait(max(timeout, 0), stop)
+            if stop.is_set():
+                break
+            due = time.monotonic() >= next_heartbeat
+            if changed or due or not synced:
+                synced = self.sync(heartbeat=due)
+            if due:
+                next_heartbeat = time.monotonic() + self.heartbeat
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Upload hardware scans when the hardware changes')
+    parser.add_argument('--server', default=os.environ.get('INVENTORY_SERVER'),
+                        help='Inventory server URL, e.g. http://inventory:5101 (default: $INVENTORY_SERVER)')
+    parser.add_argument('--interval', type=float, default=CHECK_INTERVAL,
+                        help=f'Seconds between hardware checks (default: {CHECK_INTERVAL:g})')
+    parser.add_argument('--heartbeat', type=float, default=HEARTBEAT_INTERVAL,
+                        help=f'Seconds between heartbeats (default: {HEARTBEAT_INTERVAL:g})')
+    parser.add_argument('--no-netlink', action='store_true',
+                        help="Only poll; don't listen for kernel device events")
+    parser.add_argument('--once', action='store_true', help='Sync once and exit')
+    args = parser.parse_args(argv)
+
+    if not args.server:
+        parser.error('--server or INVENTORY_SERVER is required')
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        print("Note: Running without root. Memory slots and serial numbers will be missing.",
+              file=sys.stderr)
+
+    client = InventoryClient(args.server)
+    watcher = HardwareWatcher(args.interval, use_netlink=not (args.no_netlink or args.once))
+    agent = HardwareAgent(client, watcher, heartbeat=args.heartbeat)
+    try:
+        if args.once:
+            return 0 if agent.sync(heartbeat=True) else 1
+
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+        print(f"Hardware agent reporting to {args.server} "
+              f"({'netlink events and ' if watcher.sock else ''}checks every {watcher.interval:g}s, "
+              f"heartbeat every {agent.heartbeat:g}s)", file=sys.stderr, flush=True)
+        agent.run(stop)
+        return 0
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
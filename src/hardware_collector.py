@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Native hardware collector for Hardware Inventory
+Reads /sys/class/dmi/id, /sys/bus/pci/devices, /sys/block and /proc directly
+in a single pass and emits the same JSON as scripts/detect_hardware.sh.
+The only external commands are the privileged probes sysfs can't answer
+(memory DIMMs via dmidecode), which run in parallel with per-probe timeouts
+so a hung tool can't stall the scan.
+
+This file is self-contained so it can be downloaded and run on any host:
+    curl -s http://server:5101/collector/hardware_collector.py | sudo python3 -
+"""
+
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SYS_DMI = '/sys/class/dmi/id'
+SYS_PCI = '/sys/bus/pci/devices'
+SYS_BLOCK = '/sys/block'
+UDEV_DATA = '/run/udev/data'
+
+PCI_IDS_PATHS = [
+    '/usr/share/hwdata/pci.ids',
+    '/usr/share/misc/pci.ids',
+    '/usr/local/share/pci.ids',
+    '/var/lib/usbutils/pci.ids',
+]
+
+# PCI class codes lspci reports as "VGA compatible", "3D" and "Display" controllers
+GPU_CLASSES = ('0x0300', '0x0302', '0x0380')
+
+# Seconds each external probe may run before it is abandoned
+PROBE_TIMEOUT = 10
+
+# Values firmware reports when it doesn't know one
+_PLACEHOLDER_VALUES = {'not specified', 'unknown', 'none', 'to be filled by o.e.m.'}
+
+
+def _read(path: str) -> str:
+    """Read a sysfs/procfs attribute, returning '' if missing or unreadable"""
+    try:
+        with open(path, 'r', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def clean_value(value: str) -> str:
+    """Drop placeholder values firmware reports, such as 'Not Specified'"""
+    value = (value or '').strip()
+    return '' if value.lower() in _PLACEHOLDER_VALUES else value
+
+
+def clean_serial(serial: str) -> str:
+    """Drop placeholder serial numbers, including all zeros or all Fs"""
+    serial = clean_value(serial)
+    return '' if re.fullmatch(r'0+|F+', serial, re.IGNORECASE) else serial
+
+
+def format_iec_size(size_bytes: int) -> str:
+    """Format a byte count like `numfmt --to=iec-i --suffix=B` (e.g. 1.9TiB)"""
+    units = ['B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB', 'EiB']
+    value = float(size_bytes)
+    unit = 0
+    while value >= 1024 and unit < len(units) - 1:
+        value /= 1024
+        unit += 1
+    if unit == 0:
+        return f'{int(value)}B'
+    # numfmt rounds away from zero, keeping one decimal below 10
+    if value < 10:
+        value = -(-value * 10 // 1) / 10
+        if value < 10:
+            return f'{value:.1f}{units[unit]}'
+    value = -(-value // 1)
+    if value >= 1024 and unit < len(units) - 1:
+        return f'1.0{units[unit + 1]}'
+    return f'{int(value)}{units[unit]}'
+
+
+# External probes
+
+def _run_probe(command: List[str], timeout: float = PROBE_TIMEOUT) -> str:
+    """Run one probe with a timeout, returning stdout or '' on any failure"""
+    if not shutil.which(command[0]):
+        return ''
+    try:
+        result = subprocess.run(command, capture_output=True, text=True,
+                                timeout=timeout, errors='replace')
+    except (subprocess.TimeoutExpired, OSError):
+        print(f"Warning: probe {' '.join(command)} failed or timed out", file=sys.stderr)
+        return ''
+    return result.stdout if result.returncode == 0 else ''
+
+
+def run_probes(probes: Dict[str, List[str]], timeout: float = PROBE_TIMEOUT) -> Dict[str, str]:
+    """Run the probes in parallel; each gets its own timeout"""
+    if not probes:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {name: pool.submit(_run_probe, command, timeout) for name, command in probes.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def parse_dmidecode_sections(output: str, section: str) -> List[Dict[str, str]]:
+    """Split dmidecode output into key/value dicts for each matching section"""
+    sections = []
+    current = None
+    for line in output.splitlines():
+        if not line.startswith('\t'):
+            current = {} if line.strip() == section else None
+            if current is not None:
+                sections.append(current)
+        elif current is not None and not line.startswith('\t\t') and ':' in line:
+            key, _, value = line.strip().partition(':')
+            current[key.strip()] = value.strip()
+    return sections
+
+
+def parse_memory_slots(output: str) -> List[Dict[str, str]]:
+    """Turn `dmidecode -t 17` output into the memory slot list"""
+    slots = []
+    for device in parse_dmidecode_sections(output, 'Memory Device'):
+        slots.append({
+            'slot': clean_value(device.get('Locator', '')),
+            'size': clean_value(device.get('Size', '')),
+            'speed': clean_value(device.get('Speed', '')),
+            'type': clean_value(device.get('Type', '')),
+            'manufacturer': clean_value(device.get('Manufacturer', '')),
+            'part_number': clean_value(device.get('Part Number', '')),
+            'serial': clean_serial(device.get('Serial Number', '')),
+        })
+    return slots
+
+
+# sysfs/procfs readers
+
+def collect_cpu() -> Dict[str, str]:
+    """CPU model and topology from /proc/cpuinfo, as lscpu reports them"""
+    model = ''
+    logical = 0
+    sockets: Set[str] = set()
+    siblings = cores = 0
+    for line in _read('/proc/cpuinfo').splitlines():
+        key, _, value = line.partition(':')
+        key, value = key.strip(), value.strip()
+        if key == 'processor':
+            logical += 1
+        elif key in ('model name', 'Model', 'Hardware') and not model:
+            model = value
+        elif key == 'physical id':
+            sockets.add(value)
+        elif key == 'siblings' and not siblings:
+            siblings = int(value or 0)
+        elif key == 'cpu cores' and not cores:
+            cores = int(value or 0)
+    return {
+        'model': model,
+        'cores': str(logical),
+        'threads_per_core': str(siblings // cores) if siblings and cores else '1',
+        'sockets': str(len(sockets) or 1),
+    }
+
+
+def collect_memory_total_gb() -> str:
+    """Total memory in whole GiB, matching `free -g`"""
+    match = re.search(r'^MemTotal:\s+(\d+)\s+kB', _read('/proc/meminfo'), re.MULTILINE)
+    return str(int(match.group(1)) // (1024 * 1024)) if match else ''
+
+
+def _pci_ancestor(path: str) -> Optional[str]:
+    """Nearest PCI device directory above a sysfs device path"""
+    path = os.path.realpath(path)
+    while path not in ('/', ''):
+        if os.path.exists(os.path.join(path, 'vendor')) and os.path.exists(os.path.join(path, 'class')):
+            return path
+        path = os.path.dirname(path)
+    return None
+
+
+def _pci_ids(device_dir: str) -> Tuple[str, str]:
+    return (_read(os.path.join(device_dir, 'vendor'))[2:].lower(),
+            _read(os.path.join(device_dir, 'device'))[2:].lower())
+
+
+def _udev_properties(block_dir: str) -> Dict[str, str]:
+    """udev's database entry for a block device (where lsblk gets serials)"""
+    properties = {}
+    dev = _read(os.path.join(block_dir, 'dev'))
+    for line in _read(os.path.join(UDEV_DATA, f'b{dev}')).splitlines():
+        if line.startswith('E:') and '=' in line:
+            key, _, value = line[2:].partition('=')
+            properties[key] = value
+    return properties
+
+
+def collect_storage() -> List[Dict[str, str]]:
+    """Physical disks from /sys/block (the devices `lsblk -d` lists as disk)"""
+    disks = []
+    try:
+        names = sorted(os.listdir(SYS_BLOCK))
+    except OSError:
+        return disks
+    for name in names:
+        block_dir = os.path.join(SYS_BLOCK, name)
+        # Loop, zram, device-mapper and md devices have no backing device;
+        # sr* are optical drives (lsblk type "rom")
+        if not os.path.exists(os.path.join(block_dir, 'device')) or name.startswith('sr'):
+            continue
+        udev = _udev_properties(block_dir)
+        sectors = _read(os.path.join(block_dir, 'size'))
+        model = (_read(os.path.join(block_dir, 'device', 'model'))
+                 or udev.get('ID_MODEL', '').replace('_', ' '))
+        serial = (_read(os.path.join(block_dir, 'device', 'serial'))
+                  or _read(os.path.join(block_dir, 'serial'))
+                  or udev.get('ID_SERIAL_SHORT', ''))
+        vendor_id = device_id = ''
+        if name.startswith('nvme'):
+            # The disk's own controller, not just the first NVMe on the bus
+            pci_dir = _pci_ancestor(os.path.join(block_dir, 'device'))
+            if pci_dir:
+                vendor_id, device_id = _pci_ids(pci_dir)
+        rotational = _read(os.path.join(block_dir, 'queue', 'rotational'))
+        disks.append({
+            'device': f'/dev/{name}',
+            'size': format_iec_size(int(sectors) * 512) if sectors.isdigit() else '',
+            'model': model.strip(),
+            'serial': clean_serial(serial),
+            'type': 'SSD' if rotational == '0' else 'HDD',
+            'vendor_id': vendor_id,
+            'device_id': device_id,
+        })
+    return disks
+
+
+def _lookup_pci_names(wanted: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    """Vendor and device names for the wanted (vendor, device) pairs from pci.ids"""
+    names: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    vendors = {vendor for vendor, _ in wanted}
+    path = next((p for p in PCI_IDS_PATHS if os.path.exists(p)), None)
+    if not path or not wanted:
+        return names
+    vendor_id = vendor_name = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            if not line.startswith('\t'):
+                if line.startswith('C '):
+                    break  # device classes follow the vendor list
+                vendor_id, _, vendor_name = line.rstrip().partition(' ')
+                vendor_id = vendor_id.lower() if vendor_id.lower() in vendors else None
+            elif vendor_id and not line.startswith('\t\t'):
+                device_id, _, device_name = line.strip().partition(' ')
+                key = (vendor_id, device_id.lower())
+                if key in wanted:
+                    names[key] = (vendor_name.strip(), device_name.strip())
+    return names
+
+
+def collect_gpus() -> List[Dict[str, str]]:
+    """Display controllers from /sys/bus/pci/devices, described like `lspci -nn`"""
+    found = []
+    try:
+        addresses = sorted(os.listdir(SYS_PCI))
+    except OSError:
+        return []
+    for address in addresses:
+        device_dir = os.path.join(SYS_PCI, address)
+        if _read(os.path.join(device_dir, 'class')).startswith(GPU_CLASSES):
+            vendor_id, device_id = _pci_ids(device_dir)
+            revision = _read(os.path.join(device_dir, 'revision'))[2:]
+            found.append((vendor_id, device_id, revision))
+
+    names = _lookup_pci_names({(vendor, device) for vendor, device, _ in found})
+    gpus = []
+    for vendor_id, device_id, revision in found:
+        vendor_name, device_name = names.get((vendor_id, device_id), ('', ''))
+        description = ' '.join(part for part in (vendor_name, device_name) if part)
+        description = f'{description} [{vendor_id}:{device_id}]'.strip()
+        if revision and revision != '00':
+            description += f' (rev {revision})'
+        gpus.append({'device': description, 'vendor_id': vendor_id, 'device_id': device_id})
+    return gpus
+
+
+def _dmi_from_sysfs(fields: Dict[str, str]) -> Dict[str, str]:
+    return {key: _read(os.path.join(SYS_DMI, attribute)) for key, attribute in fields.items()}
+
+
+def _dmi_from_dmidecode(output: str, section: str, fields: Dict[str, str]) -> Dict[str, str]:
+    values = (parse_dmidecode_sections(output, section) or [{}])[0]
+    return {key: values.get(label, '') for key, label in fields.items()}
+
+
+def collect(probe_timeout: int = PROBE_TIMEOUT) -> Dict:
+    """Collect the full hardware description in the detect_hardware.sh schema"""
+    is_root = hasattr(os, 'geteuid') and os.geteuid() == 0
+    has_dmi_sysfs = os.path.isdir(SYS_DMI)
+
+    probes = {}
+    if is_root:
+        probes['memory'] = ['dmidecode', '-t', '17']
+        if not has_dmi_sysfs:
+            probes['system'] = ['dmidecode', '-t', 'system']
+            probes['baseboard'] = ['dmidecode', '-t', 'baseboard']
+
+    # Probes run in the background while sysfs is read
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        probe_future = pool.submit(run_probes, probes, probe_timeout)
+
+        data = {
+            'hostname': socket.gethostname(),
+            'detection_date': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'cpu': collect_cpu(),
+            'memory': {'total_gb': collect_memory_total_gb(), 'slots': []},
+            'storage': collect_storage(),
+            'gpu': collect_gpus(),
+        }
+        board = _dmi_from_sysfs({'manufacturer': 'board_vendor', 'product': 'board_name',
+                                 'version': 'board_version', 'serial': 'board_serial'})
+        system = _dmi_from_sysfs({'manufacturer': 'sys_vendor', 'product': 'product_name',
+                                  'version': 'product_version', 'serial': 'product_serial',
+                                  'uuid': 'product_uuid'})
+
+        results = probe_future.result()
+
+    data['memory']['slots'] = parse_memory_slots(results.get('memory', ''))
+    if results.get('baseboard'):
+        board = _dmi_from_dmidecode(results['baseboard'], 'Base Board Information', {
+            'manufacturer': 'Manufacturer', 'product': 'Product Name',
+            'version': 'Version', 'serial': 'Serial Number'})
+    if results.get('system'):
+        system = _dmi_from_dmidecode(results['system'], 'System Information', {
+            'manufacturer': 'Manufacturer', 'product': 'Product Name', 'version': 'Version',
+            'serial': 'Serial Number', 'uuid': 'UUID'})
+    board['serial'] = clean_serial(board['serial'])
+    system['serial'] = clean_serial(system['serial'])
+    data['motherboard'] = board
+    data['system'] = system
+    return data
+
+
+def main(argv: Iterable[str] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Collect hardware details as JSON')
+    parser.add_argument('--timeout', type=int, default=PROBE_TIMEOUT,
+                        help=f'Seconds per external probe (default: {PROBE_TIMEOUT})')
+    args = parser.parse_args(argv)
+
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        print("Note: Running without root. Memory slots and serial numbers will be missing.",
+              file=sys.stderr)
+    json.dump(collect(args.timeout), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,23 +4,198 @@ Hardware Inventory Manager
 Processes hardware detection data and manages the SQLite database
 """
 
+import hashlib
 import json
+import re
 import sqlite3
-import subprocess
 import sys
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
 import argparse
 
+# hardware_collector, backup, subprocess and csv are imported where they are
+# used, so read-only CLI actions start quickly
+import sql_trace
+from component_archive import COLUMN_LIST, ComponentArchive, ComponentArchivePolicy
+from component_history import ComponentHistory
+from consistency import CHECKS, ConsistencyChecker
+from maintenance import TASKS, DatabaseMaintenance
+from manufacturers import MANUFACTURER_FILTER, ManufacturerDictionary, filter_keys
+from scan_archive import RetentionPolicy, ScanArchive, normalize_timestamp
+from change_events import record_event
+from reports import REPORTS, FleetReports, format_capacity
+from metrics import REGISTRY
+
 # Import our PCI lookup utility
 try:
-    from pci_lookup import PCIIDLookup, enhance_manufacturer_detection, parse_lspci_vendor_ids
+    from pci_lookup import (PCIIDLookup, enhance_manufacturer_detection,
+                            parse_lspci_vendor_ids, get_shared_lookup)
 except ImportError:
     print("Warning: PCI lookup module not available. Manufacturer detection will be limited.")
     PCIIDLookup = None
     enhance_manufacturer_detection = None
     parse_lspci_vendor_ids = None
+    get_shared_lookup = None
+
+
+# Ingest and database metrics, exposed by the web interface at /metrics
+SCANS_INGESTED = REGISTRY.counter(
+    'inventory_scans_ingested_total', 'Scans processed by update_system')
+COMPONENTS_INGESTED = REGISTRY.counter(
+    'inventory_ingest_components_total',
+    'Components seen during scan ingest, by outcome (inserted, updated, noop)', ['result'])
+UPDATE_SYSTEM_SECONDS = REGISTRY.histogram(
+    'inventory_update_system_duration_seconds', 'Time spent inside update_system')
+SQLITE_CONNECTIONS = REGISTRY.counter(
+    'inventory_sqlite_connections_total', 'SQLite connections opened', ['source'])
+SQLITE_LOCK_WAIT = REGISTRY.histogram(
+    'inventory_sqlite_lock_wait_seconds', 'Time spent waiting for the SQLite write lock',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0))
+SQLITE_LOCK_ERRORS = REGISTRY.counter(
+    'inventory_sqlite_lock_errors_total', 'Write transactions that failed with "database is locked"')
+# Site recorded for systems whose scans don't name one
+DEFAULT_SITE = os.environ.get('INVENTORY_SITE', '')
+
+SCANS_UNCHANGED = REGISTRY.counter(
+    'inventory_scans_unchanged_total', 'Upload handshakes answered "unchanged" without a payload')
+SCANS_STALE = REGISTRY.counter(
+    'inventory_scans_stale_total', 'Late scans only archived because the system has a newer one')
+
+# How far ahead of the server's clock a scan's detection_date may be
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+# Rows fetched per round trip when streaming query results
+FETCH_BATCH = 500
+
+OUTPUT_FORMATS = ('table', 'json', 'csv')
+
+COMPONENT_TYPES = ('cpu', 'gpu', 'memory', 'storage', 'motherboard')
+COMPONENT_STATUSES = ('installed', 'spare', 'retired')
+BULK_ACTIONS = ('set-status', 'set-location', 'retire', 'delete')
+
+# Valid spare rows inserted per transaction by import_spares
+IMPORT_BATCH = int(os.environ.get('INVENTORY_IMPORT_BATCH', 1000))
+
+SPARES_IMPORTED = REGISTRY.counter(
+    'inventory_spares_import_rows_total', 'Spare-part import rows, by result (imported, rejected)', ['result'])
+
+# Filters accepted by bulk_update_components, mapped to their condition
+BULK_FILTERS = {
+    'type': 'component_type = ?',
+    'status': 'status = ?',
+    'location': 'location = ?',
+    'manufacturer': MANUFACTURER_FILTER,
+    'model': 'model = ?',
+    'search': "(model LIKE '%' || ? || '%' OR manufacturer LIKE '%' || ? || '%' "
+              "OR serial_number LIKE '%' || ? || '%' OR location LIKE '%' || ? || '%')",
+}
+
+
+def iter_rows(cursor, batch: int = FETCH_BATCH) -> Iterator[Dict]:
+    """Yield a cursor's rows as dicts, fetching a batch at a time"""
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(row)
+
+
+def write_rows(rows: Iterable[Dict], fmt: str, out=None):
+    """Stream rows to out (default stdout) as a JSON array or CSV
+
+    Rows are written as they arrive, so memory use doesn't grow with the
+    number of rows. CSV columns come from the first row.
+    """
+    out = out or sys.stdout
+    if fmt == 'csv':
+        import csv
+    if fmt == 'json':
+        out.write('[')
+        for index, row in enumerate(rows):
+            out.write(',\n' if index else '\n')
+            out.write(json.dumps(row))
+        out.write('\n]\n')
+    elif fmt == 'csv':
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row), lineterminator='\n')
+                writer.writeheader()
+            writer.writerow(row)
+    else:
+        raise ValueError(f"Unknown output format {fmt!r}")
+
+
+def schema_version(schema: str) -> int:
+    """Checksum of schema.sql stored in PRAGMA user_version once applied"""
+    return zlib.crc32(schema.encode('utf-8')) & 0x7fffffff
+
+
+def scan_fingerprint(data: Dict) -> str:
+    """Canonical hash of a scan payload, ignoring its detection_date
+
+    Scanners compute the same value (sorted keys, no whitespace, ASCII
+    escapes) to ask the server whether an upload is needed at all.
+    """
+    payload = {key: value for key, value in data.items() if key != 'detection_date'}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def parse_detection_date(value: Optional[str]) -> Optional[datetime]:
+    """A scan date as an aware datetime (local time if it has no offset), or None"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.astimezone()
+
+
+def checked_detection_date(value: Optional[str]) -> str:
+    """A scan's detection_date in UTC, as stored in last_scan
+
+    Dates that don't parse or lie in the future are replaced by the time of
+    upload: stored as they are, every later scan would look older and be
+    treated as late.
+    """
+    now = datetime.now(timezone.utc)
+    moment = parse_detection_date(value)
+    if moment is None or moment > now + MAX_CLOCK_SKEW:
+        moment = now
+    return moment.astimezone(timezone.utc).isoformat(timespec='seconds')
+
+
+def _not_older(detection_date: str, last_scan: Optional[str]) -> bool:
+    """Whether a checked detection_date may replace a system's last_scan"""
+    stored = parse_detection_date(last_scan)
+    # A stored date that won't parse or lies in the future (written before
+    # dates were checked) mustn't hold back every later scan
+    if stored is None or stored > datetime.now(timezone.utc) + MAX_CLOCK_SKEW:
+        return True
+    return parse_detection_date(detection_date) >= stored
+
+
+_CAPACITY_PATTERN = re.compile(r'^\s*([\d.]+)\s*([KMGTPE]?)(?:i?B)?\s*$', re.IGNORECASE)
+
+
+def parse_capacity(size: Optional[str]) -> Optional[int]:
+    """Bytes in a size string such as '1.8TiB', '16 GB' or '512M'
+
+    The tools that produce these (numfmt, lsblk, dmidecode) all use binary
+    units, so 'GB' is read as GiB. Returns None if the size is unparseable.
+    """
+    match = _CAPACITY_PATTERN.match(size or '')
+    if not match:
+        return None
+    try:
+        value = float(match.group(1))
+    except ValueError:
+        return None
+    return int(value * 1024 ** ' KMGTPE'.index(match.group(2).upper() or ' '))
 
 
 class HardwareInventory:
@@ -31,47 +206,137 @@ class HardwareInventory:
             db_path = os.path.join(base_dir, 'data', 'hardware_inventory.db')
         self.db_path = db_path
         self.conn = None
-        
-        # Initialize PCI lookup if available
-        self.pci_lookup = None
-        if PCIIDLookup:
-            try:
-                self.pci_lookup = PCIIDLookup()
-                print(f"PCI database loaded: {len(self.pci_lookup.vendors)} vendors, {len(self.pci_lookup.devices)} devices")
-            except Exception as e:
-                print(f"Warning: Could not load PCI database: {e}")
+        self._pci_lookup = None
+        self._pci_lookup_loaded = False
         
         self.init_database()
     
+    @property
+    def pci_lookup(self):
+        """Shared PCI database, loaded the first time something needs it"""
+        if not self._pci_lookup_loaded:
+            self._pci_lookup_loaded = True
+            if PCIIDLookup:
+                try:
+                    self._pci_lookup = get_shared_lookup()
+                    print(f"PCI database loaded: {len(self._pci_lookup.vendors)} vendors, {len(self._pci_lookup.devices)} devices")
+                except Exception as e:
+                    print(f"Warning: Could not load PCI database: {e}")
+        return self._pci_lookup
+    
+    @pci_lookup.setter
+    def pci_lookup(self, lookup):
+        self._pci_lookup = lookup
+        self._pci_lookup_loaded = True
+    
     def init_database(self):
         """Initialize database with schema if needed"""
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sql_trace.instrument(sqlite3.connect(self.db_path))
         self.conn.row_factory = sqlite3.Row
+        SQLITE_CONNECTIONS.inc(source='inventory')
         
-        # Read and execute schema
+        # Read schema; a database already at this version needs nothing
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         schema_path = os.path.join(base_dir, 'schema.sql')
+        schema = ''
         if os.path.exists(schema_path):
             with open(schema_path, 'r') as f:
-                self.conn.executescript(f.read())
-        self.conn.commit()
+                schema = f.read()
+        version = schema_version(schema)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != version:
+            if self.conn.execute("SELECT 1 FROM sqlite_master").fetchone() is None:
+                # Only settable before the first table is created; lets
+                # maintenance return freed pages without a full VACUUM
+                self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # WAL lets readers in one server worker proceed while another writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            
+            # Bring older databases up to date, then apply the schema (which
+            # may create indexes and triggers on the new columns)
+            self._migrate_schema()
+            self.conn.executescript(schema)
+            self.manufacturer_dictionary().intern_components()
+            self.conn.execute(f"PRAGMA user_version = {version}")
+            self.conn.commit()
+        self.archive = ScanArchive(self.conn)
+        self.history = ComponentHistory(self.conn)
+    
+    def _migrate_schema(self):
+        """Add columns introduced after a database was first created"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(systems)")}
+        if not columns:
+            return  # new database; the schema creates everything
+        for column, definition in (('scan_fingerprint', 'VARCHAR(64)'), ('site', 'VARCHAR(100)'),
+                                   ('memory_bytes', 'INTEGER')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE systems ADD COLUMN {column} {definition}")
+        
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(components)")}
+        if 'manufacturer_id' not in columns:
+            # Filled in by intern_components() once the schema has the tables
+            self.conn.execute("ALTER TABLE components ADD COLUMN manufacturer_id INTEGER")
+        if 'capacity_bytes' not in columns:
+            self.conn.execute("ALTER TABLE components ADD COLUMN capacity_bytes INTEGER")
+            rows = self.conn.execute(
+                """SELECT id, specifications FROM components
+                   WHERE component_type IN ('memory', 'storage') AND specifications IS NOT NULL"""
+            ).fetchall()
+            updates = []
+            for component_id, specs in rows:
+                try:
+                    capacity = parse_capacity(json.loads(specs).get('size'))
+                except (ValueError, AttributeError):
+                    continue
+                if capacity is not None:
+                    updates.append((capacity, component_id))
+            self.conn.executemany("UPDATE components SET capacity_bytes = ? WHERE id = ?", updates)
+        
+        has_meta = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone()
+        if not has_meta or not self.conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'memory_keyed_by_serial'").fetchone():
+            self._rekey_memory()
+    
+    def _rekey_memory(self):
+        """Undo keying DIMMs by part number, which every DIMM of a model shares
+
+        The part number moves to the specifications and the serial is
+        cleared, so the next scan adopts the row under the module serial and
+        it keeps its id and history. Rows a rescan has already replaced were
+        left installed without a link; they are retired.
+        """
+        legacy = """component_type = 'memory' AND serial_number <> ''
+                    AND json_extract(CASE WHEN json_valid(specifications) THEN specifications END,
+                                     '$.part_number') IS NULL"""
+        self.conn.execute(f"""
+            UPDATE components SET status = 'retired'
+            WHERE {legacy} AND status = 'installed'
+              AND id NOT IN (SELECT component_id FROM system_components)
+        """)
+        self.conn.execute(f"""
+            UPDATE components
+            SET specifications = json_set(CASE WHEN json_valid(specifications) THEN specifications ELSE '{{}}' END,
+                                          '$.part_number', serial_number),
+                serial_number = ''
+            WHERE {legacy}
+        """)
+    
+    def manufacturer_dictionary(self) -> ManufacturerDictionary:
+        """A manufacturer dictionary for one transaction on this connection"""
+        return ManufacturerDictionary(self.conn, lambda: self.pci_lookup)
     
     def scan_local_system(self) -> Dict:
-        """Run hardware detection script on local system"""
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        script_path = os.path.join(base_dir, 'scripts', 'detect_hardware.sh')
+        """Collect hardware details on the local system"""
+        import subprocess
+        collector_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'hardware_collector.py')
         try:
-            # Try with sudo first (non-interactive), fall back to regular user
-            result = subprocess.run(['sudo', '-n', script_path], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
-                # If sudo fails, try without
-                result = subprocess.run([script_path], 
-                                      capture_output=True, text=True)
-            
+            # Memory slots and serials need root; try sudo (non-interactive)
+            # first, then fall back to collecting in-process
+            result = subprocess.run(['sudo', '-n', sys.executable, collector_path],
+                                    capture_output=True, text=True)
             if result.returncode == 0:
                 try:
                     return json.loads(result.stdout)
@@ -79,28 +344,44 @@ class HardwareInventory:
                     print(f"Error parsing JSON output: {e}")
                     print(f"Output was: {result.stdout[:200]}...")
                     return None
-            else:
-                print(f"Error running detection script: {result.stderr}")
-                return None
+            import hardware_collector
+            return hardware_collector.collect()
         except Exception as e:
             print(f"Error scanning system: {e}")
             return None
     
     def scan_remote_system(self, hostname: str) -> Dict:
-        """Run hardware detection script on remote system via SSH"""
+        """Run hardware detection on a remote system via SSH
+
+        Uses the Python collector when the remote host has python3, and the
+        shell script otherwise.
+        """
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        collector_path = os.path.join(base_dir, 'src', 'hardware_collector.py')
         script_path = os.path.join(base_dir, 'scripts', 'detect_hardware.sh')
+        import subprocess
         try:
-            # Copy script to remote system
+            has_python = subprocess.run(
+                ['ssh', hostname, 'command -v python3'],
+                capture_output=True, text=True
+            ).returncode == 0
+            if has_python:
+                local_path, remote_path = collector_path, '/tmp/hardware_collector.py'
+                command = f'sudo python3 {remote_path}'
+            else:
+                local_path, remote_path = script_path, '/tmp/detect_hardware.sh'
+                command = f'sudo {remote_path}'
+
+            # Copy collector to remote system
             scp_result = subprocess.run(
-                ['scp', script_path, f'{hostname}:/tmp/detect_hardware.sh'],
+                ['scp', local_path, f'{hostname}:{remote_path}'],
                 capture_output=True, text=True
             )
             
             if scp_result.returncode == 0:
-                # Run script on remote system
+                # Run collector on remote system
                 ssh_result = subprocess.run(
-                    ['ssh', hostname, 'sudo /tmp/detect_hardware.sh'],
+                    ['ssh', hostname, command],
                     capture_output=True, text=True
                 )
                 
@@ -116,23 +397,155 @@ class HardwareInventory:
             print(f"Error scanning remote system: {e}")
             return None
     
-    def update_system(self, data: Dict):
-        """Update or insert system and component data"""
-        cursor = self.conn.cursor()
-        
+    def _begin_write(self):
+        """Start a write transaction, recording how long the write lock took"""
+        if self.conn.in_transaction:
+            return
+        start = time.perf_counter()
+        try:
+            # IMMEDIATE takes the write lock up front, so a scan can't fail
+            # half-way through when another worker is writing
+            self.conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e):
+                SQLITE_LOCK_ERRORS.inc()
+            raise
+        finally:
+            SQLITE_LOCK_WAIT.observe(time.perf_counter() - start)
+    
+    def update_system(self, data: Dict) -> Dict:
+        """Update or insert system and component data
+
+        Returns the scan's hostname, detection_date, fingerprint and whether
+        it was applied, like replay_scans; a scan older than its system's
+        last scan is only archived.
+        """
+        fingerprint = scan_fingerprint(data)
+        with UPDATE_SYSTEM_SECONDS.time():
+            self._begin_write()
+            try:
+                applied = self._apply_scan(data, fingerprint)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        SCANS_INGESTED.inc()
+        return {'hostname': data['hostname'], 'detection_date': data.get('detection_date'),
+                'fingerprint': fingerprint, 'applied': applied}
+    
+    def replay_scans(self, scans: List[Dict]) -> List[Dict]:
+        """Apply scans spooled by scanners while the server was down
+
+        Scans are applied oldest first, in one transaction. Each result has
+        the scan's hostname, detection_date, fingerprint and whether it was
+        applied; scans older than their system's last scan are only archived.
+        Raises ValueError if a scan has no hostname or detection_date.
+        """
+        for data in scans:
+            if not isinstance(data, dict) or not data.get('hostname') or not data.get('detection_date'):
+                raise ValueError("Every scan needs a hostname and detection_date")
+        results = []
+        self._begin_write()
+        try:
+            for data in sorted(scans, key=lambda scan: checked_detection_date(scan['detection_date'])):
+                fingerprint = scan_fingerprint(data)
+                with UPDATE_SYSTEM_SECONDS.time():
+                    applied = self._apply_scan(data, fingerprint)
+                results.append({'hostname': data['hostname'], 'detection_date': data['detection_date'],
+                                'fingerprint': fingerprint, 'applied': applied})
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        SCANS_INGESTED.inc(len(results))
+        return results
+    
+    def _apply_scan(self, data: Dict, fingerprint: str) -> bool:
+        """Archive a scan and, unless the system has a newer one, apply it
+
+        Runs inside the caller's transaction. Returns False for a late scan,
+        which leaves the system, its components and their history alone.
+        """
+        data = dict(data, detection_date=checked_detection_date(data.get('detection_date')))
+        row = self.conn.execute("SELECT last_scan FROM systems WHERE hostname = ?",
+                                (data['hostname'],)).fetchone()
+        applied = _not_older(data['detection_date'], row[0] if row else None)
+        if applied:
+            event = self._update_system_records(self.conn.cursor(), data, fingerprint)
+            record_event(self.conn, 'scan', event)
+        else:
+            SCANS_STALE.inc()
+        self.archive.record(data['hostname'], data, fingerprint)
+        return applied
+    
+    def get_scan_fingerprint(self, hostname: str) -> Optional[str]:
+        """Fingerprint of the last full scan uploaded for a system"""
+        row = self.conn.execute(
+            "SELECT scan_fingerprint FROM systems WHERE hostname = ?", (hostname,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def touch_unchanged_scan(self, hostname: str, fingerprint: str,
+                             detection_date: str = None) -> bool:
+        """Record a scan whose payload matches the stored fingerprint
+
+        Only last_scan is updated. Returns False if the system is unknown or
+        its hardware has changed, in which case the full payload is needed.
+        A late scan is still archived and answered, but last_scan only moves
+        forward.
+        """
+        detection_date = checked_detection_date(detection_date)
+        self._begin_write()
+        try:
+            row = self.conn.execute(
+                "SELECT last_scan FROM systems WHERE hostname = ? AND scan_fingerprint = ?",
+                (hostname, fingerprint)
+            ).fetchone()
+            if row:
+                self.archive.record_unchanged(hostname, fingerprint, detection_date)
+                if _not_older(detection_date, row[0]):
+                    self.conn.execute("UPDATE systems SET last_scan = ? WHERE hostname = ?",
+                                      (detection_date, hostname))
+                    record_event(self.conn, 'scan', {'hostname': hostname, 'last_scan': detection_date,
+                                                     'unchanged': True})
+                else:
+                    SCANS_STALE.inc()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if row:
+            SCANS_UNCHANGED.inc()
+        return row is not None
+    
+    def _update_system_records(self, cursor, data: Dict, fingerprint: str = None) -> Dict:
+        """Write the system row and its components for one scan
+
+        Returns the system as shown on the systems page, for the scan's
+        change event.
+        """
         # Update or insert system record
         system_data = data.get('system', {})
+        site = data.get('site') or DEFAULT_SITE
+        memory_data = data.get('memory', {})
+        slot_bytes = [parse_capacity(slot.get('size')) for slot in memory_data.get('slots', [])]
+        if any(slot_bytes):
+            memory_bytes = sum(size for size in slot_bytes if size)
+        else:
+            memory_bytes = parse_capacity(f"{memory_data.get('total_gb', '')} GiB")
         
         # First check if system exists
-        cursor.execute("SELECT id FROM systems WHERE hostname = ?", (data['hostname'],))
+        cursor.execute("SELECT id, last_scan FROM systems WHERE hostname = ?", (data['hostname'],))
         existing_system = cursor.fetchone()
         
         if existing_system:
             system_id = existing_system[0]
+            components_before = self.history.current_components(cursor, system_id)
             cursor.execute("""
                 UPDATE systems 
                 SET manufacturer = ?, model = ?, serial_number = ?, 
-                    uuid = ?, last_scan = ?, updated_at = CURRENT_TIMESTAMP
+                    uuid = ?, last_scan = ?, scan_fingerprint = ?,
+                    site = ?, memory_bytes = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (
                 system_data.get('manufacturer', ''),
@@ -140,26 +553,35 @@ class HardwareInventory:
                 system_data.get('serial', ''),
                 system_data.get('uuid', ''),
                 data['detection_date'],
+                fingerprint,
+                site,
+                memory_bytes,
                 system_id
             ))
         else:
             cursor.execute("""
                 INSERT INTO systems 
-                (hostname, manufacturer, model, serial_number, uuid, last_scan)
-                VALUES (?, ?, ?, ?, ?, ?)
+                (hostname, manufacturer, model, serial_number, uuid, last_scan,
+                 scan_fingerprint, site, memory_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 data['hostname'],
                 system_data.get('manufacturer', ''),
                 system_data.get('product', ''),
                 system_data.get('serial', ''),
                 system_data.get('uuid', ''),
-                data['detection_date']
+                data['detection_date'],
+                fingerprint,
+                site,
+                memory_bytes
             ))
             system_id = cursor.lastrowid
+            components_before = {}
         
         # Don't clear components - we'll update them in place
         # Just remove old system component links
         cursor.execute("DELETE FROM system_components WHERE system_id = ?", (system_id,))
+        names = self.manufacturer_dictionary()
         
         # Process CPU
         cpu_data = data.get('cpu', {})
@@ -169,12 +591,11 @@ class HardwareInventory:
             
             component_id = self._add_or_update_component(
                 cursor, 'cpu', manufacturer, cpu_data['model'], '',
-                json.dumps(cpu_data), 'installed', data['hostname']
+                json.dumps(cpu_data), 'installed', data['hostname'], names=names
             )
             self._link_component_to_system(cursor, system_id, component_id)
         
         # Process Memory
-        memory_data = data.get('memory', {})
         for slot in memory_data.get('slots', []):
             if slot.get('size') and 'No Module' not in slot.get('size', ''):
                 specs = {
@@ -183,12 +604,17 @@ class HardwareInventory:
                     'speed': slot.get('speed'),
                     'type': slot.get('type')
                 }
+                if slot.get('part_number'):
+                    specs['part_number'] = slot['part_number']
+                # Part numbers are shared by every DIMM of a model; only the
+                # module serial identifies one
                 component_id = self._add_or_update_component(
                     cursor, 'memory',
                     slot.get('manufacturer', ''),
                     f"{slot.get('type', 'Memory')} {slot.get('size', '')}",
-                    slot.get('part_number', ''),
-                    json.dumps(specs), 'installed', data['hostname']
+                    slot.get('serial', ''),
+                    json.dumps(specs), 'installed', data['hostname'],
+                    system_id, names
                 )
                 self._link_component_to_system(cursor, system_id, component_id)
         
@@ -210,7 +636,8 @@ class HardwareInventory:
                     cursor, 'storage', manufacturer,
                     disk['model'],
                     disk.get('serial', ''),
-                    json.dumps(specs), 'installed', data['hostname']
+                    json.dumps(specs), 'installed', data['hostname'],
+                    system_id, names
                 )
                 self._link_component_to_system(cursor, system_id, component_id)
         
@@ -223,7 +650,8 @@ class HardwareInventory:
                 component_id = self._add_or_update_component(
                     cursor, 'gpu', manufacturer,
                     gpu['device'], '',
-                    json.dumps(gpu), 'installed', data['hostname']
+                    json.dumps(gpu), 'installed', data['hostname'],
+                    system_id, names
                 )
                 self._link_component_to_system(cursor, system_id, component_id)
         
@@ -235,11 +663,26 @@ class HardwareInventory:
                 mb_data.get('manufacturer', ''),
                 mb_data.get('product', ''),
                 mb_data.get('serial', ''),
-                json.dumps(mb_data), 'installed', data['hostname']
+                json.dumps(mb_data), 'installed', data['hostname'], names=names
             )
             self._link_component_to_system(cursor, system_id, component_id)
         
-        self.conn.commit()
+        components_after = self.history.current_components(cursor, system_id)
+        changes = self.history.record(
+            cursor, data['hostname'], components_before, components_after,
+            data['detection_date'], existing_system[1] if existing_system else None
+        )
+        return {
+            'hostname': data['hostname'],
+            'site': site,
+            'manufacturer': system_data.get('manufacturer', ''),
+            'model': system_data.get('product', ''),
+            'serial_number': system_data.get('serial', ''),
+            'last_scan': data['detection_date'],
+            'component_count': len(components_after),
+            'new': not existing_system,
+            'changes': changes,
+        }
     
     def _enhance_component_manufacturer(self, comp_type: str, manufacturer: str, 
                                        model: str, component_data: dict = None) -> str:
@@ -275,41 +718,74 @@ class HardwareInventory:
 
     def _add_or_update_component(self, cursor, comp_type: str, manufacturer: str,
                                  model: str, serial: str, specs: str,
-                                 status: str, location: str) -> int:
-        """Add or update a component record"""
+                                 status: str, location: str, system_id: int = None,
+                                 names: ManufacturerDictionary = None) -> int:
+        """Add or update a component record
+
+        Components without a serial are matched by model and location. When
+        system_id is given, components already linked to that system in this
+        scan are skipped so identical parts (e.g. two of the same GPU) stay
+        separate records. A serial seen for the first time takes over such a
+        serial-less row, e.g. a DIMM recorded before memory was keyed by
+        serial. The manufacturer is stored by its canonical name and id (see
+        manufacturers.py).
+        """
+        manufacturer_id, manufacturer = (names or self.manufacturer_dictionary()).resolve(manufacturer)
+        capacity = None
+        if comp_type in ('memory', 'storage'):
+            capacity = parse_capacity(json.loads(specs).get('size'))
+        
+        # For components without serial, match by type, model, and location
+        # This prevents duplicates when rescanning the same system
+        by_location = """SELECT id, manufacturer, model, specifications, status, location,
+                                capacity_bytes, manufacturer_id
+                         FROM components WHERE model = ? AND component_type = ? AND location = ?
+                           AND id NOT IN (SELECT component_id FROM system_components
+                                          WHERE system_id = ?)"""
+        adopted = False
         # Try to find existing component by serial number (if provided)
         if serial:
-            cursor.execute(
-                "SELECT id FROM components WHERE serial_number = ? AND component_type = ?",
-                (serial, comp_type)
-            )
-            existing = cursor.fetchone()
+            by_serial = """SELECT id, manufacturer, model, specifications, status, location,
+                                 capacity_bytes, manufacturer_id
+                          FROM components WHERE serial_number = ? AND component_type = ?"""
+            existing = cursor.execute(by_serial, (serial, comp_type)).fetchone()
+            if existing is None and ComponentArchive(self.conn).restore_serial(serial, comp_type):
+                # Seen again after being archived; carry on with its old row
+                existing = cursor.execute(by_serial, (serial, comp_type)).fetchone()
+            if existing is None and system_id is not None:
+                existing = cursor.execute(by_location + " AND serial_number = '' ORDER BY id",
+                                          (model, comp_type, location, system_id)).fetchone()
+                adopted = existing is not None
         else:
-            # For components without serial, match by type, model, and location
-            # This prevents duplicates when rescanning the same system
-            cursor.execute(
-                "SELECT id FROM components WHERE model = ? AND component_type = ? AND location = ?",
-                (model, comp_type, location)
-            )
-            existing = cursor.fetchone()
+            existing = cursor.execute(by_location + " ORDER BY id",
+                                      (model, comp_type, location, system_id)).fetchone()
         
-        if existing:
+        if existing and not adopted and tuple(existing[1:]) == (manufacturer, model, specs, status, location, capacity,
+                                                manufacturer_id):
+            # Rescan found nothing new; skip the write
+            COMPONENTS_INGESTED.inc(result='noop')
+            return existing[0]
+        elif existing:
             # Update existing component
+            COMPONENTS_INGESTED.inc(result='updated')
             cursor.execute("""
                 UPDATE components 
-                SET manufacturer = ?, model = ?, specifications = ?,
-                    status = ?, location = ?, updated_at = CURRENT_TIMESTAMP
+                SET manufacturer = ?, manufacturer_id = ?, model = ?, serial_number = COALESCE(NULLIF(?, ''), serial_number),
+                    specifications = ?, status = ?, location = ?, capacity_bytes = ?,
+                    updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
-            """, (manufacturer, model, specs, status, location, existing[0]))
+            """, (manufacturer, manufacturer_id, model, serial, specs, status, location, capacity,
+                  existing[0]))
             return existing[0]
         else:
             # Insert new component
+            COMPONENTS_INGESTED.inc(result='inserted')
             cursor.execute("""
                 INSERT INTO components 
-                (component_type, manufacturer, model, serial_number, 
-                 specifications, status, location)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (comp_type, manufacturer, model, serial, specs, status, location))
+                (component_type, manufacturer, manufacturer_id, model, serial_number, 
+                 specifications, status, location, capacity_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (comp_type, manufacturer, manufacturer_id, model, serial, specs, status, location, capacity))
             return cursor.lastrowid
     
     def _link_component_to_system(self, cursor, system_id: int, component_id: int):
@@ -324,47 +800,173 @@ class HardwareInventory:
                            location: str = '', notes: str = ''):
         """Manually add a spare component"""
         cursor = self.conn.cursor()
+        manufacturer_id, manufacturer = self.manufacturer_dictionary().resolve(manufacturer)
         cursor.execute("""
             INSERT INTO components 
-            (component_type, manufacturer, model, serial_number, 
+            (component_type, manufacturer, manufacturer_id, model, serial_number, 
              status, location, notes)
-            VALUES (?, ?, ?, ?, 'spare', ?, ?)
-        """, (comp_type, manufacturer, model, serial, location, notes))
+            VALUES (?, ?, ?, ?, ?, 'spare', ?, ?)
+        """, (comp_type, manufacturer, manufacturer_id, model, serial, location, notes))
         self.conn.commit()
         return cursor.lastrowid
     
+    def import_spares(self, stream, fmt: str = 'csv', mapping: Optional[Dict[str, str]] = None,
+                      rejects=None, batch: int = None, dry_run: bool = False) -> Dict:
+        """
+        Import spare components from a CSV or NDJSON stream
+
+        Rows are validated as they are read (type, manufacturer and model
+        required, size parseable for memory and storage) and valid rows are
+        inserted batch rows at a time with executemany, one transaction per
+        batch. Serial numbers already in the inventory, or repeated earlier
+        in the file, are rejected. Rejected rows go to the rejects stream
+        (see spares_import.RejectWriter). Returns the row counts.
+        """
+        from spares_import import RejectWriter, map_record, read_records
+        
+        batch = max(batch or IMPORT_BATCH, 1)
+        reject_writer = RejectWriter(rejects, fmt) if rejects is not None else None
+        summary = {'read': 0, 'imported': 0, 'rejected': 0, 'duplicates': 0, 'batches': 0,
+                   'dry_run': dry_run}
+        seen_serials = set()
+        pending = []  # (line, source record, insert parameters)
+        
+        def reject(line, record, error):
+            summary['rejected'] += 1
+            if reject_writer:
+                reject_writer.write(line, record, error)
+        
+        def flush():
+            serials = [params[3] for _, _, params in pending if params[3]]
+            self._begin_write()
+            try:
+                # Checked inside the write transaction, so a concurrent scan
+                # can't add the same serial in between
+                existing, archived = ({row[0] for row in self.conn.execute(
+                    f"SELECT serial_number FROM {table} WHERE serial_number IN (SELECT value FROM json_each(?))",
+                    (json.dumps(serials),))} if serials else set()
+                    for table in ('components', 'archived_components'))
+                rows = []
+                names = self.manufacturer_dictionary()
+                for line, record, params in pending:
+                    if params[3] in existing:
+                        summary['duplicates'] += 1
+                        reject(line, record, f"serial number {params[3]} is already in the inventory")
+                    elif params[3] in archived:
+                        # A second row would stop the archived one being restored
+                        summary['duplicates'] += 1
+                        reject(line, record, f"serial number {params[3]} is archived; restore it instead")
+                    else:
+                        rows.append(params[:1] + names.resolve(params[1]) + params[2:])
+                with sql_trace.paused(self.conn):
+                    self.conn.executemany("""
+                        INSERT INTO components
+                        (component_type, manufacturer_id, manufacturer, model, serial_number, specifications,
+                         status, location, capacity_bytes, notes)
+                        VALUES (?, ?, ?, ?, ?, ?, 'spare', ?, ?, ?)
+                    """, rows)
+                if dry_run:
+                    self.conn.rollback()
+                else:
+                    if rows:
+                        record_event(self.conn, 'import', {'imported': len(rows)})
+                    self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            summary['imported'] += len(rows)
+            summary['batches'] += 1
+            pending.clear()
+        
+        for line, record, error in read_records(stream, fmt):
+            summary['read'] += 1
+            if error:
+                reject(line, record, error)
+                continue
+            fields = map_record(record, mapping)
+            comp_type = fields.get('component_type', '').lower()
+            serial = fields.get('serial_number', '')
+            size = fields.get('size', '')
+            capacity = parse_capacity(size) if size and comp_type in ('memory', 'storage') else None
+            
+            missing = [name for name in ('component_type', 'manufacturer', 'model') if not fields.get(name)]
+            if missing:
+                reject(line, record, f"missing {', '.join(missing)}")
+            elif comp_type not in COMPONENT_TYPES:
+                reject(line, record, f"unknown component type {fields['component_type']!r}")
+            elif size and comp_type in ('memory', 'storage') and capacity is None:
+                reject(line, record, f"unparseable size {size!r}")
+            elif serial and serial in seen_serials:
+                summary['duplicates'] += 1
+                reject(line, record, f"serial number {serial} appears earlier in the file")
+            else:
+                if serial:
+                    seen_serials.add(serial)
+                specs = json.dumps({'size': size}) if size else None
+                pending.append((line, record, (comp_type, fields['manufacturer'], fields['model'], serial,
+                                               specs, fields.get('location', ''), capacity,
+                                               fields.get('notes', ''))))
+                if len(pending) >= batch:
+                    flush()
+        if pending:
+            flush()
+        
+        SPARES_IMPORTED.inc(summary['imported'], result='imported')
+        SPARES_IMPORTED.inc(summary['rejected'], result='rejected')
+        return summary
+    
     def list_all_components(self, comp_type: Optional[str] = None,
                            status: Optional[str] = None) -> List[Dict]:
         """List all components with optional filters"""
+        return list(self.iter_components(comp_type, status))
+    
+    def iter_components(self, comp_type: Optional[str] = None, status: Optional[str] = None,
+                        limit: Optional[int] = None, include_archived: bool = False) -> Iterator[Dict]:
+        """Stream components with optional filters, ordered by type
+
+        include_archived adds archived components (see component_archive.py),
+        which have an archived_at time.
+        """
         cursor = self.conn.cursor()
-        query = "SELECT * FROM components WHERE 1=1"
+        where = "1=1"
         params = []
         
         if comp_type:
-            query += " AND component_type = ?"
+            where += " AND component_type = ?"
             params.append(comp_type)
         
         if status:
-            query += " AND status = ?"
+            where += " AND status = ?"
             params.append(status)
         
+        query = f"SELECT {COLUMN_LIST}, NULL AS archived_at FROM components WHERE {where}"
+        if include_archived:
+            query += f" UNION ALL SELECT {COLUMN_LIST}, archived_at FROM archived_components WHERE {where}"
+            params += params
         query += " ORDER BY component_type, manufacturer, model"
         
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return iter_rows(cursor)
     
     def list_systems(self) -> List[Dict]:
         """List all systems"""
+        return list(self.iter_systems())
+    
+    def iter_systems(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Stream systems with their component counts, ordered by hostname"""
         cursor = self.conn.cursor()
         cursor.execute("""
             SELECT s.*, 
-                   COUNT(sc.component_id) as component_count
+                   (SELECT COUNT(*) FROM system_components sc WHERE sc.system_id = s.id) as component_count
             FROM systems s
-            LEFT JOIN system_components sc ON s.id = sc.system_id
-            GROUP BY s.id
             ORDER BY s.hostname
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+            LIMIT ?
+        """, (-1 if limit is None else limit,))
+        return iter_rows(cursor)
     
     def get_system_details(self, hostname: str) -> Dict:
         """Get detailed system information including components"""
@@ -391,21 +993,120 @@ class HardwareInventory:
         result['components'] = [dict(row) for row in cursor.fetchall()]
         return result
     
+    def get_system_at(self, hostname: str, at: str) -> Optional[Dict]:
+        """System information with the components it had at a point in time
+
+        Components are rebuilt from scan history; system fields are current.
+        """
+        state = self.history.state_at(hostname, at)
+        system = self.conn.execute("SELECT * FROM systems WHERE hostname = ?", (hostname,)).fetchone()
+        if not system and not state:
+            return None
+        
+        result = dict(system) if system else {'hostname': hostname}
+        result.update(state or {'as_of': normalize_timestamp(at), 'components': []})
+        return result
+    
     def delete_component(self, component_id: int) -> bool:
         """Delete a component and its associations"""
         cursor = self.conn.cursor()
         try:
+            hostnames = [row[0] for row in cursor.execute("""
+                SELECT s.hostname FROM systems s
+                JOIN system_components sc ON s.id = sc.system_id
+                WHERE sc.component_id = ?
+            """, (component_id,)).fetchall()]
             # First remove any system associations
+            self.history.record_unlinked(cursor, "sc.component_id = ?", (component_id,))
             cursor.execute("DELETE FROM system_components WHERE component_id = ?", (component_id,))
             # Then delete the component
             cursor.execute("DELETE FROM components WHERE id = ?", (component_id,))
+            deleted = cursor.rowcount > 0
+            if deleted:
+                record_event(self.conn, 'component', {'id': component_id, 'action': 'deleted',
+                                                      'hostnames': hostnames})
             self.conn.commit()
-            return cursor.rowcount > 0
+            return deleted
         except Exception as e:
             self.conn.rollback()
             print(f"Error deleting component: {e}")
             return False
     
+    def bulk_update_components(self, action: str, ids: Optional[List[int]] = None,
+                               filters: Optional[Dict[str, str]] = None, value: Optional[str] = None,
+                               dry_run: bool = False) -> Dict:
+        """
+        Change or delete many components in one transaction
+
+        Components are selected by id list, by filters (see BULK_FILTERS), or
+        both; at least one is required. value is the new status for
+        set-status or the new location for set-location. Components that stop
+        being installed are unlinked from their systems. Returns how many
+        components matched and the rows each statement affected.
+        """
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"Unknown bulk action {action!r}; choose from {', '.join(BULK_ACTIONS)}")
+        if action == 'set-status' and value not in COMPONENT_STATUSES:
+            raise ValueError(f"set-status needs one of {', '.join(COMPONENT_STATUSES)}")
+        if action == 'set-location' and value is None:
+            raise ValueError("set-location needs a location")
+        filters = {key: val for key, val in (filters or {}).items() if val not in (None, '')}
+        unknown = set(filters) - set(BULK_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        if ids is None and not filters:
+            raise ValueError("Select components by id or by at least one filter")
+        
+        conditions, params = [], []
+        if ids is not None:
+            conditions.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([int(component_id) for component_id in ids]))
+        for key, val in filters.items():
+            conditions.append(BULK_FILTERS[key])
+            if key == 'manufacturer':
+                params.extend(filter_keys(val, self.pci_lookup))
+            else:
+                params.extend([val] * BULK_FILTERS[key].count('?'))
+        
+        self._begin_write()
+        try:
+            cursor = self.conn.cursor()
+            # Fix the selection first, since updates may change what the
+            # filters would match
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_selection (id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM bulk_selection")
+            cursor.execute(f"INSERT INTO bulk_selection SELECT id FROM components WHERE {' AND '.join(conditions)}",
+                           params)
+            summary = {'action': action, 'matched': cursor.rowcount, 'updated': 0, 'deleted': 0,
+                       'unlinked': 0, 'dry_run': dry_run}
+            if dry_run:
+                self.conn.rollback()
+                return summary
+            
+            selection = "SELECT id FROM bulk_selection"
+            if action == 'delete' or (action in ('set-status', 'retire') and value != 'installed'):
+                self.history.record_unlinked(cursor, f"sc.component_id IN ({selection})")
+                cursor.execute(f"DELETE FROM system_components WHERE component_id IN ({selection})")
+                summary['unlinked'] = cursor.rowcount
+            if action == 'delete':
+                cursor.execute(f"DELETE FROM components WHERE id IN ({selection})")
+                summary['deleted'] = cursor.rowcount
+            else:
+                column, new_value = (('location', value) if action == 'set-location'
+                                     else ('status', 'retired' if action == 'retire' else value))
+                cursor.execute(f"""
+                    UPDATE components SET {column} = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id IN ({selection})
+                """, (new_value,))
+                summary['updated'] = cursor.rowcount
+            cursor.execute("DELETE FROM bulk_selection")
+            record_event(self.conn, 'bulk', summary)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return summary
+    
     def delete_system(self, system_id: int) -> bool:
         """Delete a system and its component associations"""
         cursor = self.conn.cursor()
@@ -426,10 +1127,12 @@ class HardwareInventory:
             """, (hostname,))
             
             # Remove all component associations
+            self.history.record_unlinked(cursor, "sc.system_id = ?", (system_id,))
             cursor.execute("DELETE FROM system_components WHERE system_id = ?", (system_id,))
             
             # Then delete the system
             cursor.execute("DELETE FROM systems WHERE id = ?", (system_id,))
+            record_event(self.conn, 'system-deleted', {'hostname': hostname})
             
             self.conn.commit()
             return True
@@ -455,6 +1158,7 @@ class HardwareInventory:
             return 0
         
         cursor = self.conn.cursor()
+        names = self.manufacturer_dictionary()
         updated_count = 0
         
         try:
@@ -495,11 +1199,12 @@ class HardwareInventory:
                 
                 # Update if we found a better manufacturer
                 if enhanced_manufacturer and enhanced_manufacturer != (current_manufacturer or ''):
+                    manufacturer_id, enhanced_manufacturer = names.resolve(enhanced_manufacturer)
                     cursor.execute("""
                         UPDATE components 
-                        SET manufacturer = ?, updated_at = CURRENT_TIMESTAMP
+                        SET manufacturer = ?, manufacturer_id = ?, updated_at = CURRENT_TIMESTAMP
                         WHERE id = ?
-                    """, (enhanced_manufacturer, comp_id))
+                    """, (enhanced_manufacturer, manufacturer_id, comp_id))
                     
                     updated_count += 1
                     print(f"Updated {comp_type} '{model}' with manufacturer: {enhanced_manufacturer}")
@@ -513,6 +1218,67 @@ class HardwareInventory:
             print(f"Error backfilling manufacturers: {e}")
             return 0
 
+    def archive_components(self, policy: ComponentArchivePolicy = None, dry_run: bool = False) -> Dict:
+        """
+        Move retired and long-unseen components to archived_components
+
+        Returns how many were archived as retired and as unseen, and how
+        many system links were removed with them (see component_archive.py).
+        """
+        self._begin_write()
+        try:
+            summary = ComponentArchive(self.conn).archive(policy, dry_run)
+            archived = summary['retired'] + summary['unseen']
+            if dry_run:
+                self.conn.rollback()
+                return summary
+            if archived:
+                record_event(self.conn, 'bulk', {'action': 'archive', 'matched': archived, 'updated': 0,
+                                                 'deleted': archived, 'unlinked': summary['unlinked'],
+                                                 'dry_run': False})
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return summary
+    
+    def restore_components(self, ids: List[int]) -> Dict:
+        """Move archived components back; returns restored and skipped counts"""
+        self._begin_write()
+        try:
+            summary = ComponentArchive(self.conn).restore(ids)
+            if summary['restored']:
+                record_event(self.conn, 'bulk', {'action': 'restore', 'matched': len(ids),
+                                                 'updated': summary['restored'], 'deleted': 0,
+                                                 'unlinked': 0, 'dry_run': False})
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return summary
+    
+    def check_consistency(self, full: bool = False, repair: bool = False) -> Dict:
+        """
+        Check rows changed since the last check for inventory inconsistencies
+
+        full checks everything; repair fixes what is found (see
+        ConsistencyChecker._repair). Returns the checker's summary.
+        """
+        self._begin_write()
+        try:
+            summary = ConsistencyChecker(self.conn).run(full=full, repair=repair)
+            if repair and summary['repaired']['issues']:
+                record_event(self.conn, 'bulk', {'action': 'repair', 'matched': summary['repaired']['issues'],
+                                                 'updated': summary['repaired']['relocated']
+                                                 + summary['repaired']['made_spare'],
+                                                 'deleted': 0, 'unlinked': summary['repaired']['links_removed'],
+                                                 'dry_run': False})
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return summary
+
     def close(self):
         """Close database connection"""
         if self.conn:
@@ -521,21 +1287,74 @@ class HardwareInventory:
 
 def main():
     parser = argparse.ArgumentParser(description='Hardware Inventory Manager')
-    parser.add_argument('action', choices=['scan', 'add-spare', 'list', 'show', 'backfill-manufacturers'],
+    parser.add_argument('action', choices=['scan', 'add-spare', 'list', 'show', 'backfill-manufacturers',
+                                           'compact-archive', 'report', 'backup', 'bulk', 'import-spares',
+                                           'manufacturers', 'check', 'archive-components',
+                                           'restore-components', 'maintenance'],
                        help='Action to perform')
     parser.add_argument('--hostname', help='Hostname for remote scan or show')
-    parser.add_argument('--type', help='Component type (for add-spare/list)')
-    parser.add_argument('--manufacturer', help='Manufacturer (for add-spare)')
-    parser.add_argument('--model', help='Model (for add-spare)')
+    parser.add_argument('--type', help='Component type (for add-spare/list/report models/bulk)')
+    parser.add_argument('--manufacturer', help='Manufacturer (for add-spare/bulk)')
+    parser.add_argument('--model', help='Model (for add-spare/bulk)')
     parser.add_argument('--serial', help='Serial number (for add-spare)')
-    parser.add_argument('--location', help='Location (for add-spare)')
+    parser.add_argument('--location', help='Location (for add-spare/bulk)')
     parser.add_argument('--notes', help='Notes (for add-spare)')
-    parser.add_argument('--status', help='Status filter (for list)')
+    parser.add_argument('--status', help='Status filter (for list/bulk)')
+    parser.add_argument('--report', choices=list(REPORTS),
+                       help='Report to print (for report; default: all)')
+    parser.add_argument('--at', help='ISO 8601 date/time to show hardware as of (for show --hostname)')
+    parser.add_argument('--from-backup', action='store_true',
+                       help='Run reports against the latest backup instead of the live database (for report)')
+    parser.add_argument('--backup-dir', help='Backup directory (for backup/report --from-backup; '
+                                             'default: INVENTORY_BACKUP_DIR or data/backups)')
+    parser.add_argument('--keep', type=int, help='Number of backups to keep (for backup)')
+    parser.add_argument('--no-compress', action='store_true', help='Store the backup uncompressed (for backup)')
+    parser.add_argument('--operation', choices=BULK_ACTIONS,
+                       help='What bulk does to the selected components')
+    parser.add_argument('--to', help='New status (set-status) or location (set-location) for bulk')
+    parser.add_argument('--ids', help='Comma-separated component ids (for bulk/restore-components; bulk can '
+                                      'also select with --type/--status/--location/--manufacturer/--model)')
+    parser.add_argument('--include-archived', action='store_true',
+                       help='Include archived components (for list)')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Only count the matching components (for bulk/archive-components), validate '
+                            'the file (for import-spares) or show which tasks are due (for maintenance)')
+    parser.add_argument('--file', help='CSV or NDJSON file of spare parts, or - for stdin (for import-spares)')
+    parser.add_argument('--input-format', choices=['csv', 'ndjson'],
+                       help='Format of --file (for import-spares; default: from the file extension)')
+    parser.add_argument('--map', help='Column mapping such as "Part No=model,Bin=location" (for import-spares)')
+    parser.add_argument('--rejects', help='Where to write rejected rows (for import-spares; '
+                                          'default: <file>.rejects.csv or .ndjson)')
+    parser.add_argument('--batch', type=int, help='Rows per transaction (for import-spares; '
+                                                  'default: INVENTORY_IMPORT_BATCH or 1000)')
+    parser.add_argument('--merge', help='Manufacturer to fold into --into (for manufacturers)')
+    parser.add_argument('--into', help='Manufacturer that keeps the components (for manufacturers --merge)')
+    parser.add_argument('--full', action='store_true',
+                       help='Check every row, not just those changed since the last check (for check), or '
+                            'rebuild the database with a full VACUUM to enable incremental vacuuming '
+                            '(for maintenance)')
+    parser.add_argument('--task', action='append', choices=list(TASKS),
+                       help='Maintenance task to run; repeat for several (for maintenance; default: all due)')
+    parser.add_argument('--force', action='store_true',
+                       help='Run the tasks even if not due or while scans are arriving (for maintenance)')
+    parser.add_argument('--repair', action='store_true', help='Fix the inconsistencies found (for check)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table',
+                       help='Output format (for list/show/check; default: table)')
+    parser.add_argument('--limit', type=int, help='Maximum number of rows (for list/show)')
     parser.add_argument('--db', default=None,
                        help='Database file path (default: data/hardware_inventory.db)')
+    parser.add_argument('--profile', nargs='?', const='.', metavar='DIR',
+                       help='Write cProfile stats (.prof) and collapsed stacks (.collapsed) for the action '
+                            'to DIR (default: the current directory)')
     
     args = parser.parse_args()
     
+    profiler = None
+    if args.profile is not None:
+        from profiling import Profiler
+        profiler = Profiler()
+        profiler.start()
+    
     inventory = HardwareInventory(args.db)
     
     try:
@@ -548,8 +1367,10 @@ def main():
                 data = inventory.scan_local_system()
             
             if data:
-                inventory.update_system(data)
-                print(f"Successfully updated inventory for {data['hostname']}")
+                if inventory.update_system(data)['applied']:
+                    print(f"Successfully updated inventory for {data['hostname']}")
+                else:
+                    print(f"{data['hostname']} has a newer scan; this one was only archived")
             else:
                 print("Scan failed")
                 sys.exit(1)
@@ -566,38 +1387,51 @@ def main():
             print(f"Added spare component with ID: {comp_id}")
         
         elif args.action == 'list':
-            components = inventory.list_all_components(args.type, args.status)
+            components = inventory.iter_components(args.type, args.status, args.limit, args.include_archived)
             
-            if not components:
-                print("No components found")
+            if args.format != 'table':
+                write_rows(components, args.format)
             else:
-                # Group by type
-                by_type = {}
-                for comp in components:
-                    comp_type = comp['component_type']
-                    if comp_type not in by_type:
-                        by_type[comp_type] = []
-                    by_type[comp_type].append(comp)
-                
-                for comp_type, items in sorted(by_type.items()):
-                    print(f"\n{comp_type.upper()}:")
-                    print("-" * 80)
-                    for item in items:
-                        status = f"[{item['status']}]"
-                        location = f"@ {item['location']}" if item['location'] else ""
-                        print(f"  {status:12} {item['manufacturer']:20} {item['model']:40} {location}")
-                        if item['serial_number']:
-                            print(f"               Serial: {item['serial_number']}")
+                # Rows arrive ordered by type; print a heading whenever it changes
+                comp_type = None
+                for item in components:
+                    if item['component_type'] != comp_type:
+                        comp_type = item['component_type']
+                        print(f"\n{comp_type.upper()}:")
+                        print("-" * 80)
+                    status = f"[{item['status']}]" if not item['archived_at'] else f"[{item['status']}*]"
+                    location = f"@ {item['location']}" if item['location'] else ""
+                    print(f"  {status:12} {item['manufacturer'] or '':20} {item['model']:40} {location}")
+                    if item['serial_number']:
+                        print(f"               Serial: {item['serial_number']}")
+                if comp_type is None:
+                    print("No components found")
+                elif args.include_archived:
+                    print("\n* archived (restore with restore-components --ids)")
         
         elif args.action == 'show':
             if args.hostname:
-                details = inventory.get_system_details(args.hostname)
-                if details:
+                if args.at:
+                    try:
+                        datetime.fromisoformat(args.at)
+                    except ValueError:
+                        print(f"Error: --at must be an ISO 8601 date/time, got {args.at!r}")
+                        sys.exit(1)
+                    details = inventory.get_system_at(args.hostname, args.at)
+                else:
+                    details = inventory.get_system_details(args.hostname)
+                if details and args.format == 'json':
+                    print(json.dumps(details, indent=2))
+                elif details and args.format == 'csv':
+                    write_rows(details['components'][:args.limit], 'csv')
+                elif details:
                     print(f"\nSystem: {details['hostname']}")
-                    print(f"Manufacturer: {details['manufacturer']}")
-                    print(f"Model: {details['model']}")
-                    print(f"Serial: {details['serial_number']}")
-                    print(f"Last Scan: {details['last_scan']}")
+                    print(f"Manufacturer: {details.get('manufacturer')}")
+                    print(f"Model: {details.get('model')}")
+                    print(f"Serial: {details.get('serial_number')}")
+                    print(f"Last Scan: {details.get('last_scan')}")
+                    if args.at:
+                        print(f"Hardware as of: {details['as_of']}")
                     print("\nComponents:")
                     
                     for comp in details['components']:
@@ -611,12 +1445,15 @@ def main():
                     print(f"System {args.hostname} not found")
             else:
                 # List all systems
-                systems = inventory.list_systems()
-                print("\nSystems:")
-                print("-" * 60)
-                for sys in systems:
-                    print(f"{sys['hostname']:20} {sys['manufacturer']:15} {sys['model']:20} "
-                          f"({sys['component_count']} components)")
+                systems = inventory.iter_systems(args.limit)
+                if args.format != 'table':
+                    write_rows(systems, args.format)
+                else:
+                    print("\nSystems:")
+                    print("-" * 60)
+                    for system in systems:
+                        print(f"{system['hostname']:20} {system['manufacturer'] or '':15} {system['model'] or '':20} "
+                              f"({system['component_count']} components)")
         
         elif args.action == 'backfill-manufacturers':
             print("Backfilling manufacturer information for existing components...")
@@ -625,9 +1462,242 @@ def main():
                 print(f"Successfully updated {updated_count} components")
             else:
                 print("No components needed manufacturer updates")
+        
+        elif args.action == 'report':
+            source = inventory.conn
+            if args.from_backup:
+                from backup import BackupPolicy, latest_backup, open_backup
+                policy = BackupPolicy.from_env(inventory.db_path)
+                snapshot = latest_backup(args.backup_dir or policy.directory)
+                if not snapshot:
+                    print(f"Error: no backups found in {args.backup_dir or policy.directory}")
+                    sys.exit(1)
+                print(f"Reporting from backup {snapshot}")
+                source = open_backup(snapshot)
+            fleet = FleetReports(source)
+            for name in ([args.report] if args.report else list(REPORTS)):
+                rows = (fleet.run(name, component_type=args.type) if name in ('models', 'manufacturers')
+                        else fleet.run(name))
+                print(f"\n{REPORTS[name]}:")
+                print("-" * 80)
+                if not rows:
+                    print("  (no data)")
+                for row in rows:
+                    if name == 'storage-by-site':
+                        print(f"  {row['site']:20} {row['hosts']:6} hosts {row['disks']:7} disks "
+                              f"{format_capacity(row['raw_bytes']):>12}")
+                    elif name == 'models':
+                        print(f"  {row['component_type']:12} {row['manufacturer'][:20]:20} {row['model'][:40]:40} "
+                              f"installed {row['installed']:5}  spare {row['spare']:5}")
+                    elif name == 'manufacturers':
+                        print(f"  {row['manufacturer'][:40]:40} installed {row['installed']:5}  "
+                              f"spare {row['spare']:5}  retired {row['retired']:5}")
+                    elif name == 'memory':
+                        size = f"{row['memory_gib']} GiB" if row['memory_gib'] is not None else 'Unknown'
+                        print(f"  {size:>10} {row['hosts']:7} hosts")
+                    else:
+                        print(f"  {row['component_type']:12} {row['status']:10} {row['components']:7} components "
+                              f"{format_capacity(row['capacity_bytes']):>12}")
+            if source is not inventory.conn:
+                source.close()
+        
+        elif args.action == 'manufacturers':
+            names = inventory.manufacturer_dictionary()
+            if args.merge:
+                if not args.into:
+                    print("Error: --into is required with --merge")
+                    sys.exit(1)
+                try:
+                    inventory._begin_write()
+                    moved = names.merge(args.merge, args.into)
+                    inventory.conn.commit()
+                except ValueError as e:
+                    inventory.conn.rollback()
+                    print(f"Error: {e}")
+                    sys.exit(1)
+                print(f"Merged {args.merge!r} into {args.into!r}: {moved} components moved")
+            elif args.format != 'table':
+                write_rows(names.list(), args.format)
+            else:
+                for row in names.list():
+                    print(f"  {row['name'][:40]:40} {row['components']:7} components  "
+                          f"aliases: {row['aliases'] or '-'}")
+        
+        elif args.action == 'check':
+            summary = inventory.check_consistency(full=args.full, repair=args.repair)
+            checker = ConsistencyChecker(inventory.conn)
+            if args.format != 'table':
+                write_rows(checker.issues(), args.format)
+            else:
+                scope = 'full check' if summary['full'] else 'changed since the last check'
+                print(f"Checked {summary['components_checked']} components and "
+                      f"{summary['links_checked']} links ({scope})")
+                if args.repair:
+                    repaired = summary['repaired']
+                    print(f"Repaired {repaired['issues']} issues: {repaired['links_removed']} links removed, "
+                          f"{repaired['relocated']} locations corrected, {repaired['made_spare']} made spare")
+                for check, description in CHECKS.items():
+                    print(f"  {check:20} {summary['found'][check]:5}  {description}")
+                print(f"{summary['open']} open issues")
+                for issue in checker.issues():
+                    print(f"  {issue['check_name']:20} component {issue['component_id'] or '-':<6} "
+                          f"{issue['hostname'] or '':20} {issue['detail']}")
+        
+        elif args.action == 'archive-components':
+            policy = ComponentArchivePolicy.from_env()
+            unseen = (f"installed components unseen for {policy.unseen_days} days" if policy.unseen_days
+                      else "no installed components")
+            print(f"Archiving retired components after {policy.retired_days} days and {unseen}...")
+            summary = inventory.archive_components(policy, dry_run=args.dry_run)
+            if args.dry_run:
+                print(f"Would archive {summary['retired']} retired and {summary['unseen']} unseen components")
+            else:
+                print(f"Archived {summary['retired']} retired and {summary['unseen']} unseen components "
+                      f"({summary['unlinked']} system links removed)")
+            stats = ComponentArchive(inventory.conn).stats()
+            print(f"Components: {stats['live']} live, {stats['archived']} archived")
+        
+        elif args.action == 'restore-components':
+            if not args.ids:
+                print("Error: --ids is required")
+                sys.exit(1)
+            try:
+                ids = [int(part) for part in args.ids.split(',') if part.strip()]
+            except ValueError:
+                print("Error: --ids must be comma-separated component ids")
+                sys.exit(1)
+            summary = inventory.restore_components(ids)
+            print(f"Restored {summary['restored']} components")
+            if summary['skipped']:
+                print(f"{summary['skipped']} left archived: their serial numbers are in use again")
+        
+        elif args.action == 'maintenance':
+            maintenance = DatabaseMaintenance(inventory.db_path)
+            if args.full:
+                print(f"Rebuilding {inventory.db_path} with VACUUM (blocks writes until it finishes)...")
+                results, summary = [maintenance.full_vacuum()], None
+            elif not args.dry_run:
+                summary = maintenance.run(args.task, force=args.force)
+                results = summary['ran']
+            else:
+                results, summary = [], None
+            for result in results:
+                detail = ', '.join(f"{key}={value}" for key, value in result['detail'].items())
+                print(f"{result['task']:12} {result['result']:8} {result['seconds'] * 1000:8.1f} ms  {detail}")
+            if summary and summary['skipped']:
+                print(f"Skipped: {summary['skipped']}")
+            elif summary and not results:
+                print("No maintenance tasks are due")
+            if summary and summary['pending']:
+                print(f"Time budget spent; left for the next run: {', '.join(summary['pending'])}")
+            print(f"\n{'Task':12} {'Every':>8}  {'Last run':25} {'Took':>10}  Result")
+            for task in maintenance.status():
+                every = f"{task['interval_minutes']}m" if task['interval_minutes'] else 'by hand'
+                took = f"{task['seconds'] * 1000:.1f} ms" if task['seconds'] is not None else '-'
+                print(f"{task['task']:12} {every:>8}  {task['last_run'] or 'never':25} {took:>10}  "
+                      f"{task['result'] or '-'}{' (due)' if task['due'] else ''}")
+        
+        elif args.action == 'compact-archive':
+            policy = RetentionPolicy.from_env()
+            print(f"Compacting scan archive (every scan for {policy.raw_days} days, "
+                  f"daily to {policy.daily_days} days, then monthly)...")
+            result = inventory.archive.compact(policy)
+            stats = inventory.archive.stats()
+            print(f"Removed {result['points_removed']} timeline points and "
+                  f"{result['blobs_removed']} scan bodies")
+            print(f"Archive: {stats['points']} points, {stats['blobs']} distinct scans, "
+                  f"{stats['stored_bytes'] / 1024:.1f} KiB stored "
+                  f"({stats['raw_bytes'] / 1024:.1f} KiB uncompressed)")
+        
+        elif args.action == 'bulk':
+            if not args.operation:
+                print(f"Error: --operation is required ({', '.join(BULK_ACTIONS)})")
+                sys.exit(1)
+            try:
+                ids = [int(part) for part in args.ids.split(',') if part.strip()] if args.ids else None
+                summary = inventory.bulk_update_components(
+                    args.operation, ids=ids, value=args.to, dry_run=args.dry_run,
+                    filters={'type': args.type, 'status': args.status, 'location': args.location,
+                             'manufacturer': args.manufacturer, 'model': args.model})
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            if args.dry_run:
+                print(f"{summary['matched']} components would be affected by {args.operation}")
+            else:
+                print(f"{summary['matched']} components matched: {summary['updated']} updated, "
+                      f"{summary['deleted']} deleted, {summary['unlinked']} removed from systems")
+        
+        elif args.action == 'import-spares':
+            from spares_import import detect_format, parse_mapping
+            if not args.file:
+                print("Error: --file is required")
+                sys.exit(1)
+            fmt = args.input_format or detect_format(args.file)
+            try:
+                mapping = parse_mapping(args.map)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            if args.rejects:
+                rejects_path = args.rejects
+            elif args.file == '-':
+                rejects_path = f"rejects.{fmt}"
+            else:
+                rejects_path = f"{os.path.splitext(args.file)[0]}.rejects.{fmt}"
+            
+            source = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8-sig')
+            try:
+                with open(rejects_path, 'w', newline='', encoding='utf-8') as rejects:
+                    summary = inventory.import_spares(source, fmt, mapping, rejects, args.batch, args.dry_run)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            
+            verb = 'would be imported' if args.dry_run else 'imported'
+            print(f"{summary['read']} rows read: {summary['imported']} {verb}, {summary['rejected']} rejected "
+                  f"({summary['duplicates']} duplicate serial numbers)")
+            if summary['rejected']:
+                print(f"Rejected rows written to {rejects_path}")
+            else:
+                os.remove(rejects_path)
+        
+        elif args.action == 'backup':
+            from backup import BackupError, BackupPolicy, backup_database
+            policy = BackupPolicy.from_env(inventory.db_path)
+            if args.backup_dir:
+                policy.directory = args.backup_dir
+            if args.keep:
+                policy.keep = max(args.keep, 1)
+            if args.no_compress:
+                policy.compress = False
+
+            def show_progress(copied, total):
+                print(f"\r  {copied}/{total} pages", end='', flush=True)
+
+            print(f"Backing up {inventory.db_path} to {policy.directory}...")
+            try:
+                result = backup_database(inventory.db_path, policy, progress=show_progress)
+            except BackupError as e:
+                print(f"\nBackup failed: {e}")
+                sys.exit(1)
+            print(f"\nWrote {result['path']} ({result['size'] / 1024:.1f} KiB, {result['pages']} pages, "
+                  f"{result['seconds']:.1f}s, integrity ok)")
+            if result['restarts']:
+                print(f"Copy restarted {result['restarts']} times because of concurrent writes")
+            for path in result['rotated']:
+                print(f"Removed old backup {path}")
     
     finally:
         inventory.close()
+        if profiler is not None:
+            profiler.stop()
+            base = os.path.join(args.profile, f"{args.action}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+            paths = profiler.write(base)
+            # stderr, so --format json/csv output stays clean
+            print(profiler.summary().rstrip(), file=sys.stderr)
+            print(f"Profile of {args.action} ({profiler.seconds:.2f}s) written to {' and '.join(paths)}",
+                  file=sys.stderr)
 
 
 if __name__ == '__main__':
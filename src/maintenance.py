@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Scheduled database maintenance for Hardware Inventory
+Nothing in SQLite keeps a busy database tidy on its own: the WAL file only
+shrinks on a truncating checkpoint, planner statistics go stale as the fleet
+grows, and pages freed by deleting systems stay in the file. Each task here
+runs on its own interval:
+
+- optimize: PRAGMA optimize, which re-analyzes tables whose statistics drifted
+- analyze: a full ANALYZE (limited by PRAGMA analysis_limit)
+- vacuum: PRAGMA incremental_vacuum, returning free pages a batch at a time
+- checkpoint: PRAGMA wal_checkpoint(TRUNCATE), so the WAL doesn't keep growing
+
+A run does whatever is due within a time budget; a task still running when
+the budget is spent is interrupted and stays due. Runs are skipped while
+scans are arriving faster than the busy threshold, and a lease in the meta
+table keeps web workers and the CLI from running maintenance at the same
+time. When each task last ran, how long it took and what it did is kept in
+maintenance_runs.
+
+Incremental vacuum only works on databases created with auto_vacuum set to
+INCREMENTAL (new databases are); older ones are converted once by a full
+VACUUM (`inventory_manager.py maintenance --full`).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from metrics import REGISTRY
+
+# In the order they run; the checkpoint comes last to take in the others' writes
+TASKS = {
+    'optimize': 'Re-analyze tables whose statistics have drifted',
+    'analyze': 'Refresh planner statistics for every table and index',
+    'vacuum': 'Return free pages to the file system',
+    'checkpoint': 'Copy the WAL into the database and truncate it',
+}
+
+# Minutes between runs of each task (0 = only when run by hand)
+DEFAULT_INTERVALS = {'optimize': 60, 'analyze': 7 * 24 * 60, 'vacuum': 360, 'checkpoint': 15}
+
+# PRAGMA auto_vacuum value for incremental vacuuming
+AUTO_VACUUM_INCREMENTAL = 2
+
+MAINTENANCE_TASKS = REGISTRY.counter(
+    'inventory_maintenance_tasks_total', 'Maintenance tasks run, by task and result (ok, partial, skipped, failed)',
+    ['task', 'result'])
+MAINTENANCE_SECONDS = REGISTRY.histogram(
+    'inventory_maintenance_task_duration_seconds', 'Time taken by each maintenance task', ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 30.0))
+MAINTENANCE_LAST_RUN = REGISTRY.gauge(
+    'inventory_maintenance_last_run_timestamp_seconds', 'Unix time each maintenance task last completed',
+    ['task'], multiprocess_mode='max')
+MAINTENANCE_SKIPPED = REGISTRY.counter(
+    'inventory_maintenance_skipped_total', 'Maintenance runs put off, by reason (busy, locked)', ['reason'])
+
+
+class MaintenancePolicy:
+    """How often each task runs, how long a run may take and what counts as busy
+
+    budget is in seconds per run (0 = no limit). A run is skipped while
+    busy_scans or more scans arrived in the last busy_seconds (0 = never
+    skip). check_seconds is how often the web server looks for due tasks
+    (0 = only by hand).
+    """
+
+    def __init__(self, budget: float = 2.0, intervals: Dict[str, int] = None, busy_scans: int = 10,
+                 busy_seconds: int = 60, vacuum_pages: int = 256, analysis_limit: int = 1000,
+                 check_seconds: int = 60):
+        self.budget = max(budget, 0.0)
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self.busy_scans = max(busy_scans, 0)
+        self.busy_seconds = max(busy_seconds, 1)
+        self.vacuum_pages = max(vacuum_pages, 1)
+        self.analysis_limit = max(analysis_limit, 0)
+        self.check_seconds = max(check_seconds, 0)
+
+    @classmethod
+    def from_env(cls) -> 'MaintenancePolicy':
+        return cls(
+            budget=int(os.environ.get('INVENTORY_MAINTENANCE_BUDGET_MS', 2000)) / 1000,
+            intervals={task: int(os.environ.get(f'INVENTORY_MAINTENANCE_{task.upper()}_MINUTES', minutes))
+                       for task, minutes in DEFAULT_INTERVALS.items()},
+            busy_scans=int(os.environ.get('INVENTORY_MAINTENANCE_BUSY_SCANS', 10)),
+            busy_seconds=int(os.environ.get('INVENTORY_MAINTENANCE_BUSY_SECONDS', 60)),
+            vacuum_pages=int(os.environ.get('INVENTORY_MAINTENANCE_VACUUM_PAGES', 256)),
+            analysis_limit=int(os.environ.get('INVENTORY_MAINTENANCE_ANALYSIS_LIMIT', 1000)),
+            check_seconds=int(os.environ.get('INVENTORY_MAINTENANCE_CHECK_SECONDS', 60)),
+        )
+
+
+class _Budget:
+    """Deadline shared by the tasks of one run"""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def spent(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def busy_timeout(self) -> int:
+        """Milliseconds a task may wait for a lock"""
+        remaining = self.remaining()
+        return 5000 if remaining is None else max(int(remaining * 1000), 0)
+
+
+class DatabaseMaintenance:
+    """Runs due maintenance tasks against one database file"""
+
+    def __init__(self, db_path: str, policy: MaintenancePolicy = None):
+        self.db_path = db_path
+        self.policy = policy or MaintenancePolicy.from_env()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: checkpoints and vacuums can't run inside a transaction
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _last_runs(self, conn) -> Dict[str, sqlite3.Row]:
+        return {row['task']: row for row in conn.execute("SELECT * FROM maintenance_runs")}
+
+    def _is_due(self, task: str, last_run: Optional[sqlite3.Row], now: float) -> bool:
+        """Due once its interval has passed; tasks that didn't finish stay due"""
+        interval = self.policy.intervals.get(task, 0)
+        if not interval:
+            return False
+        return last_run is None or last_run['result'] not in ('ok', 'skipped') \
+            or last_run['started_at'] + interval * 60 <= now
+
+    def status(self) -> List[Dict]:
+        """Every task with its interval, last run and whether it is due"""
+        conn = self._connect()
+        try:
+            runs = self._last_runs(conn)
+        finally:
+            conn.close()
+        now = time.time()
+        tasks = []
+        for task, description in TASKS.items():
+            run = runs.get(task)
+            tasks.append({
+                'task': task,
+                'description': description,
+                'interval_minutes': self.policy.intervals.get(task, 0),
+                'last_run': datetime.fromtimestamp(run['started_at'], timezone.utc).isoformat(timespec='seconds')
+                            if run else None,
+                'seconds': run['seconds'] if run else None,
+                'result': run['result'] if run else None,
+                'detail': json.loads(run['detail']) if run and run['detail'] else {},
+                'runs': run['runs'] if run else 0,
+                'due': self._is_due(task, run, now),
+            })
+        return tasks
+
+    def busy(self, conn=None) -> Optional[str]:
+        """Why maintenance should wait, or None if the database is quiet enough"""
+        if not self.policy.busy_scans:
+            return None
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            scans = conn.execute("""
+                SELECT COUNT(*) FROM change_events
+                WHERE kind = 'scan' AND created_at >= datetime('now', ?)
+            """, (f'-{self.policy.busy_seconds} seconds',)).fetchone()[0]
+        finally:
+            if own:
+                conn.close()
+        if scans >= self.policy.busy_scans:
+            return f"ingest busy ({scans} scans in the last {self.policy.busy_seconds}s)"
+        return None
+
+    def run(self, tasks: Iterable[str] = None, force: bool = False) -> Dict:
+        """Run the tasks that are due, or the given tasks if force
+
+        force ignores intervals and ingest activity, not the time budget.
+        Returns the tasks run with their results, the tasks left for later
+        because the budget was spent, and why the run was skipped, if it was.
+        """
+        names = list(tasks) if tasks else list(TASKS)
+        unknown = [name for name in names if name not in TASKS]
+        if unknown:
+            raise ValueError(f"Unknown maintenance task(s): {', '.join(unknown)}")
+        summary = {'ran': [], 'pending': [], 'skipped': None}
+
+        conn = self._connect()
+        try:
+            if not force:
+                runs, now = self._last_runs(conn), time.time()
+                names = [name for name in names if self._is_due(name, runs.get(name), now)]
+                if not names:
+                    return summary
+                summary['skipped'] = self.busy(conn)
+                if summary['skipped']:
+                    MAINTENANCE_SKIPPED.inc(reason='busy')
+                    return summary
+            if not self._acquire(conn):
+                MAINTENANCE_SKIPPED.inc(reason='locked')
+                summary['skipped'] = 'another maintenance run is in progress'
+                return summary
+            try:
+                budget = _Budget(self.policy.budget)
+                for name in names:
+                    if budget.spent():
+                        summary['pending'].append(name)
+                        continue
+                    summary['ran'].append(self._run_task(conn, name, budget))
+            finally:
+                conn.execute("UPDATE meta SET value = 0 WHERE key = 'maintenance_lease'")
+        finally:
+            conn.close()
+        return summary
+
+    def _acquire(self, conn) -> bool:
+        """Take the lease on maintenance, which expires on its own if this process dies"""
+        now = int(time.time())
+        expires = now + int(self.policy.budget or 3600) + 30
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('maintenance_lease', 0)")
+        return conn.execute("UPDATE meta SET value = ? WHERE key = 'maintenance_lease' AND value < ?",
+                            (expires, now)).rowcount == 1
+
+    def _run_task(self, conn, name: str, budget: _Budget) -> Dict:
+        started_at = time.time()
+        start = time.perf_counter()
+        conn.execute(f"PRAGMA busy_timeout = {budget.busy_timeout()}")
+        # Interrupts a statement still running when the budget is spent
+        conn.set_progress_handler(budget.spent, 1000)
+        try:
+            result, detail = getattr(self, f'_{name}')(conn, budget)
+        except sqlite3.OperationalError as e:
+            if 'interrupted' in str(e):
+                result, detail = 'partial', {'error': 'time budget spent'}
+            else:
+                result, detail = 'failed', {'error': str(e)}
+        except sqlite3.Error as e:
+            result, detail = 'failed', {'error': str(e)}
+        finally:
+            conn.set_progress_handler(None, 0)
+        seconds = time.perf_counter() - start
+        self._record(conn, name, started_at, seconds, result, detail)
+        return {'task': name, 'result': result, 'seconds': round(seconds, 3), 'detail': detail}
+
+    def _record(self, conn, name: str, started_at: float, seconds: float, result: str, detail: Dict):
+        conn.execute("""
+            INSERT INTO maintenance_runs (task, started_at, seconds, result, detail, runs)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON CONFLICT (task) DO UPDATE SET started_at = excluded.started_at, seconds = excluded.seconds,
+                result = excluded.result, detail = excluded.detail, runs = runs + 1
+        """, (name, started_at, round(seconds, 3), result, json.dumps(detail)))
+        MAINTENANCE_TASKS.inc(task=name, result=result)
+        MAINTENANCE_SECONDS.observe(seconds, task=name)
+        if result == 'ok':
+            MAINTENANCE_LAST_RUN.set(started_at, task=name)
+
+    def _checkpoint(self, conn, budget: _Budget):
+        wal_path = self.db_path + '-wal'
+        wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        # Busy when a reader still needs the WAL; the next run tries again
+        return ('partial' if busy else 'ok'), {'wal_bytes': wal_bytes}
+
+    def _optimize(self, conn, budget: _Budget):
+        conn.execute(f"PRAGMA analysis_limit = {self.policy.analysis_limit}")
+        conn.executescript("PRAGMA optimize")
+        return 'ok', {}
+
+    def _analyze(self, conn, budget: _Budget):
+        conn.execute(f"PRAGMA analysis_limit = {self.policy.analysis_limit}")
+        conn.executescript("ANALYZE")
+        return 'ok', {'analysis_limit': self.policy.analysis_limit}
+
+    def _vacuum(self, conn, budget: _Budget):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 'skipped', {'error': 'auto_vacuum is not incremental; run maintenance --full once'}
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free = before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free and not budget.spent():
+            # Each batch is its own short write transaction; executescript
+            # steps the pragma until the batch is done
+            conn.executescript(f"PRAGMA incremental_vacuum({self.policy.vacuum_pages})")
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        detail = {'pages_freed': before - free, 'bytes_freed': (before - free) * page_size, 'free_pages': free}
+        return ('partial' if free else 'ok'), detail
+
+    def full_vacuum(self) -> Dict:
+        """Rebuild the database with VACUUM and switch it to incremental vacuuming
+
+        Takes the write lock for as long as the rebuild takes, so it is
+        only run by hand, at a quiet time.
+        """
+        conn = self._connect()
+        try:
+            if not self._acquire(conn):
+                raise sqlite3.OperationalError('another maintenance run is in progress')
+            try:
+                size = os.path.getsize(self.db_path)
+                started_at, start = time.time(), time.perf_counter()
+                conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                seconds = time.perf_counter() - start
+                detail = {'full': True, 'bytes_freed': max(size - os.path.getsize(self.db_path), 0), 'free_pages': 0}
+                self._record(conn, 'vacuum', started_at, seconds, 'ok', detail)
+            finally:
+                conn.execute("UPDATE meta SET value = 0 WHERE key = 'maintenance_lease'")
+        finally:
+            conn.close()
+        return {'task': 'vacuum', 'result': 'ok', 'seconds': round(seconds, 3), 'detail': detail}
+
+
+def start_scheduler(db_path: str, policy: MaintenancePolicy = None) -> Optional[threading.Thread]:
+    """Run due maintenance every policy.check_seconds on a daemon thread
+
+    Started once per web worker; the lease makes sure only one worker
+    actually runs a task at a time. Returns None if checking is disabled.
+    """
+    maintenance = DatabaseMaintenance(db_path, policy)
+    if not maintenance.policy.check_seconds:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(maintenance.policy.check_seconds)
+            try:
+                maintenance.run()
+            except sqlite3.Error:
+                # Locked or not created yet; try again next time
+                pass
+
+    thread = threading.Thread(target=loop, name='maintenance', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Manufacturer dictionary for Hardware Inventory
+Scans, pci.ids and hand-entered spares spell the same vendor many ways
+("Advanced Micro Devices, Inc. [AMD/ATI]", "AMD", "Samsung Electronics Co
+Ltd", "Samsung"). Every name is reduced to a key (manufacturer_key()) and
+looked up in manufacturer_aliases, which points each key at one row of
+manufacturers. Components store that row's id in manufacturer_id, and its
+canonical name in manufacturer for display.
+
+A key seen for the first time is matched against the pci.ids vendor names
+(with their legal suffixes stripped and the short names in brackets as
+aliases) and a few common short names before a new manufacturer is
+created, so "AMD" and the pci.ids spelling end up on the same row.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pci_lookup import VENDOR_SUFFIX, get_shared_lookup
+
+# Short names used by scans and spreadsheets that pci.ids spells out
+# differently, as key -> canonical name
+COMMON_ALIASES = {
+    'amd': 'Advanced Micro Devices',
+    'ati': 'Advanced Micro Devices',
+    'samsung': 'Samsung Electronics',
+    'wd': 'Western Digital',
+    'wdc': 'Western Digital',
+    'hynix': 'SK hynix',
+    'hynix semiconductor': 'SK hynix',
+    'micron': 'Micron Technology',
+    'crucial': 'Micron Technology',
+    'seagate': 'Seagate Technology',
+    'kingston': 'Kingston Technology',
+    'hp': 'Hewlett-Packard',
+    'asus': 'ASUSTeK Computer',
+    'msi': 'Micro-Star International',
+    'supermicro': 'Super Micro Computer',
+}
+
+# Condition selecting components by any spelling of a manufacturer; the
+# parameters come from filter_keys()
+MANUFACTURER_FILTER = 'manufacturer_id IN (SELECT manufacturer_id FROM manufacturer_aliases WHERE alias IN (?, ?))'
+
+_BRACKETED = re.compile(r'\s*\[([^\]]*)\]')
+_NOT_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def clean_manufacturer(name: Optional[str]) -> str:
+    """'Advanced Micro Devices, Inc. [AMD/ATI]' -> 'Advanced Micro Devices'"""
+    name = ' '.join(_BRACKETED.sub('', name or '').split())
+    previous = None
+    while name != previous:
+        previous = name
+        name = VENDOR_SUFFIX.sub('', name).strip(' ,.')
+    return name
+
+
+@lru_cache(maxsize=4096)
+def manufacturer_key(name: Optional[str]) -> str:
+    """Case- and punctuation-insensitive lookup key for a name"""
+    return _NOT_ALNUM.sub(' ', (name or '').casefold()).strip()
+
+
+@lru_cache(maxsize=2)
+def seed_aliases(lookup=None) -> Dict[str, str]:
+    """Alias key -> canonical name from pci.ids vendors and COMMON_ALIASES
+
+    Built once per PCI lookup. Where pci.ids gives two vendors the same key
+    the first one wins.
+    """
+    seeds = {}
+    for vendor in (lookup.vendors.values() if lookup else ()):
+        canonical = clean_manufacturer(vendor)
+        if not canonical:
+            continue
+        aliases = [canonical]
+        for bracketed in _BRACKETED.findall(vendor):
+            aliases.extend(bracketed.split('/'))
+        for alias in aliases:
+            key = manufacturer_key(alias)
+            if len(key) > 1:
+                seeds.setdefault(key, canonical)
+    seeds.update(COMMON_ALIASES)
+    return seeds
+
+
+def canonical_name(name: str, lookup=None) -> str:
+    """The name a manufacturer not yet in the dictionary would be created with"""
+    cleaned = clean_manufacturer(name) or name.strip()
+    return seed_aliases(lookup).get(manufacturer_key(cleaned), cleaned)
+
+
+def filter_keys(name: str, lookup=None) -> Tuple[str, str]:
+    """MANUFACTURER_FILTER parameters: the name's own key and its canonical one
+
+    The second matches spellings the dictionary hasn't seen yet, e.g.
+    "AMD/ATI" once "AMD" is known.
+    """
+    return manufacturer_key(name), manufacturer_key(canonical_name(name, lookup))
+
+
+def _shared_lookup():
+    """The process-wide PCI lookup, or None if it can't be loaded"""
+    try:
+        return get_shared_lookup()
+    except Exception as e:
+        print(f"Warning: Could not load PCI database: {e}")
+        return None
+
+
+class ManufacturerDictionary:
+    """
+    Interns manufacturer names on one connection
+
+    New manufacturers and aliases are written in the caller's transaction,
+    and resolved names are cached on the instance, so use one dictionary per
+    transaction (a rolled-back insert would otherwise stay cached).
+    """
+
+    def __init__(self, conn, lookup: Callable = _shared_lookup):
+        self.conn = conn
+        self._lookup = lookup
+        self._cache: Dict[str, Tuple[int, str]] = {}
+
+    def _find(self, key: str) -> Optional[Tuple[int, str]]:
+        row = self.conn.execute("""
+            SELECT m.id, m.name FROM manufacturer_aliases a
+            JOIN manufacturers m ON m.id = a.manufacturer_id
+            WHERE a.alias = ?
+        """, (key,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def resolve(self, name: Optional[str]) -> Tuple[Optional[int], str]:
+        """(manufacturer id, canonical name) for any spelling; (None, '') if blank"""
+        key = manufacturer_key(name)
+        if not key:
+            return None, ''
+        if key in self._cache:
+            return self._cache[key]
+        found = self._find(key)
+        if found is None:
+            canonical = canonical_name(name, self._lookup())
+            canonical_key = manufacturer_key(canonical)
+            found = self._find(canonical_key)
+            if found is None:
+                self.conn.execute("INSERT OR IGNORE INTO manufacturers (name) VALUES (?)", (canonical,))
+                manufacturer_id = self.conn.execute(
+                    "SELECT id FROM manufacturers WHERE name = ?", (canonical,)).fetchone()[0]
+                found = (manufacturer_id, canonical)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO manufacturer_aliases (alias, manufacturer_id) VALUES (?, ?)",
+                [(alias, found[0]) for alias in {key, canonical_key}])
+        self._cache[key] = found
+        return found
+
+    def intern_components(self) -> int:
+        """Set manufacturer_id (and the canonical name) on components without one
+
+        Returns the number of components updated.
+        """
+        names = [row[0] for row in self.conn.execute("""
+            SELECT DISTINCT manufacturer FROM components
+            WHERE manufacturer_id IS NULL AND TRIM(COALESCE(manufacturer, '')) <> ''
+        """)]
+        updated = 0
+        for name in names:
+            manufacturer_id, canonical = self.resolve(name)
+            updated += self.conn.execute("""
+                UPDATE components SET manufacturer_id = ?, manufacturer = ?
+                WHERE manufacturer_id IS NULL AND manufacturer = ?
+            """, (manufacturer_id, canonical, name)).rowcount
+        return updated
+
+    def merge(self, source: str, target: str) -> int:
+        """Fold one manufacturer and its aliases into another
+
+        For names the alias map got wrong, e.g. two vendors that pci.ids
+        spells unrelatedly. Archived components move too, so they keep their
+        manufacturer when restored. Returns the number of components moved.
+        """
+        found = self._find(manufacturer_key(source))
+        if found is None:
+            raise ValueError(f"Unknown manufacturer {source!r}")
+        source_id = found[0]
+        target_id, target_name = self.resolve(target)
+        if target_id is None:
+            raise ValueError("Name the manufacturer to merge into")
+        if source_id == target_id:
+            return 0
+        moved = sum(self.conn.execute(
+            f"UPDATE {table} SET manufacturer_id = ?, manufacturer = ? WHERE manufacturer_id = ?",
+            (target_id, target_name, source_id)).rowcount for table in ('components', 'archived_components'))
+        self.conn.execute("UPDATE manufacturer_aliases SET manufacturer_id = ? WHERE manufacturer_id = ?",
+                          (target_id, source_id))
+        self.conn.execute("DELETE FROM manufacturers WHERE id = ?", (source_id,))
+        self._cache.clear()
+        return moved
+
+    def list(self) -> List[Dict]:
+        """Every manufacturer with its component count and aliases"""
+        cursor = self.conn.execute("""
+            SELECT m.id, m.name,
+                   (SELECT COUNT(*) FROM components c WHERE c.manufacturer_id = m.id) AS components,
+                   (SELECT GROUP_CONCAT(alias, ', ') FROM manufacturer_aliases a
+                    WHERE a.manufacturer_id = m.id) AS aliases
+            FROM manufacturers m
+            ORDER BY components DESC, m.name
+        """)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
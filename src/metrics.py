@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Minimal in-process metrics for Hardware Inventory
+Counters, gauges and histograms rendered in the Prometheus text exposition
+format, without depending on the Prometheus client library.
+
+With the prefork server every worker keeps its own values. Workers write a
+snapshot of their metrics to a shared directory and /metrics merges the
+snapshots of all workers, so a scrape sees the whole server whichever worker
+answers it. A forked worker starts its counters and histograms from zero, and
+the process forking it writes its own snapshot first, so what the master
+counted during warm-up is reported once rather than once per worker. Snapshots of workers that have exited are folded into one
+retired snapshot, so they don't pile up across reloads and a new worker that
+reuses an old pid doesn't overwrite its counters.
+"""
+
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from fast page renders to slow scan ingests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Counters and histograms of exited workers, summed
+RETIRED_SNAPSHOT = 'metrics-retired.json'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding one value per label combination"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {'kind': self.kind, 'help': self.documentation,
+                'labels': list(self.labelnames), 'samples': samples}
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, or is computed by a callback at scrape time
+    multiprocess_mode decides how live workers are combined: 'sum' for
+    per-worker quantities such as in-flight requests, 'max' for values every
+    worker shares, such as the preloaded PCI database.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+                 multiprocess_mode: str = 'sum'):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment for the duration of a block"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def snapshot(self) -> Dict:
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception:
+                values = {}
+            with self._lock:
+                self._values = {tuple(key): value for key, value in values.items()}
+        result = super().snapshot()
+        result['mode'] = self.multiprocess_mode
+        return result
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict:
+        result = super().snapshot()
+        result['buckets'] = list(self.buckets)
+        # Copy the mutable bucket state so callers can't race with observe()
+        result['samples'] = [[key, {'buckets': list(state['buckets']), 'sum': state['sum'],
+                                    'count': state['count']}]
+                             for key, state in result['samples']]
+        return result
+
+
+class Registry:
+    """Collection of metrics, optionally merged across worker processes"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[str] = None
+        self.flush_interval = 1.0
+        self._dirty = False
+        self._flusher_pid = None
+        # Process that last wrote a snapshot; a fork writes under a new pid
+        self._snapshot_pid = None
+        self._fork_hooks = False
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                return existing
+            metric = cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback=None, multiprocess_mode: str = 'sum') -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames, callback=callback,
+                              multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    # Multi-process support
+
+    def enable_multiprocess(self, directory: str):
+        """Share metrics between worker processes through snapshot files"""
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        if not self._fork_hooks:
+            self._fork_hooks = True
+            os.register_at_fork(before=self._before_fork, after_in_child=self._after_fork_in_child)
+
+    def _before_fork(self):
+        """The parent's counts stay in its own snapshot, not the child's"""
+        if self.multiprocess_dir:
+            try:
+                self._write_snapshot()
+            except OSError:
+                pass
+
+    def _after_fork_in_child(self):
+        """Start counters and histograms from zero in a forked process
+
+        Gauges keep their values, since they describe state the child
+        shares (such as the preloaded PCI database). Locks are replaced, as
+        another thread of the parent may have held them at the fork.
+        """
+        self._lock = threading.Lock()
+        self._dirty = False
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            if metric.kind in ('counter', 'histogram'):
+                metric._values = {}
+
+    def flush(self, force: bool = False):
+        """
+        Make this process's values visible to other workers. Forced flushes
+        write immediately; otherwise a background thread writes the snapshot
+        at most once per flush_interval.
+        """
+        if not self.multiprocess_dir:
+            return
+        if force:
+            self._write_snapshot()
+            return
+        self._dirty = True
+        # Threads don't survive fork, so each worker starts its own flusher
+        if self._flusher_pid != os.getpid():
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self._dirty = False
+                try:
+                    self._write_snapshot()
+                except OSError:
+                    pass
+
+    def _write_snapshot(self):
+        path = os.path.join(self.multiprocess_dir, f'metrics-{os.getpid()}.json')
+        if self._snapshot_pid != os.getpid():
+            # A file already here was left by an exited worker with this pid
+            with self._directory_lock():
+                if os.path.exists(path):
+                    self._retire([path])
+            self._snapshot_pid = os.getpid()
+        _write_json(path, self.snapshot())
+
+    @contextmanager
+    def _directory_lock(self):
+        """Serialize retiring and reading snapshots across processes"""
+        with open(os.path.join(self.multiprocess_dir, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _retire(self, paths: List[str]):
+        """Fold exited workers' snapshots into the retired one and delete them
+
+        Called with the directory lock held.
+        """
+        retired_path = os.path.join(self.multiprocess_dir, RETIRED_SNAPSHOT)
+        retired = _read_json(retired_path) or {}
+        for path in paths:
+            snapshot = _read_json(path)
+            if snapshot is not None:
+                _merge_snapshot(retired, snapshot, alive=False)
+        _write_json(retired_path, retired)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _collect(self) -> Dict[str, Dict]:
+        """Snapshot of this process, merged with other workers when enabled"""
+        if not self.multiprocess_dir:
+            return self.snapshot()
+        self.flush(force=True)
+        merged: Dict[str, Dict] = {}
+        with self._directory_lock():
+            live, exited = [], []
+            for filename in sorted(os.listdir(self.multiprocess_dir)):
+                if filename == RETIRED_SNAPSHOT or not (filename.startswith('metrics-')
+                                                        and filename.endswith('.json')):
+                    continue
+                path = os.path.join(self.multiprocess_dir, filename)
+                pid = int(filename[len('metrics-'):-len('.json')])
+                (live if _pid_alive(pid) else exited).append(path)
+            if exited:
+                self._retire(exited)
+            for path in live:
+                snapshot = _read_json(path)
+                if snapshot is not None:
+                    _merge_snapshot(merged, snapshot, alive=True)
+            retired = _read_json(os.path.join(self.multiprocess_dir, RETIRED_SNAPSHOT))
+            if retired is not None:
+                _merge_snapshot(merged, retired, alive=False)
+        return merged
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, metric in sorted(self._collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            labelnames = metric['labels']
+            for labels, value in sorted(metric['samples'], key=lambda s: s[0]):
+                if metric['kind'] == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric['buckets'], value['buckets']):
+                        cumulative += count
+                        le = f'le="{_format_value(bound)}"'
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                    inf = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, inf)} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    """Replace a snapshot file atomically"""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge_snapshot(merged: Dict[str, Dict], snapshot: Dict[str, Dict], alive: bool):
+    """
+    Add one worker's snapshot into the merged view. Counters and histograms
+    are summed, including workers that have exited; gauges describe current
+    state, so only live workers contribute, combined by the gauge's mode.
+    """
+    for name, metric in snapshot.items():
+        if metric['kind'] == 'gauge' and not alive:
+            continue
+        target = merged.setdefault(name, dict(metric, samples=[]))
+        index = {tuple(labels): i for i, (labels, _) in enumerate(target['samples'])}
+        for labels, value in metric['samples']:
+            i = index.get(tuple(labels))
+            if i is None:
+                target['samples'].append([labels, value])
+                index[tuple(labels)] = len(target['samples']) - 1
+            elif metric.get('mode') == 'max':
+                target['samples'][i][1] = max(target['samples'][i][1], value)
+            elif metric['kind'] == 'histogram':
+                existing = target['samples'][i][1]
+                target['samples'][i][1] = {
+                    'buckets': [a + b for a, b in zip(existing['buckets'], value['buckets'])],
+                    'sum': existing['sum'] + value['sum'],
+                    'count': existing['count'] + value['count'],
+                }
+            else:
+                target['samples'][i][1] += value
+
+
+# Default registry used throughout the application
+REGISTRY = Registry()
@@ -6,9 +6,14 @@ Provides manufacturer and device name resolution from PCI vendor/device IDs
 
 import re
 import os
-import subprocess
+import threading
+import time
 from typing import Dict, Optional, Tuple
 
+# Legal-form suffixes left off manufacturer names ("NVIDIA Corporation" -> "NVIDIA")
+VENDOR_SUFFIX = re.compile(r'[\s,]+(Inc\.?|Incorporated|Corporation|Corp\.?|Co\.,?\s*Ltd\.?|Co\.?|Company|'
+                           r'Ltd\.?|Limited|LLC|L\.L\.C\.|PLC|GmbH|AG|S\.A\.?|B\.V\.?)$', re.IGNORECASE)
+
 
 class PCIIDLookup:
     """PCI ID database lookup utility"""
@@ -16,6 +21,7 @@ class PCIIDLookup:
     def __init__(self):
         self.vendors = {}
         self.devices = {}
+        self.load_seconds = 0.0
         self.pci_ids_paths = [
             '/usr/share/hwdata/pci.ids',
             '/usr/share/misc/pci.ids', 
@@ -38,6 +44,7 @@ class PCIIDLookup:
             print("Warning: No pci.ids file found. Manufacturer detection will be limited.")
             return
         
+        start = time.perf_counter()
         try:
             with open(pci_ids_file, 'r', encoding='utf-8', errors='ignore') as f:
                 current_vendor_id = None
@@ -77,6 +84,7 @@ class PCIIDLookup:
                                     
         except Exception as e:
             print(f"Warning: Error loading pci.ids file: {e}")
+        self.load_seconds = time.perf_counter() - start
     
     def get_vendor_name(self, vendor_id: str) -> Optional[str]:
         """Get vendor name from vendor ID (4-digit hex)"""
@@ -105,6 +113,25 @@ class PCIIDLookup:
         return vendor_name, device_name
 
 
+# Process-wide lookup shared by every HardwareInventory instance. Loading
+# pci.ids takes a noticeable fraction of a second, so it is parsed once and,
+# in the prefork server, before workers fork so they share it copy-on-write.
+_shared_lookup = None
+_shared_lookup_lock = threading.Lock()
+
+
+def get_shared_lookup(reload: bool = False) -> PCIIDLookup:
+    """
+    Return the process-wide PCIIDLookup, loading pci.ids on first use
+    Pass reload=True to re-read the database (e.g. on SIGHUP)
+    """
+    global _shared_lookup
+    with _shared_lookup_lock:
+        if _shared_lookup is None or reload:
+            _shared_lookup = PCIIDLookup()
+        return _shared_lookup
+
+
 def parse_lspci_vendor_ids() -> Dict[str, str]:
     """
     Parse lspci -nn output to extract vendor/device IDs and manufacturers
@@ -112,6 +139,8 @@ def parse_lspci_vendor_ids() -> Dict[str, str]:
     """
     manufacturers = {}
     
+    import subprocess  # only needed here; keeps importing this module cheap
+    
     try:
         # Run lspci -nn to get vendor/device IDs with names
         result = subprocess.run(['lspci', '-nn'], capture_output=True, text=True)
@@ -129,7 +158,7 @@ def parse_lspci_vendor_ids() -> Dict[str, str]:
                 # Clean up manufacturer name
                 manufacturer = manufacturer.strip()
                 # Remove common suffixes to get cleaner manufacturer names
-                manufacturer = re.sub(r'\s+(Inc\.|Corporation|Co\.,?\s*Ltd\.?|Ltd\.?|Corp\.?)$', '', manufacturer)
+                manufacturer = VENDOR_SUFFIX.sub('', manufacturer)
                 manufacturers[f"{vendor_id.lower()}:{device_id.lower()}"] = manufacturer
         
     except Exception as e:
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Prefork WSGI server for the hardware inventory web interface
+Binds the listening socket and warms the application up once in a master
+process, then forks worker processes that each serve requests from a
+bounded thread pool. Workers inherit the warmed-up state copy-on-write.
+"""
+
+import functools
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+class _PooledRequestHandler(WSGIRequestHandler):
+    """Exposes the server's slot release, shutdown and warm-up state to the app
+
+    inventory.release_slot lets a long-lived response (an event stream)
+    give its thread pool slot back so it doesn't hold up other requests;
+    inventory.stopping is set when the worker starts shutting down.
+    inventory.warmed_up returns whether the worker's generation is the one
+    the master serves with (a reload keeps the old one serving until the
+    next is warmed up and forked), and inventory.generation is the worker's
+    generation.
+    """
+
+    def make_environ(self):
+        environ = super().make_environ()
+        environ['inventory.release_slot'] = self.server.release_slot
+        environ['inventory.stopping'] = self.server.stopping
+        if self.server.warmed_up is not None:
+            environ['inventory.warmed_up'] = self.server.warmed_up
+            environ['inventory.generation'] = self.server.generation
+        return environ
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server that handles requests on a fixed-size thread pool"""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, fd: int, threads: int,
+                 warmed_up: Optional[Callable[[], bool]] = None, generation: int = 0):
+        super().__init__(host, port, app, handler=_PooledRequestHandler, fd=fd)
+        self.warmed_up = warmed_up
+        self.generation = generation
+        # The listening socket is shared by every worker; non-blocking
+        # accept lets a worker that lost the race go back to waiting
+        self.socket.setblocking(False)
+        self.timeout = 0.5
+        self.stopping = threading.Event()
+        self._slots = threading.BoundedSemaphore(threads)
+        self._holds_slot = threading.local()
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # Blocking here stops this worker accepting, leaving new connections
+        # in the kernel backlog for an idle worker to pick up
+        self._slots.acquire()
+        thread = threading.Thread(target=self._process_request_thread,
+                                  args=(request, client_address), daemon=True)
+        with self._active_lock:
+            self._active.add(thread)
+        thread.start()
+
+    def _process_request_thread(self, request, client_address):
+        self._holds_slot.value = True
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._active_lock:
+                self._active.discard(threading.current_thread())
+            self.release_slot()
+
+    def release_slot(self):
+        """Free the calling request's pool slot early (at most once)"""
+        if getattr(self._holds_slot, 'value', False):
+            self._holds_slot.value = False
+            self._slots.release()
+
+    def drain(self, timeout: float):
+        """Wait for in-flight requests to finish"""
+        self.stopping.set()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._active_lock:
+                active = list(self._active)
+            if not active:
+                return
+            active[0].join(max(0.0, deadline - time.monotonic()))
+
+
+class PreforkServer:
+    """
+    Master process managing a pool of forked worker processes
+
+    SIGHUP re-runs the warm-up in the master and replaces the workers
+    gracefully; SIGTERM/SIGINT stop the workers after in-flight requests
+    finish. worker_init runs in each worker after it is forked, for
+    anything that needs its own threads (threads don't survive fork).
+    """
+
+    def __init__(self, app, host: str, port: int, workers: int = 2,
+                 threads: int = 4, warm_up: Optional[Callable[[bool], None]] = None,
+                 graceful_timeout: float = 30.0, worker_init: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.threads = max(1, threads)
+        self.warm_up = warm_up
+        self.worker_init = worker_init
+        self.graceful_timeout = graceful_timeout
+        self.socket = None
+        self._children: Dict[int, int] = {}  # pid -> generation
+        self._generation = 0
+        self._reload_requested = False
+        self._stop_requested = False
+        # The warmed-up generation that serves, set once its workers are
+        # forked; shared memory, so workers forked earlier see it change
+        self._serving_generation = multiprocessing.RawValue('i', 0)
+
+    def generation_ready(self, generation: int) -> bool:
+        """Whether a generation's workers are the ones that should get traffic"""
+        return generation == self._serving_generation.value
+
+    def bind(self):
+        """Create the listening socket shared by all workers"""
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(128)
+        sock.setblocking(False)
+        sock.set_inheritable(True)
+        self.socket = sock
+        # Report the real port when binding to port 0
+        self.port = sock.getsockname()[1]
+
+    def serve_forever(self):
+        """Run the master loop until asked to stop"""
+        if self.socket is None:
+            self.bind()
+        if self.warm_up:
+            self.warm_up(False)
+
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        print(f"Prefork server listening on {self.host}:{self.port} "
+              f"({self.workers} workers x {self.threads} threads, master pid {os.getpid()})")
+        self._spawn_generation()
+
+        try:
+            while not self._stop_requested:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload()
+                self._reap()
+                # Replace workers of the current generation that died
+                current = sum(1 for gen in self._children.values() if gen == self._generation)
+                for _ in range(self.workers - current):
+                    self._spawn_worker()
+                time.sleep(0.5)
+        finally:
+            self._stop_workers(list(self._children))
+            self.socket.close()
+
+    def _on_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _on_stop(self, signum, frame):
+        self._stop_requested = True
+
+    def _reload(self):
+        """Warm up again, start a fresh worker generation, retire the old one"""
+        print("SIGHUP received: reloading workers")
+        if self.warm_up:
+            # The current generation stays ready while the next warms up
+            try:
+                self.warm_up(True)
+            except Exception as e:
+                print(f"Warning: warm-up failed during reload, keeping current workers: {e}")
+                return
+        old_workers = list(self._children)
+        self._spawn_generation()
+        self._stop_workers(old_workers)
+
+    def _spawn_generation(self):
+        self._generation += 1
+        for _ in range(self.workers):
+            self._spawn_worker()
+        self._serving_generation.value = self._generation
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            # Child: never return into the master loop
+            code = 0
+            try:
+                self._run_worker()
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self._children[pid] = self._generation
+
+    def _run_worker(self):
+        stopping = threading.Event()
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+        if self.worker_init:
+            self.worker_init()
+        server = PooledWSGIServer(self.host, self.port, self.app,
+                                  fd=self.socket.fileno(), threads=self.threads,
+                                  warmed_up=functools.partial(self.generation_ready, self._generation),
+                                  generation=self._generation)
+        while not stopping.is_set():
+            server.handle_request()
+        server.drain(self.graceful_timeout)
+        server.socket.close()
+
+    def _reap(self):
+        """Collect exited workers without blocking"""
+        while self._children:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            self._children.pop(pid, None)
+
+    def _stop_workers(self, pids):
+        """Ask workers to finish in-flight requests and exit"""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _status = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self._children.pop(pid, None)
+            if remaining:
+                time.sleep(0.1)
+        for pid in remaining:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self._children.pop(pid, None)
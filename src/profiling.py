@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Profiling hooks for Hardware Inventory
+A Profiler runs cProfile for a block of code while a sampler thread records
+the profiled thread's call stack every few milliseconds. It writes the
+cProfile stats (.prof, readable with pstats or snakeviz) and the samples as
+collapsed stacks (.collapsed, one "outer;inner;leaf count" line per stack,
+the input format of flamegraph.pl and speedscope).
+
+The CLI profiles one action with --profile. The web interface profiles a
+sample of requests, or those sent with an X-Inventory-Profile header, when
+INVENTORY_PROFILE_DIR is set, and keeps only the slowest in a ProfileStore.
+Only one profile runs per process at a time.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Directory for request profiles; unset disables request profiling
+PROFILE_DIR = os.environ.get('INVENTORY_PROFILE_DIR', '')
+# Fraction of requests profiled without being asked to (0 = only on request)
+PROFILE_SAMPLE = float(os.environ.get('INVENTORY_PROFILE_SAMPLE', 0))
+# Slowest request profiles kept in PROFILE_DIR
+PROFILE_KEEP = int(os.environ.get('INVENTORY_PROFILE_KEEP', 20))
+# Seconds between stack samples
+SAMPLE_INTERVAL = float(os.environ.get('INVENTORY_PROFILE_INTERVAL_MS', 2)) / 1000
+
+_profile_lock = threading.Lock()
+
+_SLUG = re.compile(r'[^A-Za-z0-9]+')
+# <milliseconds>ms-<YYYYmmdd-HHMMSS>-<label slug>.prof
+_PROFILE_NAME = re.compile(r'^(\d+)ms-(\d{8}-\d{6})-([\w-]*)\.(prof|collapsed)$')
+
+
+def _frame_name(code) -> str:
+    # co_qualname (3.11+) says which class a method belongs to
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Counts one thread's call stacks, sampled from a background thread"""
+
+    def __init__(self, thread_id: int = None, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """cProfile plus stack samples for the current thread"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval=interval)
+        self.seconds = 0.0
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        self.seconds = time.perf_counter() - self._start
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def write(self, base_path: str) -> List[str]:
+        """Write <base_path>.prof and <base_path>.collapsed; returns both paths"""
+        os.makedirs(os.path.dirname(os.path.abspath(base_path)), exist_ok=True)
+        self.profile.dump_stats(base_path + '.prof')
+        with open(base_path + '.collapsed', 'w') as f:
+            f.write(self.sampler.collapsed())
+        return [base_path + '.prof', base_path + '.collapsed']
+
+    def summary(self, limit: int = 15) -> str:
+        """The functions with the most cumulative time, as pstats prints them"""
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+def try_profiler(interval: float = SAMPLE_INTERVAL) -> Optional[Profiler]:
+    """A started Profiler, or None if this process is already profiling
+
+    cProfile can't run twice at once on Python 3.12+; call release() on
+    the result when done.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = Profiler(interval)
+        profiler.start()
+    except Exception:
+        _profile_lock.release()
+        raise
+    return profiler
+
+
+def release(profiler: Profiler):
+    """Stop a profiler from try_profiler() and let the next one start"""
+    try:
+        profiler.stop()
+    finally:
+        _profile_lock.release()
+
+
+class ProfileStore:
+    """The slowest profiles, kept as files in one directory
+
+    File names start with the duration, so the directory alone says which
+    profiles to keep; several worker processes can share it.
+    """
+
+    def __init__(self, directory: str = None, keep: int = None):
+        self.directory = directory or PROFILE_DIR
+        self.keep = max(1, PROFILE_KEEP if keep is None else keep)
+
+    def profiles(self) -> List[Dict]:
+        """Kept profiles, slowest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            match = _PROFILE_NAME.match(name)
+            if not match or match.group(4) != 'prof':
+                continue
+            base = name[:-len('.prof')]
+            profiles.append({
+                'name': base,
+                'milliseconds': int(match.group(1)),
+                'taken_at': datetime.strptime(match.group(2), '%Y%m%d-%H%M%S').isoformat(),
+                'label': match.group(3),
+                'files': [f for f in (base + '.prof', base + '.collapsed')
+                          if os.path.exists(os.path.join(self.directory, f))],
+            })
+        profiles.sort(key=lambda profile: profile['milliseconds'], reverse=True)
+        return profiles
+
+    def offer(self, profiler: Profiler, label: str) -> Optional[str]:
+        """Keep a finished profile if it is among the slowest; returns its name"""
+        milliseconds = int(profiler.seconds * 1000)
+        kept = self.profiles()
+        if len(kept) >= self.keep and milliseconds <= kept[self.keep - 1]['milliseconds']:
+            return None
+        slug = _SLUG.sub('-', label).strip('-')[:60]
+        name = f"{milliseconds:07d}ms-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}"
+        profiler.write(os.path.join(self.directory, name))
+        for old in self.profiles()[self.keep:]:
+            for filename in old['files']:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass  # another worker removed it first
+        return name
+
+    def path(self, filename: str) -> Optional[str]:
+        """Full path of a kept profile file, or None for anything else"""
+        if not _PROFILE_NAME.match(filename):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
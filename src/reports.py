@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Fleet reports for Hardware Inventory
+Aggregates computed in SQL over the normalized capacity columns
+(components.capacity_bytes, systems.memory_bytes, systems.site). Results are
+cached in-process per database and invalidated by the write generation that
+triggers bump whenever report inputs change, so repeated page loads don't
+rescan the fleet.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+REPORTS = {
+    'storage-by-site': 'Raw storage capacity per site',
+    'models': 'Installed vs spare count per model',
+    'manufacturers': 'Installed vs spare count per manufacturer',
+    'memory': 'Hosts by installed RAM',
+    'capacity-by-type': 'Memory and storage capacity by status',
+}
+
+# (database file, report, parameters) -> (write generation, rows)
+_cache: Dict[tuple, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def format_capacity(size_bytes: Optional[int]) -> str:
+    """Human-readable binary size, e.g. 1.8 TiB"""
+    if size_bytes is None:
+        return '-'
+    value = float(size_bytes)
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB'):
+        if value < 1024 or unit == 'PiB':
+            return f'{value:.0f} {unit}' if unit == 'B' or value >= 100 else f'{value:.1f} {unit}'
+        value /= 1024
+
+
+class FleetReports:
+    """Report queries against one connection, cached per write generation"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.database = conn.execute("PRAGMA database_list").fetchone()[2]
+        self.from_cache = False
+
+    def write_generation(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'write_generation'").fetchone()
+        return row[0] if row else 0
+
+    def run(self, name: str, **params) -> List[Dict]:
+        """Run a report by its REPORTS name"""
+        reports = {
+            'storage-by-site': self.storage_by_site,
+            'models': self.model_distribution,
+            'manufacturers': self.manufacturer_distribution,
+            'memory': self.memory_histogram,
+            'capacity-by-type': self.capacity_by_type,
+        }
+        if name not in reports:
+            raise ValueError(f"Unknown report {name!r}; choose from {', '.join(REPORTS)}")
+        return reports[name](**params)
+
+    def _cached(self, name: str, params: tuple, compute: Callable[[], List[Dict]]) -> List[Dict]:
+        generation = self.write_generation()
+        key = (self.database, name, params)
+        with _cache_lock:
+            entry = _cache.get(key)
+        if entry and entry[0] == generation:
+            self.from_cache = True
+            return entry[1]
+        self.from_cache = False
+        rows = compute()
+        with _cache_lock:
+            _cache[key] = (generation, rows)
+        return rows
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        cursor = self.conn.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def storage_by_site(self) -> List[Dict]:
+        """Installed disks and their raw capacity per site"""
+        return self._cached('storage-by-site', (), lambda: self._query("""
+            SELECT COALESCE(NULLIF(s.site, ''), '(none)') AS site,
+                   COUNT(DISTINCT s.id) AS hosts,
+                   COUNT(c.id) AS disks,
+                   COALESCE(SUM(c.capacity_bytes), 0) AS raw_bytes
+            FROM systems s
+            JOIN system_components sc ON sc.system_id = s.id
+            JOIN components c ON c.id = sc.component_id AND c.component_type = 'storage'
+            GROUP BY 1
+            ORDER BY raw_bytes DESC
+        """))
+
+    def model_distribution(self, component_type: str = None) -> List[Dict]:
+        """Component counts per model, split by status
+
+        Grouped by model alone, since hand-entered spares often spell the
+        manufacturer differently from scans.
+        """
+        where, params = ('WHERE component_type = ?', (component_type,)) if component_type else ('', ())
+        return self._cached('models', params, lambda: self._query(f"""
+            SELECT component_type, COALESCE(MAX(NULLIF(manufacturer, '')), '') AS manufacturer, model,
+                   SUM(status = 'installed') AS installed,
+                   SUM(status = 'spare') AS spare,
+                   SUM(status = 'retired') AS retired,
+                   COUNT(*) AS total
+            FROM components
+            {where}
+            GROUP BY component_type, model
+            ORDER BY total DESC, component_type, model
+        """, params))
+
+    def manufacturer_distribution(self, component_type: str = None) -> List[Dict]:
+        """Component counts per manufacturer, split by status
+
+        Grouped by manufacturer_id, so every spelling of a vendor counts
+        once (see manufacturers.py).
+        """
+        where, params = ('WHERE c.component_type = ?', (component_type,)) if component_type else ('', ())
+        return self._cached('manufacturers', params, lambda: self._query(f"""
+            SELECT COALESCE(m.name, '(unknown)') AS manufacturer,
+                   SUM(c.status = 'installed') AS installed,
+                   SUM(c.status = 'spare') AS spare,
+                   SUM(c.status = 'retired') AS retired,
+                   COUNT(*) AS total
+            FROM components c
+            LEFT JOIN manufacturers m ON m.id = c.manufacturer_id
+            {where}
+            GROUP BY c.manufacturer_id
+            ORDER BY total DESC, manufacturer
+        """, params))
+
+    def memory_histogram(self) -> List[Dict]:
+        """Number of hosts per installed RAM size (whole GiB)"""
+        return self._cached('memory', (), lambda: self._query("""
+            SELECT CASE WHEN memory_bytes IS NULL THEN NULL
+                        ELSE CAST(ROUND(memory_bytes / 1073741824.0) AS INTEGER) END AS memory_gib,
+                   COUNT(*) AS hosts
+            FROM systems
+            GROUP BY 1
+            ORDER BY memory_gib IS NULL, memory_gib
+        """))
+
+    def capacity_by_type(self) -> List[Dict]:
+        """Total memory and storage capacity, installed vs spare"""
+        return self._cached('capacity-by-type', (), lambda: self._query("""
+            SELECT component_type, status,
+                   COUNT(*) AS components,
+                   COALESCE(SUM(capacity_bytes), 0) AS capacity_bytes
+            FROM components
+            WHERE component_type IN ('memory', 'storage')
+            GROUP BY component_type, status
+            ORDER BY component_type, status
+        """))
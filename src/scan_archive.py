@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Raw scan archive for Hardware Inventory
+Keeps every uploaded scan for audits without storing identical scans twice.
+Scan bodies (without detection_date) are zlib-compressed and stored once in
+scan_blobs, addressed by their fingerprint; scan_timeline records when each
+host reported which body. Compaction thins old timeline points according to
+a retention policy and removes blobs nothing refers to any more.
+"""
+
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+class RetentionPolicy:
+    """How long timeline points are kept at each resolution
+
+    Every scan is kept for raw_days, then one point per day until daily_days,
+    then one point per month. Points older than max_days (0 = never) are
+    dropped entirely. The last point in each day or month is the one kept.
+    """
+
+    def __init__(self, raw_days: int = 7, daily_days: int = 30, max_days: int = 0):
+        self.raw_days = raw_days
+        self.daily_days = max(daily_days, raw_days)
+        self.max_days = max_days
+
+    @classmethod
+    def from_env(cls) -> 'RetentionPolicy':
+        return cls(
+            raw_days=int(os.environ.get('INVENTORY_ARCHIVE_RAW_DAYS', 7)),
+            daily_days=int(os.environ.get('INVENTORY_ARCHIVE_DAILY_DAYS', 30)),
+            max_days=int(os.environ.get('INVENTORY_ARCHIVE_MAX_DAYS', 0)),
+        )
+
+
+def normalize_timestamp(value: Optional[str]) -> str:
+    """ISO 8601 timestamp in UTC, so timeline points sort as text"""
+    try:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.astimezone()  # assume server local time
+    except (TypeError, ValueError):
+        moment = datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec='seconds')
+
+
+class ScanArchive:
+    """Compressed, deduplicated scan bodies plus a per-host timeline
+
+    Writes happen on the caller's connection and inside its transaction;
+    nothing here commits except compact().
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def record(self, hostname: str, data: Dict, fingerprint: str):
+        """Archive one scan; the body is only stored if it is new"""
+        body = {key: value for key, value in data.items() if key != 'detection_date'}
+        exists = self.conn.execute(
+            "SELECT 1 FROM scan_blobs WHERE hash = ?", (fingerprint,)
+        ).fetchone()
+        if not exists:
+            raw = json.dumps(body, sort_keys=True, separators=(',', ':')).encode('utf-8')
+            compressed = zlib.compress(raw)
+            self.conn.execute("""
+                INSERT INTO scan_blobs (hash, body, raw_size, compressed_size)
+                VALUES (?, ?, ?, ?)
+            """, (fingerprint, compressed, len(raw), len(compressed)))
+        self._add_point(hostname, data.get('detection_date'), fingerprint)
+
+    def record_unchanged(self, hostname: str, fingerprint: str, detection_date: str = None) -> bool:
+        """Add a timeline point for a scan whose body is already archived"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM scan_blobs WHERE hash = ?", (fingerprint,)
+        ).fetchone()
+        if exists:
+            self._add_point(hostname, detection_date, fingerprint)
+        return bool(exists)
+
+    def _add_point(self, hostname: str, detection_date: Optional[str], fingerprint: str):
+        self.conn.execute("""
+            INSERT INTO scan_timeline (hostname, scanned_at, scan_hash)
+            VALUES (?, ?, ?)
+        """, (hostname, normalize_timestamp(detection_date), fingerprint))
+
+    def get_scan(self, hostname: str, at: str = None) -> Optional[Dict]:
+        """The scan a host reported at or before a time (default: latest)"""
+        row = self.conn.execute("""
+            SELECT t.scanned_at, b.body
+            FROM scan_timeline t JOIN scan_blobs b ON b.hash = t.scan_hash
+            WHERE t.hostname = ? AND t.scanned_at <= ?
+            ORDER BY t.scanned_at DESC, t.id DESC
+            LIMIT 1
+        """, (hostname, normalize_timestamp(at) if at else '9999-12-31T23:59:59+00:00')).fetchone()
+        if not row:
+            return None
+        data = json.loads(zlib.decompress(row[1]))
+        data['detection_date'] = row[0]
+        return data
+
+    def history(self, hostname: str) -> List[Dict]:
+        """Timeline points for a host, oldest first"""
+        rows = self.conn.execute("""
+            SELECT scanned_at, scan_hash FROM scan_timeline
+            WHERE hostname = ? ORDER BY scanned_at, id
+        """, (hostname,)).fetchall()
+        return [{'scanned_at': row[0], 'hash': row[1]} for row in rows]
+
+    def stats(self) -> Dict:
+        points = self.conn.execute("SELECT COUNT(*) FROM scan_timeline").fetchone()[0]
+        blobs, raw_bytes, stored_bytes = self.conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(compressed_size), 0)
+            FROM scan_blobs
+        """).fetchone()
+        return {'points': points, 'blobs': blobs, 'raw_bytes': raw_bytes, 'stored_bytes': stored_bytes}
+
+    def compact(self, policy: RetentionPolicy = None, now: datetime = None) -> Dict:
+        """Apply the retention policy and drop unreferenced blobs"""
+        policy = policy or RetentionPolicy.from_env()
+        now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+
+        def cutoff(days):
+            return (now - timedelta(days=days)).isoformat(timespec='seconds')
+
+        cursor = self.conn.cursor()
+        expired = 0
+        if policy.max_days:
+            cursor.execute("DELETE FROM scan_timeline WHERE scanned_at < ?", (cutoff(policy.max_days),))
+            expired = cursor.rowcount
+
+        # Bucket each point: recent ones by row, then by day, then by month,
+        # and keep only the last point of each bucket
+        cursor.execute("""
+            DELETE FROM scan_timeline WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY hostname, bucket ORDER BY scanned_at DESC, id DESC
+                    ) AS position
+                    FROM (
+                        SELECT id, hostname, scanned_at,
+                               CASE WHEN scanned_at >= :raw THEN 'scan-' || id
+                                    WHEN scanned_at >= :daily THEN substr(scanned_at, 1, 10)
+                                    ELSE substr(scanned_at, 1, 7) END AS bucket
+                        FROM scan_timeline
+                    )
+                ) WHERE position > 1
+            )
+        """, {'raw': cutoff(policy.raw_days), 'daily': cutoff(policy.daily_days)})
+        thinned = cursor.rowcount
+
+        # A system's current scan stays, so unchanged rescans can still be recorded
+        cursor.execute("""
+            DELETE FROM scan_blobs
+            WHERE hash NOT IN (SELECT scan_hash FROM scan_timeline)
+              AND hash NOT IN (SELECT scan_fingerprint FROM systems
+                               WHERE scan_fingerprint IS NOT NULL)
+        """)
+        blobs = cursor.rowcount
+        self.conn.commit()
+        return {'points_removed': thinned + expired, 'blobs_removed': blobs}
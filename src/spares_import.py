@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Spare-part import for Hardware Inventory
+Reads purchasing spreadsheets exported as CSV, or NDJSON (one JSON object
+per line), one row at a time so files of any size import in constant
+memory. Source columns are mapped onto component fields by name, by a
+built-in list of common aliases, or by an explicit mapping. Rows that fail
+validation are written to a reject file in the input's own format with
+the line number and reason, so they can be fixed and imported again.
+
+Validation and the batched inserts are done by
+HardwareInventory.import_spares().
+"""
+
+import csv
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Component fields a source column can be mapped onto
+FIELDS = ('component_type', 'manufacturer', 'model', 'serial_number', 'location', 'notes', 'size')
+
+# Column names seen in purchasing exports, after normalize_column()
+ALIASES = {
+    'type': 'component_type',
+    'part_type': 'component_type',
+    'category': 'component_type',
+    'vendor': 'manufacturer',
+    'make': 'manufacturer',
+    'brand': 'manufacturer',
+    'part': 'model',
+    'part_no': 'model',
+    'part_number': 'model',
+    'description': 'model',
+    'serial': 'serial_number',
+    'serial_no': 'serial_number',
+    'sn': 'serial_number',
+    'bin': 'location',
+    'shelf': 'location',
+    'capacity': 'size',
+    'comment': 'notes',
+    'comments': 'notes',
+}
+
+# Columns added to reject rows; ignored when a fixed reject file is imported
+REJECT_LINE = 'import_line'
+REJECT_ERROR = 'import_error'
+
+
+@lru_cache(maxsize=256)
+def normalize_column(name: str) -> str:
+    """'Serial No.' -> 'serial_no'"""
+    cleaned = ''.join(ch if ch.isalnum() else ' ' for ch in (name or '').lower())
+    return '_'.join(cleaned.split())
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """Parse "Source Column=field,..." into {normalized source column: field}"""
+    mapping = {}
+    for entry in filter(None, (part.strip() for part in (spec or '').split(','))):
+        column, sep, field = entry.partition('=')
+        field = field.strip()
+        if not sep or not column.strip() or field not in FIELDS:
+            raise ValueError(f"Invalid column mapping {entry!r}; expected Column=field with field one of "
+                             f"{', '.join(FIELDS)}")
+        mapping[normalize_column(column)] = field
+    return mapping
+
+
+def detect_format(filename: str, default: str = 'csv') -> str:
+    """Import format from a file extension"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    if extension in ('.csv', '.txt'):
+        return 'csv'
+    return default
+
+
+def read_records(stream, fmt: str) -> Iterator[Tuple[int, Dict, Optional[str]]]:
+    """Yield (line number, source record, parse error) for each row
+
+    Line numbers are those of the input file (the CSV header is line 1).
+    Blank lines are skipped. Rows that can't be parsed come back with an
+    error and whatever could be read of them.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        # DictReader puts surplus cells under None
+        for record in reader:
+            if not any((value or '').strip() for key, value in record.items() if key is not None):
+                continue
+            error = 'more cells than header columns' if None in record else None
+            record.pop(None, None)
+            yield reader.line_num, record, error
+    elif fmt == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, {'raw': line.rstrip('\r\n')}, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield number, {'raw': line.rstrip('\r\n')}, "expected a JSON object"
+                continue
+            yield number, record, None
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {', '.join(IMPORT_FORMATS)}")
+
+
+def map_record(record: Dict, mapping: Dict[str, str] = None) -> Dict[str, str]:
+    """Component fields of a source record, as stripped strings
+
+    An explicit mapping wins over a column that is already named after a
+    field, which wins over an alias. Unmapped columns are ignored.
+    """
+    fields = {}
+    ranked = {}
+    for column, value in record.items():
+        key = normalize_column(column)
+        if mapping and key in mapping:
+            field, rank = mapping[key], 0
+        elif key in FIELDS:
+            field, rank = key, 1
+        elif key in ALIASES:
+            field, rank = ALIASES[key], 2
+        else:
+            continue
+        if field in ranked and ranked[field] <= rank:
+            continue
+        ranked[field] = rank
+        fields[field] = '' if value is None else str(value).strip()
+    return fields
+
+
+class RejectWriter:
+    """Writes rejected rows in the input's format, with line and reason
+
+    Nothing (not even a CSV header) is written until the first reject, so
+    a clean import leaves an empty reject file.
+    """
+
+    def __init__(self, out, fmt: str):
+        self.out = out
+        self.fmt = fmt
+        self.count = 0
+        self._writer = None
+
+    def write(self, line: int, record: Dict, error: str):
+        self.count += 1
+        if self.fmt == 'ndjson':
+            row = dict(record, **{REJECT_LINE: line, REJECT_ERROR: error})
+            self.out.write(json.dumps(row, default=str) + '\n')
+            return
+        if self._writer is None:
+            columns = [REJECT_LINE, REJECT_ERROR] + [c for c in record if c not in (REJECT_LINE, REJECT_ERROR)]
+            self._writer = csv.DictWriter(self.out, fieldnames=columns, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(dict(record, **{REJECT_LINE: line, REJECT_ERROR: error}))
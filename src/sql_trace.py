@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+SQL tracing for Hardware Inventory
+Hooks sqlite3 trace and progress callbacks on a connection to record which
+statements run, how often and for how long. Statements are attributed to the
+query log of the current thread (one per web request), and statements slower
+than a configurable threshold are logged.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger('hardware_inventory.sql')
+
+# Statements at or above this duration are logged as slow queries
+SLOW_QUERY_SECONDS = float(os.environ.get('INVENTORY_SLOW_QUERY_MS', 100)) / 1000.0
+
+# The progress handler runs every N virtual machine instructions; it marks the
+# statement as still executing, which is how its duration is measured. Very
+# short statements finish between ticks and are recorded as taking ~0s.
+PROGRESS_OPS = int(os.environ.get('INVENTORY_SQL_PROGRESS_OPS', 1000))
+
+# A statement repeated this many times in one request is reported as N+1
+REPEATED_QUERY_THRESHOLD = 20
+
+TRACING_ENABLED = os.environ.get('INVENTORY_SQL_TRACE', 'true').lower() == 'true'
+
+SLOW_QUERIES = REGISTRY.counter(
+    'inventory_sqlite_slow_queries_total', 'Statements slower than the slow-query threshold')
+
+_local = threading.local()
+
+# The trace callback reports SQL with parameters already bound; literals are
+# folded back into placeholders so repeated statements group together
+_LITERAL_PATTERN = re.compile(r"[xX]?'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literal values with '?'"""
+    return _LITERAL_PATTERN.sub('?', ' '.join(sql.split()))
+
+
+class QueryLog:
+    """Statements executed on one thread during a request"""
+
+    def __init__(self):
+        self.statements: Dict[str, List[float]] = {}  # sql -> [count, seconds]
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def record(self, sql: str, seconds: float):
+        entry = self.statements.setdefault(sql, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        self.count += 1
+        self.total_seconds += seconds
+
+    def top(self, limit: int = 5, by: str = 'seconds') -> List[Dict]:
+        """Most expensive statements, by total 'seconds' or execution 'count'"""
+        index = 1 if by == 'seconds' else 0
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][index], reverse=True)
+        return [{'sql': sql, 'count': int(count), 'seconds': seconds}
+                for sql, (count, seconds) in ranked[:limit]]
+
+    def repeated(self, threshold: int = REPEATED_QUERY_THRESHOLD) -> List[Dict]:
+        """Statements executed often enough to suggest an N+1 pattern"""
+        return [entry for entry in self.top(len(self.statements), by='count')
+                if entry['count'] >= threshold]
+
+
+class _ConnectionTracer:
+    """Per-connection state for the statement currently executing"""
+
+    def __init__(self):
+        self.sql: Optional[str] = None
+        self.start = 0.0
+        self.last_active = 0.0
+        # Statements that fire triggers are reported again, expanded the
+        # same way, for each trigger step; normalize those only once
+        self._raw: Optional[str] = None
+        self._normalized: Optional[str] = None
+
+    def on_statement(self, sql: str):
+        now = time.perf_counter()
+        if sql.startswith('--'):
+            # Trigger bodies are reported as comments; they belong to the
+            # statement that fired them
+            self.last_active = now
+            return
+        self.finish()
+        if sql != self._raw:
+            self._raw, self._normalized = sql, normalize_sql(sql)
+        self.sql = self._normalized
+        self.start = self.last_active = now
+        _active_tracers().add(self)
+
+    def on_progress(self) -> int:
+        self.last_active = time.perf_counter()
+        return 0
+
+    def finish(self):
+        """Close out the current statement and attribute it"""
+        if self.sql is None:
+            return
+        sql, seconds = self.sql, self.last_active - self.start
+        self.sql = None
+        log = current_log()
+        if log is not None:
+            log.record(sql, seconds)
+        if seconds >= SLOW_QUERY_SECONDS:
+            SLOW_QUERIES.inc()
+            logger.warning("Slow query (%.1f ms): %s", seconds * 1000, sql)
+
+
+def _active_tracers() -> set:
+    tracers = getattr(_local, 'tracers', None)
+    if tracers is None:
+        tracers = _local.tracers = set()
+    return tracers
+
+
+def instrument(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Attach trace and progress callbacks to a connection"""
+    if not TRACING_ENABLED:
+        return conn
+    tracer = _ConnectionTracer()
+    conn.set_trace_callback(tracer.on_statement)
+    conn.set_progress_handler(tracer.on_progress, PROGRESS_OPS)
+    return conn
+
+
+@contextmanager
+def paused(conn: sqlite3.Connection):
+    """Stop tracing an instrumented connection for a bulk statement
+
+    executemany() reports every row (and every trigger step) as a separate
+    statement, which costs more than the insert itself for large batches.
+    """
+    if not TRACING_ENABLED:
+        yield conn
+        return
+    conn.set_trace_callback(None)
+    conn.set_progress_handler(None, 0)
+    try:
+        yield conn
+    finally:
+        instrument(conn)
+
+
+def current_log() -> Optional[QueryLog]:
+    return getattr(_local, 'log', None)
+
+
+def begin_request() -> QueryLog:
+    """Start collecting statements for the current thread"""
+    _local.log = QueryLog()
+    _active_tracers().clear()
+    return _local.log
+
+
+def end_request() -> Optional[QueryLog]:
+    """Stop collecting and return the finished log for the current thread"""
+    for tracer in list(_active_tracers()):
+        tracer.finish()
+    _active_tracers().clear()
+    log = current_log()
+    _local.log = None
+    return log
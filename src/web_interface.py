@@ -3,108 +3,403 @@
 Simple Flask web interface for hardware inventory
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, make_response, g, abort, send_file
+from markupsafe import escape
 import sqlite3
+import io
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import random
 import socket
 import subprocess
+import time
+
+import sql_trace
+from admission import Overloaded, get_admission
+from assets import IMMUTABLE_MAX_AGE, AssetManifest
+from reports import REPORTS, FleetReports, format_capacity
+from backup import BackupError, BackupPolicy, backup_database, latest_backup, open_backup
+from change_events import TooManyStreams, get_broker, latest_event_id, record_event
+from component_archive import COLUMN_LIST
+from consistency import CHECKS, ConsistencyChecker
+from federation import FederatedResult, Federation, parse_sites
+from maintenance import DatabaseMaintenance, start_scheduler
+from manufacturers import MANUFACTURER_FILTER, ManufacturerDictionary, filter_keys
+from pci_lookup import get_shared_lookup
+from profiling import PROFILE_DIR, PROFILE_KEEP, PROFILE_SAMPLE, ProfileStore, release, try_profiler
+from spares_import import detect_format, parse_mapping
+from metrics import REGISTRY
+from inventory_manager import SQLITE_CONNECTIONS
 
 # Get base directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+
+# Static files are served by static_asset() below, under content-hashed names
 app = Flask(__name__, 
-            static_folder=os.path.join(BASE_DIR, 'static'),
+            static_folder=None,
             template_folder=os.path.join(BASE_DIR, 'templates'))
 
 # Default database path
 default_db = os.path.join(BASE_DIR, 'data', 'hardware_inventory.db')
 app.config['DATABASE'] = os.environ.get('INVENTORY_DB', default_db)
 
+# Other site databases to read alongside this one (INVENTORY_SITES="dc1=/path.db,...")
+app.config['SITE_NAME'] = os.environ.get('INVENTORY_SITE') or 'local'
+app.config['SITES'] = parse_sites(os.environ.get('INVENTORY_SITES', ''))
+
+# Set once warm_up() has prepared the schema, PCI database and templates
+app.config['WARMED_UP'] = False
+
+# Add a Server-Timing header with database time outside debug mode too
+app.config['SQL_SERVER_TIMING'] = os.environ.get('INVENTORY_SQL_TIMING', 'false').lower() == 'true'
+
+# Most spooled scans accepted in one batch upload; scanners spool one fewer
+app.config['MAX_REPLAY_SCANS'] = int(os.environ.get('INVENTORY_MAX_REPLAY_SCANS', 50))
+
+# Request profiling (see profiling.py): off unless PROFILE_DIR is set
+app.config['PROFILE_DIR'] = PROFILE_DIR
+app.config['PROFILE_SAMPLE'] = PROFILE_SAMPLE
+app.config['PROFILE_KEEP'] = PROFILE_KEEP
+
+# Request and background-work metrics, exposed at /metrics
+HTTP_REQUESTS = REGISTRY.counter(
+    'inventory_http_requests_total', 'HTTP requests by route, method and status',
+    ['method', 'route', 'status'])
+HTTP_LATENCY = REGISTRY.histogram(
+    'inventory_http_request_duration_seconds', 'HTTP request latency by route', ['method', 'route'])
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'inventory_http_requests_in_flight', 'HTTP requests currently being handled')
+QUEUE_DEPTH = REGISTRY.gauge(
+    'inventory_queue_depth', 'Work items waiting or in progress, by queue', ['queue'])
+QUEUE_DEPTH.set(0, queue='ingest')
+
+
+def _pci_metrics(attribute):
+    """Callback gauge reading the shared PCI database without loading it"""
+    def collect():
+        import pci_lookup
+        lookup = pci_lookup._shared_lookup
+        if lookup is None:
+            return {}
+        value = getattr(lookup, attribute)
+        return {(): value if isinstance(value, float) else len(value)}
+    return collect
+
+
+REGISTRY.gauge('inventory_pci_load_seconds', 'Time taken to parse pci.ids',
+               callback=_pci_metrics('load_seconds'), multiprocess_mode='max')
+REGISTRY.gauge('inventory_pci_vendors', 'Vendors loaded from pci.ids',
+               callback=_pci_metrics('vendors'), multiprocess_mode='max')
+REGISTRY.gauge('inventory_pci_devices', 'Devices loaded from pci.ids',
+               callback=_pci_metrics('devices'), multiprocess_mode='max')
+
 
 def get_db():
     """Get database connection"""
-    db = sqlite3.connect(app.config['DATABASE'])
+    db = sql_trace.instrument(sqlite3.connect(app.config['DATABASE']))
     db.row_factory = sqlite3.Row
+    SQLITE_CONNECTIONS.inc(source='web')
     return db
 
 
+def get_federation():
+    """This instance's database plus any mounted site databases"""
+    return Federation(app.config['DATABASE'], app.config['SITE_NAME'], app.config['SITES'])
+
+
+def site_query(sql, params=(), site=None):
+    """
+    Run a read query on this instance's database, or on every mounted site
+    (or just ?site=) when INVENTORY_SITES is set. Rows are dicts with a site
+    column; sites that fail are listed in the result's errors.
+    """
+    federation = get_federation()
+    if not federation.federated or site == federation.primary:
+        db = get_db()
+        try:
+            rows = [dict(row, site=federation.primary) for row in db.execute(sql, params).fetchall()]
+        finally:
+            db.close()
+        return FederatedResult(rows, {})
+    return federation.query(sql, params, site)
+
+
+_assets = None
+
+
+def get_assets() -> AssetManifest:
+    """The static asset manifest, built by warm_up() or on first use
+
+    In debug mode it is rebuilt whenever a file in static/ changes.
+    """
+    global _assets
+    if _assets is None or (app.debug and _assets.stale()):
+        _assets = AssetManifest(STATIC_DIR).build()
+    return _assets
+
+
+@app.url_defaults
+def _fingerprint_static_urls(endpoint, values):
+    """url_for('static', filename=...) gives the content-hashed name"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = get_assets().url_path(values['filename'])
+
+
+@app.route('/static/<path:filename>', endpoint='static')
+def static_asset(filename):
+    """
+    Serve a static file. Hashed names are cached for a year as immutable;
+    plain names are revalidated each time. Precompressed variants are sent
+    to clients that accept them.
+    """
+    asset, hashed = get_assets().resolve(filename)
+    if asset is None:
+        abort(404)
+    
+    encoding = request.accept_encodings.best_match(list(asset.encodings)) if asset.encodings else None
+    if encoding or asset.body is not None:
+        response = Response(asset.encodings[encoding] if encoding else asset.body, mimetype=asset.mimetype)
+        response.set_etag(f"{asset.digest[:32]}-{encoding}" if encoding else asset.digest[:32])
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.make_conditional(request)
+    else:
+        response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.digest[:32], max_age=None,
+                             conditional=True)
+    if asset.encodings:
+        response.vary.add('Accept-Encoding')
+    
+    if hashed:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def live_since(site=None):
+    """
+    Event id to start a page's live updates from, or None when the page
+    shows other sites' data, which this instance gets no events for.
+    """
+    federation = get_federation()
+    if federation.federated and site != federation.primary:
+        return None
+    db = get_db()
+    try:
+        return latest_event_id(db)
+    finally:
+        db.close()
+
+
+@app.before_request
+def _start_request_metrics():
+    g.request_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+    sql_trace.begin_request()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+    HTTP_LATENCY.observe(time.perf_counter() - g.request_start, method=request.method, route=route)
+    
+    query_log = sql_trace.end_request()
+    if query_log is not None and query_log.count:
+        for entry in query_log.repeated():
+            sql_trace.logger.warning("Query repeated %d times in %s %s: %s",
+                                     entry['count'], request.method, request.path, entry['sql'])
+        if app.debug or app.config['SQL_SERVER_TIMING']:
+            response.headers.add('Server-Timing', f'db;dur={query_log.total_seconds * 1000:.2f};'
+                                                  f'desc="{query_log.count} queries"')
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    HTTP_IN_FLIGHT.dec()
+    sql_trace.end_request()
+    REGISTRY.flush()
+
+
+def get_profile_store() -> ProfileStore:
+    return ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_KEEP'])
+
+
+@app.before_request
+def _start_profile():
+    """Profile a sample of requests, and those that ask with X-Inventory-Profile"""
+    g.profiler = None
+    if not app.config['PROFILE_DIR'] or request.path.startswith('/admin/profiles'):
+        return
+    if request.headers.get('X-Inventory-Profile') or random.random() < app.config['PROFILE_SAMPLE']:
+        # None if another request in this process is being profiled
+        g.profiler = try_profiler()
+
+
+@app.after_request
+def _keep_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        release(profiler)
+        name = get_profile_store().offer(profiler, f"{request.method} {request.path}")
+        if name:
+            response.headers['X-Inventory-Profile'] = name
+    return response
+
+
+@app.teardown_request
+def _stop_profile(exc):
+    # after_request doesn't run when the view raised
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        release(profiler)
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+def warm_up(reload: bool = False):
+    """
+    Prepare everything a worker needs before serving requests: the database
+    schema, the shared PCI database and the compiled templates. The prefork
+    server calls this in the master so workers inherit it copy-on-write.
+    """
+    from inventory_manager import HardwareInventory
+
+    app.config['WARMED_UP'] = False
+
+    # Creating the inventory applies schema.sql once, rather than per request
+    inventory = HardwareInventory(app.config['DATABASE'])
+    inventory.close()
+
+    get_shared_lookup(reload=reload)
+
+    # Hash and precompress static files once, before workers fork
+    global _assets
+    _assets = AssetManifest(STATIC_DIR).build()
+
+    if reload and app.jinja_env.cache is not None:
+        app.jinja_env.cache.clear()
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+
+    app.config['WARMED_UP'] = True
+
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness probe: 200 once warm-up has completed, 503 before
+
+    Prefork workers are forked after warm-up, so they ask the master's
+    shared state instead: during a SIGHUP reload the old generation stays
+    ready until the new one is warmed up and forked.
+    """
+    warmed_up = request.environ.get('inventory.warmed_up')
+    body = {'pid': os.getpid()}
+    if warmed_up is not None:
+        body['generation'] = request.environ['inventory.generation']
+        ready = warmed_up()
+    else:
+        ready = app.config['WARMED_UP']
+    if ready:
+        return jsonify({'status': 'ready', **body})
+    return jsonify({'status': 'warming_up', **body}), 503
+
+
 @app.route('/')
 def index():
     """Main dashboard"""
-    db = get_db()
+    site = request.args.get('site')
     
     # Get component counts by type and status
-    cursor = db.cursor()
-    cursor.execute("""
+    counts = site_query("""
         SELECT component_type, status, COUNT(*) as count
         FROM components
         GROUP BY component_type, status
-        ORDER BY component_type, status
-    """)
+    """, site=site)
     
     stats = {}
-    for row in cursor.fetchall():
+    for row in sorted(counts.rows, key=lambda row: (row['component_type'], row['status'])):
         comp_type = row['component_type']
         if comp_type not in stats:
             stats[comp_type] = {'installed': 0, 'spare': 0, 'retired': 0}
-        stats[comp_type][row['status']] = row['count']
-    
-    # Get system count
-    cursor.execute("SELECT COUNT(*) as count FROM systems")
-    system_count = cursor.fetchone()['count']
+        stats[comp_type][row['status']] = stats[comp_type].get(row['status'], 0) + row['count']
     
-    db.close()
+    # Get system count, per site
+    systems = site_query("SELECT COUNT(*) as count FROM systems", site=site)
+    system_count = sum(row['count'] for row in systems.rows)
+    site_counts = {row['site']: row['count'] for row in systems.rows}
     
-    return render_template('index.html', stats=stats, system_count=system_count)
+    return render_template('index.html', stats=stats, system_count=system_count,
+                           site_counts=site_counts, sites=get_federation().sites,
+                           site_errors={**counts.errors, **systems.errors}, filter_site=site,
+                           live_since=live_since(site))
 
 
 @app.route('/systems')
 def systems():
     """List all systems"""
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("""
+    site = request.args.get('site')
+    result = site_query("""
         SELECT s.*, 
                COUNT(sc.component_id) as component_count
         FROM systems s
         LEFT JOIN system_components sc ON s.id = sc.system_id
         GROUP BY s.id
         ORDER BY s.hostname
-    """)
-    systems = cursor.fetchall()
-    db.close()
+    """, site=site)
+    systems = sorted(result.rows, key=lambda system: (system['hostname'], system['site']))
     
-    return render_template('systems.html', systems=systems)
+    federation = get_federation()
+    return render_template('systems.html', systems=systems, sites=federation.sites,
+                           primary_site=federation.primary, site_errors=result.errors,
+                           filter_site=site, live_since=live_since(site))
 
 
 @app.route('/system/<hostname>')
 def system_detail(hostname):
-    """Show system details"""
-    db = get_db()
-    cursor = db.cursor()
+    """
+    Show system details, or the hardware it had at ?at=<ISO 8601 time>.
+    ?site= reads the system from a mounted site database.
+    """
+    at = request.args.get('at')
+    site = request.args.get('site')
+    federation = get_federation()
+    if site == federation.primary:
+        site = None
+    if site and site not in federation.sites:
+        return "Site not found", 404
+    if at and not site:
+        return system_detail_at(hostname, at)
+    query_site = site or federation.primary
     
     # Get system info
-    cursor.execute("SELECT * FROM systems WHERE hostname = ?", (hostname,))
-    system = cursor.fetchone()
-    
-    if not system:
-        db.close()
+    result = site_query("SELECT * FROM systems WHERE hostname = ?", (hostname,), site=query_site)
+    if result.errors:
+        return f"Site {escape(site)} unavailable: {escape(result.errors.get(site))}", 503
+    if not result.rows:
         return "System not found", 404
+    system = result.rows[0]
     
     # Get components
-    cursor.execute("""
+    components = site_query("""
         SELECT c.* 
         FROM components c
         JOIN system_components sc ON c.id = sc.component_id
         JOIN systems s ON sc.system_id = s.id
         WHERE s.hostname = ?
         ORDER BY c.component_type
-    """, (hostname,))
-    
-    components = cursor.fetchall()
-    db.close()
+    """, (hostname,), site=query_site).rows
     
     # Parse component specifications
     parsed_components = []
@@ -117,37 +412,195 @@ def system_detail(hostname):
                 comp_dict['specs'] = {}
         parsed_components.append(comp_dict)
     
-    return render_template('system_detail.html', system=system, components=parsed_components)
+    return render_template('system_detail.html', system=system, components=parsed_components,
+                           remote_site=site)
+
+
+def system_detail_at(hostname, at):
+    """System detail page with components rebuilt from scan history"""
+    try:
+        moment = datetime.fromisoformat(at)
+    except ValueError:
+        return "Invalid 'at' timestamp; use ISO 8601, e.g. 2025-06-18T12:00", 400
+    if moment.tzinfo is None:
+        # The page's date picker works in UTC
+        at = moment.replace(tzinfo=timezone.utc).isoformat()
+    
+    from inventory_manager import HardwareInventory
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        system = inventory.get_system_at(hostname, at)
+    finally:
+        inventory.close()
+    
+    if not system:
+        return "System not found", 404
+    
+    parsed_components = []
+    for comp in system['components']:
+        try:
+            comp['specs'] = json.loads(comp['specifications']) if comp['specifications'] else {}
+        except ValueError:
+            comp['specs'] = {}
+        parsed_components.append(comp)
+    
+    return render_template('system_detail.html', system=system, components=parsed_components,
+                           as_of=system['as_of'])
 
 
 @app.route('/components')
 def components():
-    """List all components"""
+    """List all components, optionally searching model, manufacturer, serial and location
+
+    ?manufacturer= matches any spelling of a manufacturer (see manufacturers.py).
+    ?archived=1 includes archived components (see component_archive.py).
+    """
     comp_type = request.args.get('type')
     status = request.args.get('status')
+    search = request.args.get('q', '').strip()
+    site = request.args.get('site')
+    manufacturer = request.args.get('manufacturer', '').strip()
+    include_archived = request.args.get('archived') == '1'
     
-    db = get_db()
-    cursor = db.cursor()
-    
-    query = "SELECT * FROM components WHERE 1=1"
+    where = "1=1"
     params = []
     
     if comp_type:
-        query += " AND component_type = ?"
+        where += " AND component_type = ?"
         params.append(comp_type)
     
     if status:
-        query += " AND status = ?"
+        where += " AND status = ?"
         params.append(status)
     
+    if manufacturer:
+        where += f" AND {MANUFACTURER_FILTER}"
+        params.extend(filter_keys(manufacturer, get_shared_lookup()))
+    
+    if search:
+        where += " AND (model LIKE ? OR manufacturer LIKE ? OR serial_number LIKE ? OR location LIKE ?)"
+        params.extend([f'%{search}%'] * 4)
+    
+    query = f"SELECT {COLUMN_LIST}, NULL AS archived_at FROM components WHERE {where}"
+    if include_archived:
+        query += f" UNION ALL SELECT {COLUMN_LIST}, archived_at FROM archived_components WHERE {where}"
+        params += params
     query += " ORDER BY component_type, manufacturer, model"
     
-    cursor.execute(query, params)
-    components = cursor.fetchall()
-    db.close()
+    result = site_query(query, tuple(params), site=site)
+    components = result.rows
+    if len({comp['site'] for comp in components}) > 1:
+        components.sort(key=lambda comp: (comp['component_type'], comp['manufacturer'] or '',
+                                          comp['model'] or '', comp['site']))
     
+    federation = get_federation()
     return render_template('components.html', components=components, 
-                          filter_type=comp_type, filter_status=status)
+                          filter_type=comp_type, filter_status=status, search=search,
+                          filter_manufacturer=manufacturer, include_archived=include_archived,
+                          sites=federation.sites, primary_site=federation.primary,
+                          site_errors=result.errors, filter_site=site)
+
+
+@app.route('/reports')
+def reports():
+    """Fleet capacity and model distribution reports
+
+    ?source=backup runs them against the latest backup instead of the live
+    database.
+    """
+    comp_type = request.args.get('type')
+    snapshot = None
+    if request.args.get('source') == 'backup':
+        snapshot = latest_backup(BackupPolicy.from_env(app.config['DATABASE']).directory)
+    
+    db = open_backup(snapshot) if snapshot else get_db()
+    try:
+        fleet = FleetReports(db)
+        results = {
+            'storage_by_site': fleet.storage_by_site(),
+            'models': fleet.model_distribution(comp_type),
+            'manufacturers': fleet.manufacturer_distribution(comp_type),
+            'memory': fleet.memory_histogram(),
+            'capacity_by_type': fleet.capacity_by_type(),
+        }
+        generation = fleet.write_generation()
+    finally:
+        db.close()
+    
+    return render_template('reports.html', reports=results, titles=REPORTS,
+                           filter_type=comp_type, generation=generation,
+                           source=request.args.get('source'),
+                           snapshot=os.path.basename(snapshot) if snapshot else None)
+
+
+@app.route('/consistency')
+def consistency():
+    """Inconsistencies found by the last consistency checks"""
+    check = request.args.get('check') or None
+    db = get_db()
+    try:
+        checker = ConsistencyChecker(db)
+        issues = checker.issues(check)
+        last_checked = checker.last_checked()
+        counts = dict(db.execute(
+            "SELECT check_name, COUNT(*) FROM consistency_issues GROUP BY check_name").fetchall())
+    finally:
+        db.close()
+    return render_template('consistency.html', issues=issues, checks=CHECKS, counts=counts,
+                           filter_check=check, last_checked=last_checked)
+
+
+@app.route('/consistency/check', methods=['POST'])
+def check_consistency():
+    """
+    Check rows changed since the last check, or all rows
+
+    JSON body: {"full": false, "repair": false}
+    """
+    from inventory_manager import HardwareInventory
+    
+    data = request.get_json(silent=True) or {}
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        summary = inventory.check_consistency(full=bool(data.get('full')), repair=bool(data.get('repair')))
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        inventory.close()
+    
+    return jsonify({'status': 'success', **summary})
+
+
+@app.template_filter('capacity')
+def capacity_filter(size_bytes):
+    return format_capacity(size_bytes)
+
+
+@app.route('/events')
+def events():
+    """
+    Server-Sent Events stream of changes to this instance's database
+
+    ?since= (or the Last-Event-ID header on reconnect) is the event id the
+    page was rendered at; a viewer that missed events is told to reload.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        since = request.headers.get('Last-Event-ID', type=int)
+    try:
+        stream = get_broker(app.config['DATABASE']).subscribe(since)
+    except TooManyStreams as e:
+        response = jsonify({'status': 'error', 'message': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    # Streams stay open indefinitely; don't let them hold a request slot
+    release_slot = request.environ.get('inventory.release_slot')
+    if release_slot:
+        release_slot()
+    return Response(stream.messages(request.environ.get('inventory.stopping')),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/component/add', methods=['GET', 'POST'])
@@ -156,20 +609,24 @@ def add_component():
     if request.method == 'POST':
         db = get_db()
         cursor = db.cursor()
+        manufacturer_id, manufacturer = ManufacturerDictionary(db).resolve(request.form['manufacturer'])
         
         cursor.execute("""
             INSERT INTO components 
-            (component_type, manufacturer, model, serial_number, 
+            (component_type, manufacturer, manufacturer_id, model, serial_number, 
              status, location, notes)
-            VALUES (?, ?, ?, ?, 'spare', ?, ?)
+            VALUES (?, ?, ?, ?, ?, 'spare', ?, ?)
         """, (
             request.form['type'],
-            request.form['manufacturer'],
+            manufacturer,
+            manufacturer_id,
             request.form['model'],
             request.form.get('serial', ''),
             request.form.get('location', ''),
             request.form.get('notes', '')
         ))
+        record_event(db, 'component', {'id': cursor.lastrowid, 'action': 'added',
+                                       'status': 'spare', 'location': request.form.get('location', '')})
         
         db.commit()
         db.close()
@@ -179,6 +636,43 @@ def add_component():
     return render_template('add_component.html')
 
 
+@app.route('/components/import', methods=['POST'])
+def import_components():
+    """
+    Import spare components from an uploaded CSV or NDJSON file
+
+    Form fields: file, mapping ("Column=field,..."), format (csv|ndjson,
+    default from the file name) and dry_run. The response carries the row
+    counts and the rejected rows in the input's format.
+    """
+    from inventory_manager import HardwareInventory
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'status': 'error', 'message': 'No file uploaded'}), 400
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    try:
+        mapping = parse_mapping(request.form.get('mapping', ''))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    # Read the upload as it arrives rather than loading it into memory
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    rejects = io.StringIO()
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        summary = inventory.import_spares(stream, fmt, mapping, rejects,
+                                          dry_run=request.form.get('dry_run') in ('1', 'true', 'on'))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        inventory.close()
+    
+    return jsonify({'status': 'success', 'format': fmt, 'rejects': rejects.getvalue(), **summary})
+
+
 @app.route('/component/<int:comp_id>/edit', methods=['GET', 'POST'])
 def edit_component(comp_id):
     """Edit a component"""
@@ -186,13 +680,15 @@ def edit_component(comp_id):
     cursor = db.cursor()
     
     if request.method == 'POST':
+        manufacturer_id, manufacturer = ManufacturerDictionary(db).resolve(request.form['manufacturer'])
         cursor.execute("""
             UPDATE components 
-            SET manufacturer = ?, model = ?, serial_number = ?,
+            SET manufacturer = ?, manufacturer_id = ?, model = ?, serial_number = ?,
                 status = ?, location = ?, notes = ?
             WHERE id = ?
         """, (
-            request.form['manufacturer'],
+            manufacturer,
+            manufacturer_id,
             request.form['model'],
             request.form.get('serial', ''),
             request.form['status'],
@@ -200,6 +696,10 @@ def edit_component(comp_id):
             request.form.get('notes', ''),
             comp_id
         ))
+        if cursor.rowcount:
+            record_event(db, 'component', {'id': comp_id, 'action': 'updated',
+                                           'status': request.form['status'],
+                                           'location': request.form.get('location', '')})
         
         db.commit()
         db.close()
@@ -231,6 +731,56 @@ def delete_component(comp_id):
         return jsonify({'status': 'error', 'message': 'Failed to delete component'}), 500
 
 
+@app.route('/components/bulk', methods=['POST'])
+def bulk_components():
+    """
+    Change status or location of, retire or delete many components at once
+
+    JSON body: {"action": "set-status|set-location|retire|delete",
+    "ids": [...], "filter": {"type": ..., "status": ..., ...},
+    "value": new status or location, "dry_run": false}
+    """
+    from inventory_manager import HardwareInventory
+    
+    data = request.get_json(silent=True) or {}
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        summary = inventory.bulk_update_components(
+            data.get('action'), ids=data.get('ids'), filters=data.get('filter'),
+            value=data.get('value'), dry_run=bool(data.get('dry_run')))
+    except (ValueError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        inventory.close()
+    
+    return jsonify({'status': 'success', **summary})
+
+
+@app.route('/components/restore', methods=['POST'])
+def restore_components():
+    """
+    Move archived components back into the live inventory
+
+    JSON body: {"ids": [...]}
+    """
+    from inventory_manager import HardwareInventory
+    
+    data = request.get_json(silent=True) or {}
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        summary = inventory.restore_components(data.get('ids') or [])
+    except (ValueError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        inventory.close()
+    
+    return jsonify({'status': 'success', **summary})
+
+
 @app.route('/system/<hostname>/delete', methods=['POST'])
 def delete_system(hostname):
     """Delete a system"""
@@ -299,6 +849,8 @@ def scan_system():
     # Get current port from environment or use default
     port = os.environ.get('INVENTORY_PORT', '5101')
     server_url = f"http://{server_ip}:{port}"
+    # Spooled scans are sent together with the current one
+    spool_keep = max(app.config['MAX_REPLAY_SCANS'] - 1, 1)
     
     # Generate the bash script
     script = f'''#!/bin/bash
@@ -313,21 +865,31 @@ echo "========================="
 echo "Server: $SERVER_URL"
 echo ""
 
-# Check for required commands
-MISSING_CMDS=""
-for cmd in lscpu lsblk lspci; do
-    if ! command -v $cmd >/dev/null 2>&1; then
-        MISSING_CMDS="$MISSING_CMDS $cmd"
-    fi
-done
+# Prefer the Python collector (reads sysfs directly); fall back to the
+# shell script on hosts without python3
+if command -v python3 >/dev/null 2>&1; then
+    COLLECTOR="hardware_collector.py"
+    COLLECTOR_URL="$SERVER_URL/collector/hardware_collector.py"
+else
+    COLLECTOR="detect_hardware.sh"
+    COLLECTOR_URL="$SERVER_URL/static/detect_hardware.sh"
 
-if [ -n "$MISSING_CMDS" ]; then
-    echo "WARNING: Missing required commands:$MISSING_CMDS"
-    echo "Some hardware information may be incomplete."
-    echo ""
+    # Check for required commands
+    MISSING_CMDS=""
+    for cmd in lscpu lsblk lspci; do
+        if ! command -v $cmd >/dev/null 2>&1; then
+            MISSING_CMDS="$MISSING_CMDS $cmd"
+        fi
+    done
+
+    if [ -n "$MISSING_CMDS" ]; then
+        echo "WARNING: Missing required commands:$MISSING_CMDS"
+        echo "Some hardware information may be incomplete."
+        echo ""
+    fi
 fi
 
-# Check for dmidecode (optional but recommended)
+# Check for dmidecode (needed for memory slots)
 if ! command -v dmidecode >/dev/null 2>&1; then
     echo "NOTE: dmidecode is not installed."
     echo "Install it for complete hardware information:"
@@ -348,28 +910,30 @@ cd "$TEMP_DIR"
 # Download detection script
 echo "Downloading detection script..."
 if command -v wget >/dev/null 2>&1; then
-    wget -q "$SERVER_URL/static/detect_hardware.sh" -O detect_hardware.sh
+    wget -q "$COLLECTOR_URL" -O "$COLLECTOR"
 elif command -v curl >/dev/null 2>&1; then
-    curl -s "$SERVER_URL/static/detect_hardware.sh" -o detect_hardware.sh
+    curl -s "$COLLECTOR_URL" -o "$COLLECTOR"
 else
     echo "ERROR: Neither wget nor curl is available. Cannot download detection script."
     exit 1
 fi
 
-if [ ! -f detect_hardware.sh ]; then
+if [ ! -s "$COLLECTOR" ]; then
     echo "ERROR: Failed to download detection script"
     exit 1
 fi
 
-chmod +x detect_hardware.sh
+chmod +x "$COLLECTOR"
 
 # Run detection
 echo "Scanning hardware..."
-if [ "$EUID" -eq 0 ]; then
-    ./detect_hardware.sh > hardware_data.json 2>/dev/null
-else
+if [ "$EUID" -ne 0 ]; then
     echo "Running without sudo - some information may be limited."
     echo "For complete details, run: curl $SERVER_URL/scan_system | sudo bash"
+fi
+if [ "$COLLECTOR" = "hardware_collector.py" ]; then
+    python3 hardware_collector.py > hardware_data.json 2>/dev/null
+else
     ./detect_hardware.sh > hardware_data.json 2>/dev/null
 fi
 
@@ -380,17 +944,123 @@ if ! python3 -m json.tool < hardware_data.json >/dev/null 2>&1; then
     exit 1
 fi
 
+# Scans that couldn't be uploaded wait here and go with the next upload
+if [ "$EUID" -eq 0 ]; then
+    SPOOL_DIR="${{INVENTORY_SPOOL_DIR:-/var/spool/hardware-inventory}}"
+else
+    SPOOL_DIR="${{INVENTORY_SPOOL_DIR:-$HOME/.cache/hardware-inventory/spool}}"
+fi
+SPOOL_KEEP={spool_keep}
+
+# Keep this scan for the next run, dropping the oldest beyond SPOOL_KEEP
+spool_scan() {{
+    mkdir -p "$SPOOL_DIR" && cp hardware_data.json "$SPOOL_DIR/scan-$(date -u +%Y%m%dT%H%M%SZ)-$$.json" || return
+    ls -1 "$SPOOL_DIR"/scan-*.json | head -n -$SPOOL_KEEP | while read -r old; do rm -f "$old"; done
+    echo "Scan spooled to $SPOOL_DIR; it will be uploaded by the next successful scan."
+}}
+
+# POST to /api/upload_scan, waiting and retrying while the server is busy.
+# It answers 429/503 with Retry-After and a jitter window; waits double on
+# each attempt and a random part of the window is added so a fleet that
+# scanned at the same minute doesn't come back at the same second either.
+# Prints the final HTTP status; the response body is left in upload_response.
+MAX_RETRIES=6
+post_scan() {{
+    local attempt=0 status retry jitter delay
+    while true; do
+        status=$(curl -s -D upload_headers -o upload_response -w "%{{http_code}}" -X POST "$@" \\
+            "$SERVER_URL/api/upload_scan")
+        if {{ [ "$status" != "429" ] && [ "$status" != "503" ]; }} || [ $attempt -ge $MAX_RETRIES ]; then
+            echo "$status"
+            return
+        fi
+        retry=$(awk -F': *' 'tolower($1) == "retry-after" {{ print $2 + 0 }}' upload_headers)
+        jitter=$(awk -F': *' 'tolower($1) == "x-inventory-retry-jitter" {{ print $2 + 0 }}' upload_headers)
+        delay=$(( ${{retry:-5}} << attempt ))
+        if [ $delay -gt 300 ]; then
+            delay=300
+        fi
+        delay=$(( delay + RANDOM % (${{jitter:-0}} + 1) ))
+        echo "Server busy (HTTP $status); retrying in ${{delay}}s..." >&2
+        sleep $delay
+        attempt=$((attempt + 1))
+    done
+}}
+
+# Send spooled scans and this one as a single JSON array; the server applies
+# them oldest first and only archives those older than what it already has
+REPLAYED=0
+shopt -s nullglob
+SPOOLED=("$SPOOL_DIR"/scan-*.json)
+shopt -u nullglob
+if [ ${{#SPOOLED[@]}} -gt 0 ] && command -v curl >/dev/null 2>&1; then
+    echo "Uploading ${{#SPOOLED[@]}} spooled scans with this one..."
+    python3 -c '
+import json, sys
+scans = []
+for path in sys.argv[1:]:
+    try:
+        with open(path) as f:
+            scan = json.load(f)
+    except (OSError, ValueError):
+        continue
+    if isinstance(scan, dict) and scan.get("hostname") and scan.get("detection_date"):
+        scans.append(scan)
+json.dump(scans, sys.stdout)
+' "${{SPOOLED[@]}}" hardware_data.json > replay.json
+    STATUS=$(post_scan -H "Content-Type: application/json" -d @replay.json)
+    echo "Server response: $(cat upload_response)"
+    if [ "$STATUS" = "200" ]; then
+        rm -f "${{SPOOLED[@]}}"
+        REPLAYED=1
+    fi
+fi
+
+# Ask the server whether anything changed before sending the full scan.
+# The fingerprint must match inventory_manager.scan_fingerprint().
+UNCHANGED=0
+if [ $REPLAYED -eq 0 ] && command -v curl >/dev/null 2>&1; then
+    read -r SCAN_HOST SCAN_DATE FINGERPRINT < <(python3 -c '
+import hashlib, json, sys
+data = json.load(sys.stdin)
+date = data.pop("detection_date", "")
+canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+print(data.get("hostname", ""), date, hashlib.sha256(canonical.encode("utf-8")).hexdigest())
+' < hardware_data.json)
+    if [ -n "$FINGERPRINT" ]; then
+        STATUS=$(post_scan \\
+            -H "X-Inventory-Hostname: $SCAN_HOST" \\
+            -H "X-Inventory-Detection-Date: $SCAN_DATE" \\
+            -H "If-None-Match: \\"$FINGERPRINT\\"")
+        if [ "$STATUS" = "304" ]; then
+            UNCHANGED=1
+        fi
+    fi
+fi
+
 # Upload results
-echo "Uploading results to inventory server..."
-if command -v curl >/dev/null 2>&1; then
-    RESPONSE=$(curl -s -X POST -H "Content-Type: application/json" \\
-        -d @hardware_data.json \\
-        "$SERVER_URL/api/upload_scan")
-    echo "Server response: $RESPONSE"
+if [ $REPLAYED -eq 1 ]; then
+    echo "Spooled scans and this scan uploaded."
+elif [ $UNCHANGED -eq 1 ]; then
+    echo "Hardware unchanged since the last scan; nothing to upload."
+elif command -v curl >/dev/null 2>&1; then
+    echo "Uploading results to inventory server..."
+    STATUS=$(post_scan -H "Content-Type: application/json" -d @hardware_data.json)
+    echo "Server response: $(cat upload_response)"
+    if [ "$STATUS" != "200" ]; then
+        echo "ERROR: Upload failed (HTTP $STATUS)."
+        spool_scan
+        exit 1
+    fi
 elif command -v wget >/dev/null 2>&1; then
-    RESPONSE=$(wget -q -O - --post-file=hardware_data.json \\
+    echo "Uploading results to inventory server..."
+    if ! RESPONSE=$(wget -q -O - --post-file=hardware_data.json \\
         --header="Content-Type: application/json" \\
-        "$SERVER_URL/api/upload_scan")
+        "$SERVER_URL/api/upload_scan"); then
+        echo "ERROR: Upload failed."
+        spool_scan
+        exit 1
+    fi
     echo "Server response: $RESPONSE"
 else
     echo "ERROR: Cannot upload results (no curl or wget)"
@@ -413,30 +1083,182 @@ echo "View results at: $SERVER_URL"
     return response
 
 
+@app.route('/collector/hardware_collector.py')
+def download_collector():
+    """Serve the Python hardware collector used by /scan_system"""
+    with open(os.path.join(BASE_DIR, 'src', 'hardware_collector.py'), 'r') as f:
+        response = make_response(f.read())
+    response.headers['Content-Type'] = 'text/x-python'
+    response.headers['Content-Disposition'] = 'inline; filename="hardware_collector.py"'
+    return response
+
+
 @app.route('/api/upload_scan', methods=['POST'])
 def api_upload_scan():
-    """API endpoint to receive scan results"""
+    """API endpoint to receive scan results
+
+    Scanners may first send just their hostname (X-Inventory-Hostname) and the
+    payload fingerprint (If-None-Match). If it matches the last upload the
+    answer is 304 and the body is never parsed; otherwise a bodyless request
+    gets "upload_required" and the scanner sends the full payload.
+
+    Handshakes and full uploads go through admission control. When the
+    server is busy the answer is 429 or 503 with Retry-After and X-Inventory-Retry-Jitter, and
+    the scanner retries after that many seconds plus a random share of the
+    jitter window.
+
+    A JSON array uploads scans a scanner spooled while the server was
+    unreachable, plus its current one. They are applied oldest first in one
+    transaction; a scan older than its system's last scan is only archived.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'status': 'error', 'message': 'No data provided'}), 400
-        
         # Import the inventory manager
         from inventory_manager import HardwareInventory
         
+        scan_hostname = request.headers.get('X-Inventory-Hostname')
+        fingerprints = request.if_none_match.as_set()
+        if scan_hostname and fingerprints:
+            # Recording an unchanged scan takes the write lock too, so when the
+            # whole fleet checks in at once the handshake is shed like uploads
+            with QUEUE_DEPTH.track_inprogress(queue='ingest'), get_admission().admit():
+                inventory = HardwareInventory(app.config['DATABASE'])
+                try:
+                    fingerprint = next(iter(fingerprints))
+                    if inventory.touch_unchanged_scan(
+                            scan_hostname, fingerprint,
+                            request.headers.get('X-Inventory-Detection-Date')):
+                        response = make_response('', 304)
+                        response.set_etag(fingerprint)
+                        return response
+                    # The full upload that follows is what counts
+                    get_admission().refund()
+                finally:
+                    inventory.close()
+            if not request.content_length:
+                # Don't ask for the full scan only to turn it away
+                get_admission().check()
+                return jsonify({
+                    'status': 'upload_required',
+                    'message': f'Hardware changed or unknown for {scan_hostname}; send the full scan'
+                })
+        
         # Process the scan data
-        inventory = HardwareInventory(app.config['DATABASE'])
-        inventory.update_system(data)
-        inventory.close()
+        with QUEUE_DEPTH.track_inprogress(queue='ingest'), get_admission().admit():
+            data = request.get_json()
+            if not data:
+                return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+            if isinstance(data, list):
+                return replay_scans(data)
+            inventory = HardwareInventory(app.config['DATABASE'])
+            try:
+                result = inventory.update_system(data)
+            finally:
+                inventory.close()
         
-        return jsonify({
+        if not result['applied']:
+            # Not the system's current hardware, so no ETag for the handshake
+            return jsonify({
+                'status': 'stale',
+                'message': f'{result["hostname"]} has a newer scan; this one was only archived'
+            })
+        response = jsonify({
             'status': 'success', 
             'message': f'Successfully updated inventory for {data.get("hostname", "unknown")}'
         })
+        response.set_etag(result['fingerprint'])
+        return response
+    except Overloaded as e:
+        response = jsonify({'status': 'busy', 'message': str(e),
+                            'retry_after': e.retry_after, 'jitter': e.jitter})
+        response.headers['Retry-After'] = str(e.retry_after)
+        response.headers['X-Inventory-Retry-Jitter'] = str(e.jitter)
+        return response, e.status
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+def replay_scans(scans):
+    """Apply a batch of spooled scans for api_upload_scan"""
+    from inventory_manager import HardwareInventory
+    
+    if len(scans) > app.config['MAX_REPLAY_SCANS']:
+        return jsonify({'status': 'error', 'message': f"At most {app.config['MAX_REPLAY_SCANS']} "
+                                                      f"scans per upload"}), 413
+    inventory = HardwareInventory(app.config['DATABASE'])
+    try:
+        results = inventory.replay_scans(scans)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    finally:
+        inventory.close()
+    
+    applied = sum(result['applied'] for result in results)
+    return jsonify({
+        'status': 'success',
+        'message': f'Replayed {len(results)} scans: {applied} applied, '
+                   f'{len(results) - applied} older than the latest and archived only',
+        'results': results
+    })
+
+
+@app.route('/admin/backup', methods=['POST'])
+def admin_backup():
+    """Take an online backup of the database"""
+    try:
+        result = backup_database(app.config['DATABASE'])
+    except BackupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return jsonify({'status': 'success', **result})
+
+
+@app.route('/admin/maintenance')
+def admin_maintenance():
+    """When each maintenance task last ran, how long it took and whether it is due"""
+    maintenance = DatabaseMaintenance(app.config['DATABASE'])
+    try:
+        return jsonify({'tasks': maintenance.status(), 'busy': maintenance.busy()})
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/admin/maintenance', methods=['POST'])
+def admin_run_maintenance():
+    """Run due maintenance tasks now, or the listed tasks with force"""
+    data = request.get_json(silent=True) or {}
+    try:
+        summary = DatabaseMaintenance(app.config['DATABASE']).run(data.get('tasks'), force=bool(data.get('force')))
+    except (ValueError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return jsonify({'status': 'success', **summary})
+
+
+def start_maintenance():
+    """Run due database maintenance in the background of this process"""
+    start_scheduler(app.config['DATABASE'])
+
+
+@app.route('/admin/profiles')
+def admin_profiles():
+    """The slowest profiled requests, with their .prof and .collapsed files"""
+    if not app.config['PROFILE_DIR']:
+        abort(404)
+    store = get_profile_store()
+    return render_template('profiles.html', profiles=store.profiles(), keep=store.keep,
+                           directory=store.directory, sample=app.config['PROFILE_SAMPLE'])
+
+
+@app.route('/admin/profiles/<filename>')
+def admin_profile_file(filename):
+    """Download one profile file"""
+    path = get_profile_store().path(filename) if app.config['PROFILE_DIR'] else None
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/plain' if filename.endswith('.collapsed') else 'application/octet-stream',
+                     as_attachment=True, download_name=filename)
+
+
 @app.route('/api/scan/<hostname>', methods=['POST'])
 def api_scan_system(hostname):
     """API endpoint to trigger system scan"""
@@ -460,11 +1282,35 @@ if __name__ == '__main__':
     parser.add_argument('--debug', action='store_true', 
                         default=os.environ.get('INVENTORY_DEBUG', 'false').lower() == 'true',
                         help='Enable debug mode')
+    parser.add_argument('--workers', default=os.environ.get('INVENTORY_WORKERS', '0'),
+                        help='Prefork worker processes, or "auto" for one per CPU '
+                             '(default: 0, use the Flask development server)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('INVENTORY_THREADS', 4)),
+                        help='Request threads per worker process (default: 4)')
     
     args = parser.parse_args()
+    workers = (os.cpu_count() or 1) if args.workers == 'auto' else int(args.workers)
     
     print(f"Starting Hardware Inventory Web Interface on {args.host}:{args.port}")
     print(f"Debug mode: {args.debug}")
     print(f"Database: {app.config['DATABASE']}")
     
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    if workers > 0 and not args.debug:
+        import shutil
+        import tempfile
+        from prefork_server import PreforkServer
+        
+        # Workers share metrics through snapshot files in this directory
+        metrics_dir = tempfile.mkdtemp(prefix='inventory-metrics-')
+        REGISTRY.enable_multiprocess(metrics_dir)
+        
+        server = PreforkServer(app, args.host, args.port, workers=workers,
+                               threads=args.threads, warm_up=warm_up, worker_init=start_maintenance)
+        try:
+            server.serve_forever()
+        finally:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+    else:
+        warm_up()
+        start_maintenance()
+        app.run(host=args.host, port=args.port, debug=args.debug)
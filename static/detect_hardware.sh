@@ -42,8 +42,35 @@ echo "  },"
 # Memory Information
 echo "  \"memory\": {"
 echo "    \"total_gb\": \"$(free -g | grep Mem: | awk '{print $2}')\","
-# TODO: Fix memory slot detection
-echo "    \"slots\": []"
+if [ "$EUID" -eq 0 ] && command -v dmidecode >/dev/null 2>&1; then
+    echo "    \"slots\": ["
+    # One JSON object per "Memory Device" section of dmidecode -t 17
+    dmidecode -t 17 2>/dev/null | awk '
+        function esc(v) { gsub(/\\/, "\\\\", v); gsub(/"/, "\\\"", v); return v }
+        function clean(v) {
+            gsub(/^[ \t]+|[ \t]+$/, "", v)
+            if (tolower(v) ~ /^(not specified|unknown|none|to be filled by o\.e\.m\.)$/) return ""
+            return v
+        }
+        function emit() {
+            if (!in_device) return
+            serial = clean(f["Serial Number"])
+            if (serial ~ /^(0+|[Ff]+)$/) serial = ""
+            printf "%s      {\"slot\": \"%s\", \"size\": \"%s\", \"speed\": \"%s\", \"type\": \"%s\", \"manufacturer\": \"%s\", \"part_number\": \"%s\", \"serial\": \"%s\"}", sep, esc(clean(f["Locator"])), esc(clean(f["Size"])), esc(clean(f["Speed"])), esc(clean(f["Type"])), esc(clean(f["Manufacturer"])), esc(clean(f["Part Number"])), esc(serial)
+            sep = ",\n"
+            in_device = 0
+        }
+        /^[^\t]/ { emit(); if ($0 == "Memory Device") { in_device = 1; delete f } next }
+        in_device && /^\t[^\t]/ {
+            line = substr($0, 2); key = substr(line, 1, index(line, ":") - 1)
+            f[key] = substr(line, index(line, ":") + 1)
+        }
+        END { emit(); if (sep != "") printf "\n" }
+    '
+    echo "    ]"
+else
+    echo "    \"slots\": []"
+fi
 echo "  },"
 
 # Storage Information
@@ -62,10 +89,24 @@ for disk in $(lsblk -d -o NAME,TYPE | grep disk | awk '{print $1}'); do
     echo "      \"serial\": \"$serial\","
     rota=$(lsblk -d -o ROTA -n /dev/$disk 2>/dev/null)
     if [ "$rota" = "0" ]; then
-        echo "      \"type\": \"SSD\""
+        echo "      \"type\": \"SSD\","
     else
-        echo "      \"type\": \"HDD\""
+        echo "      \"type\": \"HDD\","
+    fi
+    
+    # Try to get PCI vendor info for NVMe devices
+    vendor_id=""
+    device_id=""
+    if [[ "$disk" == nvme* ]]; then
+        # For NVMe drives, try to find PCI info
+        pci_info=$(lspci -nn 2>/dev/null | grep -i "Non-Volatile\|NVMe" | head -1)
+        if [ -n "$pci_info" ]; then
+            vendor_id=$(echo "$pci_info" | grep -o '\[....:....\]' | tail -1 | sed 's/\[\(.*\):\(.*\)\]/\1/')
+            device_id=$(echo "$pci_info" | grep -o '\[....:....\]' | tail -1 | sed 's/\[\(.*\):\(.*\)\]/\2/')
+        fi
     fi
+    echo "      \"vendor_id\": \"$vendor_id\","
+    echo "      \"device_id\": \"$device_id\""
 done
 if [ $first -eq 0 ]; then echo "    }"; fi
 echo "  ],"
@@ -77,9 +118,20 @@ if command -v lspci >/dev/null 2>&1; then
     while IFS= read -r line; do
         if [ $gpu_count -gt 0 ]; then echo "    },"; fi
         echo "    {"
-        echo "      \"device\": \"$(echo "$line" | cut -d: -f3- | xargs)\""
+        # Extract device description and PCI IDs
+        device_desc=$(echo "$line" | sed 's/.*: //')
+        vendor_id=$(echo "$line" | grep -o '\[....:....\]' | tail -1 | sed 's/\[\(.*\):\(.*\)\]/\1/')
+        device_id=$(echo "$line" | grep -o '\[....:....\]' | tail -1 | sed 's/\[\(.*\):\(.*\)\]/\2/')
+        echo "      \"device\": \"$device_desc\","
+        if [ -n "$vendor_id" ] && [ -n "$device_id" ]; then
+            echo "      \"vendor_id\": \"$vendor_id\","
+            echo "      \"device_id\": \"$device_id\""
+        else
+            echo "      \"vendor_id\": \"\","
+            echo "      \"device_id\": \"\""
+        fi
         gpu_count=$((gpu_count + 1))
-    done < <(lspci | grep -E "VGA|3D|Display")
+    done < <(lspci -nn | grep -E "VGA|3D|Display")
     if [ $gpu_count -gt 0 ]; then echo "    }"; fi
 fi
 echo "  ],"
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Tests for scan upload admission control
+
+Run with: python3 test_admission.py
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import admission
+from admission import AdmissionController, Overloaded
+from inventory_manager import scan_fingerprint
+
+SCAN = {
+    'hostname': 'herd-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'SER1', 'size': '1TiB'}],
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _rejected(controller):
+    try:
+        with controller.admit():
+            return None
+    except Overloaded as e:
+        return e
+
+
+def test_token_bucket():
+    """A burst is admitted, then uploads are limited to the rate"""
+    print("Testing token bucket...")
+
+    clock = FakeClock()
+    controller = AdmissionController(concurrency=0, rate=2, burst=3, max_jitter=60, clock=clock)
+    assert [_rejected(controller) for _ in range(3)] == [None, None, None]
+
+    first = _rejected(controller)
+    assert first.status == 429 and first.reason == 'rate' and first.retry_after == 1, vars(first)
+    # Every host turned away widens the window the herd should spread over
+    for _ in range(39):
+        last = _rejected(controller)
+    assert last.jitter == 20, last.jitter
+    assert controller.max_jitter >= last.jitter
+
+    # Tokens come back at the rate, and the queue of waiting hosts drains
+    clock.now += 0.5
+    assert _rejected(controller) is None
+    try:
+        controller.check()
+        raise AssertionError("check() should see an empty bucket")
+    except Overloaded as e:
+        assert e.status == 429
+    clock.now += 60
+    controller.check()
+    assert _rejected(controller) is None
+
+    print("✅ Token bucket test passed")
+
+
+def test_concurrency_limit():
+    """Uploads beyond the limit wait briefly for a slot, then get 503"""
+    print("Testing concurrency limit...")
+
+    controller = AdmissionController(concurrency=1, rate=0, queue_timeout=0.1)
+    holding, release = threading.Event(), threading.Event()
+
+    def ingest():
+        with controller.admit():
+            holding.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=ingest)
+    worker.start()
+    holding.wait(5)
+    start = time.monotonic()
+    rejected = _rejected(controller)
+    assert rejected.status == 503 and rejected.reason == 'concurrency', vars(rejected)
+    assert 0.05 < time.monotonic() - start < 2
+    assert rejected.retry_after >= 1 and rejected.jitter >= 1
+
+    # A slot freed while waiting is taken instead
+    threading.Timer(0.05, release.set).start()
+    controller.queue_timeout = 2
+    assert _rejected(controller) is None
+    worker.join()
+
+    # A host that timed out waiting doesn't lose its token as well
+    controller = AdmissionController(concurrency=1, rate=1, burst=1, queue_timeout=0.05, clock=FakeClock())
+    controller._slots.acquire()
+    assert _rejected(controller).status == 503
+    controller._slots.release()
+    assert _rejected(controller) is None
+
+    print("✅ Concurrency limit test passed")
+
+
+def test_upload_busy_responses():
+    """Busy uploads get 429 with Retry-After and a jitter window"""
+    print("Testing busy upload responses...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        admission._controller = AdmissionController(concurrency=1, rate=0.01, burst=1)
+        try:
+            response = client.post('/api/upload_scan', json=SCAN)
+            assert response.status_code == 200, response.get_json()
+
+            response = client.post('/api/upload_scan', json=dict(SCAN, hostname='other-host'))
+            assert response.status_code == 429
+            assert int(response.headers['Retry-After']) > 1
+            assert int(response.headers['X-Inventory-Retry-Jitter']) >= 1
+            body = response.get_json()
+            assert body['status'] == 'busy' and body['retry_after'] == int(response.headers['Retry-After'])
+
+            # Handshakes take the write lock as well, so they are shed the same way
+            handshake = {'X-Inventory-Hostname': 'herd-host', 'If-None-Match': f'"{scan_fingerprint(SCAN)}"'}
+            response = client.post('/api/upload_scan', headers=handshake)
+            assert response.status_code == 429 and 'X-Inventory-Retry-Jitter' in response.headers
+            handshake['X-Inventory-Hostname'] = 'other-host'
+            assert client.post('/api/upload_scan', headers=handshake).status_code == 429
+
+            # Once admitted, an unchanged host is answered without an upload
+            admission._controller = AdmissionController(concurrency=1, rate=0)
+            handshake['X-Inventory-Hostname'] = 'herd-host'
+            assert client.post('/api/upload_scan', headers=handshake).status_code == 304
+
+            # A changed host's handshake and upload take one token between them
+            admission._controller = AdmissionController(concurrency=1, rate=0.01, burst=1)
+            handshake['If-None-Match'] = '"changed"'
+            response = client.post('/api/upload_scan', headers=handshake)
+            assert response.get_json()['status'] == 'upload_required', response.get_json()
+            changed = dict(SCAN, detection_date='2025-06-19T23:42:00+10:00')
+            assert client.post('/api/upload_scan', json=changed).status_code == 200
+            assert client.post('/api/upload_scan', json=changed).status_code == 429
+        finally:
+            admission._controller = None
+
+    print("✅ Busy upload response test passed")
+
+
+def test_scanner_backs_off():
+    """The /scan_system script waits out Retry-After and retries"""
+    print("Testing scanner retry...")
+
+    from werkzeug.serving import make_server
+
+    import web_interface
+    with tempfile.TemporaryDirectory() as tmp:
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        script = web_interface.app.test_client().get('/scan_system').get_data(as_text=True)
+        post_scan = re.search(r'^MAX_RETRIES=.*?^}\n', script, re.MULTILINE | re.DOTALL).group(0)
+
+        # One upload per second: the second host is turned away once
+        admission._controller = AdmissionController(concurrency=0, rate=1, burst=1, max_jitter=1)
+        server = make_server('127.0.0.1', 0, web_interface.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            statuses = []
+            for hostname in ('host-1', 'host-2'):
+                with open(os.path.join(tmp, 'hardware_data.json'), 'w') as f:
+                    json.dump(dict(SCAN, hostname=hostname), f)
+                result = subprocess.run(
+                    ['bash', '-c', post_scan + 'post_scan -H "Content-Type: application/json" '
+                                               '-d @hardware_data.json'],
+                    cwd=tmp, capture_output=True, text=True, timeout=30,
+                    env=dict(os.environ, SERVER_URL=f'http://127.0.0.1:{server.server_port}'))
+                statuses.append((result.stdout.strip(), result.stderr))
+        finally:
+            server.shutdown()
+            admission._controller = None
+
+        assert statuses[0] == ('200', ''), statuses
+        assert statuses[1][0] == '200' and 'Server busy (HTTP 429); retrying in' in statuses[1][1], statuses
+
+    print("✅ Scanner retry test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Admission Control Tests")
+    print("=" * 50)
+
+    tests = [
+        test_token_bucket,
+        test_concurrency_limit,
+        test_upload_busy_responses,
+        test_scanner_backs_off,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for fingerprinted, precompressed static assets
+
+Run with: python3 test_assets.py
+"""
+
+import gzip
+import os
+import re
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from assets import AssetManifest
+
+
+def test_manifest():
+    """Files get content-hashed names; stylesheets point at hashed images"""
+    print("Testing asset manifest...")
+
+    with tempfile.TemporaryDirectory() as static_dir:
+        os.makedirs(os.path.join(static_dir, 'css'))
+        with open(os.path.join(static_dir, 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG first')
+        css_path = os.path.join(static_dir, 'css', 'site.css')
+        with open(css_path, 'w') as f:
+            f.write("body { background: url('/static/logo.png'); }\n" + "p { color: #333; }\n" * 40)
+
+        manifest = AssetManifest(static_dir).build()
+        logo = manifest.url_path('logo.png')
+        assert re.fullmatch(r'logo\.[0-9a-f]{12}\.png', logo), logo
+        css = manifest.assets['css/site.css']
+        assert f"url('/static/{logo}')".encode() in css.body
+        assert gzip.decompress(css.encodings['gzip']) == css.body
+        assert not manifest.assets['logo.png'].encodings
+        assert manifest.resolve(css.hashed_name) == (css, True)
+        assert manifest.resolve('css/site.css') == (css, False)
+        assert manifest.url_path('missing.js') == 'missing.js'
+        assert not manifest.stale()
+
+        # Changing the image changes the stylesheet's name as well
+        with open(os.path.join(static_dir, 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG second, longer')
+        assert manifest.stale()
+        rebuilt = AssetManifest(static_dir).build()
+        assert rebuilt.url_path('logo.png') != logo
+        assert rebuilt.url_path('css/site.css') != css.hashed_name
+        # Pages rendered before the change still get the stylesheet, uncached
+        assert rebuilt.resolve(css.hashed_name) == (rebuilt.assets['css/site.css'], False)
+
+    print("✅ Asset manifest test passed")
+
+
+def test_static_responses():
+    """Pages link hashed assets served with long-lived cache headers"""
+    print("Testing static responses...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        web_interface.warm_up()
+        client = web_interface.app.test_client()
+
+        page = client.get('/').get_data(as_text=True)
+        assert '<style>' not in page
+        href = re.search(r'href="(/static/css/inventory\.[0-9a-f]{12}\.css)"', page).group(1)
+
+        response = client.get(href, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable', response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+        css = gzip.decompress(response.data).decode()
+        image = re.search(r"url\('(/static/background\.[0-9a-f]{12}\.jpg)'\)", css).group(1)
+
+        response = client.get(href, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+
+        response = client.get(image)
+        assert response.status_code == 200 and response.mimetype == 'image/jpeg'
+        assert 'immutable' in response.headers['Cache-Control'] and 'no-cache' not in response.headers['Cache-Control']
+        response.close()
+
+        # The scanner fetches the collector script by its plain name
+        response = client.get('/static/detect_hardware.sh')
+        assert response.status_code == 200 and response.headers['Cache-Control'] == 'no-cache'
+        response.close()
+        assert client.get('/static/../schema.sql').status_code == 404
+
+    print("✅ Static responses test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Asset Tests")
+    print("=" * 50)
+
+    tests = [
+        test_manifest,
+        test_static_responses,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
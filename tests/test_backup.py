@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for online database backups
+
+Run with: python3 test_backup.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backup import BackupError, BackupPolicy, backup_database, latest_backup, list_backups, open_backup
+from inventory_manager import HardwareInventory
+from reports import FleetReports
+
+
+def make_scan(hostname):
+    return {
+        'hostname': hostname,
+        'site': 'dc1',
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': f'{hostname}-D0',
+                     'size': '1TiB'}],
+    }
+
+
+def test_backup_while_writing():
+    """Writes during a stepped copy don't corrupt or block the snapshot"""
+    print("Testing backup during concurrent writes...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        inventory = HardwareInventory(db_path)
+        try:
+            for i in range(200):
+                inventory.update_system(make_scan(f'host{i:03}'))
+
+            writes = []
+
+            def write_between_steps(copied, total):
+                # Another connection keeps ingesting while the copy pauses
+                if len(writes) < 5:
+                    writes.append(inventory.update_system(make_scan(f'late{len(writes)}')))
+
+            policy = BackupPolicy(os.path.join(tmp, 'backups'), compress=False, pages=4, sleep=0)
+            result = backup_database(db_path, policy, progress=write_between_steps)
+            assert len(writes) == 5, writes
+            assert result['restarts'] >= 1, result
+            assert os.path.exists(result['path'])
+
+            snapshot = sqlite3.connect(result['path'])
+            assert snapshot.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+            assert snapshot.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+            hosts = snapshot.execute("SELECT COUNT(*) FROM systems").fetchone()[0]
+            snapshot.close()
+            assert 200 <= hosts <= 205, hosts
+        finally:
+            inventory.close()
+
+    print("✅ Backup during concurrent writes test passed")
+
+
+def test_compression_and_rotation():
+    """Compressed snapshots rotate and can be reported on"""
+    print("Testing compression and rotation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        inventory = HardwareInventory(db_path)
+        try:
+            inventory.update_system(make_scan('snap1'))
+        finally:
+            inventory.close()
+
+        backup_dir = os.path.join(tmp, 'backups')
+        policy = BackupPolicy(backup_dir, keep=2)
+        start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+        for day in range(4):
+            result = backup_database(db_path, policy, now=start + timedelta(days=day))
+        assert result['path'].endswith('-20250604T000000Z.db.gz'), result
+        assert len(list_backups(backup_dir)) == 2
+        assert latest_backup(backup_dir) == result['path']
+        assert len(result['rotated']) == 1
+
+        conn = open_backup(latest_backup(backup_dir))
+        try:
+            by_site = FleetReports(conn).storage_by_site()
+            assert by_site[0]['site'] == 'dc1' and by_site[0]['raw_bytes'] == 1024 ** 4, by_site
+            # Opening another snapshot replaces the expanded copy, which
+            # stays readable through connections already open
+            older = open_backup(list_backups(backup_dir)[1])
+            older.close()
+            assert FleetReports(conn).storage_by_site() == by_site
+        finally:
+            conn.close()
+        expanded_dir = os.path.join(backup_dir, '.expanded')
+        assert os.stat(expanded_dir).st_mode & 0o777 == 0o700
+        assert sorted(os.listdir(expanded_dir)) == ['.lock', os.path.basename(list_backups(backup_dir)[1])[:-3]]
+
+        # A directory others can write to is refused
+        os.chmod(expanded_dir, 0o777)
+        try:
+            open_backup(latest_backup(backup_dir))
+            raise AssertionError("a shared expansion directory should be refused")
+        except BackupError:
+            pass
+
+    print("✅ Compression and rotation test passed")
+
+
+def test_admin_endpoint():
+    """POST /admin/backup writes a snapshot that /reports can use"""
+    print("Testing /admin/backup...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        os.environ['INVENTORY_BACKUP_DIR'] = os.path.join(tmp, 'backups')
+        try:
+            client = web_interface.app.test_client()
+            client.post('/api/upload_scan', json=make_scan('web1'))
+
+            page = client.get('/reports?source=backup').get_data(as_text=True)
+            assert 'No backup available' in page
+
+            response = client.post('/admin/backup')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            assert response.get_json()['path'].endswith('.db.gz')
+
+            page = client.get('/reports?source=backup').get_data(as_text=True)
+            assert 'Showing data from backup' in page and 'dc1' in page, page
+        finally:
+            del os.environ['INVENTORY_BACKUP_DIR']
+
+    print("✅ /admin/backup test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Backup Tests")
+    print("=" * 50)
+
+    tests = [
+        test_backup_while_writing,
+        test_compression_and_rotation,
+        test_admin_endpoint,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
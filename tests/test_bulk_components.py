@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk component operations
+
+Run with: python3 test_bulk_components.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+
+SCAN = {
+    'hostname': 'rack1-node1',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'storage': [{'device': f'/dev/sd{letter}', 'model': 'WDC WD40EZRZ-00GXCB0', 'serial': f'WD-{letter}',
+                 'size': '3.6TiB'} for letter in 'abc'],
+}
+
+
+def statuses(inventory):
+    return dict(inventory.conn.execute("SELECT serial_number, status FROM components").fetchall())
+
+
+def test_bulk_operations():
+    """Selections by id and by filter, applied in one transaction"""
+    print("Testing bulk operations...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.update_system(SCAN)
+            spare_ids = [inventory.add_spare_component('gpu', 'NVIDIA', 'RTX 3060', f'GPU{i}', 'shelf A')
+                         for i in range(3)]
+
+            # Retiring installed disks removes them from the system
+            summary = inventory.bulk_update_components('retire', filters={'location': 'rack1-node1',
+                                                                          'type': 'storage'})
+            assert (summary['matched'], summary['updated'], summary['unlinked']) == (3, 3, 3), summary
+            assert inventory.get_system_details('rack1-node1')['components'] == []
+            assert statuses(inventory)['WD-a'] == 'retired'
+
+            # Dry runs count without changing anything
+            summary = inventory.bulk_update_components('delete', ids=spare_ids[:2], dry_run=True)
+            assert summary['matched'] == 2 and summary['deleted'] == 0
+            assert len(statuses(inventory)) == 6
+
+            summary = inventory.bulk_update_components('set-location', ids=spare_ids, value='shelf B')
+            assert summary['updated'] == 3
+            summary = inventory.bulk_update_components('delete', ids=spare_ids[:2])
+            assert summary['deleted'] == 2 and len(statuses(inventory)) == 4
+
+            # The selection is fixed before the update changes what filters match
+            summary = inventory.bulk_update_components('set-status', filters={'status': 'retired'},
+                                                       value='spare')
+            assert summary['updated'] == 3, summary
+
+            for bad in (lambda: inventory.bulk_update_components('delete'),
+                        lambda: inventory.bulk_update_components('set-status', ids=[1], value='lost'),
+                        lambda: inventory.bulk_update_components('explode', ids=[1])):
+                try:
+                    bad()
+                    assert False, "expected ValueError"
+                except ValueError:
+                    pass
+        finally:
+            inventory.close()
+
+    print("✅ Bulk operations test passed")
+
+
+def test_bulk_endpoint():
+    """POST /components/bulk returns a summary"""
+    print("Testing /components/bulk...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        client.post('/api/upload_scan', json=SCAN)
+
+        response = client.post('/components/bulk', json={'action': 'retire',
+                                                          'filter': {'search': 'WD-'}})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.get_json()['updated'] == 3
+
+        response = client.post('/components/bulk', json={'action': 'delete'})
+        assert response.status_code == 400
+
+        page = client.get('/components').get_data(as_text=True)
+        assert 'name="component-id"' in page and 'bulkAction' in page
+
+    print("✅ /components/bulk test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Bulk Component Tests")
+    print("=" * 50)
+
+    tests = [
+        test_bulk_operations,
+        test_bulk_endpoint,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Tests for live change events and the /events stream
+
+Run with: python3 test_change_events.py
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Add src directory to path
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from change_events import EventBroker, latest_event_id
+from inventory_manager import HardwareInventory
+
+
+def make_scan(hostname, serial='SER1'):
+    return {
+        'hostname': hostname,
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': serial, 'size': '1TiB'}],
+    }
+
+
+def read_until(stream, kind, timeout=5.0):
+    """Messages from a stream until one of the given kind arrives"""
+    received = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        batch = stream.read(timeout=0.5)
+        if batch is None:
+            return received + [(None, 'reload', '{}')]
+        received.extend(batch)
+        if any(message[1] == kind for message in batch):
+            return received
+    raise AssertionError(f"no {kind} event in {received}")
+
+
+def test_broadcast():
+    """Writes reach every stream once, with counts recomputed per batch"""
+    print("Testing event broadcast...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        inventory = HardwareInventory(db_path)
+        broker = EventBroker(db_path, poll_interval=0.05)
+        try:
+            first, second = broker.subscribe(), broker.subscribe()
+            fingerprint = inventory.update_system(make_scan('host-a'))['fingerprint']
+
+            for stream in (first, second):
+                messages = read_until(stream, 'counts')
+                kinds = [kind for _id, kind, _data in messages]
+                assert kinds == ['scan', 'counts'], kinds
+                scan = json.loads(messages[0][2])
+                assert scan['hostname'] == 'host-a' and scan['new'] and scan['component_count'] == 1
+                counts = json.loads(messages[1][2])
+                assert counts == {'systems': 1, 'components': {'storage': {'installed': 1, 'spare': 0,
+                                                                           'retired': 0}}}, counts
+
+            # An unchanged rescan only moves last_scan; no counts follow
+            assert inventory.touch_unchanged_scan('host-a', fingerprint, '2025-06-19T00:00:00+10:00')
+            messages = read_until(first, 'scan')
+            assert [kind for _id, kind, _data in messages] == ['scan']
+            assert first.read(timeout=0.3) == []
+
+            # Missed events are replayed from the buffer; a broker that never
+            # saw them tells the viewer to reload
+            latest = latest_event_id(inventory.conn)
+            late = broker.subscribe(since=latest - 1)
+            assert [kind for _id, kind, _data in late.read(timeout=0.5)] == ['scan']
+            restarted = EventBroker(db_path)
+            stale = restarted.subscribe(since=latest - 1)
+            assert stale.read(timeout=0.5) is None
+            stale.close()
+            restarted.close()
+            for stream in (first, second, late):
+                stream.close()
+        finally:
+            broker.close()
+            inventory.close()
+
+    print("✅ Event broadcast test passed")
+
+
+def test_pages_subscribe():
+    """Dashboard and systems pages start live updates from the current event"""
+    print("Testing live page markup...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        client.post('/api/upload_scan', json=make_scan('host-a'))
+
+        inventory = HardwareInventory(web_interface.app.config['DATABASE'])
+        latest = latest_event_id(inventory.conn)
+        inventory.close()
+        for path in ('/', '/systems'):
+            page = client.get(path).get_data(as_text=True)
+            assert f'/events?since={latest}' in page, page
+        assert 'data-hostname="host-a"' in client.get('/systems').get_data(as_text=True)
+
+    print("✅ Live page markup test passed")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_stream_does_not_hold_worker():
+    """An open stream leaves a single-thread worker free for other requests"""
+    print("Testing /events on the prefork server...")
+
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, INVENTORY_DB=os.path.join(tmp, 'inventory.db'), INVENTORY_EVENTS_POLL_MS='50')
+        proc = subprocess.Popen(
+            [sys.executable, 'web_interface.py', '--host', '127.0.0.1', '--port', str(port),
+             '--workers', '1', '--threads', '1'],
+            cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    urllib.request.urlopen(f'{base}/health/ready', timeout=2).close()
+                    break
+                except OSError:
+                    assert time.monotonic() < deadline, "server did not become ready"
+                    time.sleep(0.2)
+
+            stream = urllib.request.urlopen(f'{base}/events', timeout=10)
+            assert stream.headers['Content-Type'].startswith('text/event-stream')
+            assert stream.readline() == b'retry: 5000\n'
+
+            request = urllib.request.Request(f'{base}/api/upload_scan', method='POST',
+                                             data=json.dumps(make_scan('host-b')).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                assert response.status == 200
+
+            lines = []
+            while b'event: counts\n' not in lines:
+                lines.append(stream.readline())
+            assert b'event: scan\n' in lines, lines
+            scan = next(line for line in lines if line.startswith(b'data: {"hostname"'))
+            assert json.loads(scan[len(b'data: '):])['hostname'] == 'host-b'
+
+            # Shutdown ends open streams instead of waiting out the drain timeout
+            start = time.monotonic()
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=20)
+            assert time.monotonic() - start < 10
+            stream.close()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+    print("✅ Prefork /events test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Change Event Tests")
+    print("=" * 50)
+
+    tests = [
+        test_broadcast,
+        test_pages_subscribe,
+        test_stream_does_not_hold_worker,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
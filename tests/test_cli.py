@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the inventory_manager command line
+
+Run with: python3 test_cli.py
+"""
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add src directory to path
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from inventory_manager import HardwareInventory, schema_version
+
+
+def run_cli(*args):
+    result = subprocess.run([sys.executable, os.path.join(SRC_DIR, 'inventory_manager.py'), *args],
+                            capture_output=True, text=True, cwd=SRC_DIR)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def make_inventory(db_path, spares=30):
+    inventory = HardwareInventory(db_path)
+    try:
+        for i in range(spares):
+            inventory.add_spare_component('storage', 'Samsung', f'SSD {i:02}', f'SER{i:02}')
+        inventory.add_spare_component('gpu', 'NVIDIA', 'RTX 3060', 'GPU1')
+    finally:
+        inventory.close()
+
+
+def test_fast_start():
+    """Opening a current database neither loads pci.ids nor reapplies the schema"""
+    print("Testing fast start...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        make_inventory(db_path)
+
+        inventory = HardwareInventory(db_path)
+        try:
+            with open(os.path.join(SRC_DIR, '..', 'schema.sql')) as f:
+                expected = schema_version(f.read())
+            assert inventory.conn.execute("PRAGMA user_version").fetchone()[0] == expected
+            assert inventory.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+            rows = inventory.iter_components('storage', limit=5)
+            assert not isinstance(rows, list)
+            assert [row['model'] for row in rows] == [f'SSD {i:02}' for i in range(5)]
+            assert not inventory._pci_lookup_loaded
+        finally:
+            inventory.close()
+
+    print("✅ Fast start test passed")
+
+
+def test_output_formats():
+    """list and show stream JSON and CSV, honouring --limit"""
+    print("Testing output formats...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        make_inventory(db_path)
+
+        rows = json.loads(run_cli('list', '--db', db_path, '--format', 'json'))
+        assert len(rows) == 31 and rows[0]['component_type'] == 'gpu'
+
+        output = run_cli('list', '--db', db_path, '--type', 'storage', '--format', 'csv', '--limit', '3')
+        rows = list(csv.DictReader(io.StringIO(output)))
+        assert [row['serial_number'] for row in rows] == ['SER00', 'SER01', 'SER02'], rows
+
+        assert json.loads(run_cli('list', '--db', db_path, '--type', 'cpu', '--format', 'json')) == []
+        assert json.loads(run_cli('show', '--db', db_path, '--format', 'json')) == []
+
+        output = run_cli('list', '--db', db_path, '--limit', '2')
+        assert 'GPU:' in output and 'SSD 00' in output and 'SSD 01' not in output, output
+
+    print("✅ Output formats test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running CLI Tests")
+    print("=" * 50)
+
+    tests = [
+        test_fast_start,
+        test_output_formats,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Tests for archiving cold components
+
+Run with: python3 test_component_archive.py
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from component_archive import ComponentArchivePolicy
+from inventory_manager import HardwareInventory
+
+POLICY = ComponentArchivePolicy(retired_days=0, unseen_days=365)
+
+
+def make_scan(hostname, serials, detection_date=None):
+    return {
+        'hostname': hostname,
+        'detection_date': detection_date or datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'memory': {'slots': [{'slot': f'DIMM{index}', 'size': '16 GB', 'type': 'DDR4', 'manufacturer': 'Samsung',
+                              'serial': serial} for index, serial in enumerate(serials)]},
+    }
+
+
+def cold_inventory(tmp):
+    """A live host, a host last scanned two years ago, a spare and a retired part"""
+    inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+    inventory.update_system(make_scan('live-host', ['LIVE1']))
+    inventory.update_system(make_scan('old-host', [], '2023-01-10T09:00:00+00:00'))
+    # Inserted directly: the update trigger would reset an old updated_at
+    cursor = inventory.conn.execute("""
+        INSERT INTO components (component_type, model, serial_number, specifications, status, location,
+                                created_at, updated_at)
+        VALUES ('memory', 'DDR4 16 GB', 'OLD1', '{"size": "16 GB"}', 'installed', 'old-host',
+                '2023-01-10 09:00:00', '2023-01-10 09:00:00')
+    """)
+    inventory.conn.execute("INSERT INTO system_components (system_id, component_id) VALUES "
+                           "((SELECT id FROM systems WHERE hostname = 'old-host'), ?)", (cursor.lastrowid,))
+    inventory.conn.commit()
+    inventory.add_spare_component('cpu', 'AMD', 'EPYC 7302', 'SPARE1')
+    retired = inventory.add_spare_component('cpu', 'Intel', 'Xeon E5-2680', 'RET1')
+    inventory.bulk_update_components('retire', ids=[retired])
+    return inventory
+
+
+def serials(inventory, table):
+    return sorted(row[0] for row in inventory.conn.execute(f"SELECT serial_number FROM {table}"))
+
+
+def test_archive_and_restore():
+    """Cold rows move out, stay listable, and come back by hand or by scan"""
+    print("Testing component archive...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = cold_inventory(tmp)
+        summary = inventory.archive_components(POLICY, dry_run=True)
+        assert summary == {'retired': 1, 'unseen': 1, 'unlinked': 0}, summary
+        assert len(serials(inventory, 'archived_components')) == 0
+
+        summary = inventory.archive_components(POLICY)
+        assert summary == {'retired': 1, 'unseen': 1, 'unlinked': 1}, summary
+        assert inventory.history.state_at('old-host', '2030-01-01T00:00:00+00:00')['components'] == []
+        assert serials(inventory, 'components') == ['LIVE1', 'SPARE1']
+        assert serials(inventory, 'archived_components') == ['OLD1', 'RET1']
+        listed = {row['serial_number']: row['archived_at'] for row in
+                  inventory.iter_components(include_archived=True)}
+        assert set(listed) == {'LIVE1', 'SPARE1', 'OLD1', 'RET1'} and listed['RET1'] and not listed['LIVE1']
+        assert inventory.archive_components(POLICY) == {'retired': 0, 'unseen': 0, 'unlinked': 0}
+
+        # Restored by hand, and not archived again straight away
+        retired_id = inventory.conn.execute(
+            "SELECT id FROM archived_components WHERE serial_number = 'RET1'").fetchone()[0]
+        assert inventory.restore_components([retired_id]) == {'restored': 1, 'skipped': 0}
+        assert inventory.conn.execute("SELECT status FROM components WHERE id = ?",
+                                      (retired_id,)).fetchone()[0] == 'retired'
+        assert inventory.archive_components(ComponentArchivePolicy(retired_days=30))['retired'] == 0
+
+        # The old host comes back: its DIMM keeps its id
+        old_id = inventory.conn.execute(
+            "SELECT id FROM archived_components WHERE serial_number = 'OLD1'").fetchone()[0]
+        inventory.update_system(make_scan('old-host', ['OLD1']))
+        assert inventory.conn.execute("SELECT COUNT(*) FROM archived_components").fetchone()[0] == 0
+        assert inventory.conn.execute("""
+            SELECT s.hostname FROM system_components sc JOIN systems s ON s.id = sc.system_id
+            WHERE sc.component_id = ?""", (old_id,)).fetchone()[0] == 'old-host'
+
+        # A part re-added under the same serial blocks the restore
+        inventory.archive_components(POLICY)
+        inventory.add_spare_component('cpu', 'Intel', 'Xeon E5-2680', 'RET1')
+        assert inventory.restore_components([retired_id]) == {'restored': 0, 'skipped': 1}
+        inventory.close()
+
+    print("✅ Component archive test passed")
+
+
+def test_archived_rows_kept_consistent():
+    """Manufacturer merges reach archived rows; imports can't reuse their serials"""
+    print("Testing archived rows in merges and imports...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = cold_inventory(tmp)
+        inventory.archive_components(POLICY)
+        names = inventory.manufacturer_dictionary()
+        assert names.merge('Intel', 'AMD') == 1
+        inventory.conn.commit()
+        retired_id = inventory.conn.execute(
+            "SELECT id FROM archived_components WHERE serial_number = 'RET1'").fetchone()[0]
+        inventory.restore_components([retired_id])
+        assert inventory.conn.execute("""
+            SELECT m.name FROM components c JOIN manufacturers m ON m.id = c.manufacturer_id WHERE c.id = ?
+        """, (retired_id,)).fetchone()[0] == names.resolve('AMD')[1]
+
+        rejects = io.StringIO()
+        record = {'type': 'memory', 'make': 'Samsung', 'Part': 'DDR4 16 GB', 'sn': 'OLD1'}
+        summary = inventory.import_spares(io.StringIO(json.dumps(record) + '\n'), 'ndjson', rejects=rejects)
+        assert (summary['imported'], summary['duplicates']) == (0, 1), summary
+        assert 'archived' in json.loads(rejects.getvalue())['import_error']
+        inventory.close()
+
+    print("✅ Archived rows in merges and imports test passed")
+
+
+def test_web_archived_components():
+    """The components page lists archived parts on request and restores them"""
+    print("Testing archived components on the web...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        inventory = cold_inventory(tmp)
+        inventory.archive_components(POLICY)
+        client = web_interface.app.test_client()
+
+        page = client.get('/components').get_data(as_text=True)
+        assert 'EPYC 7302' in page and 'Xeon E5-2680' not in page
+        page = client.get('/components?archived=1&type=cpu').get_data(as_text=True)
+        assert 'Xeon E5-2680' in page and 'restoreComponent(' in page and 'DDR4' not in page
+
+        retired_id = inventory.conn.execute(
+            "SELECT id FROM archived_components WHERE serial_number = 'RET1'").fetchone()[0]
+        summary = client.post('/components/restore', json={'ids': [retired_id]}).get_json()
+        assert summary['status'] == 'success' and summary['restored'] == 1, summary
+        assert 'Xeon E5-2680' in client.get('/components').get_data(as_text=True)
+        assert client.post('/components/restore', json={'ids': ['x']}).status_code == 400
+
+        # An unseen part lost its link when archived, so it comes back a spare
+        old_id = inventory.conn.execute(
+            "SELECT id FROM archived_components WHERE serial_number = 'OLD1'").fetchone()[0]
+        assert client.post('/components/restore', json={'ids': [old_id]}).get_json()['restored'] == 1
+        assert tuple(inventory.conn.execute("SELECT status, location FROM components WHERE id = ?",
+                                            (old_id,)).fetchone()) == ('spare', None)
+        assert inventory.check_consistency(full=True)['open'] == 0
+        inventory.close()
+
+    print("✅ Archived components web test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Component Archive Tests")
+    print("=" * 50)
+
+    tests = [
+        test_archive_and_restore,
+        test_archived_rows_kept_consistent,
+        test_web_archived_components,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for point-in-time reconstruction of system hardware
+
+Run with: python3 test_component_history.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+
+
+def make_scan(day: int, disks):
+    moment = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=day)
+    return {
+        'hostname': 'history-host',
+        'detection_date': moment.isoformat(),
+        'cpu': {'model': 'AMD Ryzen 5 3600 6-Core Processor', 'cores': '12'},
+        'storage': [{'device': f'/dev/sd{chr(97 + i)}', 'model': 'Samsung SSD 870',
+                     'serial': serial, 'size': '1.8TiB'} for i, serial in enumerate(disks)],
+    }
+
+
+def serials_at(inventory, at):
+    details = inventory.get_system_at('history-host', at)
+    return sorted(c['serial_number'] for c in details['components'] if c['component_type'] == 'storage')
+
+
+def test_point_in_time():
+    """Each date shows the disks installed then"""
+    print("Testing point-in-time reconstruction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        inventory.history.snapshot_interval = 3
+        try:
+            inventory.update_system(make_scan(0, ['D1', 'D2']))
+            inventory.update_system(make_scan(10, ['D1', 'D2']))
+            inventory.update_system(make_scan(20, ['D1', 'D3']))
+            inventory.update_system(make_scan(30, ['D3', 'D4', 'D5']))
+
+            assert inventory.get_system_at('history-host', '2024-12-31T00:00:00+00:00')['components'] == []
+            assert serials_at(inventory, '2025-01-05T00:00:00+00:00') == ['D1', 'D2']
+            assert serials_at(inventory, '2025-01-21T00:00:00+00:00') == ['D1', 'D3']
+            assert serials_at(inventory, '2025-02-15T00:00:00+00:00') == ['D3', 'D4', 'D5']
+
+            # Snapshots bound how many deltas have to be replayed
+            snapshots = inventory.conn.execute("SELECT COUNT(*) FROM system_snapshots").fetchone()[0]
+            assert snapshots >= 2, snapshots
+            latest = inventory.get_system_at('history-host', '2025-02-15T00:00:00+00:00')
+            assert latest['deltas_applied'] < 3, latest
+            assert inventory.get_system_at('missing-host', '2025-02-15T00:00:00+00:00') is None
+        finally:
+            inventory.close()
+
+    print("✅ Point-in-time reconstruction test passed")
+
+
+def test_unlinked_outside_scans():
+    """Deletes and bulk actions between scans show up in the history"""
+    print("Testing unlinks outside scans...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.update_system(make_scan(0, ['D1', 'D2', 'D3']))
+            # Scanned before history was kept
+            inventory.conn.execute("DELETE FROM component_history")
+            inventory.conn.commit()
+            ids = dict(inventory.conn.execute(
+                "SELECT serial_number, id FROM components WHERE component_type = 'storage'").fetchall())
+
+            assert inventory.delete_component(ids['D1'])
+            inventory.bulk_update_components('retire', ids=[ids['D2']])
+            now = datetime.now(timezone.utc).isoformat()
+            assert serials_at(inventory, now) == ['D3']
+            assert serials_at(inventory, '2025-01-05T00:00:00+00:00') == ['D1', 'D2', 'D3']
+            snapshot = inventory.conn.execute("SELECT taken_at FROM system_snapshots").fetchone()[0]
+            assert snapshot == '2025-01-01T00:00:00+00:00', snapshot
+
+            inventory.delete_system(inventory.get_system_id_by_hostname('history-host'))
+            assert inventory.history.state_at('history-host', now)['components'] == []
+        finally:
+            inventory.close()
+
+    print("✅ Unlinks outside scans test passed")
+
+
+def test_web_view():
+    """/system/<hostname>?at= renders the historical component set"""
+    print("Testing as-of web view...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        client.post('/api/upload_scan', json=make_scan(0, ['OLD1']))
+        client.post('/api/upload_scan', json=make_scan(10, ['NEW1']))
+
+        page = client.get('/system/history-host?at=2025-01-05T00:00').get_data(as_text=True)
+        assert 'OLD1' in page and 'NEW1' not in page
+        page = client.get('/system/history-host').get_data(as_text=True)
+        assert 'NEW1' in page and 'OLD1' not in page
+        assert client.get('/system/history-host?at=yesterday').status_code == 400
+
+    print("✅ As-of web view test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Component History Tests")
+    print("=" * 50)
+
+    tests = [
+        test_point_in_time,
+        test_unlinked_outside_scans,
+        test_web_view,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Tests for the inventory consistency checker
+
+Run with: python3 test_consistency.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from reports import FleetReports
+
+
+def make_scan(hostname, serials, day=18):
+    return {
+        'hostname': hostname,
+        'detection_date': f'2025-06-{day}T23:42:00+10:00',
+        'memory': {'slots': [{'slot': f'DIMM{index}', 'size': '16 GB', 'type': 'DDR4', 'manufacturer': 'Samsung',
+                              'serial': serial} for index, serial in enumerate(serials)]},
+    }
+
+
+def broken_inventory(tmp):
+    """Two hosts sharing a DIMM, plus an orphaned component and a dangling link"""
+    inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+    inventory.update_system(make_scan('host-a', ['A1', 'MOVED']))
+    # The DIMM moved to host-b; host-a hasn't been rescanned since
+    inventory.update_system(make_scan('host-b', ['B1', 'MOVED']))
+    inventory.conn.execute("""INSERT INTO components (component_type, model, serial_number, status, location)
+                              VALUES ('cpu', 'EPYC 7302', 'ORPHAN', 'installed', 'host-gone')""")
+    inventory.conn.execute("INSERT INTO system_components (system_id, component_id) VALUES (999, 1)")
+    inventory.conn.commit()
+    return inventory
+
+
+def settle(inventory):
+    """Move the last check a second later than the writes before it
+
+    The watermark includes its own second, since updated_at has one-second
+    resolution; without this every row written in the test is rechecked.
+    """
+    inventory.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'consistency_checked_at'")
+    inventory.conn.commit()
+
+
+def found(inventory):
+    return sorted((row[0], row[1]) for row in inventory.conn.execute("""
+        SELECT i.check_name, c.serial_number FROM consistency_issues i
+        LEFT JOIN components c ON c.id = i.component_id"""))
+
+
+def test_full_check():
+    """A first check looks at everything and records each problem"""
+    print("Testing full consistency check...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = broken_inventory(tmp)
+        summary = inventory.check_consistency()
+        assert summary['full'] and summary['components_checked'] == 4, summary
+        assert summary['found'] == {'duplicate-serial': 2, 'installed-unlinked': 1, 'dangling-link': 1,
+                                    'location-mismatch': 1}, summary
+        assert found(inventory) == [('dangling-link', 'A1'), ('duplicate-serial', 'MOVED'),
+                                    ('duplicate-serial', 'MOVED'), ('installed-unlinked', 'ORPHAN'),
+                                    ('location-mismatch', 'MOVED')], found(inventory)
+
+        # Nothing changed, so the next check has nothing to look at
+        settle(inventory)
+        summary = inventory.check_consistency()
+        assert not summary['full'] and summary['components_checked'] == 0 and summary['open'] == 5, summary
+        inventory.close()
+
+    print("✅ Full consistency check test passed")
+
+
+def test_incremental_check():
+    """Later checks scope only changed rows and keep the other issues"""
+    print("Testing incremental consistency check...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = broken_inventory(tmp)
+        inventory.check_consistency()
+        settle(inventory)
+        time.sleep(1.1)
+
+        # Rescanning host-a drops its link to the moved DIMM
+        inventory.update_system(make_scan('host-a', ['A1'], day=19))
+        summary = inventory.check_consistency()
+        assert not summary['full'] and summary['components_checked'] == 2, summary
+        assert summary['found']['duplicate-serial'] == summary['found']['location-mismatch'] == 0, summary
+        assert found(inventory) == [('dangling-link', 'A1'), ('installed-unlinked', 'ORPHAN')], found(inventory)
+
+        # Deleting a component resolves its issues without a full check
+        inventory.conn.execute("DELETE FROM components WHERE serial_number = 'ORPHAN'")
+        inventory.conn.commit()
+        inventory.check_consistency()
+        assert found(inventory) == [('dangling-link', 'A1')], found(inventory)
+        assert inventory.check_consistency(full=True)['open'] == 1
+        inventory.close()
+
+    print("✅ Incremental consistency check test passed")
+
+
+def test_repair():
+    """Repair keeps the newest link and makes the rest consistent"""
+    print("Testing consistency repair...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = broken_inventory(tmp)
+        inventory.close()
+
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        assert "hasn't been checked yet" in client.get('/consistency').get_data(as_text=True)
+
+        response = client.post('/consistency/check', json={'repair': True})
+        summary = response.get_json()
+        assert summary['repaired'] == {'issues': 5, 'links_removed': 2, 'relocated': 0, 'made_spare': 1}, summary
+        assert summary['open'] == 0, summary
+        assert 'No open issues' in client.get('/consistency').get_data(as_text=True)
+
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        rows = dict(inventory.conn.execute("""
+            SELECT c.serial_number, c.status || ' ' || COALESCE(s.hostname, '-') FROM components c
+            LEFT JOIN system_components sc ON sc.component_id = c.id LEFT JOIN systems s ON s.id = sc.system_id
+        """).fetchall())
+        assert rows == {'A1': 'installed host-a', 'MOVED': 'installed host-b', 'B1': 'installed host-b',
+                        'ORPHAN': 'spare -'}, rows
+        removed = inventory.conn.execute("""
+            SELECT h.hostname FROM component_history h JOIN components c ON c.id = h.component_id
+            WHERE h.change = 'removed' AND c.serial_number = 'MOVED'
+        """).fetchall()
+        assert [tuple(row) for row in removed] == [('host-a',)], removed
+        event = inventory.conn.execute("SELECT kind, data FROM change_events ORDER BY id DESC").fetchone()
+        assert event[0] == 'bulk' and json.loads(event[1])['action'] == 'repair'
+        inventory.close()
+
+    # The CLI prints issues in the usual formats
+    with tempfile.TemporaryDirectory() as tmp:
+        broken_inventory(tmp).close()
+        script = os.path.join(os.path.dirname(__file__), '..', 'src', 'inventory_manager.py')
+        result = subprocess.run([sys.executable, script, 'check', '--format', 'json', '--db',
+                                 os.path.join(tmp, 'inventory.db')], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        issues = json.loads(result.stdout)
+        assert len(issues) == 5 and {issue['check_name'] for issue in issues} >= {'dangling-link'}
+
+    print("✅ Consistency repair test passed")
+
+
+def test_repair_invalidates_reports():
+    """Links removed by a repair show up in cached reports"""
+    print("Testing repair and cached reports...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        disk = {'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'DISK1', 'size': '1 TB'}
+        for hostname in ('host-a', 'host-b'):
+            inventory.update_system({'hostname': hostname, 'detection_date': '2025-06-18T23:42:00+10:00',
+                                     'storage': [disk]})
+        assert FleetReports(inventory.conn).storage_by_site()[0]['disks'] == 2
+
+        inventory.check_consistency(repair=True)
+        inventory.conn.commit()
+        reports = FleetReports(inventory.conn)
+        assert reports.storage_by_site()[0]['disks'] == 1 and not reports.from_cache
+
+        # A dangling link leaves no history, but is still a write
+        generation = reports.write_generation()
+        inventory.conn.execute("INSERT INTO system_components (system_id, component_id) VALUES (999, 1)")
+        inventory.check_consistency(full=True, repair=True)
+        assert reports.write_generation() > generation
+        inventory.close()
+
+    print("✅ Repair and cached reports test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Consistency Checker Tests")
+    print("=" * 50)
+
+    tests = [
+        test_full_check,
+        test_incremental_check,
+        test_repair,
+        test_repair_invalidates_reports,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
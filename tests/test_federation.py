@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for federated queries across site databases
+
+Run with: python3 test_federation.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from federation import Federation, parse_sites
+from inventory_manager import HardwareInventory
+
+
+def make_scan(hostname, serial):
+    return {
+        'hostname': hostname,
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': serial, 'size': '1TiB'}],
+    }
+
+
+def make_site(path, hostname, serial):
+    inventory = HardwareInventory(path)
+    try:
+        inventory.update_system(make_scan(hostname, serial))
+    finally:
+        inventory.close()
+
+
+def test_parse_sites():
+    """INVENTORY_SITES parsing"""
+    print("Testing site parsing...")
+
+    assert parse_sites('dc1=/a.db, dc2=/b.db') == {'dc1': '/a.db', 'dc2': '/b.db'}
+    assert parse_sites('') == {}
+    try:
+        parse_sites('dc1')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    print("✅ Site parsing test passed")
+
+
+def test_fan_out():
+    """Rows from every site are merged; a broken site only reports an error"""
+    print("Testing federated fan-out...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local, dc2 = os.path.join(tmp, 'local.db'), os.path.join(tmp, 'dc2.db')
+        make_site(local, 'host-a', 'SER-A')
+        make_site(dc2, 'host-b', 'SER-B')
+
+        federation = Federation(local, 'dc1', {'dc1': local, 'dc2': dc2,
+                                               'dc3': os.path.join(tmp, 'missing.db')})
+        assert list(federation.sites) == ['dc1', 'dc2', 'dc3']
+
+        result = federation.query("SELECT hostname FROM systems")
+        assert sorted((row['site'], row['hostname']) for row in result.rows) == \
+            [('dc1', 'host-a'), ('dc2', 'host-b')], result.rows
+        assert list(result.errors) == ['dc3'], result.errors
+
+        result = federation.query("SELECT hostname FROM systems", site='dc2')
+        assert [row['hostname'] for row in result.rows] == ['host-b'] and not result.errors
+
+        # Sites are read-only through the federation
+        result = federation.query("DELETE FROM systems", site='dc2')
+        assert 'dc2' in result.errors
+
+    print("✅ Federated fan-out test passed")
+
+
+def test_web_views():
+    """Dashboard, systems, components and detail pages merge sites"""
+    print("Testing federated web views...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        local, dc2 = os.path.join(tmp, 'local.db'), os.path.join(tmp, 'dc2.db')
+        make_site(local, 'host-a', 'SER-A')
+        make_site(dc2, 'host-b', 'SER-B')
+        web_interface.app.config['DATABASE'] = local
+        web_interface.app.config['SITES'] = {'dc2': dc2, 'dc3': os.path.join(tmp, 'missing.db')}
+        try:
+            client = web_interface.app.test_client()
+
+            page = client.get('/systems').get_data(as_text=True)
+            assert 'host-a' in page and 'host-b' in page
+            assert 'Site dc3 unavailable' in page
+
+            page = client.get('/systems?site=dc2').get_data(as_text=True)
+            assert 'host-b' in page and 'host-a' not in page
+
+            page = client.get('/components?q=SER-B').get_data(as_text=True)
+            assert 'SER-B' in page and 'SER-A' not in page
+
+            page = client.get('/').get_data(as_text=True)
+            assert 'data-count="systems">2</div>' in page, page
+
+            page = client.get('/system/host-b?site=dc2').get_data(as_text=True)
+            assert 'SER-B' in page and 'read-only' in page
+            assert client.get('/system/host-b').status_code == 404
+            response = client.get('/system/host-b?site=<script>alert(1)</script>')
+            assert response.status_code == 404 and b'<script>' not in response.data
+            response = client.get('/system/host-b?site=dc3')
+            assert response.status_code == 503 and 'Site dc3 unavailable' in response.get_data(as_text=True)
+        finally:
+            web_interface.app.config['SITES'] = {}
+
+    print("✅ Federated web views test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Federation Tests")
+    print("=" * 50)
+
+    tests = [
+        test_parse_sites,
+        test_fan_out,
+        test_web_views,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tests for the hardware change agent
+
+Run with: python3 test_hardware_agent.py
+"""
+
+import copy
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import hardware_agent
+from inventory_manager import HardwareInventory, scan_fingerprint
+
+SCAN = {
+    'hostname': 'agent-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'cpu': {'model': 'AMD EPYC 7302', 'cores': '32', 'threads_per_core': '2', 'sockets': '1'},
+    'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'SER1', 'size': '1TiB'}],
+}
+
+
+def test_fingerprint_and_uevents():
+    """The agent's fingerprint is the server's; only device events wake it"""
+    print("Testing fingerprint and uevent parsing...")
+
+    assert hardware_agent.scan_fingerprint(SCAN) == scan_fingerprint(SCAN)
+    rescanned = dict(SCAN, detection_date='2025-06-19T00:00:00+10:00')
+    assert hardware_agent.scan_fingerprint(rescanned) == hardware_agent.scan_fingerprint(SCAN)
+
+    fields = hardware_agent.parse_uevent(
+        b'add@/devices/pci0000:00/0000:00:1f.2/ata1/host0/target0:0:0/0:0:0:0/block/sdb\0'
+        b'ACTION=add\0DEVPATH=/devices/pci0000:00/.../block/sdb\0SUBSYSTEM=block\0DEVNAME=sdb\0SEQNUM=4242\0')
+    assert fields['ACTION'] == 'add' and fields['DEVNAME'] == 'sdb'
+    assert hardware_agent.is_hardware_event(fields)
+    assert not hardware_agent.is_hardware_event({'ACTION': 'add', 'SUBSYSTEM': 'net'})
+    assert not hardware_agent.is_hardware_event({'ACTION': 'bind', 'SUBSYSTEM': 'pci'})
+
+    # The real signature is cheap to take and stable while nothing changes
+    assert hardware_agent.hardware_signature() == hardware_agent.hardware_signature()
+
+    print("✅ Fingerprint and uevent test passed")
+
+
+def test_watcher():
+    """wait() returns as soon as the signature changes, and not before"""
+    print("Testing hardware watcher...")
+
+    signature = ['disks: sda']
+    original = hardware_agent.hardware_signature
+    hardware_agent.hardware_signature = lambda: tuple(signature)
+    try:
+        watcher = hardware_agent.HardwareWatcher(interval=0.05, use_netlink=False)
+        stop = threading.Event()
+        assert not watcher.wait(0.2, stop)
+
+        threading.Timer(0.1, lambda: signature.append('sdb')).start()
+        start = time.monotonic()
+        assert watcher.wait(5, stop)
+        assert time.monotonic() - start < 1
+        assert not watcher.wait(0.1, stop)
+
+        stop.set()
+        start = time.monotonic()
+        assert not watcher.wait(5, stop)
+        assert time.monotonic() - start < 0.5
+    finally:
+        hardware_agent.hardware_signature = original
+
+    print("✅ Hardware watcher test passed")
+
+
+def _serve(db_path):
+    from werkzeug.serving import make_server
+
+    import web_interface
+    web_interface.app.config['DATABASE'] = db_path
+    server = make_server('127.0.0.1', 0, web_interface.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_agent_uploads_only_changes():
+    """Heartbeats send a fingerprint; only changed hardware sends a scan"""
+    print("Testing agent uploads...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        server = _serve(db_path)
+        try:
+            scan = copy.deepcopy(SCAN)
+            signature = ['sda']
+            original = hardware_agent.hardware_signature
+            hardware_agent.hardware_signature = lambda: tuple(signature)
+            try:
+                client = hardware_agent.InventoryClient(f'http://127.0.0.1:{server.server_port}')
+                watcher = hardware_agent.HardwareWatcher(interval=0.05, use_netlink=False)
+                agent = hardware_agent.HardwareAgent(client, watcher, heartbeat=3600,
+                                                     collect=lambda: copy.deepcopy(scan), log=lambda _m: None)
+
+                # Unknown to the server: the handshake asks for the full scan
+                assert agent.sync(heartbeat=True)
+                assert agent.stats == {'scans': 1, 'uploads': 1, 'heartbeats': 0, 'errors': 0}, agent.stats
+
+                # A restarted agent finds the server already has it
+                restarted = hardware_agent.HardwareAgent(client, watcher, collect=lambda: copy.deepcopy(scan),
+                                                         log=lambda _m: None)
+                scan['detection_date'] = '2025-06-20T08:00:00+10:00'
+                assert restarted.sync(heartbeat=True)
+                assert restarted.stats['uploads'] == 0 and restarted.stats['heartbeats'] == 1
+                inventory = HardwareInventory(db_path)
+                last_scan = inventory.conn.execute(
+                    "SELECT last_scan FROM systems WHERE hostname = 'agent-host'").fetchone()[0]
+                assert last_scan == '2025-06-19T22:00:00+00:00', last_scan
+
+                # Disk added while running: one upload, then quiet again
+                stop = threading.Event()
+                runner = threading.Thread(target=agent.run, args=(stop,))
+                runner.start()
+                try:
+                    time.sleep(0.2)
+                    scan['storage'].append({'device': '/dev/sdb', 'model': 'WD Red', 'serial': 'SER2',
+                                            'size': '4TiB'})
+                    signature.append('sdb')
+                    deadline = time.monotonic() + 10
+                    while agent.stats['uploads'] < 2:
+                        assert time.monotonic() < deadline, agent.stats
+                        time.sleep(0.05)
+                    time.sleep(0.3)
+                finally:
+                    stop.set()
+                    runner.join(timeout=5)
+                assert not runner.is_alive()
+                # The first upload plus the one change
+                assert agent.stats['uploads'] == 2 and agent.stats['errors'] == 0, agent.stats
+                serials = {row[0] for row in inventory.conn.execute(
+                    "SELECT serial_number FROM components WHERE component_type = 'storage'")}
+                assert serials == {'SER1', 'SER2'}, serials
+                inventory.close()
+            finally:
+                hardware_agent.hardware_signature = original
+        finally:
+            server.shutdown()
+
+    # An unreachable server is reported, not raised
+    client = hardware_agent.InventoryClient(f'http://127.0.0.1:{server.server_port}', timeout=2)
+    agent = hardware_agent.HardwareAgent(client, None, collect=lambda: copy.deepcopy(SCAN), log=lambda _m: None)
+    assert not agent.sync()
+    assert agent.stats['errors'] == 1
+
+    print("✅ Agent upload test passed")
+
+
+def test_agent_backs_off():
+    """A busy server's Retry-After is doubled per attempt, plus its jitter"""
+    print("Testing agent backoff...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import admission
+        from admission import AdmissionController
+        server = _serve(os.path.join(tmp, 'inventory.db'))
+        admission._controller = AdmissionController(concurrency=1, rate=0.5, burst=1, max_jitter=3)
+        try:
+            client = hardware_agent.InventoryClient(f'http://127.0.0.1:{server.server_port}')
+            agent = hardware_agent.HardwareAgent(client, None, collect=lambda: copy.deepcopy(SCAN),
+                                                 log=lambda _m: None)
+            assert agent.sync(heartbeat=True)
+            scan = dict(SCAN, hostname='busy-host')
+            agent.collect = lambda: copy.deepcopy(scan)
+            delays = []
+            for _ in range(3):
+                assert not agent.sync(heartbeat=True)
+                delays.append(agent.retry_delay)
+            # Retry-After is 2s here; busy isn't counted as an error
+            assert all(base <= delay <= base + 3 for base, delay in zip((2, 4, 8), delays)), delays
+            assert agent.failures == 3 and agent.stats['errors'] == 0, agent.stats
+
+            # Capped, and reset by the next sync that gets through
+            agent.failures = 20
+            agent._backoff(60, 0)
+            assert agent.retry_delay == hardware_agent.MAX_RETRY_SECONDS
+            admission._controller = AdmissionController(concurrency=1, rate=0)
+            assert agent.sync(heartbeat=True) and agent.failures == 0
+        finally:
+            admission._controller = None
+            server.shutdown()
+
+    print("✅ Agent backoff test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Hardware Agent Tests")
+    print("=" * 50)
+
+    tests = [
+        test_fingerprint_and_uevents,
+        test_watcher,
+        test_agent_uploads_only_changes,
+        test_agent_backs_off,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tests for the native hardware collector
+
+Run with: python3 test_hardware_collector.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import hardware_collector
+from inventory_manager import HardwareInventory
+
+DMIDECODE_MEMORY = """# dmidecode 3.3
+Getting SMBIOS data from sysfs.
+SMBIOS 3.2.0 present.
+
+Handle 0x0040, DMI type 17, 84 bytes
+Memory Device
+\tArray Handle: 0x003F
+\tSize: 16 GB
+\tLocator: DIMM_A1
+\tType: DDR4
+\tSpeed: 3200 MT/s
+\tManufacturer: Samsung
+\tSerial Number: 1234ABCD
+\tPart Number: M393A2K40CB2-CTD
+
+Handle 0x0041, DMI type 17, 84 bytes
+Memory Device
+\tSize: No Module Installed
+\tLocator: DIMM_A2
+\tType: Unknown
+\tManufacturer: Not Specified
+\tSerial Number: 00000000
+\tPart Number: Not Specified
+"""
+
+
+def test_parse_memory_slots():
+    """dmidecode memory devices become slot records with junk values dropped"""
+    print("Testing dmidecode memory parsing...")
+
+    slots = hardware_collector.parse_memory_slots(DMIDECODE_MEMORY)
+    assert len(slots) == 2, slots
+    assert slots[0] == {
+        'slot': 'DIMM_A1', 'size': '16 GB', 'speed': '3200 MT/s', 'type': 'DDR4',
+        'manufacturer': 'Samsung', 'part_number': 'M393A2K40CB2-CTD', 'serial': '1234ABCD',
+    }, slots[0]
+    assert slots[1]['serial'] == ''
+    assert slots[1]['manufacturer'] == ''
+
+    print("✅ Memory parsing test passed")
+
+
+def test_format_iec_size():
+    """Disk sizes match numfmt --to=iec-i --suffix=B"""
+    print("Testing IEC size formatting...")
+
+    assert hardware_collector.format_iec_size(500107862016) == '466GiB'
+    assert hardware_collector.format_iec_size(2000398934016) == '1.9TiB'
+    assert hardware_collector.format_iec_size(1023) == '1023B'
+    assert hardware_collector.format_iec_size(1024 ** 3) == '1.0GiB'
+
+    print("✅ IEC size formatting test passed")
+
+
+def test_collect_schema():
+    """collect() emits every key the shell script does"""
+    print("Testing collector output schema...")
+
+    data = hardware_collector.collect()
+    assert set(data) == {'hostname', 'detection_date', 'cpu', 'memory', 'storage',
+                         'gpu', 'motherboard', 'system'}, data.keys()
+    assert set(data['cpu']) == {'model', 'cores', 'threads_per_core', 'sockets'}
+    assert set(data['memory']) == {'total_gb', 'slots'}
+    for disk in data['storage']:
+        assert set(disk) == {'device', 'size', 'model', 'serial', 'type',
+                             'vendor_id', 'device_id'}, disk
+    json.dumps(data)
+
+    print("✅ Collector schema test passed")
+
+
+def test_probe_timeout():
+    """A probe's timeout is passed per call and doesn't change the default"""
+    print("Testing probe timeouts...")
+
+    started = time.monotonic()
+    outputs = hardware_collector.run_probes({'slow': ['sleep', '5'], 'fast': ['echo', 'ok']}, timeout=0.5)
+    assert outputs == {'slow': '', 'fast': 'ok\n'}, outputs
+    assert time.monotonic() - started < 4
+    hardware_collector.collect(probe_timeout=1)
+    assert hardware_collector.PROBE_TIMEOUT == 10
+
+    print("✅ Probe timeout test passed")
+
+
+def test_identical_dimms_kept_separate():
+    """Identical DIMMs are tracked by serial, and serial-less ones don't merge"""
+    print("Testing memory slot ingest...")
+
+    slots = hardware_collector.parse_memory_slots(DMIDECODE_MEMORY)[:1] * 2
+    slots[1] = dict(slots[1], slot='DIMM_B1', serial='5678EFGH')
+    scan = {
+        'hostname': 'dimm-host',
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'memory': {'total_gb': '32', 'slots': slots},
+        'gpu': [{'device': 'Matrox G200eW3 [102b:0536]'}] * 2,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.update_system(scan)
+            inventory.update_system(scan)
+            memory = inventory.list_all_components('memory')
+            gpus = inventory.list_all_components('gpu')
+            assert sorted(m['serial_number'] for m in memory) == ['1234ABCD', '5678EFGH'], memory
+            assert len(gpus) == 2, gpus
+            assert len(inventory.get_system_details('dimm-host')['components']) == 4
+        finally:
+            inventory.close()
+
+    print("✅ Memory slot ingest test passed")
+
+
+def test_part_number_keyed_dimms_migrated():
+    """DIMMs stored under their part number keep their rows after a rescan"""
+    print("Testing memory re-keying...")
+
+    slots = hardware_collector.parse_memory_slots(DMIDECODE_MEMORY)[:1] * 2
+    slots[1] = dict(slots[1], slot='DIMM_B1', serial='5678EFGH')
+    scan = {'hostname': 'dimm-host', 'detection_date': '2025-06-18T23:42:00+10:00',
+            'memory': {'total_gb': '32', 'slots': slots}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        inventory = HardwareInventory(db_path)
+        inventory.update_system(scan)
+        # As stored before memory was keyed by serial, plus a row a rescan
+        # under the new keys already replaced
+        inventory.conn.execute("""
+            UPDATE components SET serial_number = json_extract(specifications, '$.part_number'),
+                                  specifications = json_remove(specifications, '$.part_number')
+            WHERE component_type = 'memory'
+        """)
+        inventory.conn.execute("""
+            INSERT INTO components (component_type, model, serial_number, specifications, status, location)
+            VALUES ('memory', 'DDR4 16 GB', 'M393A2K40BB1', '{}', 'installed', 'dimm-host')
+        """)
+        inventory.conn.execute("DELETE FROM meta WHERE key = 'memory_keyed_by_serial'")
+        inventory.conn.execute("PRAGMA user_version = 0")
+        inventory.conn.commit()
+        ids = sorted(m['id'] for m in inventory.list_all_components('memory') if m['status'] == 'installed')
+        inventory.close()
+
+        inventory = HardwareInventory(db_path)
+        try:
+            inventory.update_system(scan)
+            memory = {m['id']: m for m in inventory.list_all_components('memory')}
+            installed = sorted(id for id, m in memory.items() if m['status'] == 'installed')
+            assert installed == ids[:2], memory
+            assert sorted(memory[id]['serial_number'] for id in installed) == ['1234ABCD', '5678EFGH']
+            assert memory[ids[2]]['status'] == 'retired', memory
+            assert inventory.check_consistency(full=True)['open'] == 0
+        finally:
+            inventory.close()
+
+    print("✅ Memory re-keying test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Hardware Collector Tests")
+    print("=" * 50)
+
+    tests = [
+        test_parse_memory_slots,
+        test_format_iec_size,
+        test_collect_schema,
+        test_probe_timeout,
+        test_identical_dimms_kept_separate,
+        test_part_number_keyed_dimms_migrated,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for scheduled database maintenance
+
+Run with: python3 test_maintenance.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from maintenance import TASKS, DatabaseMaintenance, MaintenancePolicy
+
+
+def make_scan(hostname, disks):
+    return {
+        'hostname': hostname,
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'storage': [{'device': f'/dev/sd{index}', 'model': 'Samsung SSD 870', 'size': '1 TB',
+                     'serial': f'{hostname}-{index}' + 'x' * 200} for index in range(disks)],
+    }
+
+
+def results(summary):
+    return {result['task']: result['result'] for result in summary['ran']}
+
+
+def test_scheduled_run():
+    """Due tasks run once per interval, free deleted pages and are recorded"""
+    print("Testing scheduled maintenance...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        inventory = HardwareInventory(db_path)
+        for host in range(20):
+            inventory.update_system(make_scan(f'host-{host}', 50))
+        for system_id in range(1, 21):
+            inventory.delete_system(system_id)
+        inventory.bulk_update_components('delete', filters={'type': 'storage'})
+        assert inventory.conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+        pages = inventory.conn.execute("PRAGMA page_count").fetchone()[0]
+
+        maintenance = DatabaseMaintenance(db_path, MaintenancePolicy(budget=0, busy_scans=0, vacuum_pages=16))
+        summary = maintenance.run()
+        assert results(summary) == dict.fromkeys(TASKS, 'ok'), summary
+        vacuum = next(result for result in summary['ran'] if result['task'] == 'vacuum')
+        assert vacuum['detail']['pages_freed'] > 0 and vacuum['detail']['free_pages'] == 0, vacuum
+        assert inventory.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert inventory.conn.execute("PRAGMA page_count").fetchone()[0] < pages
+        checkpoint = summary['ran'][-1]
+        assert checkpoint['task'] == 'checkpoint' and checkpoint['detail']['wal_bytes'] > 0, checkpoint
+        assert os.path.getsize(db_path + '-wal') < checkpoint['detail']['wal_bytes']
+        assert inventory.conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+
+        # Nothing is due again until its interval has passed
+        assert maintenance.run() == {'ran': [], 'pending': [], 'skipped': None}
+        inventory.conn.execute("UPDATE maintenance_runs SET started_at = started_at - 3600 "
+                               "WHERE task IN ('checkpoint', 'optimize')")
+        inventory.conn.commit()
+        assert [task['task'] for task in maintenance.status() if task['due']] == ['optimize', 'checkpoint']
+        assert results(maintenance.run()) == {'checkpoint': 'ok', 'optimize': 'ok'}
+        status = {task['task']: task for task in maintenance.status()}
+        assert status['checkpoint']['runs'] == 2 and status['analyze']['runs'] == 1, status
+        assert status['vacuum']['seconds'] is not None and status['vacuum']['last_run']
+
+        # A spent budget leaves the remaining tasks due for the next run
+        summary = DatabaseMaintenance(db_path, MaintenancePolicy(budget=1e-9)).run(force=True)
+        assert summary['ran'] == [] and summary['pending'] == list(TASKS), summary
+        inventory.close()
+
+    print("✅ Scheduled maintenance test passed")
+
+
+def test_busy_and_old_databases():
+    """Runs wait for ingest bursts and each other; old files need one full VACUUM"""
+    print("Testing maintenance skips and conversion...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        # Created before incremental vacuuming was enabled
+        sqlite3.connect(db_path).execute("CREATE TABLE notes (id INTEGER PRIMARY KEY)").connection.close()
+        inventory = HardwareInventory(db_path)
+        for host in range(3):
+            inventory.update_system(make_scan(f'host-{host}', 1))
+
+        maintenance = DatabaseMaintenance(db_path, MaintenancePolicy(busy_scans=3))
+        summary = maintenance.run()
+        assert summary['ran'] == [] and summary['skipped'].startswith('ingest busy'), summary
+        summary = maintenance.run(['vacuum'], force=True)
+        assert results(summary) == {'vacuum': 'skipped'}, summary
+
+        inventory.conn.execute("UPDATE meta SET value = strftime('%s', 'now') + 60 WHERE key = 'maintenance_lease'")
+        inventory.conn.commit()
+        summary = maintenance.run(force=True)
+        assert summary['skipped'] == 'another maintenance run is in progress', summary
+        inventory.conn.execute("UPDATE meta SET value = 0 WHERE key = 'maintenance_lease'")
+        inventory.conn.commit()
+
+        assert maintenance.full_vacuum()['result'] == 'ok'
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        conn.close()
+        assert results(maintenance.run(['vacuum'], force=True)) == {'vacuum': 'ok'}
+        try:
+            maintenance.run(['defrag'])
+            raise AssertionError("an unknown task should be rejected")
+        except ValueError:
+            pass
+        inventory.close()
+
+    print("✅ Maintenance skips and conversion test passed")
+
+
+def test_web_maintenance():
+    """The admin endpoints show the last runs and run tasks on request"""
+    print("Testing maintenance endpoints...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        HardwareInventory(web_interface.app.config['DATABASE']).close()
+        client = web_interface.app.test_client()
+
+        tasks = client.get('/admin/maintenance').get_json()['tasks']
+        assert [task['task'] for task in tasks] == list(TASKS) and all(task['due'] for task in tasks), tasks
+        summary = client.post('/admin/maintenance', json={'tasks': ['checkpoint'], 'force': True}).get_json()
+        assert summary['status'] == 'success' and results(summary) == {'checkpoint': 'ok'}, summary
+        tasks = {task['task']: task for task in client.get('/admin/maintenance').get_json()['tasks']}
+        assert tasks['checkpoint']['result'] == 'ok' and not tasks['checkpoint']['due'], tasks
+        assert client.post('/admin/maintenance', json={'tasks': ['defrag']}).status_code == 400
+        assert 'inventory_maintenance_tasks_total{task="checkpoint",result="ok"}' in \
+            client.get('/metrics').get_data(as_text=True)
+
+    print("✅ Maintenance endpoints test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Maintenance Tests")
+    print("=" * 50)
+
+    tests = [
+        test_scheduled_run,
+        test_busy_and_old_databases,
+        test_web_maintenance,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for the manufacturer dictionary
+
+Run with: python3 test_manufacturers.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from manufacturers import clean_manufacturer, manufacturer_key, seed_aliases
+from reports import FleetReports
+
+
+class FakeLookup:
+    """The pci.ids vendors the tests need, without the real file"""
+    vendors = {
+        '1002': 'Advanced Micro Devices, Inc. [AMD/ATI]',
+        '1022': 'Advanced Micro Devices, Inc. [AMD]',
+        '144d': 'Samsung Electronics Co Ltd',
+        '8086': 'Intel Corporation',
+        '1b4b': 'Marvell Technology Group Ltd.',
+    }
+
+    def get_vendor_name(self, vendor_id):
+        return self.vendors.get(vendor_id.lower())
+
+
+SCAN = {
+    'hostname': 'mfr-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'memory': {'slots': [{'slot': 'DIMM0', 'size': '16 GB', 'type': 'DDR4', 'manufacturer': 'Samsung',
+                          'serial': 'SER1'}]},
+    'storage': [
+        {'device': '/dev/sdb', 'model': 'SSD 88SS1093', 'serial': 'SER2', 'size': '512GiB', 'vendor_id': '1b4b'},
+    ],
+    'gpu': [{'device': 'Vega 20 [Radeon Pro VII/Radeon Instinct MI50 32GB]', 'vendor_id': '1002'}],
+}
+
+
+def test_names():
+    """Legal suffixes and bracketed short names don't make new vendors"""
+    print("Testing name cleanup...")
+
+    assert clean_manufacturer('Advanced Micro Devices, Inc. [AMD/ATI]') == 'Advanced Micro Devices'
+    assert clean_manufacturer('Samsung Electronics Co., Ltd.') == 'Samsung Electronics'
+    assert clean_manufacturer('Micro-Star International Co., Ltd.') == 'Micro-Star International'
+    assert clean_manufacturer('Intel Corporation') == 'Intel'
+    assert manufacturer_key('  Hewlett-Packard ') == manufacturer_key('HEWLETT packard') == 'hewlett packard'
+
+    seeds = seed_aliases(FakeLookup())
+    assert seeds['ati'] == seeds['amd'] == seeds['advanced micro devices'] == 'Advanced Micro Devices'
+    assert seeds['samsung'] == seeds['samsung electronics'] == 'Samsung Electronics'
+    assert seeds['marvell technology group'] == 'Marvell Technology Group'
+
+    print("✅ Name cleanup test passed")
+
+
+def test_interning():
+    """Scans, spares and imports share one row per vendor"""
+    print("Testing manufacturer interning...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        inventory.pci_lookup = FakeLookup()
+        inventory.update_system(SCAN)
+        inventory.add_spare_component('cpu', 'AMD', 'EPYC 7302', 'SPARE1')
+        inventory.add_spare_component('memory', 'Samsung Electronics Co., Ltd.', 'DDR4 16 GB', 'SPARE2')
+        inventory.add_spare_component('storage', 'Seagate', 'Exos X18', 'SPARE3')
+
+        rows = inventory.conn.execute(
+            "SELECT serial_number, manufacturer, manufacturer_id FROM components ORDER BY id").fetchall()
+        by_serial = {row[0] or 'gpu': (row[1], row[2]) for row in rows}
+        assert by_serial['gpu'] == by_serial['SPARE1'], by_serial
+        assert by_serial['gpu'][0] == 'Advanced Micro Devices'
+        assert by_serial['SER1'] == by_serial['SPARE2'] and by_serial['SER1'][0] == 'Samsung Electronics'
+        assert by_serial['SER2'][0] == 'Marvell Technology Group'
+        assert by_serial['SPARE3'][0] == 'Seagate Technology'
+        assert inventory.conn.execute("SELECT COUNT(*) FROM manufacturers").fetchone()[0] == 4
+
+        # A rescan writes nothing
+        generation = inventory.conn.execute("SELECT value FROM meta WHERE key = 'write_generation'").fetchone()[0]
+        inventory.update_system(dict(SCAN, detection_date='2025-06-19T23:42:00+10:00'))
+        assert inventory.conn.execute(
+            "SELECT value FROM meta WHERE key = 'write_generation'").fetchone()[0] == generation
+
+        # Any spelling selects the vendor
+        summary = inventory.bulk_update_components('retire', filters={'manufacturer': 'ATI', 'status': 'spare'},
+                                                   dry_run=True)
+        assert summary['matched'] == 1, summary
+        report = {row['manufacturer']: row for row in FleetReports(inventory.conn).run('manufacturers')}
+        assert report['Samsung Electronics']['installed'] == 1 and report['Samsung Electronics']['spare'] == 1
+
+        # Merging moves components and aliases
+        names = inventory.manufacturer_dictionary()
+        assert names.merge('Seagate', 'Samsung') == 1
+        inventory.conn.commit()
+        assert names.resolve('seagate technology')[1] == 'Samsung Electronics'
+        try:
+            names.merge('Nobody', 'Samsung')
+            raise AssertionError("merging an unknown manufacturer should fail")
+        except ValueError:
+            pass
+        inventory.close()
+
+    print("✅ Manufacturer interning test passed")
+
+
+def test_existing_database():
+    """Opening an older database interns its free-text manufacturers"""
+    print("Testing migration of existing rows...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'inventory.db')
+        HardwareInventory(db_path).close()
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO components (component_type, manufacturer, model, status) VALUES (?, ?, ?, ?)",
+                         [('cpu', 'AMD', 'EPYC', 'spare'), ('gpu', 'Advanced Micro Devices, Inc.', 'MI50', 'spare'),
+                          ('memory', 'Hynix Semiconductor', 'DDR4', 'spare'), ('memory', '', 'DDR4', 'spare')])
+        conn.execute("PRAGMA user_version = 0")
+        conn.commit()
+        conn.close()
+
+        inventory = HardwareInventory(db_path)
+        rows = inventory.conn.execute(
+            "SELECT manufacturer, manufacturer_id FROM components ORDER BY id").fetchall()
+        assert rows[0][0] == rows[1][0] == 'Advanced Micro Devices' and rows[0][1] == rows[1][1], rows
+        assert tuple(rows[2]) == ('SK hynix', rows[2][1]) and rows[2][1] is not None
+        assert rows[3][1] is None
+        inventory.close()
+
+    print("✅ Existing database test passed")
+
+
+def test_web_filter():
+    """The components page filters by manufacturer; edits store the canonical name"""
+    print("Testing web manufacturer filter...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        db_path = os.path.join(tmp, 'inventory.db')
+        web_interface.app.config['DATABASE'] = db_path
+        inventory = HardwareInventory(db_path)
+        inventory.add_spare_component('cpu', 'AMD', 'EPYC 7302', 'SPARE1')
+        inventory.add_spare_component('cpu', 'Intel', 'Xeon Gold 6338', 'SPARE2')
+        client = web_interface.app.test_client()
+
+        response = client.post('/component/add', data={'type': 'gpu', 'manufacturer': 'Advanced Micro Devices, Inc.',
+                                                      'model': 'Instinct MI50'})
+        assert response.status_code == 302
+        page = client.get('/components?manufacturer=amd').get_data(as_text=True)
+        assert 'EPYC 7302' in page and 'Instinct MI50' in page and 'Xeon Gold' not in page
+
+        component_id = inventory.conn.execute(
+            "SELECT id FROM components WHERE serial_number = 'SPARE2'").fetchone()[0]
+        client.post(f'/component/{component_id}/edit', data={'manufacturer': 'INTEL', 'model': 'Xeon Gold 6338',
+                                                             'status': 'spare'})
+        assert inventory.conn.execute("SELECT manufacturer FROM components WHERE id = ?",
+                                      (component_id,)).fetchone()[0] == 'Intel'
+
+        page = client.get('/reports').get_data(as_text=True)
+        assert 'Installed vs spare count per manufacturer' in page and 'manufacturer=Advanced' in page
+        inventory.close()
+
+    print("✅ Web manufacturer filter test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Manufacturer Dictionary Tests")
+    print("=" * 50)
+
+    tests = [
+        test_names,
+        test_interning,
+        test_existing_database,
+        test_web_filter,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process metrics registry and /metrics endpoint
+
+Run with: python3 test_metrics.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import Registry
+
+SAMPLE_SCAN = {
+    'hostname': 'metrics-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'cpu': {'model': 'AMD Ryzen 5 3600 6-Core Processor', 'cores': '12'},
+    'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'S1', 'size': '1.8TiB'}],
+}
+
+
+def test_render_format():
+    """Counters and histograms render in Prometheus text format"""
+    print("Testing metrics rendering...")
+
+    registry = Registry()
+    requests = registry.counter('test_requests_total', 'Requests', ['route'])
+    latency = registry.histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    requests.inc(route='/')
+    requests.inc(2, route='/')
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{route="/"} 3' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'test_latency_seconds_count 2' in text
+
+    print("✅ Metrics rendering test passed")
+
+
+def test_multiprocess_merge():
+    """Snapshots from several workers are summed, exited workers' gauges dropped"""
+    print("Testing multi-process metric merging...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worker = Registry()
+        worker.counter('test_scans_total', 'Scans').inc(5)
+        worker.gauge('test_in_flight', 'In flight').set(3)
+        worker.enable_multiprocess(tmp)
+        worker.flush(force=True)
+        # Pretend the snapshot belongs to a worker that has exited
+        os.rename(os.path.join(tmp, f'metrics-{os.getpid()}.json'),
+                  os.path.join(tmp, 'metrics-999999999.json'))
+
+        scraper = Registry()
+        scraper.counter('test_scans_total', 'Scans').inc(2)
+        scraper.gauge('test_in_flight', 'In flight').set(1)
+        scraper.enable_multiprocess(tmp)
+
+        text = scraper.render()
+        assert 'test_scans_total 7' in text, text
+        assert 'test_in_flight 1' in text, text
+
+        # The exited worker's file is folded into one retired snapshot
+        assert sorted(name for name in os.listdir(tmp) if name.endswith('.json')) == \
+            sorted(['metrics-retired.json', f'metrics-{os.getpid()}.json']), os.listdir(tmp)
+        assert 'test_scans_total 7' in scraper.render()
+
+        # A new worker that reuses the scraper's pid keeps its counts
+        reused = Registry()
+        reused.counter('test_scans_total', 'Scans').inc(1)
+        reused.enable_multiprocess(tmp)
+        assert 'test_scans_total 8' in reused.render()
+
+    print("✅ Multi-process merge test passed")
+
+
+def test_forked_workers_start_from_zero():
+    """Counts made in the master before forking are reported once"""
+    print("Testing metrics across fork...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        master = Registry()
+        master.enable_multiprocess(tmp)
+        scans = master.counter('test_fork_scans_total', 'Scans')
+        latency = master.histogram('test_fork_seconds', 'Latency', buckets=(1.0,))
+        scans.inc(5)
+        latency.observe(0.5)
+        for _ in range(3):
+            pid = os.fork()
+            if pid == 0:
+                scans.inc()
+                master.flush(force=True)
+                os._exit(0)
+            os.waitpid(pid, 0)
+
+        text = master.render()
+        assert 'test_fork_scans_total 8' in text, text
+        assert 'test_fork_seconds_count 1' in text, text
+
+    print("✅ Metrics across fork test passed")
+
+
+def test_metrics_endpoint():
+    """Scan ingest and requests show up at /metrics"""
+    print("Testing /metrics endpoint...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+
+        assert client.post('/api/upload_scan', json=SAMPLE_SCAN).status_code == 200
+        assert client.post('/api/upload_scan', json=SAMPLE_SCAN).status_code == 200
+
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'inventory_http_requests_total{method="POST",route="/api/upload_scan",status="200"}' in text
+        assert 'inventory_ingest_components_total{result="noop"}' in text
+        assert 'inventory_update_system_duration_seconds_count' in text
+        assert 'inventory_sqlite_lock_wait_seconds_count' in text
+
+    print("✅ /metrics endpoint test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Metrics Tests")
+    print("=" * 50)
+
+    tests = [
+        test_render_format,
+        test_multiprocess_merge,
+        test_forked_workers_start_from_zero,
+        test_metrics_endpoint,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
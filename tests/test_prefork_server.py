@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the prefork production server
+
+Run with: python3 test_prefork_server.py
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get_ready(port, timeout=10.0):
+    """Poll the readiness endpoint until it answers, return the decoded body"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/ready', timeout=2) as resp:
+                return json.loads(resp.read())
+        except OSError:
+            time.sleep(0.2)
+    raise AssertionError("server did not become ready")
+
+
+def _worker_pids(master_pid):
+    result = subprocess.run(['ps', '--ppid', str(master_pid), '-o', 'pid='],
+                            capture_output=True, text=True)
+    return {int(pid) for pid in result.stdout.split()}
+
+
+def test_prefork_workers_and_reload():
+    """Workers serve the readiness endpoint and are replaced on SIGHUP"""
+    print("Testing prefork workers and SIGHUP reload...")
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, INVENTORY_DB=os.path.join(tmp, 'inventory.db'))
+        proc = subprocess.Popen(
+            [sys.executable, 'web_interface.py', '--host', '127.0.0.1', '--port', str(port),
+             '--workers', '2', '--threads', '2'],
+            cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            body = _get_ready(port)
+            assert body['status'] == 'ready', body
+            workers = _worker_pids(proc.pid)
+            assert len(workers) == 2, f"expected 2 workers, got {workers}"
+            assert body['pid'] in workers, "request was not served by a worker"
+
+            proc.send_signal(signal.SIGHUP)
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                new_workers = _worker_pids(proc.pid)
+                if len(new_workers) == 2 and not new_workers & workers:
+                    break
+                time.sleep(0.2)
+            assert not new_workers & workers, "workers were not replaced on SIGHUP"
+            body = _get_ready(port)
+            assert body['pid'] in new_workers and body['generation'] == 2, body
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+    print("✅ Prefork server test passed")
+
+
+def test_ready_during_reload():
+    """The serving generation stays ready until the next one is up"""
+    print("Testing readiness during a reload warm-up...")
+
+    sys.path.insert(0, SRC_DIR)
+    import web_interface
+    from prefork_server import PreforkServer
+
+    client = web_interface.app.test_client()
+    seen = []
+
+    def ready(generation):
+        response = client.get('/health/ready', environ_overrides={
+            'inventory.warmed_up': lambda: server.generation_ready(generation),
+            'inventory.generation': generation})
+        assert response.get_json()['generation'] == generation
+        return response.status_code, response.get_json()['status']
+
+    def warm_up(reload):
+        seen.append(ready(1))
+        if len(seen) == 2:
+            raise RuntimeError("template error")
+
+    server = PreforkServer(web_interface.app, '127.0.0.1', 0, workers=1, threads=1, warm_up=warm_up)
+    server._spawn_worker = server._stop_workers = lambda *args: None
+    server._spawn_generation()
+    assert ready(1) == (200, 'ready')
+    server._reload()
+    assert seen == [(200, 'ready')], seen
+    assert ready(2) == (200, 'ready') and ready(1)[0] == 503
+
+    # A failed reload keeps the current generation serving
+    server._reload()
+    assert ready(2) == (200, 'ready') and server._generation == 2
+
+    print("✅ Readiness during reload test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Prefork Server Tests")
+    print("=" * 50)
+
+    tests = [
+        test_prefork_workers_and_reload,
+        test_ready_during_reload,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the profiling hooks
+
+Run with: python3 test_profiling.py
+"""
+
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from profiling import Profiler, ProfileStore, release, try_profiler
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_profiler_and_store():
+    """Profiles carry stats and stacks; the store keeps only the slowest"""
+    print("Testing profiler and profile store...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with Profiler(interval=0.001) as profiler:
+            busy_loop(0.1)
+        paths = profiler.write(os.path.join(tmp, 'run'))
+        stats = pstats.Stats(paths[0])
+        assert any(name == 'busy_loop' for _, _, name in stats.stats), "busy_loop missing from the stats"
+        with open(paths[1]) as f:
+            lines = f.read().splitlines()
+        assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+        assert any('test_profiling.py:busy_loop' in line for line in lines), lines[:3]
+
+        # Only one profile per process at a time
+        first = try_profiler()
+        assert first is not None and try_profiler() is None
+        release(first)
+
+        store = ProfileStore(os.path.join(tmp, 'profiles'), keep=2)
+        kept = []
+        for milliseconds in (30, 10, 50, 20):
+            profiler.seconds = milliseconds / 1000
+            kept.append(store.offer(profiler, f'GET /page/{milliseconds}'))
+        assert kept[3] is None, kept
+        assert [p['milliseconds'] for p in store.profiles()] == [50, 30]
+        assert store.profiles()[0]['label'] == 'GET-page-50'
+        assert len(os.listdir(store.directory)) == 4
+        assert store.path(kept[2] + '.collapsed') and store.path('../run.prof') is None
+
+    print("✅ Profiler and profile store test passed")
+
+
+def test_request_profiles():
+    """Requests sent with the header are profiled and listed"""
+    print("Testing request profiles...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        HardwareInventory(web_interface.app.config['DATABASE']).close()
+        client = web_interface.app.test_client()
+        assert client.get('/admin/profiles').status_code == 404
+
+        web_interface.app.config['PROFILE_DIR'] = os.path.join(tmp, 'profiles')
+        try:
+            assert 'X-Inventory-Profile' not in client.get('/components').headers
+            response = client.get('/components', headers={'X-Inventory-Profile': '1'})
+            name = response.headers['X-Inventory-Profile']
+            assert '-GET-components' in name, name
+
+            page = client.get('/admin/profiles').get_data(as_text=True)
+            assert 'GET-components' in page and f'{name}.collapsed' in page
+            download = client.get(f'/admin/profiles/{name}.prof')
+            assert download.status_code == 200 and len(download.data) > 0
+            download.close()
+            assert client.get('/admin/profiles/missing.prof').status_code == 404
+        finally:
+            web_interface.app.config['PROFILE_DIR'] = ''
+
+    # The CLI writes one profile per action
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(os.path.dirname(__file__), '..', 'src', 'inventory_manager.py')
+        result = subprocess.run([sys.executable, script, 'list', '--format', 'json', '--db',
+                                 os.path.join(tmp, 'inventory.db'), '--profile', tmp],
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0 and json.loads(result.stdout) == [], result
+        assert 'Profile of list' in result.stderr
+        assert sorted(os.path.splitext(f)[1] for f in os.listdir(tmp) if f.startswith('list-')) == \
+            ['.collapsed', '.prof']
+
+    print("✅ Request profiles test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Profiling Tests")
+    print("=" * 50)
+
+    tests = [
+        test_profiler_and_store,
+        test_request_profiles,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
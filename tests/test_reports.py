@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for fleet reports
+
+Run with: python3 test_reports.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory, parse_capacity
+from reports import FleetReports
+
+
+def make_scan(hostname, site, disk_sizes, dimms):
+    return {
+        'hostname': hostname,
+        'site': site,
+        'detection_date': '2025-06-18T23:42:00+10:00',
+        'memory': {'total_gb': '31', 'slots': [
+            {'slot': f'DIMM{i}', 'size': '16 GB', 'type': 'DDR4', 'manufacturer': 'Samsung',
+             'serial': f'{hostname}-M{i}'} for i in range(dimms)]},
+        'storage': [{'device': f'/dev/sd{chr(97 + i)}', 'model': 'Samsung SSD 870', 'type': 'SSD',
+                     'serial': f'{hostname}-D{i}', 'size': size} for i, size in enumerate(disk_sizes)],
+        'gpu': [{'device': 'NVIDIA Corporation GA106 [GeForce RTX 3060 Lite Hash Rate] [10de:2504]'}],
+    }
+
+
+def test_parse_capacity():
+    """Sizes from numfmt, lsblk and dmidecode become bytes"""
+    print("Testing capacity parsing...")
+
+    assert parse_capacity('1.8TiB') == int(1.8 * 1024 ** 4)
+    assert parse_capacity('16 GB') == 16 * 1024 ** 3
+    assert parse_capacity('512M') == 512 * 1024 ** 2
+    assert parse_capacity('1023B') == 1023
+    assert parse_capacity('No Module Installed') is None
+    assert parse_capacity(None) is None
+
+    print("✅ Capacity parsing test passed")
+
+
+def test_reports():
+    """Aggregates are correct and cached until the inventory changes"""
+    print("Testing fleet reports...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.update_system(make_scan('a1', 'dc1', ['1TiB', '1TiB'], 2))
+            inventory.update_system(make_scan('a2', 'dc1', ['2TiB'], 4))
+            inventory.update_system(make_scan('b1', 'dc2', ['512GiB'], 2))
+            inventory.add_spare_component('gpu', 'NVIDIA',
+                                          'NVIDIA Corporation GA106 [GeForce RTX 3060 Lite Hash Rate] [10de:2504]')
+
+            fleet = FleetReports(inventory.conn)
+            by_site = {row['site']: row for row in fleet.storage_by_site()}
+            assert by_site['dc1']['raw_bytes'] == 4 * 1024 ** 4, by_site
+            assert by_site['dc1']['hosts'] == 2 and by_site['dc1']['disks'] == 3
+            assert by_site['dc2']['raw_bytes'] == 512 * 1024 ** 3
+
+            gpus = fleet.model_distribution('gpu')
+            assert (gpus[0]['installed'], gpus[0]['spare']) == (3, 1), gpus
+            assert fleet.memory_histogram() == [{'memory_gib': 32, 'hosts': 2},
+                                                {'memory_gib': 64, 'hosts': 1}]
+
+            # Unchanged rescans keep the cache; real changes invalidate it
+            generation = fleet.write_generation()
+            inventory.update_system(make_scan('a1', 'dc1', ['1TiB', '1TiB'], 2))
+            assert fleet.write_generation() == generation
+            fleet.storage_by_site()
+            assert fleet.from_cache
+
+            inventory.update_system(make_scan('a1', 'dc2', ['1TiB', '1TiB'], 2))
+            by_site = {row['site']: row for row in fleet.storage_by_site()}
+            assert not fleet.from_cache
+            assert by_site['dc2']['hosts'] == 2, by_site
+        finally:
+            inventory.close()
+
+    print("✅ Fleet reports test passed")
+
+
+def test_reports_page():
+    """/reports renders"""
+    print("Testing /reports page...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        client.post('/api/upload_scan', json=make_scan('web1', 'lab', ['1.8TiB'], 2))
+
+        response = client.get('/reports')
+        assert response.status_code == 200
+        page = response.get_data(as_text=True)
+        assert 'lab' in page and '1.8 TiB' in page, page
+
+    print("✅ /reports page test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Report Tests")
+    print("=" * 50)
+
+    tests = [
+        test_parse_capacity,
+        test_reports,
+        test_reports_page,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the raw scan archive
+
+Run with: python3 test_scan_archive.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from scan_archive import RetentionPolicy, normalize_timestamp
+
+SAMPLE_SCAN = {
+    'hostname': 'archive-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'cpu': {'model': 'AMD Ryzen 5 3600 6-Core Processor', 'cores': '12'},
+    'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'S1', 'size': '1.8TiB'}],
+}
+
+
+def test_deduplicated_archive():
+    """Identical scans share one body; each scan still gets a timeline point"""
+    print("Testing scan archive deduplication...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.update_system(SAMPLE_SCAN)
+            fingerprint = inventory.update_system(dict(SAMPLE_SCAN, detection_date='2025-06-19T23:42:00+10:00'))['fingerprint']
+            assert inventory.touch_unchanged_scan('archive-host', fingerprint, '2025-06-20T23:42:00+10:00')
+            upgraded = dict(SAMPLE_SCAN, detection_date='2025-06-21T23:42:00+10:00',
+                            cpu={'model': 'AMD Ryzen 9 5950X 16-Core Processor', 'cores': '32'})
+            inventory.update_system(upgraded)
+
+            stats = inventory.archive.stats()
+            assert stats['points'] == 4, stats
+            assert stats['blobs'] == 2, stats
+
+            history = inventory.archive.history('archive-host')
+            assert history[0]['scanned_at'] == '2025-06-18T13:42:00+00:00', history
+
+            scan = inventory.archive.get_scan('archive-host', '2025-06-21T00:00:00+00:00')
+            assert scan['cpu']['cores'] == '12'
+            assert scan['detection_date'] == '2025-06-20T13:42:00+00:00'
+            assert inventory.archive.get_scan('archive-host')['cpu']['cores'] == '32'
+            assert inventory.archive.get_scan('archive-host', '2025-01-01T00:00:00+00:00') is None
+        finally:
+            inventory.close()
+
+    print("✅ Scan archive deduplication test passed")
+
+
+def test_compaction():
+    """Old points thin to daily then monthly; orphaned bodies are removed"""
+    print("Testing scan archive compaction...")
+
+    now = datetime(2025, 6, 30, 12, 0, tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            # Four scans a day for 90 days, hardware changing every 10 days
+            for hours in range(0, 90 * 24, 6):
+                moment = now - timedelta(hours=hours)
+                scan = dict(SAMPLE_SCAN, detection_date=moment.isoformat(),
+                            cpu={'model': 'CPU', 'cores': str(hours // 240)})
+                inventory.update_system(scan)
+
+            before = inventory.archive.stats()
+            result = inventory.archive.compact(RetentionPolicy(raw_days=2, daily_days=30), now)
+            after = inventory.archive.stats()
+
+            assert before['points'] == 360 and before['blobs'] == 9, before
+            # 8 raw points for two days, one a day to 30 days, one a month beyond
+            assert 35 <= after['points'] <= 45, after
+            assert result['points_removed'] == before['points'] - after['points']
+            assert after['blobs'] < before['blobs'], after
+            assert inventory.archive.get_scan('archive-host')['cpu']['cores'] == '0'
+        finally:
+            inventory.close()
+
+    assert normalize_timestamp('2025-06-18T23:42:00+10:00') == '2025-06-18T13:42:00+00:00'
+    print("✅ Scan archive compaction test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Scan Archive Tests")
+    print("=" * 50)
+
+    tests = [
+        test_deduplicated_archive,
+        test_compaction,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
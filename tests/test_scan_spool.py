@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for scanner spooling and batched replay of late scans
+
+Run with: python3 test_scan_spool.py
+"""
+
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+
+
+def make_scan(day, model, hostname='spool-host'):
+    return {
+        'hostname': hostname,
+        'detection_date': f'2025-06-{day:02d}T23:42:00+10:00',
+        'cpu': {'model': model, 'cores': 8},
+    }
+
+
+def cpu_model(inventory, hostname='spool-host'):
+    return inventory.conn.execute("""
+        SELECT c.model FROM systems s JOIN system_components sc ON sc.system_id = s.id
+        JOIN components c ON c.id = sc.component_id WHERE s.hostname = ?
+    """, (hostname,)).fetchone()[0]
+
+
+def test_replay_order():
+    """Late scans are applied oldest first and never replace newer data"""
+    print("Testing replay of late scans...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        results = inventory.replay_scans([make_scan(20, 'EPYC 7543'), make_scan(18, 'EPYC 7302')])
+        assert [(r['detection_date'][:10], r['applied']) for r in results] == \
+            [('2025-06-18', True), ('2025-06-20', True)], results
+        assert cpu_model(inventory) == 'EPYC 7543'
+
+        # A scan that arrives after a newer one is only archived
+        assert not inventory.update_system(make_scan(19, 'EPYC 7313'))['applied']
+        assert cpu_model(inventory) == 'EPYC 7543'
+        assert inventory.conn.execute("SELECT last_scan FROM systems").fetchone()[0] == '2025-06-20T13:42:00+00:00'
+        assert inventory.archive.get_scan('spool-host', '2025-06-19T20:00:00+00:00')['cpu']['model'] == 'EPYC 7313'
+
+        try:
+            inventory.replay_scans([make_scan(21, 'EPYC 7543'), {'cpu': {}}])
+            raise AssertionError("a scan without a hostname should be rejected")
+        except ValueError:
+            pass
+        assert inventory.conn.execute("SELECT COUNT(*) FROM scan_timeline").fetchone()[0] == 3
+        inventory.close()
+
+    # A date that won't parse, or lies in the future, is stored as the upload
+    # time and doesn't hold back the next real scan
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        for bad_date in ('garbage', '2999-01-01T00:00:00+00:00'):
+            assert inventory.update_system(dict(make_scan(18, 'A'), detection_date=bad_date))['applied']
+            last_scan = inventory.conn.execute("SELECT last_scan FROM systems").fetchone()[0]
+            assert last_scan.endswith('+00:00') and last_scan < '2999', last_scan
+            inventory.conn.execute("UPDATE systems SET last_scan = '2020-01-01T00:00:00+00:00'")
+            inventory.conn.commit()
+        # Stored before dates were checked
+        inventory.conn.execute("UPDATE systems SET last_scan = 'garbage'")
+        inventory.conn.commit()
+        assert inventory.update_system(make_scan(19, 'B'))['applied']
+        assert cpu_model(inventory) == 'B'
+        inventory.close()
+
+    print("✅ Replay of late scans test passed")
+
+
+def test_scanner_spools():
+    """The /scan_system script spools failed uploads and sends them next time"""
+    print("Testing scanner spooling...")
+
+    from werkzeug.serving import make_server
+
+    import web_interface
+    with tempfile.TemporaryDirectory() as tmp:
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+        script = client.get('/scan_system').get_data(as_text=True)
+        upload = re.search(r'^# Scans that couldn.*?^# Cleanup', script, re.MULTILINE | re.DOTALL).group(0)
+        spool = os.path.join(tmp, 'spool')
+
+        def run_scanner(server_url, scan):
+            with open(os.path.join(tmp, 'hardware_data.json'), 'w') as f:
+                json.dump(scan, f)
+            return subprocess.run(['bash', '-c', upload], cwd=tmp, capture_output=True, text=True, timeout=30,
+                                  env=dict(os.environ, SERVER_URL=server_url, INVENTORY_SPOOL_DIR=spool))
+
+        # Nothing listens on this port
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            down = f'http://127.0.0.1:{s.getsockname()[1]}'
+        for day in (17, 16):
+            result = run_scanner(down, make_scan(day, 'EPYC 7302'))
+            assert result.returncode == 1 and 'Scan spooled to' in result.stdout, result
+        assert len(os.listdir(spool)) == 2
+
+        server = make_server('127.0.0.1', 0, web_interface.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            result = run_scanner(f'http://127.0.0.1:{server.server_port}', make_scan(18, 'EPYC 7543'))
+        finally:
+            server.shutdown()
+        assert result.returncode == 0 and 'Uploading 2 spooled scans' in result.stdout, result
+        assert 'Replayed 3 scans: 3 applied' in result.stdout, result.stdout
+        assert os.listdir(spool) == []
+
+        inventory = HardwareInventory(web_interface.app.config['DATABASE'])
+        assert cpu_model(inventory) == 'EPYC 7543'
+        assert inventory.conn.execute("SELECT COUNT(*) FROM scan_timeline").fetchone()[0] == 3
+        inventory.close()
+
+        # A single late upload says it was only archived, and gets no ETag
+        response = client.post('/api/upload_scan', json=make_scan(17, 'EPYC 7302'))
+        assert response.get_json()['status'] == 'stale' and 'ETag' not in response.headers, response.get_json()
+        inventory = HardwareInventory(web_interface.app.config['DATABASE'])
+        assert cpu_model(inventory) == 'EPYC 7543'
+        inventory.close()
+
+        too_many = [make_scan(day, 'EPYC 7302') for day in range(1, 30)] * 2
+        assert client.post('/api/upload_scan', json=too_many).status_code == 413
+        assert client.post('/api/upload_scan', json=[{'cpu': {}}]).status_code == 400
+
+    print("✅ Scanner spooling test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Scan Spool Tests")
+    print("=" * 50)
+
+    tests = [
+        test_replay_order,
+        test_scanner_spools,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
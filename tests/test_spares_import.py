@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the spare-part importer
+
+Run with: python3 test_spares_import.py
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory
+from spares_import import map_record, parse_mapping
+
+PURCHASING_CSV = """Part Type,Vendor,Part No,Serial No.,Bin,Capacity
+storage,Samsung,SSD 870 EVO,S1,Shelf A,1TB
+memory,Kingston,KSM32RD8,M1,Shelf B,32GB
+storage,Samsung,SSD 870 EVO,S1,Shelf A,1TB
+gpu,NVIDIA,,G1,Shelf C,
+sled,Acme,Widget,W1,Shelf C,
+memory,Kingston,KSM32RD8,M2,Shelf B,lots
+
+storage,Seagate,ST4000,EXISTING,Shelf D,4TB
+storage,Seagate,ST4000,S2,Shelf D,4TB
+"""
+
+
+def test_mapping():
+    """Columns map by explicit mapping, field name or alias"""
+    print("Testing column mapping...")
+
+    assert map_record({'Serial No.': ' X1 ', 'Vendor': 'Intel', 'Type': 'cpu'}) == \
+        {'serial_number': 'X1', 'manufacturer': 'Intel', 'component_type': 'cpu'}
+    # A column named after a field beats an alias for the same field
+    assert map_record({'description': 'long text', 'model': 'E5-2680'})['model'] == 'E5-2680'
+    mapping = parse_mapping('Part No=model, Description=notes')
+    assert map_record({'Part No': 'P1', 'Description': 'boxed'}, mapping) == {'model': 'P1', 'notes': 'boxed'}
+    try:
+        parse_mapping('Part No=colour')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    print("✅ Column mapping test passed")
+
+
+def test_csv_import():
+    """Valid rows are imported in batches and bad rows rejected with a reason"""
+    print("Testing CSV import...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = HardwareInventory(os.path.join(tmp, 'inventory.db'))
+        try:
+            inventory.add_spare_component('storage', 'Seagate', 'ST4000', 'EXISTING')
+            rejects = io.StringIO()
+            summary = inventory.import_spares(io.StringIO(PURCHASING_CSV), 'csv', rejects=rejects, batch=2)
+            assert (summary['read'], summary['imported'], summary['rejected'], summary['duplicates']) == \
+                (8, 3, 5, 2), summary
+            assert summary['batches'] == 2, summary
+
+            rows = {row['serial_number']: row for row in inventory.iter_components(status='spare')}
+            assert sorted(rows) == ['EXISTING', 'M1', 'S1', 'S2']
+            assert rows['S1']['location'] == 'Shelf A' and rows['S1']['capacity_bytes'] == 1024 ** 4
+            assert json.loads(rows['M1']['specifications']) == {'size': '32GB'}
+
+            rejected = list(csv.DictReader(io.StringIO(rejects.getvalue())))
+            assert [(row['import_line'], row['Serial No.']) for row in rejected] == \
+                [('4', 'S1'), ('5', 'G1'), ('6', 'W1'), ('7', 'M2'), ('9', 'EXISTING')], rejected
+            assert 'missing model' in rejected[1]['import_error']
+            assert 'already in the inventory' in rejected[4]['import_error']
+
+            # A dry run validates without writing
+            summary = inventory.import_spares(io.StringIO(PURCHASING_CSV.replace('S1', 'S9')), 'csv',
+                                              dry_run=True)
+            assert summary['imported'] == 1 and len(list(inventory.iter_components())) == 4, summary
+        finally:
+            inventory.close()
+
+    print("✅ CSV import test passed")
+
+
+def test_ndjson_upload():
+    """POST /components/import streams an NDJSON upload"""
+    print("Testing NDJSON upload...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        client = web_interface.app.test_client()
+
+        body = '\n'.join([json.dumps({'type': 'cpu', 'make': 'Intel', 'Part': 'Xeon Gold 6130', 'sn': 'C1'}),
+                          '{not json',
+                          json.dumps({'type': 'cpu', 'make': 'AMD', 'Part': 'EPYC 7302'})]) + '\n'
+        response = client.post('/components/import', data={
+            'file': (io.BytesIO(body.encode()), 'spares.ndjson')})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        result = response.get_json()
+        assert (result['format'], result['imported'], result['rejected']) == ('ndjson', 2, 1), result
+        reject = json.loads(result['rejects'])
+        assert reject['import_line'] == 2 and 'invalid JSON' in reject['import_error']
+
+        response = client.post('/components/import', data={
+            'file': (io.BytesIO(body.encode()), 'spares.ndjson'), 'mapping': 'Part=flavour'})
+        assert response.status_code == 400
+
+    print("✅ NDJSON upload test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Spares Import Tests")
+    print("=" * 50)
+
+    tests = [
+        test_mapping,
+        test_csv_import,
+        test_ndjson_upload,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for SQL tracing and the Server-Timing header
+
+Run with: python3 test_sql_trace.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import sql_trace
+
+SLOW_SQL = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000)
+    SELECT SUM(i) FROM n
+"""
+
+
+def test_statements_recorded_per_request():
+    """Statements are counted, timed and attributed to the current request"""
+    print("Testing statement recording...")
+
+    conn = sql_trace.instrument(sqlite3.connect(':memory:'))
+    log = sql_trace.begin_request()
+    conn.execute("CREATE TABLE t (x)")
+    for i in range(3):
+        conn.execute("INSERT INTO t VALUES (?)", (i,))
+    conn.execute(SLOW_SQL).fetchone()
+    finished = sql_trace.end_request()
+    conn.close()
+
+    assert finished is log
+    # CREATE, the implicit BEGIN, three INSERTs and the recursive query
+    assert log.count == 6, log.statements
+    assert log.top(1, by='count')[0] == {'sql': 'INSERT INTO t VALUES (?)', 'count': 3,
+                                         'seconds': log.statements['INSERT INTO t VALUES (?)'][1]}
+    assert log.top(1)[0]['sql'].startswith('WITH RECURSIVE'), log.top(1)
+    assert log.top(1)[0]['seconds'] > 0
+    assert sql_trace.current_log() is None
+
+    print("✅ Statement recording test passed")
+
+
+def test_paused():
+    """Bulk statements run while paused are not recorded"""
+    print("Testing paused tracing...")
+
+    conn = sql_trace.instrument(sqlite3.connect(':memory:'))
+    conn.execute("CREATE TABLE t (x)")
+    log = sql_trace.begin_request()
+    with sql_trace.paused(conn):
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+    conn.execute("SELECT COUNT(*) FROM t").fetchone()
+    sql_trace.end_request()
+    conn.close()
+
+    assert list(log.statements) == ['SELECT COUNT(*) FROM t'], log.statements
+
+    print("✅ Paused tracing test passed")
+
+
+def test_slow_query_logged():
+    """Statements over the threshold are logged"""
+    print("Testing slow query log...")
+
+    conn = sql_trace.instrument(sqlite3.connect(':memory:'))
+    threshold = sql_trace.SLOW_QUERY_SECONDS
+    sql_trace.SLOW_QUERY_SECONDS = 0.0
+    messages = []
+    handler = type('Capture', (sql_trace.logging.Handler,),
+                   {'emit': lambda self, record: messages.append(record.getMessage())})()
+    sql_trace.logger.addHandler(handler)
+    try:
+        sql_trace.begin_request()
+        conn.execute(SLOW_SQL).fetchone()
+        sql_trace.end_request()
+    finally:
+        sql_trace.logger.removeHandler(handler)
+        sql_trace.SLOW_QUERY_SECONDS = threshold
+        conn.close()
+
+    assert any(m.startswith('Slow query') and 'WITH RECURSIVE' in m for m in messages), messages
+
+    print("✅ Slow query log test passed")
+
+
+def test_server_timing_header():
+    """Debug mode adds a Server-Timing header with database time"""
+    print("Testing Server-Timing header...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        web_interface.app.config['DATABASE'] = os.path.join(tmp, 'inventory.db')
+        web_interface.warm_up()
+        client = web_interface.app.test_client()
+
+        web_interface.app.debug = True
+        try:
+            header = client.get('/').headers.get('Server-Timing', '')
+        finally:
+            web_interface.app.debug = False
+        # Component counts, system count and the live-update starting point
+        assert header.startswith('db;dur=') and '3 queries' in header, header
+        assert 'Server-Timing' not in client.get('/').headers
+
+    print("✅ Server-Timing header test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running SQL Tracing Tests")
+    print("=" * 50)
+
+    tests = [
+        test_statements_recorded_per_request,
+        test_paused,
+        test_slow_query_logged,
+        test_server_timing_header,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
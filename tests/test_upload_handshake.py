@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the conditional scan upload handshake
+
+Run with: python3 test_upload_handshake.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inventory_manager import HardwareInventory, scan_fingerprint
+
+SAMPLE_SCAN = {
+    'hostname': 'handshake-host',
+    'detection_date': '2025-06-18T23:42:00+10:00',
+    'cpu': {'model': 'AMD Ryzen 5 3600 6-Core Processor', 'cores': '12'},
+    'storage': [{'device': '/dev/sda', 'model': 'Samsung SSD 870', 'serial': 'S1', 'size': '1.8TiB'}],
+}
+
+
+def test_fingerprint_ignores_detection_date():
+    """The fingerprint depends on the hardware, not when it was scanned"""
+    print("Testing scan fingerprint...")
+
+    rescan = dict(SAMPLE_SCAN, detection_date='2025-06-19T08:00:00+10:00')
+    assert scan_fingerprint(rescan) == scan_fingerprint(SAMPLE_SCAN)
+
+    changed = dict(SAMPLE_SCAN, cpu={'model': 'AMD Ryzen 9 5950X 16-Core Processor', 'cores': '32'})
+    assert scan_fingerprint(changed) != scan_fingerprint(SAMPLE_SCAN)
+
+    print("✅ Scan fingerprint test passed")
+
+
+def test_handshake():
+    """Unchanged scans get 304 without a body; changed or unknown ones must upload"""
+    print("Testing upload handshake...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import web_interface
+        db_path = os.path.join(tmp, 'inventory.db')
+        web_interface.app.config['DATABASE'] = db_path
+        client = web_interface.app.test_client()
+        fingerprint = scan_fingerprint(SAMPLE_SCAN)
+        headers = {
+            'X-Inventory-Hostname': SAMPLE_SCAN['hostname'],
+            'X-Inventory-Detection-Date': '2025-06-20T09:00:00+10:00',
+            'If-None-Match': f'"{fingerprint}"',
+        }
+
+        # Unknown system: the scanner has to send the payload
+        response = client.post('/api/upload_scan', headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'upload_required'
+
+        response = client.post('/api/upload_scan', json=SAMPLE_SCAN)
+        assert response.status_code == 200
+        assert response.headers['ETag'] == f'"{fingerprint}"'
+
+        response = client.post('/api/upload_scan', headers=headers)
+        assert response.status_code == 304, response.status_code
+        assert response.get_data() == b''
+
+        # A late handshake is still answered, but doesn't move last_scan back
+        headers['X-Inventory-Detection-Date'] = '2025-06-19T09:00:00+10:00'
+        assert client.post('/api/upload_scan', headers=headers).status_code == 304
+
+        inventory = HardwareInventory(db_path)
+        try:
+            assert inventory.get_system_details('handshake-host')['last_scan'] == '2025-06-19T23:00:00+00:00'
+        finally:
+            inventory.close()
+
+        headers['If-None-Match'] = '"0000"'
+        response = client.post('/api/upload_scan', headers=headers)
+        assert response.get_json()['status'] == 'upload_required'
+
+    print("✅ Upload handshake test passed")
+
+
+def main():
+    """Run all tests"""
+    print("🧪 Running Upload Handshake Tests")
+    print("=" * 50)
+
+    tests = [
+        test_fingerprint_ignores_detection_date,
+        test_handshake,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
+        print()
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())